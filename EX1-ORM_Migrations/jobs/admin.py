@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from . import queue
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "attempts", "run_at", "wait_ms", "run_ms", "worker")
+    list_filter = ("status", "name")
+    search_fields = ("key",)
+    ordering = ("-id",)
+    readonly_fields = ("created_at", "started_at", "finished_at", "locked_until", "wait_ms", "run_ms", "worker", "error")
+    actions = ["retry"]
+
+    @admin.action(description="Повторить выбранные упавшие задачи")
+    def retry(self, request, queryset):
+        count = queue.retry_failed(ids=list(queryset.values_list("pk", flat=True)))
+        self.message_user(request, f"Возвращено в очередь: {count}")
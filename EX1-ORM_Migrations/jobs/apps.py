@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+    verbose_name = 'Фоновые задачи'
+    # приложение общее для обоих проектов: миграция не должна зависеть от DEFAULT_AUTO_FIELD
+    default_auto_field = 'django.db.models.AutoField'
@@ -0,0 +1,39 @@
+"""
+Цикл дочернего процесса воркера (jobs/worker.py).
+
+Процесс запускается через spawn и импортирует этот модуль до
+django.setup(), поэтому очередь и модели — только после настройки.
+"""
+import signal
+import time
+
+IDLE = 0.0
+
+
+def main(slot, state, stop, burst):
+    """Брать и выполнять задачи; state — [id задачи, момент старта, таймаут] для родителя."""
+    import django
+
+    django.setup()
+    from django.db import connections
+
+    from . import queue
+
+    # Ctrl+C в терминале получает вся группа процессов: останавливает родитель
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker = queue.worker_name(slot)
+    poll = queue.options()['POLL_SECONDS']
+    try:
+        while not stop.is_set():
+            jobs = queue.claim(worker)
+            if not jobs:
+                if burst:
+                    break
+                stop.wait(poll)
+                continue
+            job = jobs[0]
+            state[:] = [job.pk, time.time(), job.timeout]
+            queue.execute(job)
+            state[:] = [IDLE, IDLE, IDLE]
+    finally:
+        connections.close_all()
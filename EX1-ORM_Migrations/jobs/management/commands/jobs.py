@@ -0,0 +1,56 @@
+"""
+Состояние очереди фоновых задач (jobs/queue.py).
+
+    python manage.py jobs                      # по задачам: состояния, ожидание и выполнение (мс)
+    python manage.py jobs --json
+    python manage.py jobs --retry-failed [--name articles.process_image]
+    python manage.py jobs --prune [--days 7]   # удалить старые выполненные
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from jobs import queue
+from jobs.models import Job
+
+
+def _ms(value):
+    return '-' if value is None else str(value)
+
+
+class Command(BaseCommand):
+    help = 'Статистика очереди фоновых задач, повтор упавших, чистка выполненных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='вернуть упавшие задачи в очередь')
+        parser.add_argument('--name', help='только задачи с этим именем')
+        parser.add_argument('--prune', action='store_true', help='удалить выполненные задачи старше --days')
+        parser.add_argument('--days', type=int, help='срок хранения, по умолчанию JOBS["KEEP_DAYS"]')
+        parser.add_argument('--json', action='store_true', help='вывести статистику в JSON')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(f'Возвращено в очередь: {queue.retry_failed(options["name"])}')
+        if options['prune']:
+            self.stdout.write(f'Удалено выполненных: {queue.prune(options["days"])}')
+        stats = queue.stats()
+        if options['name']:
+            stats = {name: entry for name, entry in stats.items() if name == options['name']}
+        if options['json']:
+            self.stdout.write(json.dumps(stats, ensure_ascii=False, indent=2))
+            return
+        if not stats:
+            self.stdout.write('Очередь пуста')
+            return
+        statuses = [status for status, _label in Job.STATUSES]
+        header = ['задача', *statuses, 'ожид. p50', 'p95', 'вып. p50', 'p95', 'max']
+        rows = []
+        for name, entry in stats.items():
+            wait, run = entry.get('wait_ms', {}), entry.get('run_ms', {})
+            rows.append([
+                name, *(str(entry['counts'].get(status, 0)) for status in statuses),
+                _ms(wait.get('p50')), _ms(wait.get('p95')), _ms(run.get('p50')), _ms(run.get('p95')), _ms(run.get('max')),
+            ])
+        widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+        for row in [header, *rows]:
+            self.stdout.write('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
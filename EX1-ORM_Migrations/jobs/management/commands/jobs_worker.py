@@ -0,0 +1,30 @@
+"""
+Воркер очереди фоновых задач (jobs/worker.py).
+
+    python manage.py jobs_worker                    # JOBS['PROCESSES'] процессов, до SIGTERM
+    python manage.py jobs_worker --processes 4
+    python manage.py jobs_worker --burst            # выйти, когда готовых задач нет
+    python manage.py jobs_worker --processes 0      # в этом процессе, для отладки
+"""
+from django.core.management.base import BaseCommand
+
+from jobs import queue, worker
+
+
+class Command(BaseCommand):
+    help = 'Выполнять фоновые задачи из очереди в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, help='число процессов (0 — без дочерних процессов)')
+        parser.add_argument('--burst', action='store_true', help='завершиться, когда очередь пуста')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        if processes is None:
+            processes = queue.options()['PROCESSES']
+        if processes == 0:
+            count = worker.run_inline(burst=options['burst'], log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {count}'))
+            return
+        self.stdout.write(f'Воркеров: {processes}')
+        worker.Supervisor(processes, burst=options['burst'], log=self.stdout.write).run()
@@ -0,0 +1,76 @@
+"""
+Очередь фоновых задач в основной БД (jobs/queue.py).
+"""
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    args = models.JSONField(default=dict, blank=True, verbose_name='Аргументы')
+    # одинаковая работа в очереди одна: повторная постановка вернёт ждущую задачу
+    key = models.CharField(max_length=200, null=True, blank=True, verbose_name='Ключ')
+    # больше — раньше
+    priority = models.SmallIntegerField(default=0, verbose_name='Приоритет')
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED, verbose_name='Состояние')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name='Попыток всего')
+    timeout = models.PositiveIntegerField(default=300, verbose_name='Таймаут, с')
+    # не раньше этого момента: отложенный запуск и пауза перед повтором
+    run_at = models.DateTimeField(default=timezone.now, verbose_name='Запуск не раньше')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Поставлена')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начата')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершена')
+    # воркер, который её взял, и до какого момента: после — задача считается брошенной
+    worker = models.CharField(max_length=100, blank=True, verbose_name='Воркер')
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name='Занята до')
+    wait_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name='Ожидание, мс')
+    run_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name='Выполнение, мс')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=Q(status='queued'), name='jobs_job_queued_key_uniq'),
+        ]
+        indexes = [
+            # выбор следующей задачи: только ждущие, по приоритету и сроку
+            models.Index(
+                fields=['-priority', 'run_at', 'id'], condition=Q(status='queued'), name='jobs_job_ready_idx',
+            ),
+            models.Index(fields=['status', 'locked_until'], name='jobs_job_lease_idx'),
+            models.Index(fields=['status', 'finished_at'], name='jobs_job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class JobLock(models.Model):
+    """
+    Блокировка-строка: кто вставил строку с этим именем, тот и владеет.
+    Заменяет SELECT ... FOR UPDATE SKIP LOCKED там, где его нет (SQLite).
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    owner = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Блокировка очереди'
+        verbose_name_plural = 'Блокировки очереди'
+
+    def __str__(self):
+        return self.name
@@ -1,11 +1,36 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 
+from . import exports
 from .models import Student, Teacher
 
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
-    pass
+    # потоковая выгрузка выбранных учеников с учителями (website/export.py)
+    actions = exports.students.admin_actions()
+
+    def get_urls(self):
+        analytics_url = path(
+            'analytics/', self.admin_site.admin_view(self.analytics_view), name='school_student_analytics',
+        )
+        return [analytics_url, *super().get_urls()]
+
+    def analytics_view(self, request):
+        # numpy — при открытии страницы, а не при старте: его пул потоков не переживает fork
+        from . import analytics
+
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Аналитика',
+            'report': analytics.report(),
+        }
+        return TemplateResponse(request, 'admin/school/analytics.html', context)
 
 
 @admin.register(Teacher)
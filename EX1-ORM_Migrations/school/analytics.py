@@ -0,0 +1,157 @@
+"""
+Сводные отчёты по школе: классы, нагрузка учителей, пробелы в предметах,
+общие учителя классов.
+
+Обход Student.teachers в Python — запрос или объект на каждую связь.
+Здесь всё читается тремя запросами ``values_list`` в целочисленные
+массивы numpy (ученики, учителя, through-таблица), классы и предметы
+кодируются номерами (``np.unique(..., return_inverse=True)``), и каждый
+отчёт — это bincount или произведение матриц по этим номерам:
+
+  * ``groups`` — учеников в классе;
+  * ``subjects`` — по предмету: учителей, связей с учениками, разных
+    учеников, средняя и наибольшая нагрузка на учителя;
+  * ``gaps`` — классы, где ни у одного ученика нет учителя по предмету
+    (матрица класс × предмет с числом учеников, у кого он есть);
+  * ``overlap`` — пары классов с общими учителями (M·Mᵀ для матрицы
+    класс × учитель).
+
+Результат кешируется (website/cache.py, пространство школы) до любой
+правки учеников, учителей или их связей — их сигналы меняют версию.
+
+    python manage.py school_analytics [--report gaps --subject Физика] [--json]
+
+В админке — «Аналитика» на странице списка учеников.
+"""
+import numpy as np
+
+from website.cache import cached
+
+from .models import Student, Teacher
+from .tenancy import namespace
+
+REPORTS = ('groups', 'subjects', 'gaps', 'overlap')
+# ключ содержит версию данных, поэтому отчёт держим, пока его не вытеснят
+REPORT_TTL = 24 * 3600
+
+
+def _codes(values):
+    """Значения → (отсортированные уникальные, номер каждого значения)."""
+    if not values:
+        return [], np.zeros(0, dtype=np.int64)
+    labels, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+    return labels.tolist(), codes.astype(np.int64)
+
+
+class Dataset:
+    """Ученики, учителя и связи — массивами номеров."""
+
+    def __init__(self, students, teachers, links):
+        """students — (id, класс), teachers — (id, предмет, имя), оба по возрастанию id."""
+        student_ids = np.array([row[0] for row in students], dtype=np.int64)
+        self.teacher_ids = np.array([row[0] for row in teachers], dtype=np.int64)
+        self.teacher_names = [row[2] for row in teachers]
+        self.groups, self.student_group = _codes([row[1] for row in students])
+        self.subjects, self.teacher_subject = _codes([row[1] for row in teachers])
+
+        # связи → номера строк: id отсортированы, их место находит searchsorted
+        links = np.array(links, dtype=np.int64).reshape(-1, 2)
+        self.link_student = np.searchsorted(student_ids, links[:, 0])
+        self.link_teacher = np.searchsorted(self.teacher_ids, links[:, 1])
+
+    @classmethod
+    def load(cls):
+        through = Student.teachers.through.objects.values_list('student_id', 'teacher_id')
+        return cls(
+            list(Student.objects.order_by('id').values_list('id', 'group').iterator(chunk_size=5000)),
+            list(Teacher.objects.order_by('id').values_list('id', 'subject', 'name')),
+            list(through.iterator(chunk_size=5000)),
+        )
+
+    def group_sizes(self):
+        return np.bincount(self.student_group, minlength=len(self.groups))
+
+    def groups_report(self):
+        return list(zip(self.groups, self.group_sizes().tolist()))
+
+    def subjects_report(self):
+        subject_count = len(self.subjects)
+        load = np.bincount(self.link_teacher, minlength=len(self.teacher_ids))
+        teachers = np.bincount(self.teacher_subject, minlength=subject_count)
+        links = np.bincount(self.teacher_subject, weights=load, minlength=subject_count).astype(np.int64)
+        busiest = np.zeros(subject_count, dtype=np.int64)
+        np.maximum.at(busiest, self.teacher_subject, load)
+        # разные ученики предмета — уникальные пары (предмет, ученик)
+        size = max(len(self.student_group), 1)
+        pairs = np.unique(self.teacher_subject[self.link_teacher] * size + self.link_student)
+        students = np.bincount(pairs // size, minlength=subject_count)
+        return [
+            {
+                'subject': subject,
+                'teachers': int(teachers[i]),
+                'links': int(links[i]),
+                'students': int(students[i]),
+                'average_load': round(float(links[i] / teachers[i]), 1) if teachers[i] else 0.0,
+                'max_load': int(busiest[i]),
+            }
+            for i, subject in enumerate(self.subjects)
+        ]
+
+    def coverage(self):
+        """Матрица класс × предмет: учеников класса с учителем этого предмета."""
+        covered = np.zeros((len(self.groups), len(self.subjects)), dtype=np.int64)
+        if not len(self.link_student):
+            return covered
+        size = max(len(self.subjects), 1)
+        pairs = np.unique(self.link_student * size + self.teacher_subject[self.link_teacher])
+        np.add.at(covered, (self.student_group[pairs // size], pairs % size), 1)
+        return covered
+
+    def gaps_report(self):
+        """[(предмет, [классы, где ни у кого нет учителя по нему]), ...]."""
+        covered = self.coverage()
+        return [
+            (subject, [self.groups[g] for g in np.flatnonzero(covered[:, i] == 0).tolist()])
+            for i, subject in enumerate(self.subjects)
+        ]
+
+    def overlap_report(self):
+        """Пары классов с общими учителями, больше общих — выше."""
+        taught = np.zeros((len(self.groups), len(self.teacher_ids)), dtype=np.int64)
+        taught[self.student_group[self.link_student], self.link_teacher] = 1
+        shared = taught @ taught.T
+        first, second = np.triu_indices(len(self.groups), k=1)
+        counts = shared[first, second]
+        keep = np.flatnonzero(counts)
+        keep = keep[np.lexsort((second[keep], first[keep], -counts[keep]))]
+        return [
+            (self.groups[first[i]], self.groups[second[i]], int(counts[i]), self._common(taught, first[i], second[i]))
+            for i in keep.tolist()
+        ]
+
+    def _common(self, taught, first, second):
+        return sorted(self.teacher_names[t] for t in np.flatnonzero(taught[first] & taught[second]).tolist())
+
+    def report(self):
+        return {
+            'groups': self.groups_report(),
+            'subjects': self.subjects_report(),
+            'gaps': self.gaps_report(),
+            'overlap': self.overlap_report(),
+        }
+
+
+@cached(namespace, key=lambda: 'analytics', soft_ttl=REPORT_TTL, hard_ttl=REPORT_TTL)
+def report():
+    """Все отчёты разом — простыми списками и словарями (кешируются pickle)."""
+    return Dataset.load().report()
+
+
+def gaps(subject):
+    """Классы без учителя по предмету (из кешированного отчёта)."""
+    current = report()
+    for name, groups in current['gaps']:
+        if name == subject:
+            return groups
+    # предмета нет ни у одного учителя — не покрыт ни один класс
+    return [group for group, _students in current['groups']]
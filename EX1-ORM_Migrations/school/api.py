@@ -0,0 +1,115 @@
+"""
+JSON API учеников и учителей только-для-чтения.
+
+    GET /api/students/?limit=50&fields=id,name,teachers&after=<курсор>
+    GET /api/teachers/?limit=50&fields=id,name,groups&after=<курсор>
+    GET /api/teachers/<pk>/students/?limit=50&after=<курсор>
+
+Ответ строится из кортежей values_list(): экземпляры Student/Teacher
+не создаются. Пагинация — keyset: ученики по (group, id), учителя по id.
+"""
+from django.db.models import Q
+from django.http import Http404
+from django.views.decorators.http import require_GET
+
+from school.models import Student, Teacher
+from school.read_models import load_teachers
+from school.roster import group_counts
+from website.api import (
+    ApiError, decode_cursor, error_response, json_response,
+    parse_fields, parse_limit, split_page,
+)
+
+STUDENT_FIELDS = ('id', 'name', 'group', 'teachers')
+TEACHER_FIELDS = ('id', 'name', 'subject', 'groups', 'students_total')
+
+
+def student_teachers(student_ids):
+    """{student_id: [{'id': ..., 'name': ..., 'subject': ...}, ...]} — учителя по имени."""
+    return {
+        student_id: [
+            teacher._asdict()
+            for teacher in sorted(teachers, key=lambda t: (t.name, t.id))
+        ]
+        for student_id, teachers in load_teachers(student_ids).items()
+    }
+
+
+def students_page(request, queryset):
+    """Общая часть /api/students/ и /api/teachers/<pk>/students/."""
+    try:
+        fields = parse_fields(request, STUDENT_FIELDS)
+        limit = parse_limit(request)
+        cursor = decode_cursor(request, 2)
+        if cursor and not (isinstance(cursor[0], str) and isinstance(cursor[1], int)):
+            raise ApiError('некорректный курсор after')
+    except ApiError as e:
+        return error_response(e)
+
+    columns = [name for name in fields if name != 'teachers']
+    # group нужен для курсора, даже если его не запрашивали
+    select = columns if 'group' in columns else columns + ['group']
+    group_idx = select.index('group')
+
+    queryset = queryset.order_by('group', 'id')
+    if cursor:
+        queryset = queryset.filter(Q(group__gt=cursor[0]) | Q(group=cursor[0], id__gt=cursor[1]))
+    rows = list(queryset.values_list(*select)[:limit + 1])
+    rows, next_cursor = split_page(rows, limit, lambda row: (row[group_idx], row[0]))
+
+    teachers = student_teachers([row[0] for row in rows]) if 'teachers' in fields else None
+
+    results = []
+    for row in rows:
+        item = dict(zip(columns, row))
+        if teachers is not None:
+            item['teachers'] = teachers.get(row[0], [])
+        results.append(item)
+
+    return json_response({'results': results, 'next': next_cursor})
+
+
+@require_GET
+def students_api(request):
+    return students_page(request, Student.objects.all())
+
+
+@require_GET
+def teacher_students_api(request, pk):
+    if not Teacher.objects.filter(pk=pk).exists():
+        raise Http404
+    return students_page(request, Student.objects.filter(teachers=pk))
+
+
+@require_GET
+def teachers_api(request):
+    try:
+        fields = parse_fields(request, TEACHER_FIELDS)
+        limit = parse_limit(request)
+        cursor = decode_cursor(request, 1)
+        if cursor and not isinstance(cursor[0], int):
+            raise ApiError('некорректный курсор after')
+    except ApiError as e:
+        return error_response(e)
+
+    columns = [name for name in fields if name in ('id', 'name', 'subject')]
+    queryset = Teacher.objects.order_by('id')
+    if cursor:
+        queryset = queryset.filter(id__gt=cursor[0])
+    rows = list(queryset.values_list(*columns)[:limit + 1])
+    rows, next_cursor = split_page(rows, limit, lambda row: (row[0],))
+
+    with_counts = 'groups' in fields or 'students_total' in fields
+    counts = group_counts([row[0] for row in rows]) if with_counts else {}
+
+    results = []
+    for row in rows:
+        item = dict(zip(columns, row))
+        groups = counts.get(row[0], [])
+        if 'groups' in fields:
+            item['groups'] = dict(groups)
+        if 'students_total' in fields:
+            item['students_total'] = sum(students for _group, students in groups)
+        results.append(item)
+
+    return json_response({'results': results, 'next': next_cursor})
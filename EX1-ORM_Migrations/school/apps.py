@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class SchoolConfig(AppConfig):
     name = 'school'
     verbose_name = 'Школа'
+
+    def ready(self):
+        from website import querylog
+
+        from . import changes, exports, plans, prefetch, signals, tasks, tenancy, warmup  # noqa: F401
+
+        # журнал SQL для advise_indexes (settings.QUERY_LOG)
+        querylog.install()
+        # базы школ из settings.SCHOOL_TENANTS
+        tenancy.register()
@@ -0,0 +1,36 @@
+"""
+Ленты изменений школы (website/changes.py):
+
+    GET /api/students/changes/?since=<токен>   — имя, класс, id учителей
+    GET /api/teachers/changes/?since=<токен>   — имя, предмет
+    python manage.py changes students --since <токен>
+
+Ученику ставится updated_at и при правке его учителей (school/signals.py),
+так что потребитель видит и изменения связей.
+"""
+from collections import defaultdict
+
+from website.changes import Feed, register
+
+from .models import Student, Teacher, Tombstone
+
+
+def student_teacher_ids(student_ids):
+    """{student_id: [teacher_id, ...]} одним запросом к промежуточной таблице."""
+    result = defaultdict(list)
+    rows = (
+        Student.teachers.through.objects
+        .filter(student_id__in=student_ids)
+        .order_by('teacher_id')
+        .values_list('student_id', 'teacher_id')
+    )
+    for student_id, teacher_id in rows:
+        result[student_id].append(teacher_id)
+    return result
+
+
+students = register(Feed(
+    'students', Student, ('name', 'group'), Tombstone,
+    related=student_teacher_ids, related_name='teachers',
+))
+teachers = register(Feed('teachers', Teacher, ('name', 'subject'), Tombstone))
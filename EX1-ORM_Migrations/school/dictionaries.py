@@ -0,0 +1,13 @@
+"""
+Справочник учителей в памяти процесса (см. website/dictionaries.py).
+
+Список учеников и API берут из through-таблицы только teacher_id, а имя
+и предмет — отсюда, без JOIN с таблицей учителей. Сбрасывается
+сигналами в school/signals.py.
+"""
+from website.dictionaries import ModelDictionary
+
+from .models import Teacher
+from .read_models import TeacherRow
+
+teachers = ModelDictionary(Teacher, ('id', 'name', 'subject'), record=TeacherRow)
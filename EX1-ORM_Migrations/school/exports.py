@@ -0,0 +1,30 @@
+"""
+Выгрузка учеников с учителями (website/export.py):
+
+    python manage.py export students --format ndjson --gzip -o students.ndjson.gz
+
+и действия «Выгрузить в CSV/NDJSON» в админке учеников. Имена учителей
+склеиваются в SQL (GroupConcat по Student.teachers).
+"""
+from website.export import Export, GroupConcat, register, split_group
+
+from .models import Student
+
+COLUMNS = ('id', 'name', 'group', 'teachers')
+
+
+def student_rows(queryset):
+    return (
+        queryset
+        .order_by('id')
+        .annotate(teacher_names=GroupConcat('teachers__name'))
+        .values_list('id', 'name', 'group', 'teacher_names')
+    )
+
+
+def prepare(row):
+    student_id, name, group, teacher_names = row
+    return student_id, name, group, split_group(teacher_names)
+
+
+students = register(Export('students', Student, COLUMNS, student_rows, prepare))
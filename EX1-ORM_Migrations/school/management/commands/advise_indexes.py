@@ -0,0 +1,12 @@
+"""
+Предложения индексов по журналу SQL-запросов (website/indexes.py).
+
+    python manage.py loadtest --log-queries .cache/queries.ndjson
+    python manage.py advise_indexes --log .cache/queries.ndjson
+    python manage.py advise_indexes --top 5 --json   # журнал из QUERY_LOG["PATH"]
+"""
+from website.indexes import AdviseCommand
+
+
+class Command(AdviseCommand):
+    pass
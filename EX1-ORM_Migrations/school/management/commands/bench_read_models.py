@@ -0,0 +1,76 @@
+"""
+Сравнение памяти: модели + prefetch_related('teachers') против StudentRow.
+
+    python manage.py bench_read_models --students 5000 --teachers 5
+
+Данные создаются внутри транзакции и откатываются после замера.
+"""
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from school.models import Student, Teacher
+
+
+class Rollback(Exception):
+    pass
+
+
+def measure(build):
+    """(число строк, пиковое число байт, секунды) на построение списка."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = build()
+    elapsed = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), peak, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Замер памяти/времени построения списка учеников: модели против read-моделей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--teachers', type=int, default=3, help='учителей на ученика')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['students'], options['teachers'])
+                self.report()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, teachers_per_student):
+        teachers = Teacher.objects.bulk_create(
+            Teacher(name=f'Учитель {i}', subject=f'Предм{i}') for i in range(20)
+        )
+        students = Student.objects.bulk_create(
+            Student(name=f'Ученик {i}', group=f'{5 + i % 7}А') for i in range(count)
+        )
+        Through = Student.teachers.through
+        Through.objects.bulk_create(
+            Through(student_id=student.pk, teacher_id=teachers[(student.pk + j) % len(teachers)].pk)
+            for student in students
+            for j in range(teachers_per_student)
+        )
+
+    def report(self):
+        def models():
+            return list(Student.objects.order_by('group').prefetch_related('teachers'))
+
+        def rows():
+            return list(Student.objects.order_by('group').as_rows())
+
+        results = {name: measure(build) for name, build in (('models', models), ('rows', rows))}
+        for name, (count, peak, elapsed) in results.items():
+            self.stdout.write(
+                f'{name:>7}: {count} строк, пик {peak / 1024:.0f} КиБ '
+                f'({peak / max(count, 1):.0f} Б/строку), {elapsed * 1000:.0f} мс'
+            )
+        ratio = results['models'][1] / max(results['rows'][1], 1)
+        self.stdout.write(self.style.SUCCESS(f'read-модели экономят память в {ratio:.1f} раза'))
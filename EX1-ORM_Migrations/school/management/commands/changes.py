@@ -0,0 +1,12 @@
+"""
+Ленты изменений учеников и учителей в NDJSON (website/changes.py).
+
+    python manage.py changes students                  # всё с начала + токен next
+    python manage.py changes teachers --since <токен>  # только новое
+    python manage.py changes --prune                   # почистить журнал удалений
+"""
+from website.changes import ChangesCommand
+
+
+class Command(ChangesCommand):
+    pass
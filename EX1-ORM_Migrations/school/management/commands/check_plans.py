@@ -0,0 +1,12 @@
+"""
+Планы ключевых выборок на засеянных данных (website/plans.py).
+
+    python manage.py check_plans                      # все, синтетика 5000 строк
+    python manage.py check_plans students_list --seed 0
+    python manage.py check_plans --update-baseline    # сохранить эталон
+"""
+from website.plans import PlansCommand
+
+
+class Command(PlansCommand):
+    pass
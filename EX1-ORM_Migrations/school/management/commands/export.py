@@ -0,0 +1,11 @@
+"""
+Потоковая выгрузка учеников (website/export.py).
+
+    python manage.py export students > students.csv
+    python manage.py export students --format ndjson --gzip -o students.ndjson.gz
+"""
+from website.export import ExportCommand
+
+
+class Command(ExportCommand):
+    pass
@@ -0,0 +1,34 @@
+"""
+Нагрузочный прогон списков учеников/учителей и админки (website/loadtest.py).
+
+    python manage.py loadtest --duration 20 --concurrency 20
+    python manage.py loadtest --rate 200 --server gunicorn --workers 4
+    python manage.py loadtest --compare latest
+"""
+from school.models import Student, Teacher
+from website.loadtest import LoadTestCommand
+
+
+class Command(LoadTestCommand):
+    default_paths = (
+        '/',
+        '/teachers/',
+        '/admin/',
+        '/admin/school/student/',
+        '/admin/school/teacher/',
+    )
+    cache_namespaces = ('school', 'dict:school.teacher')
+
+    def seed(self, count):
+        teachers = Teacher.objects.bulk_create(
+            Teacher(name=f'Учитель {i}', subject=f'Предмет {i % 8}') for i in range(40)
+        )
+        students = Student.objects.bulk_create(
+            Student(name=f'Ученик {i}', group=f'{5 + i % 7}{"АБВ"[i % 3]}') for i in range(count)
+        )
+        Through = Student.teachers.through
+        Through.objects.bulk_create(
+            Through(student_id=student.pk, teacher_id=teachers[(i + j) % len(teachers)].pk)
+            for i, student in enumerate(students)
+            for j in range(3)
+        )
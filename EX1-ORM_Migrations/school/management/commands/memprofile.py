@@ -0,0 +1,14 @@
+"""
+Профиль памяти команды (website/memprofile.py).
+
+    python manage.py memprofile loaddata school.json              # пик, категории, флеймграф
+    python manage.py memprofile --check dumpdata school -o /dev/null  # ошибка сверх бюджета
+    python manage.py memprofile --folded load.folded loaddata school.json
+
+Свои ключи memprofile — до имени команды, всё после него передаётся ей.
+"""
+from website.memprofile import MemoryProfileCommand
+
+
+class Command(MemoryProfileCommand):
+    pass
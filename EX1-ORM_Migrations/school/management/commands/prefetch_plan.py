@@ -0,0 +1,13 @@
+"""
+План only/select_related/Prefetch по шаблонам страниц (website/prefetch.py).
+
+    python manage.py prefetch_plan                    # все страницы, синтетика 50 учеников
+    python manage.py prefetch_plan teacher_detail --seed 0
+    python manage.py prefetch_plan --update           # запомнить пути, увиденные при отрисовке
+    python manage.py prefetch_plan --check            # ошибка, если шаблон догружает данные
+"""
+from website.prefetch import PrefetchCommand
+
+
+class Command(PrefetchCommand):
+    pass
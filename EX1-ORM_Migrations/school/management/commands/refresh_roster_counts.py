@@ -0,0 +1,35 @@
+"""
+Обновить готовые сводки школы в БД (school/roster.py).
+
+    python manage.py refresh_roster_counts [--blocking]
+
+Список учеников school_student_roster обновляется на любой СУБД,
+счётчики учеников по классам — только на PostgreSQL. Обычно их
+обновляет задача school.refresh_roster после правок; команда — для
+первого включения SCHOOL_STUDENT_ROSTER / SCHOOL_ROSTER_COUNTS_MATVIEW
+и для cron.
+"""
+from django.core.management.base import BaseCommand
+from school.roster import (
+    MATVIEW_NAME, STUDENT_ROSTER_NAME, refresh_matview, refresh_student_roster, roster_connection,
+)
+
+
+class Command(BaseCommand):
+    help = 'Обновить список учеников и сводку учителей по классам (REFRESH MATERIALIZED VIEW)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking', action='store_true',
+            help='обычный REFRESH (блокирует чтение), а не CONCURRENTLY',
+        )
+
+    def handle(self, *args, **options):
+        concurrently = not options['blocking']
+        refresh_student_roster(concurrently=concurrently)
+        self.stdout.write(self.style.SUCCESS(f'{STUDENT_ROSTER_NAME} обновлено'))
+        if roster_connection().vendor != 'postgresql':
+            self.stdout.write(f'{MATVIEW_NAME}: только PostgreSQL, пропущено')
+            return
+        refresh_matview(concurrently=concurrently)
+        self.stdout.write(self.style.SUCCESS(f'{MATVIEW_NAME} обновлено'))
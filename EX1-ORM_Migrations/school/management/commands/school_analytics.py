@@ -0,0 +1,58 @@
+"""
+Сводные отчёты по школе (school/analytics.py).
+
+    python manage.py school_analytics                          # все отчёты
+    python manage.py school_analytics --report subjects --json
+    python manage.py school_analytics --report gaps --subject Физика
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from school import analytics
+from website.api import dumps
+
+
+class Command(BaseCommand):
+    help = 'Классы, нагрузка учителей, классы без предмета, общие учителя классов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', action='append', choices=analytics.REPORTS,
+                            help='какой отчёт вывести (можно несколько раз; по умолчанию все)')
+        parser.add_argument('--subject', help='для gaps: только этот предмет')
+        parser.add_argument('--json', action='store_true', help='вывести JSON')
+
+    def handle(self, *args, **options):
+        names = options['report'] or analytics.REPORTS
+        if options['subject'] and 'gaps' not in names:
+            raise CommandError('--subject относится к отчёту gaps')
+        current = analytics.report()
+        result = {name: current[name] for name in names}
+        if options['subject']:
+            result['gaps'] = [(options['subject'], analytics.gaps(options['subject']))]
+        if options['json']:
+            self.stdout.write(dumps(result).decode('utf-8'))
+            return
+        for name in names:
+            getattr(self, f'write_{name}')(result[name])
+
+    def write_groups(self, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING('Учеников в классах'))
+        for group, students in rows:
+            self.stdout.write(f'  {group}: {students}')
+
+    def write_subjects(self, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING('Нагрузка по предметам'))
+        for row in rows:
+            self.stdout.write(
+                f"  {row['subject']}: учителей {row['teachers']}, учеников {row['students']}, "
+                f"связей {row['links']}, в среднем {row['average_load']}, максимум {row['max_load']}"
+            )
+
+    def write_gaps(self, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING('Классы без учителя по предмету'))
+        for subject, groups in rows:
+            self.stdout.write(f"  {subject}: {', '.join(groups) or '—'}")
+
+    def write_overlap(self, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING('Общие учителя классов'))
+        for first, second, count, names in rows:
+            self.stdout.write(f"  {first} и {second}: {count} ({', '.join(names)})")
@@ -0,0 +1,121 @@
+"""
+Школы установки (school/tenancy.py).
+
+    python manage.py tenants                               # школы, их базы, число учеников и учителей
+    python manage.py tenants --migrate --parallel 4        # migrate в базу каждой школы, по 4 сразу
+    python manage.py tenants --run "warmup" --only gym1    # любая команда от имени школ (SCHOOL_TENANT)
+    python manage.py tenants --move lyceum --node node2    # копия школы на другой узел
+
+Миграции и команды идут отдельными процессами ``manage.py``: у каждой
+школы своё подключение и свой вывод, упавшая школа не мешает остальным.
+"""
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+
+from school import roster, tenancy
+from school.models import Student, Teacher
+
+DEFAULT_PARALLEL = 4
+
+
+class Command(BaseCommand):
+    help = 'Школы: список, миграции и команды по всем школам параллельно, перенос на другой узел'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--migrate', action='store_true', help='применить миграции в базах школ')
+        parser.add_argument('--run', metavar='COMMAND', help='выполнить команду manage.py для каждой школы')
+        parser.add_argument('--only', action='append', metavar='SLUG', help='только эти школы (можно несколько)')
+        parser.add_argument('--parallel', type=int, default=DEFAULT_PARALLEL, help='сколько школ сразу')
+        parser.add_argument('--move', metavar='SLUG', help='скопировать данные школы на узел --node')
+        parser.add_argument('--node', help='для --move: псевдоним узла в DATABASES')
+
+    def handle(self, *args, **options):
+        selected = self.select(options['only'])
+        if options['move']:
+            return self.move(options['move'], options['node'])
+        if options['migrate']:
+            return self.each(selected, lambda tenant: ['migrate', '--database', tenant.alias], options['parallel'])
+        if options['run']:
+            command = shlex.split(options['run'])
+            return self.each(selected, lambda tenant: command, options['parallel'], show_output=True)
+        self.list(selected)
+
+    def select(self, only):
+        known = tenancy.tenants()
+        unknown = set(only or ()) - set(known)
+        if unknown:
+            raise CommandError(f"неизвестные школы: {', '.join(sorted(unknown))}")
+        return [tenant for slug, tenant in known.items() if not only or slug in only]
+
+    def list(self, selected):
+        if not selected:
+            self.stdout.write('Школы не настроены (settings.SCHOOL_TENANTS): всё в базе default')
+            return
+        for tenant in selected:
+            database = connections[tenant.alias].settings_dict
+            where = f'схема {tenant.schema}' if connections[tenant.alias].vendor == 'postgresql' else database['NAME']
+            try:
+                with tenancy.activate(tenant):
+                    counts = f'учеников {Student.objects.count()}, учителей {Teacher.objects.count()}'
+            except DatabaseError as error:
+                counts = self.style.ERROR(f'база недоступна: {error}'.splitlines()[0])
+            hosts = ', '.join(tenant.hosts) or '-'
+            self.stdout.write(f'{tenant.slug}: {tenant.alias} на {tenant.node}, {where}; хосты {hosts}; {counts}')
+
+    def each(self, selected, arguments, parallel, show_output=False):
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+
+        def run(tenant):
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, manage, *arguments(tenant)], capture_output=True, text=True,
+                env={**os.environ, 'SCHOOL_TENANT': tenant.slug},
+            )
+            return tenant, result, time.perf_counter() - started
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            for tenant, result, seconds in pool.map(run, selected):
+                if result.returncode == 0:
+                    self.stdout.write(f'{tenant.slug}: готово за {seconds:.1f} с')
+                    if show_output and result.stdout.strip():
+                        self.stdout.write(result.stdout.rstrip())
+                    continue
+                failed.append(tenant.slug)
+                self.stdout.write(self.style.ERROR(f'{tenant.slug}: ошибка (код {result.returncode})'))
+                self.stdout.write((result.stderr or result.stdout).strip())
+        if failed:
+            raise CommandError(f"не удалось для школ: {', '.join(failed)}")
+
+    def move(self, slug, node):
+        if not node:
+            raise CommandError('--move требует --node')
+        if node not in connections:
+            raise CommandError(f'нет базы {node!r} в DATABASES')
+        tenant = tenancy.get(slug)
+        if node == tenant.node and tenant.database is None:
+            raise CommandError(f'школа {slug} уже на узле {node}')
+        target = tenancy.move_database(tenant, node)
+        call_command('migrate', database=target, verbosity=0)
+        try:
+            counts = tenancy.copy_data(tenant.alias, target, log=self.stdout.write)
+        except ValueError as error:
+            raise CommandError(str(error)) from None
+        # готовые сводки не копируются — собираются заново из скопированных строк
+        roster.refresh_student_roster(concurrently=False, using=target)
+        if connections[target].vendor == 'postgresql':
+            roster.refresh_matview(concurrently=False, using=target)
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Скопировано строк: {total}. Поставьте SCHOOL_TENANTS[{slug!r}]["NODE"] = {node!r} '
+            f'и перезапустите процессы; старые данные удалите после проверки.'
+        ))
@@ -0,0 +1,40 @@
+# Копия 0004_copy_fk_to_m2m пачками и в мигрируемую базу.
+# Уже применённую 0004 не переписываем: Django берёт эту миграцию вместо неё
+# только там, где 0004 ещё не применялась (новые базы, базы школ).
+
+from django.db import migrations
+
+BATCH = 5000
+
+
+def copy_fk_to_m2m(apps, schema_editor):
+    Student = apps.get_model('school', 'Student')
+    Through = Student.teachers.through
+    # У модели в историческом состоянии есть и FK, и M2M. Связи пишутся
+    # пачками в through-таблицу: по add() на ученика — несколько запросов
+    # на строку. В фоновую задачу (jobs) это не вынести: 0006 удаляет FK.
+    # база — та, что мигрируется (у каждой школы своя, school/tenancy.py), а не выбор роутера
+    db_alias = schema_editor.connection.alias
+    pairs = Student.objects.using(db_alias).filter(teacher__isnull=False).values_list('id', 'teacher_id').order_by('id')
+    batch = []
+    for student_id, teacher_id in pairs.iterator(chunk_size=BATCH):
+        batch.append(Through(student_id=student_id, teacher_id=teacher_id))
+        if len(batch) == BATCH:
+            Through.objects.using(db_alias).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    Through.objects.using(db_alias).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ('school', '0004_copy_fk_to_m2m'),
+    ]
+
+    dependencies = [
+        ('school', '0003_student_teachers'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_fk_to_m2m, migrations.RunPython.noop),
+    ]
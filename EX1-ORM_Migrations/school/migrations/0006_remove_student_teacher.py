@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:41
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0005_copy_fk_to_m2m'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='student',
+            name='teacher',
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+MATVIEW_NAME = 'school_teacher_group_counts'
+
+
+def create_matview(apps, schema_editor):
+    # материализованные представления есть только в PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {MATVIEW_NAME} AS
+        SELECT st.teacher_id, s."group", COUNT(*) AS students
+        FROM school_student_teachers st
+        JOIN school_student s ON s.id = st.student_id
+        GROUP BY st.teacher_id, s."group"
+    """)
+    # уникальный индекс нужен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+    schema_editor.execute(
+        f'CREATE UNIQUE INDEX IF NOT EXISTS {MATVIEW_NAME}_uniq ON {MATVIEW_NAME} (teacher_id, "group")'
+    )
+
+
+def drop_matview(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP MATERIALIZED VIEW IF EXISTS {MATVIEW_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0006_remove_student_teacher'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_matview, drop_matview),
+    ]
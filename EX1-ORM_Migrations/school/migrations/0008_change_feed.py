@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0007_teacher_group_counts_matview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(max_length=32, verbose_name='Лента')),
+                ('object_id', models.BigIntegerField(verbose_name='ID записи')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Удалена')),
+            ],
+            options={
+                'verbose_name': 'Удалённая запись',
+                'verbose_name_plural': 'Удалённые записи',
+            },
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменён'),
+        ),
+        migrations.AddField(
+            model_name='teacher',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменён'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['updated_at', 'id'], name='school_student_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='teacher',
+            index=models.Index(fields=['updated_at', 'id'], name='school_teacher_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['feed', 'deleted_at', 'id'], name='school_tombstone_feed_idx'),
+        ),
+    ]
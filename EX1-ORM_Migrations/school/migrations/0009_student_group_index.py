@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0008_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['group', 'id'], name='school_student_group_idx'),
+        ),
+    ]
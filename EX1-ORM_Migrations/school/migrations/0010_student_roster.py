@@ -0,0 +1,83 @@
+from django.db import migrations, models
+
+ROSTER_NAME = 'school_student_roster'
+
+# учителя ученика — в порядке добавления (id связи); запросы те же, что в school/roster.py
+POSTGRESQL_SELECT = """
+    SELECT s.id, (row_number() OVER (ORDER BY s."group", s.id))::integer AS position, s.name, s."group",
+           COALESCE(
+               jsonb_agg(jsonb_build_array(t.id, t.name, t.subject) ORDER BY st.id) FILTER (WHERE t.id IS NOT NULL),
+               '[]'::jsonb
+           ) AS teachers
+    FROM school_student s
+    LEFT JOIN school_student_teachers st ON st.student_id = s.id
+    LEFT JOIN school_teacher t ON t.id = st.teacher_id
+    GROUP BY s.id
+"""
+
+SQLITE_SELECT = """
+    SELECT s.id, row_number() OVER (ORDER BY s."group", s.id) AS position, s.name, s."group",
+           (SELECT json_group_array(json_array(t.id, t.name, t.subject)) FROM (
+                SELECT t.id, t.name, t.subject FROM school_student_teachers st
+                JOIN school_teacher t ON t.id = st.teacher_id
+                WHERE st.student_id = s.id ORDER BY st.id
+           ) AS t) AS teachers
+    FROM school_student s
+"""
+
+
+def create_roster(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'CREATE MATERIALIZED VIEW IF NOT EXISTS {ROSTER_NAME} AS {POSTGRESQL_SELECT}')
+        # уникальный индекс нужен для REFRESH MATERIALIZED VIEW CONCURRENTLY
+        schema_editor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {ROSTER_NAME}_uniq ON {ROSTER_NAME} (id)')
+    else:
+        # материализованных представлений в SQLite нет — обычная таблица
+        schema_editor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {ROSTER_NAME} (
+                id integer NOT NULL PRIMARY KEY,
+                position integer NOT NULL,
+                name varchar(30) NOT NULL,
+                "group" varchar(10) NOT NULL,
+                teachers text NOT NULL
+            )
+        """)
+        schema_editor.execute(
+            f'INSERT INTO {ROSTER_NAME} (id, position, name, "group", teachers) {SQLITE_SELECT}'
+        )
+    # страница читает строки подряд по position
+    schema_editor.execute(
+        f'CREATE UNIQUE INDEX IF NOT EXISTS {ROSTER_NAME}_position ON {ROSTER_NAME} (position)'
+    )
+
+
+def drop_roster(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP MATERIALIZED VIEW IF EXISTS {ROSTER_NAME}')
+    else:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {ROSTER_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0009_student_group_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRoster',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('position', models.IntegerField()),
+                ('name', models.CharField(max_length=30)),
+                ('group', models.CharField(max_length=10)),
+                ('teachers', models.JSONField()),
+            ],
+            options={
+                'db_table': 'school_student_roster',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_roster, drop_roster),
+    ]
@@ -1,18 +1,36 @@
 from django.db import models
+from django.utils import timezone
 
 
 class Teacher(models.Model):
     name = models.CharField(max_length=30, verbose_name='Имя')
     subject = models.CharField(max_length=10, verbose_name='Предмет')
+    # лента изменений /api/teachers/changes/ (website/changes.py)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменён')
 
     class Meta:
         verbose_name = 'Учитель'
         verbose_name_plural = 'Учителя'
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='school_teacher_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class StudentQuerySet(models.QuerySet):
+    def as_rows(self):
+        """
+        Отдавать лёгкие StudentRow (см. school/read_models.py) вместо
+        экземпляров модели; учителя подтягиваются одним запросом.
+        """
+        from school.read_models import StudentRowIterable
+        clone = self.prefetch_related(None)
+        clone._iterable_class = StudentRowIterable
+        return clone
+
+
 class Student(models.Model):
     name = models.CharField(max_length=30, verbose_name='Имя')
     # teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE)  # старое поле оставляем для выполнения аккуратной миграции с переносом данных в М2М модель, потом закоментируем...
@@ -74,10 +92,58 @@ class Student(models.Model):
     '''
     teachers = models.ManyToManyField(Teacher,related_name='students', blank=True)
     group = models.CharField(max_length=10, verbose_name='Класс')
+    # лента изменений /api/students/changes/; правки teachers ставят его
+    # сигналами (school/signals.py) — auto_now их не видит
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменён')
+
+    objects = StudentQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Ученик'
         verbose_name_plural = 'Ученики'
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='school_student_updated_idx'),
+            # список учеников упорядочен по классу (manage.py check_plans ловил сортировку таблицы)
+            models.Index(fields=['group', 'id'], name='school_student_group_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Tombstone(models.Model):
+    """Журнал удалений для лент изменений (website/changes.py)."""
+    feed = models.CharField(max_length=32, verbose_name='Лента')
+    object_id = models.BigIntegerField(verbose_name='ID записи')
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name='Удалена')
+
+    class Meta:
+        verbose_name = 'Удалённая запись'
+        verbose_name_plural = 'Удалённые записи'
+        indexes = [
+            models.Index(fields=['feed', 'deleted_at', 'id'], name='school_tombstone_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.feed}#{self.object_id}'
+
+
+class StudentRoster(models.Model):
+    """
+    Готовые строки списка учеников (school/roster.py): ученик, его место
+    в порядке (класс, id) и учителя [[id, имя, предмет], ...]. На
+    PostgreSQL — материализованное представление, на SQLite — таблица;
+    таблицами управляет миграция 0010, обновляет refresh_student_roster().
+    """
+    id = models.IntegerField(primary_key=True)
+    position = models.IntegerField()
+    name = models.CharField(max_length=30)
+    group = models.CharField(max_length=10)
+    teachers = models.JSONField()
+
+    class Meta:
+        managed = False
+        db_table = 'school_student_roster'
 
     def __str__(self):
         return self.name
@@ -0,0 +1,60 @@
+"""
+Ключевые выборки школы для проверки планов (website/plans.py).
+
+    python manage.py check_plans
+"""
+from django.db.models import Count
+
+from website.plans import QueryPlan, register
+from website.prefetch import planned
+
+from .models import Student, Teacher
+from .roster import refresh_student_roster, student_roster
+from .views import STUDENTS_PER_PAGE, TEACHER_TEMPLATE, TEACHERS_PER_PAGE
+
+SUBJECTS = ['Матем', 'Физика', 'Химия', 'История', 'Литер', 'Биология', 'Англ', 'Информ']
+
+
+def seed(size):
+    """size учеников в ~30 классах, учитель на 50 учеников, по 3 учителя у ученика."""
+    teachers = Teacher.objects.bulk_create(
+        Teacher(name=f'Учитель {n}', subject=SUBJECTS[n % len(SUBJECTS)])
+        for n in range(max(size // 50, len(SUBJECTS)))
+    )
+    students = Student.objects.bulk_create(
+        (Student(name=f'Ученик {n}', group=f'{5 + n % 7}{"АБВГ"[n // 7 % 4]}') for n in range(size)),
+        batch_size=1000,
+    )
+    Student.teachers.through.objects.bulk_create(
+        (
+            Student.teachers.through(student_id=student.pk, teacher_id=teachers[(n * 7 + k) % len(teachers)].pk)
+            for n, student in enumerate(students)
+            for k in range(3)
+        ),
+        batch_size=1000,
+    )
+    refresh_student_roster(concurrently=False)
+
+
+def _busiest_teacher():
+    return Teacher.objects.annotate(students_total=Count('students')).order_by('-students_total').first()
+
+
+# список без пагинации читает всю таблицу; без индекса по group — ещё и сортирует её
+register(QueryPlan(
+    'students_list', lambda: Student.objects.all().order_by('group').as_rows(), seed=seed, allow=['seq_scan'],
+))
+# то же при SCHOOL_STUDENT_ROSTER: готовые строки подряд по индексу position
+register(QueryPlan('students_roster', student_roster, seed=seed))
+register(QueryPlan(
+    'teachers_list',
+    lambda: Teacher.objects.order_by('name', 'id').values_list('id', 'name', 'subject')[:TEACHERS_PER_PAGE],
+    seed=seed,
+))
+register(QueryPlan(
+    'teacher_detail',
+    lambda: planned(
+        _busiest_teacher().students.order_by('group', 'name', 'id'), TEACHER_TEMPLATE, 'page_obj[]',
+    )[:STUDENTS_PER_PAGE],
+    seed=seed,
+))
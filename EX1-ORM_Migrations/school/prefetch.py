@@ -0,0 +1,32 @@
+"""
+Страницы школы для плана загрузки по шаблону (website/prefetch.py).
+
+    python manage.py prefetch_plan
+"""
+from django.core.paginator import Paginator
+
+from website.prefetch import Target, register
+
+from .models import Student
+from .plans import _busiest_teacher, seed
+from .read_models import StudentRow
+from .views import STUDENTS_PER_PAGE
+
+# список отдаёт StudentRow (read_models.py): у строки должны быть все атрибуты
+# из students_list.html, а выборка моделей — та, что была в view до read-моделей
+register(Target(
+    'students_list', 'school/students_list.html', 'object_list[]',
+    build=lambda: Student.objects.order_by('group'), seed=seed, rows=StudentRow,
+    current=lambda: Student.objects.order_by('group').prefetch_related('teachers'),
+))
+
+
+def _teacher_context(objects):
+    return {'page_obj': Paginator(objects, STUDENTS_PER_PAGE).get_page(1), 'groups': []}
+
+
+register(Target(
+    'teacher_detail', 'school/teacher_detail.html', 'page_obj[]',
+    build=lambda: _busiest_teacher().students.order_by('group', 'name', 'id'), seed=seed,
+    context=_teacher_context,
+))
@@ -0,0 +1,124 @@
+"""
+Лёгкие read-модели для списка учеников.
+
+Вместо экземпляров Student/Teacher с prefetch-кешами строки собираются из
+кортежей values_list() в компактные объекты со ``__slots__``. Атрибуты
+повторяют то, к чему обращается students_list.html
+(``student.teachers.all`` → ``teacher.name``, ``teacher.subject``),
+поэтому шаблон менять не нужно.
+
+Используется через ``Student.objects.order_by(...).as_rows()``.
+"""
+from collections import defaultdict, namedtuple
+
+from django.db.models.query import BaseIterable
+
+from school.tenancy import namespace
+from website.cache import cached, queryset_key
+
+ROW_FIELDS = ('id', 'name', 'group')
+
+TeacherRow = namedtuple('TeacherRow', 'id name subject')
+
+
+class Related(tuple):
+    """Кортеж, который шаблон может обходить как ``{% for x in obj.rel.all %}``."""
+    __slots__ = ()
+
+    def all(self):
+        return self
+
+
+NO_RELATED = Related()
+
+
+class StudentRow:
+    __slots__ = ROW_FIELDS + ('teachers',)
+
+    def __init__(self, id, name, group, teachers=NO_RELATED):
+        self.id = id
+        self.name = name
+        self.group = group
+        self.teachers = teachers
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'<StudentRow {self.id}: {self.name}>'
+
+
+def load_teachers(student_ids):
+    """
+    {student_id: Related(TeacherRow, ...)} одним запросом по through-таблице.
+    Из неё читаются только id; имя и предмет берутся из справочника в
+    памяти (school/dictionaries.py), так что JOIN с учителями не нужен.
+    Один и тот же учитель — один объект на все строки.
+    """
+    from school.dictionaries import teachers as teacher_dictionary
+    from school.models import Student
+
+    rows = list(
+        Student.teachers.through.objects
+        .filter(student_id__in=student_ids)
+        .order_by('student_id', 'id')
+        .values_list('student_id', 'teacher_id')
+    )
+    records = teacher_dictionary.get_many({teacher_id for _student_id, teacher_id in rows})
+
+    teachers = defaultdict(list)
+    for student_id, teacher_id in rows:
+        teacher = records.get(teacher_id)
+        if teacher is not None:
+            teachers[student_id].append(teacher)
+    return {student_id: Related(items) for student_id, items in teachers.items()}
+
+
+@cached(namespace, key=queryset_key)
+def load_rows(queryset):
+    """Строки для queryset; кешируются до изменения учеников/учителей (school/signals.py)."""
+    rows = list(queryset.values_list(*ROW_FIELDS))
+    teachers = load_teachers([row[0] for row in rows]) if rows else {}
+    return [StudentRow(*row, teachers=teachers.get(row[0], NO_RELATED)) for row in rows]
+
+
+class StudentRowIterable(BaseIterable):
+    """Итерация QuerySet'а, отдающая StudentRow вместо экземпляров Student."""
+
+    def __iter__(self):
+        return iter(load_rows(self.queryset))
+
+
+class TeacherCard:
+    """Строка сводки по учителям: классы и число учеников в каждом."""
+    __slots__ = ('id', 'name', 'subject', 'groups')
+
+    def __init__(self, id, name, subject, groups=()):
+        self.id = id
+        self.name = name
+        self.subject = subject
+        self.groups = tuple(groups)  # ((группа, учеников), ...)
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def students_total(self):
+        return sum(students for _group, students in self.groups)
+
+    def __repr__(self):
+        return f'<TeacherCard {self.id}: {self.name}>'
+
+
+def teacher_cards(teacher_rows):
+    """(id, name, subject) → TeacherCard со счётчиками по классам (один запрос)."""
+    from school.roster import group_counts
+
+    teacher_rows = list(teacher_rows)
+    counts = group_counts([row[0] for row in teacher_rows])
+    return [TeacherCard(*row, groups=counts.get(row[0], ())) for row in teacher_rows]
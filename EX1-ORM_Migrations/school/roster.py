@@ -0,0 +1,166 @@
+"""
+Сводки учеников и учителей, которые можно держать готовыми в БД.
+
+Сводка по учителям: сколько учеников в каждом классе у каждого учителя.
+Счётчики считаются одним GROUP BY по through-таблице Student.teachers
+только для учителей текущей страницы. На PostgreSQL их можно читать из
+материализованного представления (settings.SCHOOL_ROSTER_COUNTS_MATVIEW).
+
+Список учеников: строки с учителями, уже соединённые и упорядоченные по
+(класс, id), — StudentRoster (материализованное представление на
+PostgreSQL, таблица на SQLite). При settings.SCHOOL_STUDENT_ROSTER
+страница /students/ читает их одним проходом по индексу position.
+
+Обе сводки обновляет задача school.refresh_roster (school/tasks.py) через
+несколько секунд после правок; вручную — ``manage.py refresh_roster_counts``.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count
+
+from school.models import Student, StudentRoster
+from school.read_models import NO_RELATED, Related, StudentRow, TeacherRow
+from school.tenancy import namespace
+from website.cache import cached
+
+MATVIEW_NAME = 'school_teacher_group_counts'
+
+CREATE_MATVIEW_SQL = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {MATVIEW_NAME} AS
+SELECT st.teacher_id, s."group", COUNT(*) AS students
+FROM school_student_teachers st
+JOIN school_student s ON s.id = st.student_id
+GROUP BY st.teacher_id, s."group";
+CREATE UNIQUE INDEX IF NOT EXISTS {MATVIEW_NAME}_uniq ON {MATVIEW_NAME} (teacher_id, "group");
+"""
+
+DROP_MATVIEW_SQL = f'DROP MATERIALIZED VIEW IF EXISTS {MATVIEW_NAME};'
+
+STUDENT_ROSTER_NAME = StudentRoster._meta.db_table
+STUDENT_ROSTER_COLUMNS = 'id, position, name, "group", teachers'
+
+# учителя ученика — в порядке добавления (id связи), как в load_teachers()
+STUDENT_ROSTER_SQL = {
+    'postgresql': """
+        SELECT s.id, (row_number() OVER (ORDER BY s."group", s.id))::integer AS position, s.name, s."group",
+               COALESCE(
+                   jsonb_agg(jsonb_build_array(t.id, t.name, t.subject) ORDER BY st.id) FILTER (WHERE t.id IS NOT NULL),
+                   '[]'::jsonb
+               ) AS teachers
+        FROM school_student s
+        LEFT JOIN school_student_teachers st ON st.student_id = s.id
+        LEFT JOIN school_teacher t ON t.id = st.teacher_id
+        GROUP BY s.id
+    """,
+    'sqlite': """
+        SELECT s.id, row_number() OVER (ORDER BY s."group", s.id) AS position, s.name, s."group",
+               (SELECT json_group_array(json_array(t.id, t.name, t.subject)) FROM (
+                    SELECT t.id, t.name, t.subject FROM school_student_teachers st
+                    JOIN school_teacher t ON t.id = st.teacher_id
+                    WHERE st.student_id = s.id ORDER BY st.id
+               ) AS t) AS teachers
+        FROM school_student s
+    """,
+}
+
+
+def roster_connection(using=None):
+    """Подключение, где лежат ученики (база текущей школы, school/tenancy.py)."""
+    return connections[using or router.db_for_read(Student)]
+
+
+def matview_enabled():
+    return (
+        getattr(settings, 'SCHOOL_ROSTER_COUNTS_MATVIEW', False)
+        and roster_connection().vendor == 'postgresql'
+    )
+
+
+def _live_counts(teacher_ids):
+    return (
+        Student.teachers.through.objects
+        .filter(teacher_id__in=teacher_ids)
+        .values_list('teacher_id', 'student__group')
+        .annotate(students=Count('id'))
+        .order_by('teacher_id', 'student__group')
+    )
+
+
+def _matview_counts(teacher_ids):
+    with roster_connection().cursor() as cursor:
+        cursor.execute(
+            f'SELECT teacher_id, "group", students FROM {MATVIEW_NAME} '
+            'WHERE teacher_id = ANY(%s) ORDER BY teacher_id, "group"',
+            [list(teacher_ids)],
+        )
+        return cursor.fetchall()
+
+
+@cached(namespace, key=lambda teacher_ids: tuple(sorted(teacher_ids)))
+def group_counts(teacher_ids):
+    """{teacher_id: [(group, students), ...]} — классы по порядку."""
+    if not teacher_ids:
+        return {}
+    rows = _matview_counts(teacher_ids) if matview_enabled() else _live_counts(teacher_ids)
+    counts = defaultdict(list)
+    for teacher_id, group, students in rows:
+        counts[teacher_id].append((group, students))
+    return dict(counts)
+
+
+def refresh_matview(concurrently=True, using=None):
+    with roster_connection(using).cursor() as cursor:
+        cursor.execute(CREATE_MATVIEW_SQL)
+        mode = ' CONCURRENTLY' if concurrently else ''
+        cursor.execute(f'REFRESH MATERIALIZED VIEW{mode} {MATVIEW_NAME}')
+
+
+def student_roster_enabled():
+    return getattr(settings, 'SCHOOL_STUDENT_ROSTER', False)
+
+
+def refresh_needed(using=None):
+    """Есть ли в базе using сводки, которые читаются вместо живых запросов."""
+    return student_roster_enabled() or (
+        getattr(settings, 'SCHOOL_ROSTER_COUNTS_MATVIEW', False)
+        and roster_connection(using).vendor == 'postgresql'
+    )
+
+
+def refresh_student_roster(concurrently=True, using=None):
+    """
+    Пересобрать строки StudentRoster. PostgreSQL: REFRESH MATERIALIZED
+    VIEW [CONCURRENTLY] — с CONCURRENTLY чтение не блокируется; SQLite:
+    таблица заново в одной транзакции, читатели видят старые строки до
+    её конца.
+    """
+    connection = roster_connection(using)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            mode = ' CONCURRENTLY' if concurrently else ''
+            cursor.execute(f'REFRESH MATERIALIZED VIEW{mode} {STUDENT_ROSTER_NAME}')
+            return
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(f'DELETE FROM {STUDENT_ROSTER_NAME}')
+            cursor.execute(
+                f'INSERT INTO {STUDENT_ROSTER_NAME} ({STUDENT_ROSTER_COLUMNS}) {STUDENT_ROSTER_SQL[connection.vendor]}'
+            )
+
+
+def student_roster():
+    """Строки StudentRoster в порядке страницы (индекс по position)."""
+    return StudentRoster.objects.order_by('position').values_list('id', 'name', 'group', 'teachers')
+
+
+def student_rows():
+    """StudentRow для students_list.html из StudentRoster — один запрос без JOIN."""
+    shared = {}
+    rows = []
+    for student_id, name, group, teachers in student_roster():
+        if teachers:
+            # один и тот же учитель — один объект на все строки, как в load_teachers()
+            teachers = Related(shared.setdefault(tuple(item), TeacherRow(*item)) for item in teachers)
+        rows.append(StudentRow(student_id, name, group, teachers=teachers or NO_RELATED))
+    return rows
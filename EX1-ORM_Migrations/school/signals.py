@@ -0,0 +1,103 @@
+"""
+Сброс кеша школы (website/cache.py, пространство имён 'school' или
+'school@<школа>', school/tenancy.py)
+при любом изменении учеников, учителей и их связей, отложенные
+пересчёт аналитики и обновление сводок в БД (school/tasks.py); updated_at и журнал удалений
+для лент изменений (school/changes.py).
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from website.cache import bump
+from website.changes import touch
+
+from . import changes, tasks, tenancy
+from .dictionaries import teachers
+from .models import Student, Teacher
+
+
+@receiver(post_save, sender=Student, dispatch_uid='school_cache_student_saved')
+@receiver(post_delete, sender=Student, dispatch_uid='school_cache_student_deleted')
+@receiver(post_save, sender=Teacher, dispatch_uid='school_cache_teacher_saved')
+@receiver(post_delete, sender=Teacher, dispatch_uid='school_cache_teacher_deleted')
+def invalidate_school_cache(sender, using, **kwargs):
+    # после коммита: иначе кеш успеют заполнить старыми строками под новой версией
+    namespace = tenancy.namespace(using)
+    transaction.on_commit(lambda: bump(namespace), using=using)
+
+
+@receiver(m2m_changed, sender=Student.teachers.through, dispatch_uid='school_cache_teachers_changed')
+def invalidate_school_cache_m2m(sender, action, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        namespace = tenancy.namespace(using)
+        transaction.on_commit(lambda: bump(namespace), using=using)
+
+
+@receiver(post_save, sender=Student, dispatch_uid='school_analytics_student_saved')
+@receiver(post_delete, sender=Student, dispatch_uid='school_analytics_student_deleted')
+@receiver(post_save, sender=Teacher, dispatch_uid='school_analytics_teacher_saved')
+@receiver(post_delete, sender=Teacher, dispatch_uid='school_analytics_teacher_deleted')
+def schedule_analytics(sender, using, raw=False, **kwargs):
+    # фикстуры (raw) грузятся пачкой — пересчёт по первому открытию отчёта
+    if not raw:
+        tasks.schedule_analytics(using)
+
+
+@receiver(m2m_changed, sender=Student.teachers.through, dispatch_uid='school_analytics_teachers_changed')
+def schedule_analytics_m2m(sender, action, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        tasks.schedule_analytics(using)
+
+
+@receiver(post_save, sender=Student, dispatch_uid='school_roster_student_saved')
+@receiver(post_delete, sender=Student, dispatch_uid='school_roster_student_deleted')
+@receiver(post_save, sender=Teacher, dispatch_uid='school_roster_teacher_saved')
+@receiver(post_delete, sender=Teacher, dispatch_uid='school_roster_teacher_deleted')
+def schedule_roster(sender, using, **kwargs):
+    # и для фикстур: готовые строки сами по первому чтению не пересоберутся
+    tasks.schedule_roster(using)
+
+
+@receiver(m2m_changed, sender=Student.teachers.through, dispatch_uid='school_roster_teachers_changed')
+def schedule_roster_m2m(sender, action, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        tasks.schedule_roster(using)
+
+
+@receiver(post_save, sender=Teacher, dispatch_uid='school_teacher_dictionary_saved')
+@receiver(post_delete, sender=Teacher, dispatch_uid='school_teacher_dictionary_deleted')
+def invalidate_teacher_dictionary(sender, using, **kwargs):
+    # справочник перечитывается только при новой версии — её ставим после коммита
+    transaction.on_commit(lambda: teachers.invalidate(using), using=using)
+
+
+@receiver(post_delete, sender=Student, dispatch_uid='school_changes_student_deleted')
+def log_deleted_student(sender, instance, using, **kwargs):
+    # журнал — в базе удалённой строки (школы), а не текущей школы запроса
+    changes.students.forget([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Teacher, dispatch_uid='school_changes_teacher_deleted')
+def log_deleted_teacher(sender, instance, using, **kwargs):
+    changes.teachers.forget([instance.pk], using=using)
+
+
+@receiver(pre_delete, sender=Teacher, dispatch_uid='school_changes_teacher_deleting')
+def touch_students_of_deleted_teacher(sender, instance, using, **kwargs):
+    # связи удалятся каскадом без m2m_changed
+    touch(Student.objects.using(using).filter(teachers=instance))
+
+
+@receiver(m2m_changed, sender=Student.teachers.through, dispatch_uid='school_changes_teachers_changed')
+def touch_students(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    students = Student.objects.using(using)
+    if not reverse:
+        touch(students.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        # после clear() учеников учителя уже не найти
+        touch(students.filter(teachers=instance))
+    else:
+        touch(students.filter(pk__in=pk_set))
@@ -0,0 +1,61 @@
+"""
+Фоновые задачи школы (jobs/queue.py).
+
+``school.rebuild_analytics`` — пересчитать сводные отчёты
+(school/analytics.py) после правок, чтобы первый открывший «Аналитику»
+получил их из кеша. Ставится из school/signals.py с ключом и отсрочкой
+DEBOUNCE_SECONDS, которую каждая новая правка начинает заново
+(enqueue(debounce=True)): пачка правок (импорт, админка) даёт один
+пересчёт по уже итоговым данным. У каждой школы (school/tenancy.py) — свой.
+
+``school.refresh_roster`` — пересобрать готовые сводки в БД
+(school/roster.py), если страницы их читают; отсрочка короче —
+ROSTER_DEBOUNCE_SECONDS, до обновления списки показывают прежние строки.
+"""
+from jobs.queue import task
+from website.cache import bump
+
+from . import roster, tenancy
+
+DEBOUNCE_SECONDS = 30
+ROSTER_DEBOUNCE_SECONDS = 5
+
+
+@task('school.rebuild_analytics', priority=-1, timeout=120)
+def rebuild_analytics(tenant=None):
+    # numpy — в воркере, а не при старте (см. school/analytics.py)
+    from . import analytics
+
+    with tenancy.activate(tenant):
+        analytics.report()
+
+
+@task('school.refresh_roster', timeout=120)
+def refresh_roster(tenant=None):
+    with tenancy.activate(tenant):
+        if roster.student_roster_enabled():
+            roster.refresh_student_roster()
+        if roster.matview_enabled():
+            roster.refresh_matview()
+        # счётчики из представления могли попасть в кеш до обновления
+        bump(tenancy.namespace())
+
+
+def _schedule(job, name, using, delay):
+    # одна задача на школу, чья база using (None — текущую)
+    tenant = tenancy.for_alias(using) if using else tenancy.current()
+    if tenant is None:
+        return job.enqueue(key=f'school:{name}', delay=delay, debounce=True)
+    return job.enqueue({'tenant': tenant.slug}, key=f'school:{name}@{tenant.slug}', delay=delay, debounce=True)
+
+
+def schedule_analytics(using=None):
+    """Поставить пересчёт для школы, чья база using (None — текущей)."""
+    return _schedule(rebuild_analytics, 'analytics', using, DEBOUNCE_SECONDS)
+
+
+def schedule_roster(using=None):
+    """Поставить обновление сводок, если они включены; иначе None."""
+    if not roster.refresh_needed(using):
+        return None
+    return _schedule(refresh_roster, 'roster', using, ROSTER_DEBOUNCE_SECONDS)
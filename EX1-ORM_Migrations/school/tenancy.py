@@ -0,0 +1,332 @@
+"""
+Несколько школ (арендаторов) в одной установке.
+
+Ученики, учителя и всё остальное приложения school у каждой школы
+хранятся отдельно; остальное (пользователи, сессии, очередь задач) —
+общее, в базе ``default``. Школы описываются в settings.SCHOOL_TENANTS:
+
+    SCHOOL_TENANTS = {
+        'gym1': {'HOSTS': ['gym1.example.com']},                    # схема school_gym1 на default
+        'lyceum': {'HOSTS': ['lyceum.example.com'], 'NODE': 'node2'},  # крупная школа — на своём узле
+    }
+
+  * у каждой школы свой псевдоним БД ``school_<slug>`` (register() из
+    AppConfig.ready): на PostgreSQL — подключение к узлу NODE (ключ
+    DATABASES) со своей схемой в search_path (SCHEMA, по умолчанию
+    school_<slug>), на SQLite — отдельный файл рядом с базой узла;
+    ``DATABASE`` — готовое описание подключения вместо узла;
+  * TenantMiddleware выбирает школу по хосту запроса или, при
+    SCHOOL_TENANT_RESOLVE = 'path', по префиксу ``/t/<slug>/``; запросы
+    без школы работают с ``default``, как до разделения;
+  * TenantRouter отправляет запросы моделей school в базу текущей
+    школы (activate()) и мигрирует в базы школ только приложение school;
+  * кеш (website/cache.py) и справочники (website/dictionaries.py)
+    разделяются по школам: namespace() и псевдоним БД;
+  * ``manage.py tenants`` — список школ, миграции и любые команды по всем
+    школам параллельно, перенос школы на другой узел (copy_data()).
+
+Для команд школу задаёт переменная окружения SCHOOL_TENANT.
+"""
+import copy
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.color import no_style
+from django.core.serializers import sort_dependencies
+from django.db import connections, transaction
+from django.db.models.signals import pre_migrate
+from django.http import Http404
+from django.http.request import split_domain_port
+from django.urls import get_script_prefix, set_script_prefix
+
+APP_LABEL = 'school'
+ALIAS_PREFIX = 'school_'
+PATH_PREFIX = re.compile(r'^/t/(?P<slug>[a-z0-9_-]+)(?P<rest>/.*)?$')
+IDENTIFIER = re.compile(r'^[a-z_][a-z0-9_]*$')
+COPY_BATCH = 2000
+
+_current = ContextVar('school_tenant', default=None)
+_tenants = {}
+
+
+class Tenant:
+    def __init__(self, slug, hosts=(), schema=None, node='default', database=None):
+        self.slug = slug
+        self.hosts = tuple(host.lower() for host in hosts)
+        self.schema = schema or f'{ALIAS_PREFIX}{slug}'
+        self.node = node
+        self.database = database
+        self.alias = f'{ALIAS_PREFIX}{slug}'
+
+    def __repr__(self):
+        return f'<Tenant {self.slug} ({self.alias})>'
+
+
+def database_settings(tenant, node=None):
+    """Описание подключения к базе школы (на её узле или на node)."""
+    if tenant.database is not None and node is None:
+        return {**copy.deepcopy(tenant.database), 'TEST': {**tenant.database.get('TEST', {})}}
+    suffix = tenant.slug if node is None else f'{tenant.slug}__{node}'
+    node = node or tenant.node
+    if node not in connections:
+        raise ImproperlyConfigured(f'SCHOOL_TENANTS[{tenant.slug!r}]: нет базы {node!r} в DATABASES')
+    database = copy.deepcopy(connections.settings[node])
+    if database['ENGINE'] == 'django.db.backends.postgresql':
+        if not IDENTIFIER.match(tenant.schema):
+            raise ImproperlyConfigured(f'SCHOOL_TENANTS[{tenant.slug!r}]: недопустимое имя схемы {tenant.schema!r}')
+        database['OPTIONS'] = {**database.get('OPTIONS', {}), 'options': f'-c search_path={tenant.schema}'}
+        # своя тестовая база: иначе Django сочтёт псевдонимы одного узла зеркалами
+        database['TEST'] = {**database.get('TEST', {}), 'NAME': f"test_{database['NAME']}_{tenant.slug}"}
+    elif database['ENGINE'] == 'django.db.backends.sqlite3':
+        name = str(database['NAME'])
+        if name == ':memory:' or 'mode=memory' in name:
+            # база узла в памяти (тесты) — и у школы своя, а не та же самая
+            database['NAME'] = f'file:memorydb_{ALIAS_PREFIX}{suffix}?mode=memory&cache=shared'
+        else:
+            stem, extension = os.path.splitext(name)
+            database['NAME'] = f'{stem}_{suffix}{extension}'
+        database['TEST'] = {**database.get('TEST', {}), 'NAME': None}
+    else:
+        raise ImproperlyConfigured(f"Школы поддерживаются на PostgreSQL и SQLite, а не {database['ENGINE']}")
+    return database
+
+
+def register(config=None):
+    """Добавить школы из config (по умолчанию settings.SCHOOL_TENANTS) и их псевдонимы БД."""
+    config = getattr(settings, 'SCHOOL_TENANTS', {}) if config is None else config
+    added = []
+    for slug, options in config.items():
+        tenant = Tenant(
+            slug, hosts=options.get('HOSTS', ()), schema=options.get('SCHEMA'),
+            node=options.get('NODE', 'default'), database=options.get('DATABASE'),
+        )
+        _add_database(tenant.alias, database_settings(tenant))
+        _tenants[slug] = tenant
+        added.append(tenant)
+    pre_migrate.connect(create_schema, dispatch_uid='school_tenancy_create_schema')
+    return added
+
+
+def unregister(slugs):
+    """Убрать школы slugs и их псевдонимы БД (вместе с копиями move_database())."""
+    for slug in slugs:
+        tenant = _tenants.pop(slug)
+        for alias in [alias for alias in connections.settings if alias.split('__')[0] == tenant.alias]:
+            if hasattr(connections._connections, alias):
+                connections[alias].close()
+                del connections[alias]
+            del connections.settings[alias]
+            settings.DATABASES.pop(alias, None)
+
+
+def create_schema(using, **kwargs):
+    """pre_migrate: схема школы на PostgreSQL должна быть до первой таблицы (и django_migrations)."""
+    tenant = for_alias(using)
+    connection = connections[using]
+    if tenant is not None and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS {connection.ops.quote_name(tenant.schema)}')
+
+
+def _add_database(alias, database):
+    # configure_settings дописывает умолчания (AUTOCOMMIT, TEST, ...) и требует default
+    database = connections.configure_settings({'default': {**connections.settings['default']}, alias: database})[alias]
+    settings.DATABASES[alias] = database
+    connections.settings[alias] = database
+
+
+def tenants():
+    return dict(_tenants)
+
+
+def get(slug):
+    if isinstance(slug, Tenant) or slug is None:
+        return slug
+    try:
+        return _tenants[slug]
+    except KeyError:
+        raise LookupError(f'Нет школы {slug!r} (SCHOOL_TENANTS)') from None
+
+
+def for_alias(alias):
+    """Школа, чья это база (и её копия на другом узле, move_database()); None для default и прочих."""
+    if alias and alias.startswith(ALIAS_PREFIX):
+        return _tenants.get(alias[len(ALIAS_PREFIX):].split('__')[0])
+    return None
+
+
+def current():
+    tenant = _current.get()
+    if tenant is None and os.environ.get('SCHOOL_TENANT'):
+        tenant = get(os.environ['SCHOOL_TENANT'])
+    return tenant
+
+
+def current_alias():
+    tenant = current()
+    return tenant.alias if tenant else 'default'
+
+
+@contextmanager
+def activate(tenant):
+    """Внутри блока запросы моделей school идут в базу школы (None — в default)."""
+    token = _current.set(get(tenant))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def namespace(using=None):
+    """Пространство имён кеша школы: для запроса — текущей, для сигнала — по базе using."""
+    tenant = for_alias(using) if using else current()
+    return f'{APP_LABEL}@{tenant.slug}' if tenant else APP_LABEL
+
+
+class TenantRouter:
+    """Модели school — в базу текущей школы; в базы школ мигрирует только school."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == APP_LABEL:
+            tenant = current()
+            if tenant is not None:
+                return tenant.alias
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if APP_LABEL in (obj1._meta.app_label, obj2._meta.app_label) and obj1._state.db and obj2._state.db:
+            return obj1._state.db == obj2._state.db
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if for_alias(db) is not None:
+            return app_label == APP_LABEL
+        return None
+
+
+def resolve(request):
+    """(школа, префикс пути) для запроса; Http404 для неизвестной школы в пути."""
+    if getattr(settings, 'SCHOOL_TENANT_RESOLVE', 'host') == 'path':
+        match = PATH_PREFIX.match(request.path_info)
+        if match is None:
+            return None, ''
+        tenant = _tenants.get(match['slug'])
+        if tenant is None:
+            raise Http404(f"Нет школы {match['slug']}")
+        return tenant, f"/t/{match['slug']}"
+    host, _port = split_domain_port(request.get_host())
+    for tenant in _tenants.values():
+        if host in tenant.hosts:
+            return tenant, ''
+    return None, ''
+
+
+def _streamed(content, tenant):
+    # потоковый ответ (выгрузки) читает БД уже после выхода из middleware
+    iterator = iter(content)
+    while True:
+        with activate(tenant):
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class TenantMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tenant, prefix = resolve(request)
+        request.tenant = tenant
+        if tenant is None:
+            return self.get_response(request)
+        script_prefix = get_script_prefix()
+        if prefix:
+            # /t/<slug>/teachers/ разбирается как /teachers/, а reverse() добавляет префикс
+            request.path_info = request.path_info[len(prefix):] or '/'
+            set_script_prefix(script_prefix.rstrip('/') + prefix + '/')
+        try:
+            with activate(tenant):
+                response = self.get_response(request)
+        finally:
+            # префикс живёт в потоке; WSGIHandler ставит его заново, тестовый клиент — нет
+            set_script_prefix(script_prefix)
+        if response.streaming:
+            response.streaming_content = _streamed(response.streaming_content, tenant)
+        return response
+
+
+def models():
+    """Модели school в порядке зависимостей, through-таблицы — после своих моделей."""
+    # неуправляемые (StudentRoster) — производные, их пересобирают, а не копируют
+    ordered = [model for model in sort_dependencies([(apps.get_app_config(APP_LABEL), None)]) if model._meta.managed]
+    through = [
+        field.remote_field.through for model in ordered for field in model._meta.local_many_to_many
+        if field.remote_field.through._meta.auto_created
+    ]
+    return ordered + through
+
+
+def copy_data(source, target, log=None):
+    """
+    Скопировать все данные school из базы source в пустую базу target
+    строка в строку (те же id и updated_at); вернуть {модель: строк}.
+    Для переноса школы на другой узел: пока идёт копия, правки школы
+    нужно остановить.
+    """
+    connection = connections[target]
+    quote = connection.ops.quote_name
+    counts = {}
+    with transaction.atomic(using=target), connection.cursor() as cursor:
+        for model in models():
+            if model._base_manager.using(target).exists():
+                raise ValueError(f'{target}: в {model._meta.db_table} уже есть строки')
+            fields = model._meta.concrete_fields
+            sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+                quote(model._meta.db_table), ', '.join(quote(field.column) for field in fields),
+                ', '.join(['%s'] * len(fields)),
+            )
+            rows = (
+                model._base_manager.using(source).order_by('pk')
+                .values_list(*[field.attname for field in fields]).iterator(chunk_size=COPY_BATCH)
+            )
+            counts[model] = 0
+            for batch in _batches(rows, COPY_BATCH):
+                cursor.executemany(sql, [
+                    [field.get_db_prep_save(value, connection) for field, value in zip(fields, row)] for row in batch
+                ])
+                counts[model] += len(batch)
+            if log:
+                log(f'{model._meta.db_table}: {counts[model]}')
+        for statement in connection.ops.sequence_reset_sql(no_style(), models()):
+            cursor.execute(statement)
+    return counts
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def move_database(tenant, node):
+    """Зарегистрировать базу школы на узле node под временным псевдонимом; вернуть его."""
+    alias = f'{tenant.alias}__{node}'
+    if alias not in connections:
+        _add_database(alias, database_settings(tenant, node=node))
+    return alias
+
+
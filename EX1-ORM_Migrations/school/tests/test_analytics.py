@@ -0,0 +1,79 @@
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from school import analytics
+from school.models import Student, Teacher
+
+
+class TestSchoolAnalytics(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.math = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        cls.math2 = Teacher.objects.create(name="Олег Смирнов", subject="Матем")
+        cls.physics = Teacher.objects.create(name="Анна Смирнова", subject="Физика")
+        Teacher.objects.create(name="Без учеников", subject="Химия")
+        cls.a1 = Student.objects.create(name="Вася", group="7А")
+        cls.a2 = Student.objects.create(name="Петя", group="7А")
+        cls.b1 = Student.objects.create(name="Маша", group="7Б")
+        cls.c1 = Student.objects.create(name="Коля", group="8А")
+        cls.a1.teachers.set([cls.math, cls.physics])
+        cls.a2.teachers.set([cls.math])
+        cls.b1.teachers.set([cls.math, cls.math2])
+
+    def test_reports(self):
+        with self.assertNumQueries(3):
+            report = analytics.report()
+        self.assertEqual(report["groups"], [("7А", 2), ("7Б", 1), ("8А", 1)])
+        self.assertEqual(report["subjects"], [
+            {"subject": "Матем", "teachers": 2, "links": 4, "students": 3, "average_load": 2.0, "max_load": 3},
+            {"subject": "Физика", "teachers": 1, "links": 1, "students": 1, "average_load": 1.0, "max_load": 1},
+            {"subject": "Химия", "teachers": 1, "links": 0, "students": 0, "average_load": 0.0, "max_load": 0},
+        ])
+        self.assertEqual(report["gaps"], [
+            ("Матем", ["8А"]), ("Физика", ["7Б", "8А"]), ("Химия", ["7А", "7Б", "8А"]),
+        ])
+        self.assertEqual(report["overlap"], [("7А", "7Б", 1, ["Иван Петров"])])
+        self.assertEqual(analytics.gaps("Физика"), ["7Б", "8А"])
+        self.assertEqual(analytics.gaps("История"), ["7А", "7Б", "8А"])
+
+    def test_empty_school(self):
+        Student.objects.all().delete()
+        Teacher.objects.all().delete()
+        self.assertEqual(analytics.report(), {"groups": [], "subjects": [], "gaps": [], "overlap": []})
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        TIERED_CACHE={"ENABLED": True},
+    )
+    def test_cached_until_school_changes(self):
+        cache.clear()
+        analytics.report()
+        with self.assertNumQueries(0):
+            analytics.report()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.c1.teachers.add(self.physics)
+        self.assertEqual(analytics.gaps("Физика"), ["7Б"])
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("school_analytics", "--report", "gaps", "--subject", "Физика", "--json", stdout=out)
+        self.assertEqual(json.loads(out.getvalue()), {"gaps": [["Физика", ["7Б", "8А"]]]})
+
+        out = io.StringIO()
+        call_command("school_analytics", stdout=out)
+        self.assertIn("7А и 7Б: 1 (Иван Петров)", out.getvalue())
+        self.assertIn("Матем: учителей 2, учеников 3", out.getvalue())
+
+    def test_admin_page(self):
+        self.client.force_login(User.objects.create_superuser("admin", "a@example.com", "pass"))
+        response = self.client.get(reverse("admin:school_student_changelist"))
+        self.assertContains(response, reverse("admin:school_student_analytics"))
+        response = self.client.get(reverse("admin:school_student_analytics"))
+        self.assertContains(response, "Классы без учителя по предмету")
+        self.assertContains(response, "<td>Физика</td><td>7Б, 8А</td>", html=True)
@@ -0,0 +1,52 @@
+from django.db.models.signals import post_init
+from django.test import TestCase
+from django.urls import reverse
+from school.models import Student, Teacher
+
+
+class TestStudentsApi(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.t1 = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        cls.t2 = Teacher.objects.create(name="Анна Смирнова", subject="Физика")
+        cls.students = []
+        for i, group in enumerate(["7А", "7А", "7Б", "8А", "8А"]):
+            cls.students.append(Student.objects.create(name=f"Ученик {i}", group=group))
+        cls.students[0].teachers.set([cls.t1, cls.t2])
+
+    def test_teachers_in_response(self):
+        resp = self.client.get(reverse("students_api"))
+        self.assertEqual(resp.status_code, 200)
+        first = resp.json()["results"][0]
+        self.assertEqual(first["group"], "7А")
+        self.assertEqual(
+            [t["name"] for t in first["teachers"]],
+            ["Анна Смирнова", "Иван Петров"],
+        )
+
+    def test_keyset_paging_keeps_group_order(self):
+        url = reverse("students_api")
+        seen = []
+        params = {"limit": 2, "fields": "name"}
+        while True:
+            data = self.client.get(url, params).json()
+            for item in data["results"]:
+                self.assertEqual(set(item), {"id", "name"})
+                seen.append(item["id"])
+            if not data["next"]:
+                break
+            params["after"] = data["next"]
+        self.assertEqual(seen, [s.id for s in self.students])
+
+    def test_no_model_instances_are_created(self):
+        created = []
+
+        def on_init(sender, **kwargs):
+            created.append(sender)
+
+        post_init.connect(on_init)
+        try:
+            self.client.get(reverse("students_api"))
+        finally:
+            post_init.disconnect(on_init)
+        self.assertFalse({Student, Teacher} & set(created))
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from school.models import Student, Teacher
+from school.roster import group_counts
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    TIERED_CACHE={"ENABLED": True},
+)
+class TestSchoolCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        cls.student = Student.objects.create(name="Вася", group="7А")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_group_counts_cached_and_invalidated_by_m2m(self):
+        self.assertEqual(group_counts([self.teacher.id]), {})
+        with self.assertNumQueries(0):
+            group_counts([self.teacher.id])
+
+        # кеш сбрасывается после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.teachers.add(self.teacher)
+        self.assertEqual(group_counts([self.teacher.id]), {self.teacher.id: [("7А", 1)]})
+
+    def test_students_rows_cached_and_invalidated_by_save(self):
+        self.assertEqual([s.name for s in Student.objects.order_by("group").as_rows()], ["Вася"])
+        with self.assertNumQueries(0):
+            list(Student.objects.order_by("group").as_rows())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(name="Маша", group="7Б")
+            # до коммита — прежние строки из кеша
+            self.assertEqual([s.name for s in Student.objects.order_by("group").as_rows()], ["Вася"])
+        self.assertEqual(
+            [s.name for s in Student.objects.order_by("group").as_rows()], ["Вася", "Маша"],
+        )
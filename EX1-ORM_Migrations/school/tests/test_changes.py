@@ -0,0 +1,61 @@
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from school.models import Student, Teacher, Tombstone
+
+
+@override_settings(CHANGE_FEED={"SETTLE_SECONDS": 0, "RETENTION_DAYS": 30})
+class TestChangeFeeds(TestCase):
+    def setUp(self):
+        self.teacher = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        self.other = Teacher.objects.create(name="Анна Смирнова", subject="Физика")
+        self.first = Student.objects.create(name="Ученик 1", group="7А")
+        self.second = Student.objects.create(name="Ученик 2", group="7Б")
+
+    def feed(self, name, since=None, **params):
+        if since:
+            params["since"] = since
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, page):
+        return [item["id"] for item in page["changes"]]
+
+    def test_teacher_links_touch_students(self):
+        token = self.feed("students_changes")["next"]
+        self.first.teachers.add(self.teacher, self.other)
+        page = self.feed("students_changes", token)
+        self.assertEqual(self.ids(page), [self.first.pk])
+        self.assertEqual(page["changes"][0]["teachers"], [self.teacher.pk, self.other.pk])
+
+        token = page["next"]
+        self.teacher.students.add(self.second)
+        self.assertEqual(self.ids(self.feed("students_changes", token)), [self.second.pk])
+
+        token = self.feed("students_changes", token)["next"]
+        teacher_id = self.teacher.pk
+        self.teacher.delete()
+        page = self.feed("students_changes", token)
+        links = {item["id"]: item["teachers"] for item in page["changes"]}
+        self.assertEqual(links, {self.first.pk: [self.other.pk], self.second.pk: []})
+        self.assertEqual(self.feed("teachers_changes", self.feed("teachers_changes")["next"])["deleted"], [])
+        self.assertEqual(Tombstone.objects.get().object_id, teacher_id)
+
+    def test_deletes_are_logged(self):
+        token = self.feed("students_changes")["next"]
+        student_id = self.second.pk
+        self.second.delete()
+        page = self.feed("students_changes", token)
+        self.assertEqual((page["changes"], page["deleted"]), ([], [student_id]))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("changes", "teachers", stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line["name"] for line in lines[:-1]], ["Иван Петров", "Анна Смирнова"])
+        self.assertFalse(lines[-1]["more"])
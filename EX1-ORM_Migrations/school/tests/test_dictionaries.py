@@ -0,0 +1,32 @@
+from django.test import TestCase
+from django.urls import reverse
+from school.dictionaries import teachers
+from school.models import Student, Teacher
+
+
+class TestTeacherDictionary(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        student = Student.objects.create(name="Вася", group="7А")
+        student.teachers.add(cls.teacher)
+
+    def setUp(self):
+        # id в SQLite переиспользуются после отката — начинаем с пустого справочника
+        teachers.clear()
+
+    def test_students_list_without_teacher_join(self):
+        teachers.records()
+        # ученики + id учителей из through-таблицы; имена — из памяти
+        with self.assertNumQueries(2):
+            resp = self.client.get(reverse("students"))
+        self.assertContains(resp, "Иван Петров: Матем")
+
+    def test_rename_is_picked_up(self):
+        self.assertEqual(teachers[self.teacher.id].subject, "Матем")
+        self.teacher.subject = "Алгебра"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.save()
+            # до коммита версия прежняя — и данные прежние
+            self.assertEqual(teachers[self.teacher.id].subject, "Матем")
+        self.assertEqual(teachers[self.teacher.id].subject, "Алгебра")
@@ -0,0 +1,54 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from school.models import Student, Teacher
+
+
+class TestStudentExport(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.t1 = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        cls.t2 = Teacher.objects.create(name="Анна Смирнова", subject="Физика")
+        cls.first = Student.objects.create(name="Ученик, первый", group="7А")
+        cls.second = Student.objects.create(name="Ученик 2", group="7Б")
+        cls.first.teachers.set([cls.t1, cls.t2])
+
+    def test_csv_one_query_with_teachers_aggregated(self):
+        out = io.StringIO()
+        with self.assertNumQueries(1):
+            call_command("export", "students", stdout=out)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ["id", "name", "group", "teachers"])
+        self.assertEqual(rows[1], [str(self.first.pk), "Ученик, первый", "7А", "Анна Смирнова, Иван Петров"])
+        self.assertEqual(rows[2], [str(self.second.pk), "Ученик 2", "7Б", ""])
+
+    def test_ndjson_gzip_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "students.ndjson.gz")
+            call_command("export", "students", "--format", "ndjson", "--gzip", "-o", path)
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[0]["teachers"], ["Анна Смирнова", "Иван Петров"])
+        self.assertEqual(lines[1]["teachers"], [])
+
+    def test_admin_action_streams_selected(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(admin)
+        response = self.client.post(reverse("admin:school_student_changelist"), {
+            "action": "export_students_csv",
+            "_selected_action": [self.second.pk],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment", response["Content-Disposition"])
+        body = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8")
+        self.assertEqual(len(body.splitlines()), 2)
+        self.assertIn("Ученик 2", body)
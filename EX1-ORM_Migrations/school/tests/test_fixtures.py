@@ -0,0 +1,18 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from school.models import Student, Teacher
+
+
+class TestShippedFixture(TestCase):
+    def test_school_json_loads(self):
+        call_command("loaddata", os.path.join(settings.BASE_DIR, "school.json"), stdout=io.StringIO())
+        self.assertEqual(Teacher.objects.count(), 3)
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertFalse(Teacher.objects.filter(updated_at__isnull=True).exists())
+        # у каждого ученика — учитель из прежнего поля teacher
+        self.assertFalse(Student.objects.filter(teachers=None).exists())
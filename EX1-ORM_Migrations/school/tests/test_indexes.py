@@ -0,0 +1,77 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from school.models import Student, Teacher
+from website import indexes, querylog
+
+
+class TestIndexAdvisor(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, "queries.ndjson")
+
+    def advise(self):
+        out = io.StringIO()
+        call_command("advise_indexes", "--log", self.log, "--json", stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_parse_resolves_aliases_and_order(self):
+        usages = indexes.parse(
+            'SELECT "school_student"."id" FROM "school_student" WHERE ("school_student"."group" = %s AND '
+            '"school_student"."id" IN (SELECT U0."student_id" FROM "school_student_teachers" U0 '
+            'WHERE U0."teacher_id" = %s)) ORDER BY "school_student"."name" DESC LIMIT 21'
+        )
+        self.assertEqual(usages["school_student"].equal, [("group", 0), ("id", None)])
+        self.assertEqual(usages["school_student"].order, [("name", True)])
+        self.assertEqual(usages["school_student_teachers"].equal, [("teacher_id", 1)])
+
+    def test_parse_positional_order_by(self):
+        # values() сортирует номерами колонок SELECT
+        usages = indexes.parse(
+            'SELECT "school_student"."id" AS "id", "school_student"."name" AS "name", '
+            '"school_student"."group" AS "group" FROM "school_student" ORDER BY 3 ASC, 1 DESC'
+        )
+        self.assertEqual(usages["school_student"].order, [("group", False), ("id", True)])
+
+    def test_parse_skips_from_of_select_subquery(self):
+        # первый FROM — у подзапроса в списке SELECT, ведущая таблица — внешняя
+        usages = indexes.parse(
+            'SELECT "school_teacher"."id", (SELECT COUNT(U0."student_id") AS "n" FROM "school_student_teachers" U0 '
+            'WHERE U0."teacher_id" = ("school_teacher"."id")) AS "students" FROM "school_teacher" '
+            'ORDER BY "school_teacher"."name" ASC'
+        )
+        self.assertEqual(usages["school_teacher"].order, [("name", False)])
+        self.assertEqual(usages["school_student_teachers"].order, [])
+
+    def test_unindexed_filter_is_proposed(self):
+        Student.objects.create(name="Вася", group="7А")
+        with querylog.recording(self.log):
+            for name in ("Вася", "Петя"):
+                list(Student.objects.filter(name=name).order_by("id"))
+        result = self.advise()
+        self.assertEqual(result["queries"], 2)
+        self.assertEqual(result["fingerprints"], 1)
+        proposal, = result["proposals"]
+        self.assertEqual(proposal["model"], "school.Student")
+        self.assertIn("fields=['name', 'id']", proposal["index"])
+        self.assertTrue(proposal["estimate"]["samples"][0]["used"])
+        # индекс оценивался в откатившейся транзакции
+        self.assertEqual(Student.objects.count(), 1)
+
+    def test_views_need_no_new_indexes(self):
+        teacher = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        student = Student.objects.create(name="Вася", group="7А")
+        student.teachers.add(teacher)
+        with querylog.recording(self.log):
+            self.client.get(reverse("students"))
+            self.client.get(reverse("teacher", args=[teacher.pk]))
+        out = io.StringIO()
+        call_command("advise_indexes", "--log", self.log, stdout=out)
+        self.assertIn("Новых индексов не нужно", out.getvalue())
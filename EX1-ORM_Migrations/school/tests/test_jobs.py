@@ -0,0 +1,163 @@
+import datetime
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job, JobLock
+from school import analytics
+from school.models import Student, Teacher
+
+CALLS = []
+
+
+@queue.task("tests.record")
+def record(label):
+    CALLS.append(label)
+
+
+@queue.task("tests.broken", max_attempts=2)
+def broken():
+    raise ValueError("сломалось")
+
+
+@override_settings(JOBS={"BACKOFF_SECONDS": 10})
+class TestJobQueue(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_key_merges_waiting_job(self):
+        first = record.enqueue({"label": "a"}, key="same", delay=60)
+        second = record.enqueue({"label": "a"}, key="same", priority=5)
+        self.assertEqual(second.pk, first.pk)
+        job = Job.objects.get()
+        self.assertEqual(job.priority, 5)
+        self.assertLessEqual(job.run_at, timezone.now())
+
+        # после выполнения ключ свободен
+        queue.run_pending()
+        self.assertNotEqual(record.enqueue({"label": "a"}, key="same").pk, first.pk)
+
+    def test_key_conflict_with_claimed_job_enqueues_again(self):
+        from unittest import mock
+
+        from django.db.models import QuerySet
+
+        taken = record.enqueue({"label": "a"}, key="same")
+        first = QuerySet.first
+        lookups = []
+
+        def racing_first(queryset):
+            lookups.append(queryset)
+            if len(lookups) == 1:
+                return None  # другой процесс ещё не закоммитил свою задачу
+            # ... а после конфликта INSERT её успел взять воркер
+            Job.objects.filter(pk=taken.pk).update(status=Job.RUNNING)
+            return first(queryset)
+
+        with mock.patch.object(QuerySet, "first", racing_first):
+            job = record.enqueue({"label": "a"}, key="same")
+        self.assertEqual(len(lookups), 2)
+        self.assertNotEqual(job.pk, taken.pk)
+        self.assertEqual(Job.objects.get(status=Job.QUEUED, key="same").pk, job.pk)
+
+    def test_debounce_pushes_run_at_forward(self):
+        first = record.enqueue({"label": "a"}, key="same", delay=10, debounce=True)
+        Job.objects.update(run_at=timezone.now() + datetime.timedelta(seconds=1))
+        # правка через 9 с — отсчёт начинается заново
+        second = record.enqueue({"label": "a"}, key="same", delay=10, debounce=True)
+        self.assertEqual(second.pk, first.pk)
+        self.assertGreater(Job.objects.get().run_at, timezone.now() + datetime.timedelta(seconds=9))
+        # без debounce — ранний срок остаётся
+        record.enqueue({"label": "a"}, key="same", delay=60)
+        self.assertLess(Job.objects.get().run_at, timezone.now() + datetime.timedelta(seconds=11))
+
+    def test_priority_then_run_at(self):
+        record.enqueue({"label": "поздняя"})
+        record.enqueue({"label": "срочная"}, priority=10)
+        record.enqueue({"label": "отложенная"}, priority=20, delay=60)
+        self.assertEqual(queue.run_pending(), 2)
+        self.assertEqual(CALLS, ["срочная", "поздняя"])
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    def test_retry_with_backoff_then_failed(self):
+        job = broken.enqueue()
+        with self.assertLogs("jobs", "ERROR"):
+            queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now() + datetime.timedelta(seconds=9))
+        self.assertIn("ValueError: сломалось", job.error)
+        # пауза не вышла — брать нечего
+        self.assertEqual(queue.run_pending(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("jobs", "ERROR"):
+            queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+        self.assertEqual(queue.retry_failed("tests.broken"), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (Job.QUEUED, 0, ""))
+
+    def test_sqlite_claims_through_lock_row(self):
+        # строка блокировки упавшего воркера не мешает, своя удаляется
+        JobLock.objects.create(name=queue.CLAIM_LOCK, owner="упал", expires_at=timezone.now() - datetime.timedelta(1))
+        record.enqueue({"label": "a"})
+        [job] = queue.claim("w1")
+        self.assertEqual((job.status, job.worker, job.attempts), (Job.RUNNING, "w1", 1))
+        self.assertFalse(JobLock.objects.exists())
+        self.assertEqual(queue.claim("w2"), [])
+
+    def test_recover_abandoned_job(self):
+        record.enqueue({"label": "a"})
+        [job] = queue.claim("w1")
+        Job.objects.update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(queue.recover(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn("не завершил", job.error)
+
+    def test_stats_and_commands(self):
+        record.enqueue({"label": "a"})
+        record.enqueue({"label": "b"})
+        out = io.StringIO()
+        call_command("jobs_worker", "--processes", "0", "--burst", stdout=out)
+        self.assertIn("Выполнено задач: 2", out.getvalue())
+
+        entry = queue.stats()["tests.record"]
+        self.assertEqual(entry["counts"], {"done": 2})
+        self.assertEqual(set(entry["run_ms"]), {"p50", "p95", "max"})
+
+        out = io.StringIO()
+        call_command("jobs", stdout=out)
+        self.assertRegex(out.getvalue(), r"tests\.record\s+0\s+0\s+2\s+0")
+
+        Job.objects.update(finished_at=timezone.now() - datetime.timedelta(days=30))
+        call_command("jobs", "--prune", stdout=out)
+        self.assertIn("Удалено выполненных: 2", out.getvalue())
+
+
+class TestAnalyticsJob(TestCase):
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        TIERED_CACHE={"ENABLED": True},
+    )
+    def test_edits_schedule_one_delayed_rebuild(self):
+        cache.clear()
+        teacher = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        student = Student.objects.create(name="Вася", group="7А")
+        student.teachers.add(teacher)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.key), ("school.rebuild_analytics", "school:analytics"))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(queue.run_pending(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(queue.run_pending(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(analytics.report()["groups"], [("7А", 1)])
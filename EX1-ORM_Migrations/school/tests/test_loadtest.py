@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+class LoadHarnessTests(SimpleTestCase):
+    """website/loadtest.py: клиент, открытая/закрытая модель и перцентили."""
+    @staticmethod
+    def app(environ, start_response):
+        status = "404 Not Found" if environ["PATH_INFO"] == "/missing/" else "200 OK"
+        body = b"ok" * 100
+        start_response(status, [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))])
+        return [body]
+
+    def test_percentile_nearest_rank(self):
+        from website.loadtest import percentile
+        values = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 0.05)
+        self.assertEqual(percentile(values, 99), 0.099)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_drive_closed_and_open_loop(self):
+        import asyncio
+        from website.loadtest import drive, inprocess_server, summarize
+
+        with inprocess_server(self.app) as base_url:
+            samples, elapsed = asyncio.run(
+                drive(base_url, ["/", "/missing/"], duration=0.3, concurrency=4)
+            )
+            report = summarize(samples, elapsed)
+            self.assertGreater(report["total"]["requests"], 0)
+            self.assertEqual(report["paths"]["/"]["errors"], 0)
+            self.assertEqual(report["paths"]["/missing/"]["errors"], report["paths"]["/missing/"]["requests"])
+
+            samples, elapsed = asyncio.run(
+                drive(base_url, ["/"], duration=0.3, rate=50, warmup=0.1, seed=1)
+            )
+            self.assertTrue(all(status == 200 for _path, _latency, status in samples))
+            total = summarize(samples, elapsed)["total"]
+            self.assertLessEqual(total["p50_ms"], total["p95_ms"])
+            self.assertLessEqual(total["p95_ms"], total["p99_ms"])
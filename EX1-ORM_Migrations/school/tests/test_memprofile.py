@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from school.models import Student, Teacher
+from website.memprofile import MemoryBudgetExceeded, human, parse_size
+
+
+class TestMemoryProfile(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        teacher = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        for number in range(40):
+            Student.objects.create(name=f"Ученик {number}", group="7А").teachers.add(teacher)
+
+    def profiling(self, **options):
+        return override_settings(MEMORY_PROFILE={
+            "ENABLED": True, "STRICT": True, "FRAMES": 5, "INTERVAL": 0, "PATH": self.path, **options,
+        })
+
+    def test_sizes(self):
+        self.assertEqual(parse_size("512KB"), 512 * 1024)
+        self.assertEqual(parse_size("1G"), 1024 ** 3)
+        self.assertEqual(human(512), "512 B")
+        self.assertEqual(human(3 * 1024 * 1024), "3.0 MB")
+
+    def test_page_profile_and_flamegraph(self):
+        with self.profiling(BUDGETS={"students": "64MB"}):
+            response = self.client.get(reverse("students"))
+        self.assertContains(response, "Ученик 39")
+        self.assertGreater(int(response["X-Memory-Peak"]), 0)
+        with open(os.path.join(self.path, "profiles.ndjson"), encoding="utf-8") as f:
+            record = json.loads(f.readline())
+        self.assertEqual(record["name"], "students")
+        self.assertTrue({"templates", "querysets", "models"} & set(record["categories"]))
+        with open(os.path.join(self.path, "students.folded"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(re.match(r"^students(;[^;]+:\d+)+ \d+$", line) for line in lines))
+
+    def test_page_over_budget_fails(self):
+        with self.profiling(BUDGETS={"students": "1KB"}):
+            with self.assertRaisesMessage(MemoryBudgetExceeded, "students: пик памяти"):
+                self.client.get(reverse("students"))
+        # выключенный профиль бюджеты не проверяет
+        with self.profiling(BUDGETS={"students": "1KB"}, ENABLED=False):
+            response = self.client.get(reverse("students"))
+        self.assertFalse(response.has_header("X-Memory-Peak"))
+
+    def test_command_wrapper_attributes_fixture_load(self):
+        fixture = os.path.join(self.path, "school.json")
+        call_command("dumpdata", "school.teacher", "school.student", output=fixture)
+        Student.objects.all().delete()
+        folded = os.path.join(self.path, "load.folded")
+        out = io.StringIO()
+        with self.profiling(BUDGETS={"loaddata": "256MB"}):
+            call_command("memprofile", "loaddata", fixture, folded=folded, stdout=out)
+        self.assertEqual(Student.objects.count(), 40)
+        self.assertRegex(out.getvalue(), r"loaddata: пик \d.* \(бюджет 256\.0 MB\)")
+        self.assertRegex(out.getvalue(), r"serialization +\d")
+        self.assertTrue(os.path.getsize(folded))
+
+        with self.profiling(BUDGETS={"loaddata": "1KB"}):
+            with self.assertRaisesMessage(CommandError, "больше бюджета"):
+                call_command("memprofile", "loaddata", fixture, stdout=io.StringIO())
+
+    def test_shipped_fixture_load_within_budget(self):
+        Student.objects.all().delete()
+        Teacher.objects.all().delete()
+        out = io.StringIO()
+        with self.profiling(BUDGETS={"loaddata": "256MB"}):
+            call_command(
+                "memprofile", "loaddata", os.path.join(settings.BASE_DIR, "school.json"),
+                folded=os.path.join(self.path, "school.folded"), stdout=out,
+            )
+        self.assertIn("Installed 6 object(s)", out.getvalue())
+        self.assertRegex(out.getvalue(), r"loaddata: пик \d.* \(бюджет 256\.0 MB\)")
+        self.assertEqual(Student.objects.filter(teachers__isnull=False).distinct().count(), 3)
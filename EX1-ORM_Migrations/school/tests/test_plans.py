@@ -0,0 +1,81 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from school.models import Student, Teacher
+from website import plans
+
+
+class TestQueryPlans(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, "plans.json")
+        override = override_settings(QUERY_PLANS={"BASELINE": self.baseline, "SEQ_SCAN_MIN_ROWS": 50})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_unindexed_filter_is_flagged(self):
+        Student.objects.bulk_create(Student(name=f"Ученик {n}", group="7А") for n in range(60))
+        plan = plans.QueryPlan("by_name", lambda: Student.objects.filter(name="Ученик 1"))
+        result = plans.check(plan)
+        self.assertEqual(result["flags"], ["seq_scan"])
+        self.assertEqual(len(result["queries"]), 1)
+        # ожидаемую пометку можно разрешить
+        plan = plans.QueryPlan("by_name", plan.build, allow=["seq_scan"])
+        self.assertEqual(plans.check(plan)["flags"], [])
+
+    def test_indexed_lookup_passes(self):
+        Student.objects.bulk_create(Student(name=f"Ученик {n}", group="7А") for n in range(60))
+        plan = plans.QueryPlan("by_group", lambda: Student.objects.filter(group="7А").order_by("id")[:10])
+        result = plans.check(plan)
+        self.assertEqual(result["flags"], [])
+        self.assertIn("school_student_group_idx", "\n".join(result["queries"][0]["shape"]))
+
+    def test_command_seeds_and_rolls_back(self):
+        out = io.StringIO()
+        call_command("check_plans", "--seed", "200", "--update-baseline", stdout=out)
+        self.assertIn("students_list: ok", out.getvalue())
+        self.assertIn("students_roster: ok", out.getvalue())
+        self.assertIn("teacher_detail: ok", out.getvalue())
+        self.assertFalse(Student.objects.exists())
+        self.assertFalse(Teacher.objects.exists())
+
+    def test_baseline_and_changed_shape(self):
+        call_command("check_plans", "--seed", "200", "--update-baseline", stdout=io.StringIO())
+        with open(self.baseline, encoding="utf-8") as f:
+            stored = json.load(f)["sqlite"]
+        self.assertEqual(sorted(stored), ["students_list", "students_roster", "teacher_detail", "teachers_list"])
+        call_command("check_plans", "--seed", "200", stdout=io.StringIO())
+
+        # эталон с другой формой — выборка помечается changed
+        stored["teachers_list"][0]["shape"] = ["SCAN school_teacher"]
+        with open(self.baseline, "w", encoding="utf-8") as f:
+            json.dump({"sqlite": stored}, f)
+        out = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "teachers_list"):
+            call_command("check_plans", "teachers_list", "--seed", "200", stdout=out)
+        self.assertIn("[changed]", out.getvalue())
+
+    def test_single_plan_matches_full_run_baseline(self):
+        call_command("check_plans", "--seed", "200", "--update-baseline", stdout=io.StringIO())
+        for name in ("teacher_detail", "students_list"):
+            out = io.StringIO()
+            call_command("check_plans", name, "--seed", "200", stdout=out)
+            self.assertIn(f"{name}: ok", out.getvalue())
+
+    def test_missing_baseline_fails(self):
+        with self.assertRaisesMessage(CommandError, "нет планов sqlite для: students_list, students_roster"):
+            call_command("check_plans", "--seed", "0", stdout=io.StringIO())
+        call_command("check_plans", "teachers_list", "--seed", "200", "--update-baseline", stdout=io.StringIO())
+        # выборка, которой нет в эталоне, тоже ошибка
+        with self.assertRaisesMessage(CommandError, "для: students_list. Снимите его"):
+            call_command("check_plans", "students_list", "--seed", "0", stdout=io.StringIO())
+
+    def test_unknown_plan(self):
+        with self.assertRaisesMessage(CommandError, "nope"):
+            call_command("check_plans", "nope", stdout=io.StringIO())
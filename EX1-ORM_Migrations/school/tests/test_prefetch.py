@@ -0,0 +1,69 @@
+import io
+import os
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from school.models import Student, Teacher
+from website import prefetch
+
+PROBE_TEMPLATES = [{
+    "BACKEND": "django.template.backends.django.DjangoTemplates",
+    "OPTIONS": {"loaders": [("django.template.loaders.locmem.Loader", {
+        # {{ student }} — это __str__, по шаблону не видно, что нужно имя
+        "probe.html": "{% for student in object_list %}{{ student }};{% endfor %}",
+    })]},
+}]
+
+
+class TestPrefetchPlanner(TestCase):
+    def setUp(self):
+        self.addCleanup(prefetch.reset)
+
+    def test_template_paths(self):
+        self.assertEqual(prefetch.template_paths("school/teacher_detail.html", "page_obj[]"), {"group", "name"})
+        self.assertEqual(prefetch.template_paths("school/teacher_detail.html", "teacher"), {"name", "subject"})
+        self.assertEqual(
+            prefetch.template_paths("school/students_list.html", "object_list[]"),
+            {"group", "name", "teachers.all", "teachers.all.name", "teachers.all.subject"},
+        )
+
+    def test_teacher_detail_loads_printed_columns(self):
+        teacher = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        Student.objects.create(name="Вася", group="7А").teachers.add(teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("teacher", args=[teacher.pk]))
+        self.assertContains(response, "Вася 7А")
+        self.assertFalse([query["sql"] for query in queries.captured_queries if "updated_at" in query["sql"]])
+
+    def test_runtime_access_is_learned(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        learned = os.path.join(directory.name, "prefetch.json")
+        target = prefetch.register(prefetch.Target("probe", "probe.html", "object_list[]", build=Student.objects.all))
+        self.addCleanup(prefetch.TARGETS.pop, "probe")
+        Student.objects.create(name="Вася", group="7А")
+        Student.objects.create(name="Петя", group="7Б")
+
+        with override_settings(TEMPLATES=PROBE_TEMPLATES, PREFETCH_PLANS={"LEARNED": learned}):
+            out = io.StringIO()
+            with self.assertRaisesMessage(CommandError, "probe"):
+                call_command("prefetch_plan", "probe", "--seed", "0", "--check", stdout=out)
+            self.assertIn("запросов из шаблона: по плану 2", out.getvalue())
+            self.assertIn("только при отрисовке: name", out.getvalue())
+
+            call_command("prefetch_plan", "probe", "--seed", "0", "--update", stdout=io.StringIO())
+            self.assertEqual(prefetch.plan_for(Student, "probe.html", "object_list[]").only(), ["id", "name"])
+            self.assertEqual(prefetch.analyse(target, ["name"])["plan_queries"], 0)
+
+    def test_command_checks_read_model(self):
+        out = io.StringIO()
+        call_command("prefetch_plan", "--seed", "20", "--check", stdout=out)
+        self.assertIn("students_list: ok", out.getvalue())
+        self.assertIn("teacher_detail: ok", out.getvalue())
+        self.assertIn("текущая выборка грузит зря: school_student: updated_at", out.getvalue())
+        self.assertFalse(Student.objects.exists())
@@ -0,0 +1,34 @@
+from django.test import TestCase
+from django.urls import reverse
+from school.models import Student, Teacher
+from school.read_models import StudentRow
+
+
+class TestStudentRows(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.t1 = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        cls.t2 = Teacher.objects.create(name="Анна Смирнова", subject="Физика")
+        cls.s1 = Student.objects.create(name="Вася", group="7А")
+        cls.s2 = Student.objects.create(name="Маша", group="7Б")
+        cls.s1.teachers.set([cls.t1, cls.t2])
+
+    def test_rows_replace_model_instances(self):
+        rows = list(Student.objects.order_by("group").as_rows())
+        self.assertTrue(all(isinstance(row, StudentRow) for row in rows))
+        self.assertEqual([row.name for row in rows], ["Вася", "Маша"])
+        self.assertCountEqual(
+            [(t.name, t.subject) for t in rows[0].teachers.all()],
+            [("Иван Петров", "Матем"), ("Анна Смирнова", "Физика")],
+        )
+        self.assertEqual(list(rows[1].teachers.all()), [])
+
+    def test_same_teacher_is_shared_between_rows(self):
+        self.s2.teachers.set([self.t2])
+        rows = list(Student.objects.order_by("group").as_rows())
+        anna = [t for t in rows[0].teachers.all() if t.id == self.t2.id][0]
+        self.assertIs(anna, rows[1].teachers.all()[0])
+
+    def test_empty_teachers_render_dash(self):
+        resp = self.client.get(reverse("students"))
+        self.assertContains(resp, "—")
@@ -0,0 +1,34 @@
+from django.test import SimpleTestCase, TestCase
+class ProgressTestRunnerTests(TestCase):
+    """Порядок по истории прогонов и счётчик запросов раннера."""
+    def test_slow_classes_go_first_within_group(self):
+        from school.tests_runner import ProgressTestRunner
+
+        class Fast(TestCase):
+            def test_a(self): pass
+            def test_b(self): pass
+
+        class Slow(TestCase):
+            def test_c(self): pass
+
+        class Simple(SimpleTestCase):
+            def test_d(self): pass
+
+        tests = [Fast("test_a"), Fast("test_b"), Slow("test_c"), Simple("test_d")]
+        runner = ProgressTestRunner(parallel=1, slowest=0, verbosity=0)
+        runner.state = {"durations": {tests[0].id(): 0.1, tests[1].id(): 0.1, tests[2].id(): 2.0}}
+        ordered = runner.order_by_history(tests)
+        # SimpleTestCase остаётся после TestCase, тесты класса — рядом и по порядку
+        self.assertEqual([t._testMethodName for t in ordered], ["test_c", "test_a", "test_b", "test_d"])
+
+    def test_query_counter(self):
+        from django.db import connection
+        from school.tests_runner import QueryCounter
+
+        counter = QueryCounter()
+        counter.start()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.execute("SELECT 2")
+        self.assertEqual(counter.stop(), 2)
+        self.assertNotIn(counter, connection.execute_wrappers)
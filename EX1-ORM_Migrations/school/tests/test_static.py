@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from website.static_handler import PrecompressedStaticFiles
+
+
+def fallback(environ, start_response):
+    start_response("404 Not Found", [])
+    return [b"app"]
+
+
+class TestStaticHandler(SimpleTestCase):
+    """collectstatic с отпечатками и .gz копиями; WSGI-обработчик статики."""
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root, True)
+        with override_settings(STATIC_ROOT=self.static_root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            self.hashed = staticfiles_storage.stored_name("css/bootstrap.min.css")
+        self.app = PrecompressedStaticFiles(fallback, root=self.static_root, prefix="/static/")
+
+    def call(self, path, **environ):
+        environ = {"PATH_INFO": path, **environ}
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, headers):
+            response["status"] = status
+            response["headers"] = dict(headers)
+
+        body = b"".join(self.app(environ, start_response))
+        return response["status"], response["headers"], body
+
+    def test_collectstatic_fingerprints_and_compresses(self):
+        self.assertNotEqual(self.hashed, "css/bootstrap.min.css")
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, self.hashed + ".gz")))
+
+    def test_negotiates_encoding_and_caches_forever(self):
+        status, headers, body = self.call("/static/" + self.hashed, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", headers["Cache-Control"])
+        self.assertEqual(int(headers["Content-Length"]), len(body))
+
+        _, headers, _ = self.call("/static/" + self.hashed)
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(self.call("/static/../settings.py")[2], b"app")
+        self.assertEqual(self.call("/")[2], b"app")
+
+    def test_if_none_match_compares_whole_etags(self):
+        _, headers, _ = self.call("/static/" + self.hashed)
+        etag = headers["ETag"]
+        self.assertEqual(self.call("/static/" + self.hashed, HTTP_IF_NONE_MATCH=etag)[0], "304 Not Modified")
+        self.assertEqual(
+            self.call("/static/" + self.hashed, HTTP_IF_NONE_MATCH='"other", W/%s' % etag)[0], "304 Not Modified")
+        self.assertEqual(self.call("/static/" + self.hashed, HTTP_IF_NONE_MATCH="*")[0], "304 Not Modified")
+        # ETag несжатого варианта — подстрока ETag'а gzip-варианта, но не он сам
+        self.assertEqual(
+            self.call("/static/" + self.hashed, HTTP_IF_NONE_MATCH=etag[:-1] + '-gzip"')[0], "200 OK")
+        self.assertEqual(self.call("/static/" + self.hashed, HTTP_IF_NONE_MATCH=etag[1:-1])[0], "200 OK")
+
+    def test_misses_are_not_cached(self):
+        for number in range(50):
+            self.assertEqual(self.call("/static/missing-%d.css" % number)[2], b"app")
+        self.assertEqual(self.app._files, {})
+        self.call("/static/" + self.hashed)
+        self.assertEqual(list(self.app._files), [self.hashed])
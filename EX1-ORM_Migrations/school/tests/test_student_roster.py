@@ -0,0 +1,72 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from school.models import Student, Teacher
+from school.read_models import StudentRow
+from school.roster import refresh_student_roster, student_rows
+
+
+@override_settings(SCHOOL_STUDENT_ROSTER=True)
+class TestStudentRoster(TestCase):
+    def setUp(self):
+        self.t1 = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        self.t2 = Teacher.objects.create(name="Анна Смирнова", subject="Физика")
+        self.s1 = Student.objects.create(name="Маша", group="7Б")
+        self.s2 = Student.objects.create(name="Вася", group="7А")
+        self.s3 = Student.objects.create(name="Петя", group="7А")
+        self.s2.teachers.add(self.t2)
+        self.s2.teachers.add(self.t1)
+        self.s1.teachers.add(self.t2)
+        refresh_student_roster()
+
+    def test_rows_match_live_rows(self):
+        rows = student_rows()
+        self.assertTrue(all(isinstance(row, StudentRow) for row in rows))
+        self.assertEqual([row.name for row in rows], ["Вася", "Петя", "Маша"])
+        live = list(Student.objects.order_by("group", "id").as_rows())
+        self.assertEqual(
+            [(row.id, row.group, list(row.teachers.all())) for row in rows],
+            [(row.id, row.group, list(row.teachers.all())) for row in live],
+        )
+        # учитель — один объект на все строки
+        self.assertIs(rows[0].teachers.all()[0], rows[2].teachers.all()[0])
+        self.assertEqual(list(rows[1].teachers.all()), [])
+
+    def test_page_is_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("students"))
+        self.assertRegex(response.content.decode(), r"Вася 7А<br>\s+Преподаватели:\s+Анна Смирнова: Физика,\s+Иван Петров")
+
+    def test_edits_schedule_debounced_refresh(self):
+        Job.objects.all().delete()
+        self.s3.teachers.add(self.t1)
+        Teacher.objects.get(pk=self.t1.pk).save()
+        job = Job.objects.get(name="school.refresh_roster")
+        self.assertEqual(job.key, "school:roster")
+        self.assertGreater(job.run_at, timezone.now())
+        # до обновления — прежние строки
+        self.assertEqual(list(student_rows()[1].teachers.all()), [])
+
+        Job.objects.update(run_at=timezone.now())
+        queue.run_pending()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+        self.assertEqual([t.name for t in student_rows()[1].teachers.all()], ["Иван Петров"])
+
+    def test_command_refreshes_roster(self):
+        Student.objects.filter(pk=self.s3.pk).delete()
+        out = io.StringIO()
+        call_command("refresh_roster_counts", stdout=out)
+        self.assertIn("school_student_roster обновлено", out.getvalue())
+        self.assertEqual([row.name for row in student_rows()], ["Вася", "Маша"])
+
+    @override_settings(SCHOOL_STUDENT_ROSTER=False)
+    def test_disabled_roster_is_not_scheduled(self):
+        Job.objects.all().delete()
+        self.s3.teachers.add(self.t1)
+        self.assertFalse(Job.objects.filter(name="school.refresh_roster").exists())
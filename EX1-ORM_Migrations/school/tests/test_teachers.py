@@ -0,0 +1,47 @@
+from django.test import TestCase
+from django.urls import reverse
+from school.models import Student, Teacher
+from school.roster import group_counts
+
+
+class TestTeacherRoster(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.t1 = Teacher.objects.create(name="Иван Петров", subject="Матем")
+        cls.t2 = Teacher.objects.create(name="Анна Смирнова", subject="Физика")
+        cls.t3 = Teacher.objects.create(name="Без учеников", subject="ИЗО")
+        for i, group in enumerate(["7А", "7А", "7Б"]):
+            student = Student.objects.create(name=f"Ученик {i}", group=group)
+            student.teachers.add(cls.t1)
+            if group == "7Б":
+                student.teachers.add(cls.t2)
+
+    def test_group_counts_single_query(self):
+        with self.assertNumQueries(1):
+            counts = group_counts([self.t1.id, self.t2.id, self.t3.id])
+        self.assertEqual(counts[self.t1.id], [("7А", 2), ("7Б", 1)])
+        self.assertEqual(counts[self.t2.id], [("7Б", 1)])
+        self.assertNotIn(self.t3.id, counts)
+
+    def test_roster_page_query_count(self):
+        # count для пагинатора + строки учителей + GROUP BY по through-таблице
+        with self.assertNumQueries(3):
+            resp = self.client.get(reverse("teachers"))
+        self.assertContains(resp, "7А: 2, 7Б: 1")
+        self.assertContains(resp, "Без учеников")
+
+    def test_teacher_detail_lists_students(self):
+        resp = self.client.get(reverse("teacher", args=[self.t2.id]))
+        self.assertContains(resp, "Ученик 2")
+        self.assertNotContains(resp, "Ученик 0")
+
+    def test_teachers_api(self):
+        data = self.client.get(reverse("teachers_api")).json()
+        by_id = {item["id"]: item for item in data["results"]}
+        self.assertEqual(by_id[self.t1.id]["groups"], {"7А": 2, "7Б": 1})
+        self.assertEqual(by_id[self.t1.id]["students_total"], 3)
+        self.assertEqual(by_id[self.t3.id]["students_total"], 0)
+
+        data = self.client.get(reverse("teacher_students_api", args=[self.t2.id])).json()
+        self.assertEqual([s["name"] for s in data["results"]], ["Ученик 2"])
+        self.assertEqual(self.client.get(reverse("teacher_students_api", args=[0])).status_code, 404)
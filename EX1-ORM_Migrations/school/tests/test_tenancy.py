@@ -0,0 +1,162 @@
+import io
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, router
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+from school import analytics, tenancy
+from school.dictionaries import teachers
+from school.models import Student, Teacher, Tombstone
+
+
+def sqlite_file(slug):
+    return {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(settings.BASE_DIR, ".cache", f"{slug}.sqlite3")}
+
+
+# SQLite-файлы вместо схем PostgreSQL, в тестах Django держит их в памяти
+TENANTS = {
+    "north": {"HOSTS": ["north.school.test"], "DATABASE": sqlite_file("north")},
+    "south": {"HOSTS": ["south.school.test"], "DATABASE": sqlite_file("south")},
+}
+# куда test_command_lists_and_moves_tenant переносит north
+MOVED = "school_north__default"
+TENANT_DATABASES = ("school_north", "school_south", MOVED)
+
+TIERED = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "TIERED_CACHE": {"ENABLED": True},
+}
+
+
+@override_settings(ALLOWED_HOSTS=["north.school.test", "south.school.test", "testserver"])
+class TestTenancy(TestCase):
+    # базы школ появляются только в setUpClass: "__all__" раскрывается уже после register()
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        # раннер создаёт тестовые БД до setUpClass — базы школ создаём и удаляем сами
+        tenancy.register(TENANTS)
+        cls.addClassCleanup(tenancy.unregister, TENANTS)
+        tenancy.move_database(tenancy.get("north"), "default")
+        for alias in TENANT_DATABASES:
+            creation = connections[alias].creation
+            cls.addClassCleanup(creation.destroy_test_db, creation.connection.settings_dict["NAME"], verbosity=0)
+            creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        super().setUpClass()
+
+    def setUp(self):
+        teachers.clear()
+        self.addCleanup(teachers.clear)
+
+    def populate(self, tenant, students, subject="Матем"):
+        with tenancy.activate(tenant):
+            teacher = Teacher.objects.create(name=f"Учитель {tenant}", subject=subject)
+            for name in students:
+                Student.objects.create(name=name, group="7А").teachers.add(teacher)
+            return teacher
+
+    def test_queries_stay_in_tenant_database(self):
+        self.populate("north", ["Вася", "Петя"])
+        self.populate("south", ["Маша"])
+        with tenancy.activate("north"):
+            self.assertEqual(router.db_for_read(Student), "school_north")
+            self.assertEqual(sorted(Student.objects.values_list("name", flat=True)), ["Вася", "Петя"])
+        with tenancy.activate("south"):
+            self.assertEqual(list(Student.objects.values_list("name", flat=True)), ["Маша"])
+        self.assertFalse(Student.objects.exists())
+        # в базы школ мигрирует только school
+        self.assertFalse(router.allow_migrate("school_north", "auth"))
+        self.assertIn("school_student", connections["school_north"].introspection.table_names())
+        self.assertNotIn("auth_user", connections["school_north"].introspection.table_names())
+
+    def test_host_selects_tenant(self):
+        self.populate("north", ["Вася"])
+        self.populate("south", ["Маша"])
+        response = self.client.get(reverse("students"), HTTP_HOST="south.school.test")
+        self.assertContains(response, "Маша")
+        self.assertNotContains(response, "Вася")
+        self.assertContains(response, "Учитель south")
+        # хост без школы — база default
+        response = self.client.get(reverse("students"))
+        self.assertNotContains(response, "Маша")
+
+    @override_settings(SCHOOL_TENANT_RESOLVE="path")
+    def test_path_prefix_selects_tenant(self):
+        teacher = self.populate("north", ["Вася"])
+        response = self.client.get(f"/t/north/teachers/{teacher.pk}/")
+        self.assertContains(response, "Вася")
+        # ссылки страницы — внутри той же школы
+        self.assertContains(response, 'href="/t/north/teachers/"')
+        self.assertEqual(self.client.get("/t/nowhere/").status_code, 404)
+
+    @override_settings(**TIERED)
+    def test_cache_and_dictionary_are_per_tenant(self):
+        cache.clear()
+        north = self.populate("north", ["Вася", "Петя"])
+        south = self.populate("south", ["Маша"], subject="Физика")
+        # одинаковые id в разных школах — разные записи
+        self.assertEqual(north.pk, south.pk)
+        with tenancy.activate("north"):
+            self.assertEqual(analytics.report()["groups"], [("7А", 2)])
+            self.assertEqual(teachers[north.pk].subject, "Матем")
+        with tenancy.activate("south"):
+            self.assertEqual(analytics.report()["groups"], [("7А", 1)])
+            self.assertEqual(teachers[south.pk].subject, "Физика")
+            Teacher.objects.filter(pk=south.pk).update(subject="Химия")
+            with self.captureOnCommitCallbacks(using=tenancy.get("south").alias, execute=True):
+                Teacher.objects.get(pk=south.pk).save()
+            self.assertEqual(teachers[south.pk].subject, "Химия")
+        with tenancy.activate("north"):
+            self.assertEqual(teachers[north.pk].subject, "Матем")
+
+    def test_deletes_through_using_log_in_tenant_database(self):
+        # задачи и команды работают через .using(alias) без activate()
+        teacher = self.populate("south", ["Маша", "Даша"])
+        alias = tenancy.get("south").alias
+        students = Student.objects.using(alias)
+        # в default — учитель с тем же id и его ученик: их трогать нельзя
+        stranger = self.populate(None, ["Чужой"])
+        self.assertEqual(stranger.pk, teacher.pk)
+        before = dict(students.values_list("name", "updated_at"))
+        before_stranger = Student.objects.using("default").get().updated_at
+
+        masha = students.get(name="Маша").pk
+        students.get(pk=masha).delete()
+        Teacher.objects.using(alias).get(pk=teacher.pk).delete()
+        self.assertEqual(
+            sorted(Tombstone.objects.using(alias).values_list("feed", "object_id")),
+            [("students", masha), ("teachers", teacher.pk)],
+        )
+        self.assertFalse(Tombstone.objects.using("default").exists())
+        # ученики удалённого учителя тронуты в базе школы
+        self.assertGreater(students.get(name="Даша").updated_at, before["Даша"])
+        self.assertEqual(Student.objects.using("default").get().updated_at, before_stranger)
+
+    def test_analytics_job_runs_in_tenant(self):
+        self.populate("north", ["Вася"])
+        job = Job.objects.get()
+        self.assertEqual((job.key, job.args), ("school:analytics@north", {"tenant": "north"}))
+        Job.objects.update(run_at=job.created_at)
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+
+    def test_command_lists_and_moves_tenant(self):
+        self.populate("north", ["Вася", "Петя"])
+        out = io.StringIO()
+        call_command("tenants", stdout=out)
+        self.assertIn("north: school_north", out.getvalue())
+        self.assertIn("учеников 2, учителей 1", out.getvalue())
+
+        call_command("tenants", "--move", "north", "--node", "default", stdout=out)
+        self.assertIn("Скопировано строк: 5", out.getvalue())
+        self.assertEqual(
+            sorted(Student.objects.using(MOVED).values_list("name", "teachers__name")),
+            [("Вася", "Учитель north"), ("Петя", "Учитель north")],
+        )
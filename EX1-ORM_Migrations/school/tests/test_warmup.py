@@ -0,0 +1,35 @@
+from django.test import TestCase, TransactionTestCase, override_settings
+class WarmupTests(TestCase):
+    """website/warmup.py: все фазы проходят, справочники после прогрева в памяти."""
+    def test_all_phases_succeed(self):
+        from website import warmup
+        from school.dictionaries import teachers
+
+        teachers.clear()
+        results = warmup.run()
+        self.assertEqual([r.error for r in results if r.error], [])
+        names = [r.name for r in results]
+        self.assertEqual(names[:3], ["urls", "admin", "templates"])
+        self.assertIn("school: ученики", names)
+        with self.assertNumQueries(0):
+            teachers.records()
+
+    def test_no_db_skips_database_phases(self):
+        from website import warmup
+
+        with self.assertNumQueries(0):
+            results = warmup.run(include_db=False)
+        self.assertNotIn("database", [r.name for r in results])
+
+
+class WarmupConnectionTests(TransactionTestCase):
+    """Прогрев при старте не оставляет открытых подключений для форкнутых воркеров."""
+    def test_startup_closes_connections(self):
+        from unittest import mock
+
+        from django.db import connection
+        from website import warmup
+
+        with override_settings(WARMUP_ON_STARTUP=True), mock.patch.object(connection, "close") as close:
+            warmup.warm_up_on_startup()
+        close.assert_called_once_with()
@@ -0,0 +1,342 @@
+# school/tests_runner.py
+"""
+Тест-раннер с прогресс-баром.
+
+Помимо полоски прогресса:
+  * тесты по умолчанию идут параллельно (``--parallel`` = число ядер,
+    ``--parallel 1`` — последовательно); прогресс собирается со всех воркеров;
+  * тестовая БД переиспользуется, пока не изменились миграции: раннер сам
+    включает ``--keepdb``, а копии БД для воркеров PostgreSQL клонирует из
+    уже смигрированной (CREATE DATABASE ... TEMPLATE). ``--rebuild-db`` —
+    пересоздать принудительно;
+  * в конце печатаются самые медленные тесты с числом SQL-запросов
+    (``--slowest N``, 0 — не печатать);
+  * классы тестов запускаются от самых долгих по прошлым прогонам, чтобы
+    воркеры не ждали одного длинного класса в конце.
+
+Длительности и отпечаток миграций хранятся в BASE_DIR/.cache/test-runner.json.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+import unittest
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.test.runner import (
+    DiscoverRunner, ParallelTestSuite, RemoteTestResult, RemoteTestRunner,
+    get_max_test_processes, iter_test_cases, partition_suite_by_case,
+)
+
+BAR_WIDTH = 30  # длина полоски прогресса
+STATE_FILE = Path(settings.BASE_DIR) / '.cache' / 'test-runner.json'
+
+
+class QueryCounter:
+    """execute_wrapper, считающий SQL-запросы на всех подключениях."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def start(self):
+        self.count = 0
+        for connection in connections.all():
+            connection.execute_wrappers.append(self)
+
+    def stop(self):
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+        return self.count
+
+
+class TestTimer:
+    """Замер одного теста: время и число запросов."""
+    def __init__(self):
+        self.queries = QueryCounter()
+        self._started = None
+
+    def start(self):
+        self.queries.start()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        elapsed = time.perf_counter() - self._started
+        return elapsed, self.queries.stop()
+
+
+class ProgressTextTestResult(unittest.TextTestResult):
+    """
+    Результат с прогресс-баром в консоли.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.total_tests = 0
+        self._seen = 0
+        # {test_id: (секунды, запросы)}; в параллельном режиме приходят
+        # от воркеров событием addTiming, иначе меряем сами
+        self.timings = {}
+        self.measure = True
+        self._timer = TestTimer()
+        # Может быть назначен раннером:
+        # self.verbosity = 1
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._seen += 1
+
+        # полоса прогресса
+        if self.total_tests:
+            pct = self._seen / self.total_tests
+            filled = int(BAR_WIDTH * pct)
+            try:
+                bar = "█" * filled + "░" * (BAR_WIDTH - filled)
+            except Exception:
+                bar = "#" * filled + "-" * (BAR_WIDTH - filled)
+            self.stream.write(f"\r[{bar}] {self._seen}/{self.total_tests} ({int(pct*100)}%)")
+            self.stream.flush()
+
+        # подробный вывод имени теста при -v 2
+        if getattr(self, "verbosity", 1) >= 2:
+            name = self.getDescription(test)
+            self.stream.write(f"\n→ {name}\n")
+            self.stream.flush()
+
+        if self.measure:
+            self._timer.start()
+
+    def stopTest(self, test):
+        if self.measure:
+            self.addTiming(test, *self._timer.stop())
+        super().stopTest(test)
+
+    def addTiming(self, test, elapsed, queries):
+        self.timings[test.id()] = (elapsed, queries)
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        if getattr(self, "verbosity", 1) >= 2:
+            self.stream.write("   ✖ ERROR\n")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        if getattr(self, "verbosity", 1) >= 2:
+            self.stream.write("   ✖ FAIL\n")
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        if getattr(self, "verbosity", 1) >= 2:
+            self.stream.write("   ✓ OK\n")
+
+    def stopTestRun(self):
+        # финальный перевод строки, чтобы строка прогресса не залипла
+        try:
+            self.stream.write("\n")
+            self.stream.flush()
+        except Exception:
+            pass
+        super().stopTestRun()
+
+
+class ProgressTextTestRunner(unittest.TextTestRunner):
+    """
+    TextTestRunner, который знает об общем количестве тестов
+    и прокидывает verbosity в результат.
+    """
+    resultclass = ProgressTextTestResult
+
+    def run(self, test):
+        self._total = test.countTestCases()
+        self._parallel = isinstance(test, ParallelTestSuite)
+        return super().run(test)
+
+    def _makeResult(self):
+        result = super()._makeResult()
+        if isinstance(result, ProgressTextTestResult):
+            result.total_tests = getattr(self, "_total", 0)
+            # <-- ключевая строка: передаём уровень подробности
+            result.verbosity = getattr(self, "verbosity", 1)
+            # при параллельном прогоне время и запросы меряют воркеры
+            result.measure = not getattr(self, "_parallel", False)
+        return result
+
+
+class TimedRemoteTestResult(RemoteTestResult):
+    """Результат в воркере: дополнительно шлёт в родителя время и число запросов."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._timer = TestTimer()
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._timer.start()
+
+    def stopTest(self, test):
+        self.events.append(("addTiming", self.test_index, *self._timer.stop()))
+        super().stopTest(test)
+
+
+class TimedRemoteTestRunner(RemoteTestRunner):
+    resultclass = TimedRemoteTestResult
+
+
+class ProgressParallelTestSuite(ParallelTestSuite):
+    runner_class = TimedRemoteTestRunner
+
+
+def load_state():
+    try:
+        return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state):
+    try:
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        STATE_FILE.write_text(json.dumps(state, ensure_ascii=False, indent=1), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def migrations_fingerprint():
+    """Хеш всего, от чего зависит схема тестовой БД."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(django.get_version().encode())
+    for alias in sorted(connections):
+        db = connections[alias].settings_dict
+        digest.update(repr((alias, db["ENGINE"], db["NAME"], db.get("TEST", {}))).encode())
+    for app_config in sorted(apps.get_app_configs(), key=lambda a: a.label):
+        for path in sorted(Path(app_config.path, "migrations").glob("*.py")):
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class ProgressTestRunner(DiscoverRunner):
+    """
+    Django Test Runner, использующий наш ProgressTextTestRunner.
+    Совместим с Django 5.x: не пробрасываем несуществующие атрибуты.
+    """
+    parallel_test_suite = ProgressParallelTestSuite
+
+    def __init__(self, parallel=0, slowest=10, rebuild_db=False, **kwargs):
+        # без явного --parallel — по процессу на ядро (pdb с воркерами не работает)
+        if not parallel and not kwargs.get("pdb"):
+            parallel = get_max_test_processes()
+        super().__init__(parallel=parallel, **kwargs)
+        self.slowest = slowest
+        self.rebuild_db = rebuild_db
+        self.state = load_state()
+        self._fingerprint = None
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--slowest", type=int, default=10, metavar="N",
+            help="Показать N самых медленных тестов с числом запросов (0 — не показывать).",
+        )
+        parser.add_argument(
+            "--rebuild-db", action="store_true",
+            help="Пересоздать тестовую БД, даже если миграции не менялись.",
+        )
+
+    # ------------------------------------------------------------ порядок
+    def order_by_history(self, tests):
+        """
+        Внутри каждой группы reorder_by (TestCase, затем прочие) классы идут
+        от самых долгих по прошлым прогонам; тесты класса остаются рядом
+        и в прежнем порядке. Новые тесты считаются «средними».
+        """
+        if self.shuffle or self.reverse:
+            return tests
+        history = self.state.get("durations", {})
+        known = [history[t.id()] for t in tests if t.id() in history]
+        default = sum(known) / len(known) if known else 0.0
+
+        test_types = (unittest.loader._FailedTest, *self.reorder_by)
+        class_cost, class_pos = {}, {}
+        for pos, test in enumerate(tests):
+            cls = type(test)
+            class_cost[cls] = class_cost.get(cls, 0.0) + history.get(test.id(), default)
+            class_pos.setdefault(cls, pos)
+
+        def bucket(test):
+            for index, test_type in enumerate(test_types):
+                if isinstance(test, test_type):
+                    return index
+            return len(test_types)
+
+        return sorted(
+            tests,
+            key=lambda t: (bucket(t), -class_cost[type(t)], class_pos[type(t)]),
+        )
+
+    def build_suite(self, test_labels=None, **kwargs):
+        parallel, self.parallel = self.parallel, 0
+        suite = super().build_suite(test_labels, **kwargs)
+        self.parallel = parallel
+
+        suite = self.test_suite(self.order_by_history(list(iter_test_cases(suite))))
+        if self.parallel > 1:
+            subsuites = partition_suite_by_case(suite)
+            # воркеров не больше, чем классов тестов
+            self.parallel = min(self.parallel, len(subsuites))
+            if self.parallel > 1:
+                suite = self.parallel_test_suite(
+                    subsuites, self.parallel, self.failfast, self.debug_mode, self.buffer,
+                )
+        return suite
+
+    # ------------------------------------------------------------ БД
+    def setup_databases(self, **kwargs):
+        if self.keepdb:  # явный --keepdb — как у обычного раннера
+            return super().setup_databases(**kwargs)
+        self._fingerprint = migrations_fingerprint()
+        reuse = not self.rebuild_db and self.state.get("fingerprint") == self._fingerprint
+        if reuse:
+            self.log("Миграции не менялись — используем существующую тестовую БД.")
+        self.keepdb = reuse
+        old_config = super().setup_databases(**kwargs)
+        # свежесозданную БД (и её клоны для воркеров) оставляем для следующего прогона
+        self.keepdb = True
+        self.state["fingerprint"] = self._fingerprint
+        save_state(self.state)
+        return old_config
+
+    # ------------------------------------------------------------ прогон
+    def run_suite(self, suite, **kwargs):
+        runner = ProgressTextTestRunner(
+            verbosity=getattr(self, "verbosity", 1),
+            failfast=getattr(self, "failfast", False),
+            buffer=getattr(self, "buffer", False),
+            descriptions=True,
+            stream=sys.stderr,
+        )
+        result = runner.run(suite)
+        self.record_timings(result)
+        return result
+
+    def record_timings(self, result):
+        timings = getattr(result, "timings", {})
+        if not timings:
+            return
+        durations = self.state.setdefault("durations", {})
+        durations.update({test_id: round(elapsed, 4) for test_id, (elapsed, _q) in timings.items()})
+        save_state(self.state)
+
+        if self.slowest > 0:
+            slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)
+            sys.stderr.write(f"\nСамые медленные тесты ({min(self.slowest, len(slowest))}):\n")
+            for test_id, (elapsed, queries) in slowest[:self.slowest]:
+                sys.stderr.write(f"  {elapsed:8.3f}s {queries:5d} запр.  {test_id}\n")
+            sys.stderr.flush()
@@ -1,7 +1,16 @@
 from django.urls import path
 
-from school.views import students_list
+from school.api import students_api, teacher_students_api, teachers_api
+from school.changes import students as student_changes, teachers as teacher_changes
+from school.views import students_list, teacher_detail, teachers_list
 
 urlpatterns = [
     path('', students_list, name='students'),
+    path('teachers/', teachers_list, name='teachers'),
+    path('teachers/<int:pk>/', teacher_detail, name='teacher'),
+    path('api/students/', students_api, name='students_api'),
+    path('api/students/changes/', student_changes.as_view(), name='students_changes'),
+    path('api/teachers/', teachers_api, name='teachers_api'),
+    path('api/teachers/changes/', teacher_changes.as_view(), name='teachers_changes'),
+    path('api/teachers/<int:pk>/students/', teacher_students_api, name='teacher_students_api'),
 ]
@@ -1,7 +1,16 @@
 from django.views.generic import ListView
-from django.shortcuts import render
+from django.core.paginator import Paginator
+from django.shortcuts import get_object_or_404, render
 
-from .models import Student
+from website.prefetch import planned
+
+from .models import Student, Teacher
+from .read_models import teacher_cards
+from .roster import group_counts, student_roster_enabled, student_rows
+
+TEACHERS_PER_PAGE = 25
+STUDENTS_PER_PAGE = 50
+TEACHER_TEMPLATE = 'school/teacher_detail.html'
 
 
 def students_list(request):
@@ -12,8 +21,36 @@ def students_list(request):
     # https://docs.djangoproject.com/en/2.2/ref/models/querysets/#django.db.models.query.QuerySet.order_by
     ordering = 'group'
 
-    # Для оптимизации запросов
-    students = Student.objects.all().order_by(ordering).prefetch_related('teachers')
+    # Для оптимизации запросов: вместо моделей с prefetch_related('teachers') —
+    # компактные StudentRow, учителя собираются одним запросом по through-таблице
+    if student_roster_enabled():
+        # те же строки, заранее соединённые и упорядоченные по классу (school/roster.py)
+        students = student_rows()
+    else:
+        students = Student.objects.all().order_by(ordering).as_rows()
     context['object_list'] = students
 
     return render(request, template, context)
+
+
+def teachers_list(request):
+    template = 'school/teachers_list.html'
+    # считаем только учителей текущей страницы: один запрос на строки
+    # и один GROUP BY по through-таблице на счётчики по классам
+    teachers = Teacher.objects.order_by('name', 'id').values_list('id', 'name', 'subject')
+    page = Paginator(teachers, TEACHERS_PER_PAGE).get_page(request.GET.get('page'))
+    page.object_list = teacher_cards(page.object_list)
+    return render(request, template, {'page_obj': page, 'object_list': page.object_list})
+
+
+def teacher_detail(request, pk):
+    # колонки учителя и учеников — те, что печатает шаблон (website/prefetch.py)
+    teacher = get_object_or_404(planned(Teacher.objects.all(), TEACHER_TEMPLATE, 'teacher'), pk=pk)
+    students = planned(teacher.students.order_by('group', 'name', 'id'), TEACHER_TEMPLATE, 'page_obj[]')
+    page = Paginator(students, STUDENTS_PER_PAGE).get_page(request.GET.get('page'))
+    context = {
+        'teacher': teacher,
+        'groups': group_counts([teacher.pk]).get(teacher.pk, []),
+        'page_obj': page,
+    }
+    return render(request, TEACHER_TEMPLATE, context)
@@ -0,0 +1,22 @@
+"""
+Фазы прогрева списков школы (website/warmup.py): первый рендер
+students_list.html и teachers_list.html заполняет справочник учителей
+и кеш строк.
+"""
+from website.warmup import get_request, register
+
+
+@register('school: ученики', uses_db=True)
+def warm_students():
+    from .views import students_list
+
+    response = students_list(get_request('/'))
+    return f'{len(response.content) // 1024} КиБ'
+
+
+@register('school: учителя', uses_db=True)
+def warm_teachers():
+    from .views import teachers_list
+
+    response = teachers_list(get_request('/teachers/'))
+    return f'{len(response.content) // 1024} КиБ'
@@ -0,0 +1,23 @@
+"""
+ASGI config for website project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+import time
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
+
+_started = time.perf_counter()
+application = get_asgi_application()
+
+# шаблоны, URL, админка, БД и кеши — до первого запроса (settings.WARMUP_ON_STARTUP)
+from website.warmup import warm_up_on_startup  # noqa: E402
+
+warm_up_on_startup(time.perf_counter() - _started)
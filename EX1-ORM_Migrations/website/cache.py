@@ -0,0 +1,309 @@
+"""
+Двухуровневый кеш для тяжёлых выборок.
+
+  * L1 — LRU в памяти процесса, ограничен по размеру (байты pickle);
+  * L2 — общий для всех воркеров кеш Django (settings.CACHES, по умолчанию
+    FileBasedCache в BASE_DIR/.cache).
+
+Защита от «стада»:
+  * single-flight: в процессе одновременно считает один поток на ключ,
+    между процессами — тот, кто первым взял lock-ключ в L2 (cache.add);
+  * soft TTL: после SOFT_TTL значение ещё отдаётся, а пересчёт идёт в фоне;
+    после HARD_TTL запись удаляется.
+
+Инвалидация — через версию пространства имён: ``bump('articles')`` меняет
+версию, и все ключи вида ``articles:<старая версия>:...`` перестают читаться.
+
+Подключение::
+
+    @cached('school', key=lambda teacher_ids: tuple(sorted(teacher_ids)))
+    def group_counts(teacher_ids): ...
+
+Настройки — settings.TIERED_CACHE (см. DEFAULTS).
+"""
+import contextlib
+import contextvars
+import functools
+import hashlib
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connections
+from django.dispatch import receiver
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SHARED_ALIAS': 'default',
+    'LOCAL_MAX_BYTES': 16 * 1024 * 1024,
+    'SOFT_TTL': 30,
+    'HARD_TTL': 600,
+    # сколько секунд процесс доверяет прочитанной версии пространства имён
+    'VERSION_TTL': 1.0,
+    # сколько ждать чужой пересчёт, прежде чем считать самому
+    'LOCK_TIMEOUT': 30,
+    'LOCK_WAIT': 5.0,
+}
+
+
+def conf():
+    return {**DEFAULTS, **getattr(settings, 'TIERED_CACHE', {})}
+
+
+class LRUCache:
+    """Потокобезопасный LRU с вытеснением по суммарному размеру записей."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._data[key] = (value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _key, (_value, evicted) = self._data.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def delete(self, key):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TieredCache:
+    def __init__(self, options):
+        self.options = options
+        self.local = LRUCache(options['LOCAL_MAX_BYTES'])
+        self.shared = caches[options['SHARED_ALIAS']]
+        # полосатые локи: фиксированный набор вместо лока на каждый ключ
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._key_locks_guard = threading.Lock()
+        self._refreshing = set()
+        self._versions = {}
+
+    # ------------------------------------------------------------ версии
+    def version(self, namespace):
+        now = time.monotonic()
+        known = self._versions.get(namespace)
+        if known is not None and known[1] > now:
+            return known[0]
+        version = self.shared.get(f'v:{namespace}')
+        if version is None:
+            version = uuid.uuid4().hex
+            # add: если другой процесс успел раньше — берём его версию
+            if not self.shared.add(f'v:{namespace}', version, timeout=None):
+                version = self.shared.get(f'v:{namespace}', version)
+        self._versions[namespace] = (version, now + self.options['VERSION_TTL'])
+        return version
+
+    def bump(self, namespace):
+        # новая версия всегда уникальна: ключи старых запусков не оживут
+        version = uuid.uuid4().hex
+        self.shared.set(f'v:{namespace}', version, timeout=None)
+        self._versions[namespace] = (version, time.monotonic() + self.options['VERSION_TTL'])
+
+    def make_key(self, namespace, parts):
+        digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+        return f'{namespace}:{self.version(namespace)}:{digest}'
+
+    # ------------------------------------------------------------ чтение
+    def _read(self, key):
+        entry = self.local.get(key)
+        if entry is None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry, len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)))
+        if entry is not None and entry[2] <= time.time():
+            self.local.delete(key)
+            return None
+        return entry
+
+    def _write(self, key, value, soft_ttl, hard_ttl):
+        now = time.time()
+        entry = (value, now + soft_ttl, now + hard_ttl)
+        self.shared.set(key, entry, timeout=hard_ttl)
+        self.local.set(key, entry, len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)))
+        return entry
+
+    def get_or_compute(self, key, compute, soft_ttl=None, hard_ttl=None):
+        soft_ttl = self.options['SOFT_TTL'] if soft_ttl is None else soft_ttl
+        hard_ttl = self.options['HARD_TTL'] if hard_ttl is None else hard_ttl
+
+        entry = self._read(key)
+        if entry is not None:
+            value, fresh_until, _expires = entry
+            if fresh_until <= time.time():
+                self._refresh_in_background(key, compute, soft_ttl, hard_ttl)
+            return value
+        return self._compute(key, compute, soft_ttl, hard_ttl)
+
+    # ------------------------------------------------------------ пересчёт
+    def _key_lock(self, key):
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    def _compute(self, key, compute, soft_ttl, hard_ttl, force=False):
+        with self._key_lock(key):
+            if not force:
+                # пока ждали лок, значение мог посчитать соседний поток
+                entry = self._read(key)
+                if entry is not None:
+                    return entry[0]
+
+            lock_key = f'lock:{key}'
+            acquired = self.shared.add(lock_key, 1, timeout=self.options['LOCK_TIMEOUT'])
+            if not acquired:
+                # считает другой процесс — ждём его результат
+                deadline = time.monotonic() + self.options['LOCK_WAIT']
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    entry = self.shared.get(key)
+                    if entry is not None and (not force or entry[1] > time.time()):
+                        self.local.set(key, entry, len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)))
+                        return entry[0]
+            try:
+                return self._write(key, compute(), soft_ttl, hard_ttl)[0]
+            finally:
+                if acquired:
+                    self.shared.delete(lock_key)
+
+    def _refresh_in_background(self, key, compute, soft_ttl, hard_ttl):
+        with self._key_locks_guard:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                close_old_connections()
+                self._compute(key, compute, soft_ttl, hard_ttl, force=True)
+            finally:
+                with self._key_locks_guard:
+                    self._refreshing.discard(key)
+                # соединения с БД у потока свои — закрываем их
+                connections.close_all()
+
+        # поток видит contextvars запроса (например, текущую школу, school/tenancy.py)
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(refresh,), name=f'cache-refresh:{key}', daemon=True).start()
+
+    def clear(self):
+        self.local.clear()
+        self._versions.clear()
+
+
+_tiered = None
+_tiered_lock = threading.Lock()
+
+
+def get_cache():
+    global _tiered
+    if _tiered is None:
+        with _tiered_lock:
+            if _tiered is None:
+                _tiered = TieredCache(conf())
+    return _tiered
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(setting, **kwargs):
+    global _tiered
+    if setting in ('TIERED_CACHE', 'CACHES'):
+        _tiered = None
+
+
+def enabled():
+    return conf()['ENABLED']
+
+
+_bypass = threading.local()
+
+
+@contextlib.contextmanager
+def bypass():
+    """
+    Внутри блока @cached-функции этого потока считают заново и ничего
+    не пишут в кеш: нужно, когда важны сами запросы (website/plans.py).
+    """
+    previous = getattr(_bypass, 'active', False)
+    _bypass.active = True
+    try:
+        yield
+    finally:
+        _bypass.active = previous
+
+
+def bump(*namespaces):
+    """Инвалидировать всё закешированное в пространствах имён."""
+    if not enabled():
+        return
+    tiered = get_cache()
+    for namespace in namespaces:
+        tiered.bump(namespace)
+
+
+def cached(namespace, key=None, soft_ttl=None, hard_ttl=None):
+    """
+    Декоратор: результат функции кешируется в L1/L2 под версией namespace.
+    ``namespace`` — строка или функция без аргументов, которую зовут
+    при каждом вызове (пространство зависит от запроса, например от школы).
+    ``key`` — функция от тех же аргументов, возвращающая хешируемое
+    (repr-стабильное) описание; по умолчанию — сами аргументы.
+    Результат должен сериализоваться pickle.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled() or getattr(_bypass, 'active', False):
+                return func(*args, **kwargs)
+            parts = key(*args, **kwargs) if key is not None else (args, sorted(kwargs.items()))
+            tiered = get_cache()
+            current = namespace() if callable(namespace) else namespace
+            cache_key = tiered.make_key(current, (func.__module__, func.__qualname__, parts))
+            return tiered.get_or_compute(
+                cache_key, lambda: func(*args, **kwargs), soft_ttl=soft_ttl, hard_ttl=hard_ttl,
+            )
+
+        wrapper.namespace = namespace
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+def queryset_key(queryset):
+    """Ключ кеша для QuerySet: SQL с параметрами и алиас БД."""
+    try:
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    except EmptyResultSet:
+        return queryset.db, None, ()
+    return queryset.db, sql, tuple(params)
@@ -0,0 +1,211 @@
+"""
+Ленты изменений: что поменялось с прошлой синхронизации.
+
+    GET /api/<ресурс>/changes/?since=<токен>&limit=500
+
+Потребитель (кеш, поисковый индекс) хранит токен из ответа и в следующий
+раз получает только изменения после него, а не всю выгрузку:
+
+    {"changes": [{"id": 7, "updated_at": "...", ...}, ...],
+     "deleted": [3, 11],
+     "next": "<токен>", "more": false}
+
+  * ``changes`` — живые записи, у которых updated_at (индекс
+    (updated_at, id)) позже позиции токена, в keyset-порядке;
+  * ``deleted`` — id из журнала удалений (модель Tombstone приложения);
+  * ``more`` — есть ещё страница, запрашивать сразу с ``next``.
+
+Без ``since`` лента отдаёт все записи с начала, а удаления — только
+случившиеся после первого запроса.
+
+updated_at ставится при сохранении, а видна строка становится после
+коммита транзакции, поэтому лента не отдаёт записи моложе
+CHANGE_FEED['SETTLE_SECONDS']. Иначе запись, закоммиченная позже более
+свежей, оказалась бы позади уже выданного токена. Удаления хранятся
+CHANGE_FEED['RETENTION_DAYS'] дней (``manage.py changes --prune``). Токен
+старше этого срока получает 410: нужна полная пересинхронизация.
+
+Приложения описывают ленты объектами ``Feed`` в <app>/changes.py, а их
+сигналы (<app>/signals.py) ставят updated_at родителю при правке связей
+(``touch``) и пишут удаления в журнал (``Feed.forget``) — в базу
+сигнала (``using``), а не выбранную роутером.
+"""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+
+from website.api import (
+    ApiError, DEFAULT_LIMIT, decode_cursor, dumps, encode_cursor,
+    error_response, json_response, parse_cursor, parse_limit,
+)
+
+FEEDS = {}
+
+
+class ResyncRequired(Exception):
+    """Токен старше журнала удалений — потребителю нужна полная выгрузка."""
+
+
+def options():
+    return {'SETTLE_SECONDS': 2, 'RETENTION_DAYS': 30, **getattr(settings, 'CHANGE_FEED', {})}
+
+
+def touch(queryset):
+    """Отметить записи изменёнными (правка связей, которую не видит auto_now)."""
+    return queryset.update(updated_at=timezone.now())
+
+
+def _parse_position(values):
+    updated_at, row_id, deleted_at, tombstone_id = values
+    updated_at = parse_datetime(updated_at) if isinstance(updated_at, str) else None
+    deleted_at = parse_datetime(deleted_at) if isinstance(deleted_at, str) else None
+    if None in (updated_at, deleted_at) or not (isinstance(row_id, int) and isinstance(tombstone_id, int)):
+        raise ApiError('некорректный токен since')
+    return updated_at, row_id, deleted_at, tombstone_id
+
+
+def _after(queryset, field, moment, row_id):
+    return queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': row_id}))
+
+
+class Feed:
+    """
+    Лента одной модели: ``fields`` — колонки записи (кроме id и updated_at),
+    ``related(ids)`` — {id: значение} для поля ``related_name`` одним запросом.
+    """
+
+    def __init__(self, name, model, fields, tombstone_model, related=None, related_name=None):
+        self.name = name
+        self.model = model
+        self.fields = tuple(fields)
+        self.tombstone_model = tombstone_model
+        self.related = related
+        self.related_name = related_name
+
+    def tombstones(self):
+        return self.tombstone_model.objects.filter(feed=self.name)
+
+    def forget(self, object_ids, using=None):
+        """Записать удаление в журнал базы using (из post_delete)."""
+        self.tombstone_model.objects.using(using).bulk_create(
+            self.tombstone_model(feed=self.name, object_id=object_id) for object_id in object_ids
+        )
+
+    def changes(self, position=None, limit=DEFAULT_LIMIT):
+        now = timezone.now()
+        horizon = now - datetime.timedelta(seconds=options()['SETTLE_SECONDS'])
+        if position is None:
+            # первая выгрузка: записи с начала, удаления — начиная с неё
+            position = (datetime.datetime.min.replace(tzinfo=datetime.timezone.utc), 0, horizon, 0)
+        updated_at, row_id, deleted_at, tombstone_id = position
+        if deleted_at < now - datetime.timedelta(days=options()['RETENTION_DAYS']):
+            raise ResyncRequired('токен старше журнала удалений, нужна полная выгрузка без since')
+
+        columns = ('updated_at', 'id') + self.fields
+        rows = list(
+            _after(self.model._default_manager.filter(updated_at__lt=horizon), 'updated_at', updated_at, row_id)
+            .order_by('updated_at', 'id')
+            .values_list(*columns)[:limit + 1]
+        )
+        tombstones = list(
+            _after(self.tombstones().filter(deleted_at__lt=horizon), 'deleted_at', deleted_at, tombstone_id)
+            .order_by('deleted_at', 'id')
+            .values_list('deleted_at', 'id', 'object_id')[:limit + 1]
+        )
+        more = len(rows) > limit or len(tombstones) > limit
+        rows, tombstones = rows[:limit], tombstones[:limit]
+        if rows:
+            updated_at, row_id = rows[-1][:2]
+        if tombstones:
+            deleted_at, tombstone_id = tombstones[-1][:2]
+        elif deleted_at < horizon and not more:
+            # журнал прочитан до горизонта — сдвигаем позицию, чтобы токен не старел
+            deleted_at, tombstone_id = horizon, 0
+
+        related = self.related([row[1] for row in rows]) if self.related and rows else {}
+        changes = []
+        for row in rows:
+            item = dict(zip(columns, row))
+            if self.related:
+                item[self.related_name] = related.get(row[1], [])
+            changes.append(item)
+        return {
+            'changes': changes,
+            'deleted': [object_id for _deleted_at, _id, object_id in tombstones],
+            'next': encode_cursor(updated_at, row_id, deleted_at, tombstone_id),
+            'more': more,
+        }
+
+    def view(self, request):
+        try:
+            limit = parse_limit(request)
+            raw = decode_cursor(request, 4, param='since')
+            position = _parse_position(raw) if raw else None
+            return json_response(self.changes(position, limit))
+        except ApiError as e:
+            return error_response(e)
+        except ResyncRequired as e:
+            return json_response({'error': str(e)}, status=410)
+
+    def as_view(self):
+        return require_GET(self.view)
+
+
+def register(feed):
+    FEEDS[feed.name] = feed
+    return feed
+
+
+def prune():
+    """Удалить из журналов удаления старше RETENTION_DAYS; вернуть число строк."""
+    cutoff = timezone.now() - datetime.timedelta(days=options()['RETENTION_DAYS'])
+    removed = 0
+    for model in {feed.tombstone_model for feed in FEEDS.values()}:
+        removed += model.objects.filter(deleted_at__lt=cutoff).delete()[0]
+    return removed
+
+
+class ChangesCommand(BaseCommand):
+    """
+    Выгрузка ленты в NDJSON: строка на изменение, последняя строка —
+    {"next": токен, "more": ...}. ``--all`` — читать страницы до конца.
+    """
+    help = 'Изменения с прошлой синхронизации (NDJSON) и журнал удалений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', nargs='?', choices=sorted(FEEDS), help='лента')
+        parser.add_argument('--since', default='', help='токен next из прошлой выгрузки')
+        parser.add_argument('--limit', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='читать, пока more')
+        parser.add_argument('--prune', action='store_true', help='удалить старые записи журнала удалений')
+
+    def handle(self, *args, **options):
+        if options['prune']:
+            self.stdout.write(f'Удалено записей журнала: {prune()}')
+            if not options['feed']:
+                return
+        if not options['feed']:
+            raise CommandError('укажите ленту: ' + ', '.join(sorted(FEEDS)))
+
+        feed = FEEDS[options['feed']]
+        token = options['since']
+        while True:
+            try:
+                raw = parse_cursor(token, 4, param='since')
+                page = feed.changes(_parse_position(raw) if raw else None, options['limit'])
+            except (ApiError, ResyncRequired) as e:
+                raise CommandError(str(e))
+            for item in page['changes']:
+                self.stdout.write(dumps({'op': 'upsert', **item}).decode('utf-8'))
+            for object_id in page['deleted']:
+                self.stdout.write(dumps({'op': 'delete', 'id': object_id}).decode('utf-8'))
+            token = page['next']
+            if not (options['all'] and page['more']):
+                break
+        self.stdout.write(dumps({'next': token, 'more': page['more']}).decode('utf-8'))
+
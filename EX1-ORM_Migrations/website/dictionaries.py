@@ -0,0 +1,95 @@
+"""
+Справочники в памяти процесса: id → запись для маленьких, редко
+меняющихся таблиц (теги, учителя).
+
+Справочник загружается одним запросом при первом обращении и
+перечитывается, только когда меняется его версия в общем кеше
+(website.cache: ``TieredCache.version/bump``). Версию сбрасывают сигналы
+save/delete модели, поэтому все воркеры узнают об изменении за
+VERSION_TTL секунд. Если нужного id нет (запись появилась только что),
+справочник перечитывается сразу.
+
+Записи хранятся отдельно для каждой базы, куда роутер отправляет чтение
+модели (например, база текущей школы, school/tenancy.py), версия — тоже.
+"""
+import threading
+from collections import namedtuple
+
+from django.db import DEFAULT_DB_ALIAS, router
+
+from website.cache import get_cache
+
+
+class ModelDictionary:
+    # все справочники процесса — для прогрева (website/warmup.py)
+    instances = []
+
+    def __init__(self, model, fields, record=None):
+        self.model = model
+        self.fields = tuple(fields)
+        self.record = record or namedtuple(f'{model.__name__}Record', self.fields)
+        self.namespace = f'dict:{model._meta.label_lower}'
+        self._lock = threading.Lock()
+        # псевдоним БД → (версия, {id: запись})
+        self._loaded = {}
+        ModelDictionary.instances.append(self)
+
+    def _using(self):
+        return router.db_for_read(self.model)
+
+    def namespace_for(self, using):
+        return self.namespace if using == DEFAULT_DB_ALIAS else f'{self.namespace}@{using}'
+
+    def _load(self, using, version):
+        rows = self.model._default_manager.using(using).values_list(*self.fields)
+        records = {row[0]: self.record(*row) for row in rows}
+        self._loaded[using] = (version, records)
+        return records
+
+    def records(self):
+        using = self._using()
+        version = get_cache().version(self.namespace_for(using))
+        loaded = self._loaded.get(using)
+        if loaded is None or loaded[0] != version:
+            with self._lock:
+                loaded = self._loaded.get(using)
+                if loaded is None or loaded[0] != version:
+                    return self._load(using, version)
+        return loaded[1]
+
+    def _reload(self):
+        using = self._using()
+        with self._lock:
+            loaded = self._loaded.get(using)
+            return self._load(using, loaded[0] if loaded else None)
+
+    def get(self, pk, default=None):
+        record = self.records().get(pk)
+        if record is None:
+            record = self._reload().get(pk, default)
+        return record
+
+    def __getitem__(self, pk):
+        record = self.get(pk)
+        if record is None:
+            raise KeyError(pk)
+        return record
+
+    def get_many(self, pks):
+        """Записи по списку id; одно перечитывание на все пропуски."""
+        records = self.records()
+        if any(pk not in records for pk in pks):
+            records = self._reload()
+        return {pk: records[pk] for pk in pks if pk in records}
+
+    def invalidate(self, using=DEFAULT_DB_ALIAS, **kwargs):
+        """Сбросить справочник базы using во всех процессах (подходит как receiver сигнала)."""
+        get_cache().bump(self.namespace_for(using))
+
+    def clear(self):
+        """Забыть загруженные записи только в этом процессе (например, в тестах после отката транзакции)."""
+        with self._lock:
+            self._loaded = {}
+
+    def __len__(self):
+        return len(self.records())
@@ -0,0 +1,475 @@
+"""
+Нагрузочный прогон сайта: ``python manage.py loadtest``.
+
+Сервер:
+  * ``--server inprocess`` (по умолчанию) — website.wsgi.application в
+    многопоточном wsgiref прямо в процессе команды;
+  * ``--server gunicorn`` / ``--server uvicorn`` — локальный сервер
+    подпроцессом (нужен установленный пакет);
+  * ``--url http://host:port`` — уже запущенный сервер, без засева данных.
+
+Данные: отдельная тестовая БД (SQLite-файл во временном каталоге или
+test_<NAME> на PostgreSQL) засевается командой приложения и удаляется
+после прогона. Подпроцессу-серверу её имя передаётся через LOADTEST_DB_NAME.
+
+Клиенты — asyncio, без сторонних библиотек:
+  * ``--rate R`` — открытая модель: запросы приходят пуассоновским потоком
+    R в секунду независимо от ответов; задержка считается от запланированного
+    момента, поэтому очередь перед сервером тоже попадает в перцентили;
+  * ``--rate 0`` — закрытая модель: ``--concurrency`` клиентов шлют запросы
+    друг за другом.
+
+Результат (пропускная способность, p50/p95/p99 по каждому адресу) пишется
+в .cache/loadtest/<время>-<коммит>.json; ``--compare latest`` сравнивает
+с предыдущим сохранённым прогоном.
+
+``--log-queries FILE`` пишет SQL сервера в журнал (website/querylog.py)
+для ``manage.py advise_indexes``.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from website import querylog
+
+RESULTS_DIR = Path(settings.BASE_DIR) / '.cache' / 'loadtest'
+
+
+# ---------------------------------------------------------------- серверы
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def inprocess_server(application):
+    """WSGI-приложение на свободном порту 127.0.0.1; отдаёт базовый URL."""
+    server = make_server(
+        '127.0.0.1', 0, application,
+        server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+    )
+    thread = threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'сервер завершился с кодом {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError(f'сервер не открыл порт {port} за {timeout} с')
+
+
+SERVER_COMMANDS = {
+    'gunicorn': lambda port, workers: [
+        '-m', 'gunicorn', 'website.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning',
+    ],
+    'uvicorn': lambda port, workers: [
+        '-m', 'uvicorn', 'website.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--log-level', 'warning',
+    ],
+}
+
+
+@contextmanager
+def subprocess_server(kind, workers, db_name=None):
+    try:
+        __import__(kind)
+    except ImportError:
+        raise CommandError(f'--server {kind}: пакет {kind} не установлен')
+    port = free_port()
+    env = dict(os.environ)
+    if db_name:
+        env['LOADTEST_DB_NAME'] = str(db_name)
+    process = subprocess.Popen(
+        [sys.executable, *SERVER_COMMANDS[kind](port, workers)],
+        cwd=settings.BASE_DIR, env=env,
+    )
+    try:
+        wait_for_port(port, process)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@contextmanager
+def standin_database():
+    """Временная тестовая БД вместо рабочей; отдаёт её имя."""
+    tmpdir = None
+    if connection.vendor == 'sqlite':
+        # файл, а не :memory: — его должны видеть потоки и подпроцессы сервера
+        tmpdir = tempfile.mkdtemp(prefix='loadtest-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir, 'db.sqlite3')
+    old_name = connection.settings_dict['NAME']
+    name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield name
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# ---------------------------------------------------------------- клиент
+class HttpConnectionPool:
+    """Минимальный HTTP/1.1-клиент с keep-alive поверх asyncio streams."""
+
+    def __init__(self, base_url, headers=None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.headers = headers or {}
+        self._idle = []
+
+    async def _connect(self):
+        if self._idle:
+            return self._idle.pop()
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def get(self, path, headers=None):
+        """(статус, байт тела)."""
+        reader, writer = await self._connect()
+        lines = [f'GET {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Connection: keep-alive']
+        lines += [f'{k}: {v}' for k, v in {**self.headers, **(headers or {})}.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        try:
+            await writer.drain()
+            status, size, keep_alive = await self._read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            writer.close()
+            raise
+        if keep_alive:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        return status, size
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError('сервер закрыл соединение')
+        version, status = status_line.decode('latin-1').split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if 'content-length' in headers:
+            size = int(headers['content-length'])
+            await reader.readexactly(size)
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            size = 0
+            while True:
+                chunk = int((await reader.readline()).split(b';')[0], 16)
+                if chunk == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                size += chunk
+                await reader.readexactly(chunk + 2)
+        else:
+            size = len(await reader.read())
+            keep_alive = False
+        return int(status), size, keep_alive
+
+    def close(self):
+        for _reader, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+async def drive(base_url, paths, duration, rate=0.0, concurrency=10, warmup=0.0,
+                headers_for=None, seed=None):
+    """
+    Гоняет нагрузку и возвращает (образцы, длительность окна замера).
+    Образец — (path, задержка в секундах, статус или None при ошибке);
+    запросы, запланированные во время прогрева, не учитываются.
+    """
+    loop = asyncio.get_running_loop()
+    pool = HttpConnectionPool(base_url)
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(seed)
+    samples = []
+    start = loop.time()
+    measure_from = start + warmup
+    end = measure_from + duration
+
+    async def one(path, scheduled):
+        async with semaphore:
+            try:
+                status, _size = await pool.get(path, headers_for(path) if headers_for else None)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                status = None
+        if scheduled >= measure_from:
+            samples.append((path, loop.time() - scheduled, status))
+
+    if rate > 0:
+        tasks, i, at = [], 0, start
+        while at < end:
+            delay = at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(paths[i % len(paths)], at)))
+            i += 1
+            at += rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+    else:
+        async def client(offset):
+            i = offset
+            while loop.time() < end:
+                await one(paths[i % len(paths)], loop.time())
+                i += 1
+        await asyncio.gather(*(client(n) for n in range(concurrency)))
+
+    pool.close()
+    return samples, duration
+
+
+# ---------------------------------------------------------------- отчёт
+def percentile(values, q):
+    """Перцентиль по ближайшему рангу; values отсортированы."""
+    if not values:
+        return 0.0
+    rank = max(1, min(len(values), math.ceil(q / 100 * len(values))))
+    return values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    def stats(rows):
+        latencies = sorted(latency for _path, latency, _status in rows)
+        errors = sum(1 for _path, _latency, status in rows if status is None or status >= 400)
+        return {
+            'requests': len(rows),
+            'errors': errors,
+            'rps': round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round((latencies[-1] if latencies else 0.0) * 1000, 2),
+        }
+
+    by_path = {}
+    for sample in samples:
+        by_path.setdefault(sample[0], []).append(sample)
+    return {
+        'total': stats(samples),
+        'paths': {path: stats(rows) for path, rows in sorted(by_path.items())},
+    }
+
+
+def git_revision():
+    try:
+        sha = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{sha}+dirty' if dirty else sha
+
+
+def save_result(result, path=None):
+    if path is None:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = RESULTS_DIR / f"{stamp}-{result['meta']['revision']}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, ensure_ascii=False, indent=1), encoding='utf-8')
+    return path
+
+
+def load_result(path):
+    if path == 'latest':
+        saved = sorted(RESULTS_DIR.glob('*.json'))
+        if not saved:
+            raise CommandError(f'в {RESULTS_DIR} нет сохранённых прогонов')
+        path = saved[-1]
+    try:
+        return Path(path), json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        raise CommandError(f'не удалось прочитать {path}: {e}')
+
+
+# ---------------------------------------------------------------- команда
+class LoadTestCommand(BaseCommand):
+    """
+    Основа команды loadtest; приложение задаёт ``default_paths``,
+    ``seed(count)`` (засев тестовой БД) и ``cache_namespaces`` — пространства
+    website.cache, которые нельзя делить между тестовой и рабочей БД.
+    """
+    help = 'Нагрузочный прогон: пропускная способность и p50/p95/p99 задержки'
+    default_paths = ('/',)
+    cache_namespaces = ()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=('inprocess', 'gunicorn', 'uvicorn'), default='inprocess')
+        parser.add_argument('--workers', type=int, default=2, help='процессов gunicorn/uvicorn')
+        parser.add_argument('--url', help='нагружать уже запущенный сервер (без засева)')
+        parser.add_argument('--path', action='append', dest='paths', help='адрес (можно несколько)')
+        parser.add_argument('--rate', type=float, default=0.0,
+                            help='запросов в секунду (пуассоновский поток); 0 — закрытая модель')
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--duration', type=float, default=10.0, help='секунд замера')
+        parser.add_argument('--warmup', type=float, default=2.0, help='секунд прогрева')
+        parser.add_argument('--seed', type=int, default=500, help='сколько записей засеять')
+        parser.add_argument('--output', help='куда сохранить JSON (по умолчанию .cache/loadtest/)')
+        parser.add_argument('--no-save', action='store_true')
+        parser.add_argument('--compare', metavar='FILE', help="сравнить с прогоном (путь или 'latest')")
+        parser.add_argument('--log-queries', metavar='FILE',
+                            help='записать SQL сервера в журнал для advise_indexes (только --server inprocess)')
+
+    def seed(self, count):
+        raise NotImplementedError
+
+    def bump_caches(self):
+        from website.cache import get_cache
+
+        for namespace in self.cache_namespaces:
+            get_cache().bump(namespace)
+
+    def admin_cookie(self):
+        """Сессия суперпользователя для страниц /admin/."""
+        from django.contrib.auth import get_user_model
+        from django.test import Client
+
+        user = get_user_model().objects.create_superuser('loadtest', 'loadtest@example.com', None)
+        client = Client()
+        client.force_login(user)
+        return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or list(self.default_paths)
+        baseline = load_result(options['compare']) if options['compare'] else None
+
+        if options['log_queries'] and (options['url'] or options['server'] != 'inprocess'):
+            raise CommandError('--log-queries пишет запросы только сервера в процессе (--server inprocess)')
+        if options['url']:
+            samples, elapsed = self.run(options['url'], paths, options, cookie=None)
+        else:
+            with standin_database() as db_name:
+                self.seed(options['seed'])
+                cookie = self.admin_cookie()
+                if options['server'] == 'inprocess':
+                    from website.wsgi import application
+                    server = inprocess_server(application)
+                else:
+                    server = subprocess_server(options['server'], options['workers'], db_name)
+                # bulk_create засева не шлёт сигналов, а общий кеш помнит рабочую БД
+                self.bump_caches()
+                log = querylog.recording(options['log_queries']) if options['log_queries'] else nullcontext()
+                try:
+                    with server as base_url, log:
+                        samples, elapsed = self.run(base_url, paths, options, cookie)
+                finally:
+                    self.bump_caches()
+
+        result = {
+            'meta': {
+                'revision': git_revision(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'server': 'external' if options['url'] else options['server'],
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'rate': options['rate'],
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+                'seed': None if options['url'] else options['seed'],
+            },
+            **summarize(samples, elapsed),
+        }
+        self.report(result)
+        if baseline:
+            self.compare(result, *baseline)
+        if not options['no_save']:
+            path = save_result(result, options['output'])
+            self.stdout.write(f'Результат сохранён: {path}')
+
+    def run(self, base_url, paths, options, cookie):
+        def headers_for(path):
+            return {'Cookie': cookie} if cookie and path.startswith('/admin/') else None
+
+        mode = f"{options['rate']:g} зпр/с" if options['rate'] > 0 else f"{options['concurrency']} клиентов"
+        self.stdout.write(f"{base_url}: {mode}, {options['duration']:g} с (+{options['warmup']:g} с прогрев)")
+        return asyncio.run(drive(
+            base_url, paths, options['duration'], rate=options['rate'],
+            concurrency=options['concurrency'], warmup=options['warmup'], headers_for=headers_for,
+        ))
+
+    def report(self, result):
+        if result['meta']['debug']:
+            self.stdout.write(self.style.WARNING('DEBUG=True: цифры не показательны для продакшена'))
+        header = f"{'адрес':<40} {'запр.':>7} {'ошиб.':>6} {'зпр/с':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+        self.stdout.write(header)
+        rows = [*result['paths'].items(), ('ВСЕГО', result['total'])]
+        for path, s in rows:
+            self.stdout.write(
+                f"{path:<40} {s['requests']:>7} {s['errors']:>6} {s['rps']:>8.1f} "
+                f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}"
+            )
+
+    def compare(self, result, path, baseline):
+        self.stdout.write(f"\nСравнение с {path.name} ({baseline['meta'].get('revision')}):")
+        rows = [*result['paths'].items(), ('ВСЕГО', result['total'])]
+        for name, s in rows:
+            old = baseline['total'] if name == 'ВСЕГО' else baseline['paths'].get(name)
+            if not old:
+                continue
+            deltas = []
+            for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                change = (s[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                deltas.append(f'{key} {old[key]:g}→{s[key]:g} ({change:+.0f}%)')
+            self.stdout.write(f'  {name:<38} ' + ', '.join(deltas))
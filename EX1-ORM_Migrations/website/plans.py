@@ -0,0 +1,315 @@
+"""
+Планы запросов для ключевых выборок и проверка их на регрессии.
+
+Приложения регистрируют именованные выборки объектами ``QueryPlan``
+в <app>/plans.py: ``build()`` возвращает QuerySet таким же, каким его
+строит view, ``seed(size)`` наполняет таблицы синтетикой. Команда
+
+    python manage.py check_plans [имя ...] [--seed 5000] [--update-baseline]
+
+в транзакции, которая потом откатывается:
+
+  * засевает данные и обновляет статистику планировщика (ANALYZE);
+  * выполняет выборку мимо кеша (website/cache.py), перехватывая все
+    её SQL (с prefetch_related);
+  * для каждого SQL снимает план: на PostgreSQL ``EXPLAIN (ANALYZE,
+    BUFFERS, FORMAT JSON)``, на SQLite ``EXPLAIN QUERY PLAN``;
+  * нормализует план в «форму» — строки узлов без чисел и стоимостей —
+    и помечает проблемы:
+
+      seq_scan   — полный проход таблицы от SEQ_SCAN_MIN_ROWS строк без индекса;
+      sort       — сортировка без индекса всей такой таблицы (Sort / USE TEMP B-TREE);
+      disk_sort  — сортировка ушла на диск (PostgreSQL: external merge);
+      changed    — форма плана отличается от сохранённой в BASELINE;
+      slower     — стоимость выросла больше чем в COST_TOLERANCE раз.
+
+Ожидаемые для выборки пометки перечисляются в ``allow``. Без индекса по
+колонке сортировки или фильтра выборка получает seq_scan/sort, и команда
+завершается ошибкой — её можно ставить в CI. ``--update-baseline`` —
+сохранить текущие формы и стоимости как эталон (по СУБД отдельно);
+эталон коммитится, и без него (или без выборки в нём) проверка тоже
+завершается ошибкой — сравнивать было бы не с чем.
+
+Настройки — settings.QUERY_PLANS (см. options()).
+"""
+import json
+import os
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from website.cache import bypass
+from website.dictionaries import ModelDictionary
+
+PLANS = {}
+
+# псевдонимы подзапросов Django: FROM "school_student_teachers" U0
+ALIAS = re.compile(r'"(\w+)"\s+(?:AS\s+)?"?([A-Z]\d+)"?')
+NUMBER = re.compile(r'\b\d+\b')
+
+
+def options():
+    return {
+        'BASELINE': os.path.join(settings.BASE_DIR, 'query_plans.json'),
+        'SEED_SIZE': 5000,
+        'SEQ_SCAN_MIN_ROWS': 1000,
+        'COST_TOLERANCE': 2.0,
+        **getattr(settings, 'QUERY_PLANS', {}),
+    }
+
+
+class QueryPlan:
+    """
+    Именованная выборка: ``build()`` — QuerySet (вычисляется при проверке),
+    ``seed(size)`` — синтетика для её таблиц, ``allow`` — ожидаемые пометки.
+    """
+
+    def __init__(self, name, build, seed=None, allow=()):
+        self.name = name
+        self.build = build
+        self.seed = seed
+        self.allow = frozenset(allow)
+
+    def capture(self):
+        """Выполнить выборку; вернуть её SQL — [(sql, params), ...]."""
+        # справочники процесса (website/dictionaries.py) заполнила бы предыдущая
+        # выборка — каждая снимается с холодными, как первый запрос воркера
+        clear_dictionaries()
+        queryset = self.build()
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            queries.append((sql, tuple(params or ())))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            list(queryset)
+        return queries
+
+
+def clear_dictionaries():
+    for dictionary in ModelDictionary.instances:
+        dictionary.clear()
+
+
+def register(plan):
+    PLANS[plan.name] = plan
+    return plan
+
+
+class TableRows(dict):
+    """Число строк таблиц (COUNT(*) один раз на таблицу); None — не таблица."""
+
+    def __init__(self):
+        super().__init__()
+        self.tables = set(connection.introspection.table_names())
+
+    def __missing__(self, table):
+        rows = None
+        if table in self.tables:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                rows = cursor.fetchone()[0]
+        self[table] = rows
+        return rows
+
+
+def explain_sqlite(sql, params, table_rows):
+    """EXPLAIN QUERY PLAN → (форма, стоимость None, пометки)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        rows = cursor.fetchall()
+    aliases = dict((alias, table) for table, alias in ALIAS.findall(sql))
+    minimum = options()['SEQ_SCAN_MIN_ROWS']
+    depth = {0: -1}
+    shape, flags = [], set()
+    full_pass = False
+    for node_id, parent, _unused, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        shape.append('  ' * depth[node_id] + NUMBER.sub('N', detail))
+        words = detail.split()
+        if words[0] in ('SCAN', 'SEARCH') and len(words) > 1:
+            rows_in_table = table_rows[aliases.get(words[1], words[1])]
+            if rows_in_table is None:
+                # подзапрос или CTE, а не таблица
+                continue
+            if words[0] == 'SCAN' and rows_in_table >= minimum:
+                full_pass = True
+                if 'INDEX' not in words:
+                    flags.add('seq_scan')
+    # после поиска по индексу (SEARCH) сортируется немного строк, после SCAN — вся таблица
+    if full_pass and any('USE TEMP B-TREE FOR ORDER BY' in line for line in shape):
+        flags.add('sort')
+    return shape, None, flags
+
+
+def _walk(node, depth=0):
+    yield depth, node
+    for child in node.get('Plans', ()):
+        yield from _walk(child, depth + 1)
+
+
+def explain_postgresql(sql, params):
+    """EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) → (форма, стоимость, пометки, замеры)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params)
+        document = cursor.fetchone()[0]
+    if isinstance(document, str):
+        document = json.loads(document)
+    root = document[0]['Plan']
+    minimum = options()['SEQ_SCAN_MIN_ROWS']
+    shape, flags = [], set()
+    for depth, node in _walk(root):
+        parts = [node['Node Type']]
+        if 'Relation Name' in node:
+            parts.append(f"on {node['Relation Name']}")
+        if 'Index Name' in node:
+            parts.append(f"using {node['Index Name']}")
+        if 'Sort Key' in node:
+            parts.append('by ' + ', '.join(node['Sort Key']))
+        shape.append('  ' * depth + NUMBER.sub('N', ' '.join(parts)))
+
+        examined = (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * node.get('Actual Loops', 1)
+        if node['Node Type'] == 'Seq Scan' and examined >= minimum:
+            flags.add('seq_scan')
+        if node['Node Type'] in ('Sort', 'Incremental Sort') and node.get('Actual Rows', 0) >= minimum:
+            flags.add('sort')
+        if node.get('Sort Space Type') == 'Disk' or 'external' in node.get('Sort Method', ''):
+            flags.add('disk_sort')
+    # у корня BUFFERS уже включают дочерние узлы
+    metrics = {
+        'time_ms': round(document[0].get('Execution Time', root.get('Actual Total Time', 0.0)), 3),
+        'buffers': {'hit': root.get('Shared Hit Blocks', 0), 'read': root.get('Shared Read Blocks', 0)},
+    }
+    return shape, root['Total Cost'], flags, metrics
+
+
+def check(plan, baseline=None):
+    """
+    Снять планы всех SQL выборки. Вернуть
+    {'queries': [{'sql', 'shape', 'cost', 'flags', ...}], 'flags': [...]}.
+    """
+    table_rows = TableRows() if connection.vendor != 'postgresql' else None
+    queries = []
+    for sql, params in plan.capture():
+        metrics = {}
+        if connection.vendor == 'postgresql':
+            shape, cost, flags, metrics = explain_postgresql(sql, params)
+        else:
+            shape, cost, flags = explain_sqlite(sql, params, table_rows)
+        queries.append({'sql': sql, 'shape': shape, 'cost': cost, 'flags': flags, **metrics})
+
+    if baseline is not None:
+        for index, query in enumerate(queries):
+            before = baseline[index] if index < len(baseline) else None
+            if before is None or before['shape'] != query['shape']:
+                query['flags'].add('changed')
+            elif before.get('cost') and query['cost'] and query['cost'] > before['cost'] * options()['COST_TOLERANCE']:
+                query['flags'].add('slower')
+        if queries and len(queries) < len(baseline):
+            # выборка стала делать меньше запросов (пропал prefetch и т. п.)
+            queries[-1]['flags'].add('changed')
+
+    flags = set()
+    for query in queries:
+        query['flags'] = sorted(query['flags'] - plan.allow)
+        flags.update(query['flags'])
+    return {'queries': queries, 'flags': sorted(flags)}
+
+
+def seed(plans, size):
+    """Засеять данные для выборок (каждый seed один раз) и обновить статистику."""
+    seeds = []
+    for plan in plans:
+        if plan.seed is not None and plan.seed not in seeds:
+            seeds.append(plan.seed)
+    for func in seeds:
+        func(size)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get(connection.vendor, {})
+
+
+def save_baseline(path, results):
+    document = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            document = json.load(f)
+    stored = document.setdefault(connection.vendor, {})
+    for name, result in results.items():
+        stored[name] = [{'shape': query['shape'], 'cost': query['cost']} for query in result['queries']]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def run(names=None, size=None, baseline_path=None, update_baseline=False):
+    """Проверить выборки на засеянных данных (всё откатывается); {имя: результат}."""
+    selected = [PLANS[name] for name in (names or sorted(PLANS))]
+    size = options()['SEED_SIZE'] if size is None else size
+    baseline_path = baseline_path or options()['BASELINE']
+    baseline = {} if update_baseline else load_baseline(baseline_path)
+    missing = [plan.name for plan in selected if not update_baseline and plan.name not in baseline]
+    if missing:
+        raise CommandError(
+            f'В эталоне {baseline_path} нет планов {connection.vendor} для: {", ".join(missing)}. '
+            'Снимите его: manage.py check_plans --update-baseline — и закоммитьте файл'
+        )
+    results = {}
+    # кеш выборок отдал бы готовый результат без единого запроса
+    with bypass(), transaction.atomic():
+        if size:
+            seed(selected, size)
+        for plan in selected:
+            results[plan.name] = check(plan, baseline.get(plan.name))
+        # синтетика не должна остаться в базе
+        transaction.set_rollback(True)
+    clear_dictionaries()
+    if update_baseline:
+        save_baseline(baseline_path, results)
+    return results
+
+
+class PlansCommand(BaseCommand):
+    """Печатает формы планов и пометки; при пометках — ошибка (для CI)."""
+    help = 'Планы ключевых выборок на засеянных данных: полные проходы, сортировки, регрессии'
+
+    def add_arguments(self, parser):
+        parser.add_argument('plans', nargs='*', help='выборки: ' + ', '.join(sorted(PLANS)) + ' (по умолчанию все)')
+        parser.add_argument('--seed', type=int, default=None,
+                            help=f"строк синтетики (по умолчанию {options()['SEED_SIZE']}; 0 — текущие данные)")
+        parser.add_argument('--baseline', help='файл эталона (по умолчанию QUERY_PLANS["BASELINE"])')
+        parser.add_argument('--update-baseline', action='store_true', help='сохранить текущие планы как эталон')
+        parser.add_argument('--json', action='store_true', help='вывести результат JSON')
+
+    def handle(self, *args, **options):
+        unknown = sorted(set(options['plans']) - set(PLANS))
+        if unknown:
+            raise CommandError('неизвестные выборки: ' + ', '.join(unknown))
+        results = run(options['plans'], options['seed'], options['baseline'], options['update_baseline'])
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=1))
+        else:
+            for name, result in results.items():
+                status = self.style.ERROR(', '.join(result['flags'])) if result['flags'] else self.style.SUCCESS('ok')
+                self.stdout.write(f'{name}: {status}')
+                for query in result['queries']:
+                    cost = f" (стоимость {query['cost']})" if query['cost'] is not None else ''
+                    marks = f" [{', '.join(query['flags'])}]" if query['flags'] else ''
+                    self.stdout.write(f'  SQL{cost}{marks}')
+                    for line in query['shape']:
+                        self.stdout.write(f'    {line}')
+        if options['update_baseline']:
+            self.stdout.write(self.style.SUCCESS('Эталон планов сохранён'))
+            return
+        flagged = [name for name, result in results.items() if result['flags']]
+        if flagged:
+            raise CommandError('Проблемы в планах: ' + ', '.join(flagged))
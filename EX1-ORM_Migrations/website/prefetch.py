@@ -0,0 +1,644 @@
+"""
+План загрузки для выборки по тому, что печатает шаблон.
+
+Какие колонки и связи нужны странице, знает её шаблон: ``{% for scope in
+article.scopes.all %}{{ scope.tag.name }}`` — это Prefetch('scopes') с
+select_related('tag') и колонками is_main, tag.name. Руками написанные
+only()/select_related()/Prefetch расходятся с шаблоном незаметно: лишняя
+колонка просто грузится, пропущенная — догружается запросом на строку.
+
+  * template_paths() — статический разбор шаблона (с extends, include,
+    for и with): пути атрибутов от переменной контекста, ``'article'``
+    или ``'object_list[]'`` (элементы коллекции);
+  * build_plan() — минимальный план по путям: only() для колонок,
+    select_related для ForeignKey, Prefetch (со своим планом) для
+    обратных и many-to-many связей; пути, которые не поля модели
+    (свойства, методы), остаются в ``unresolved``;
+  * record() — запись во время отрисовки: какие колонки модели загружены
+    и к каким полям и связям шаблон обратился на самом деле (в том числе
+    изнутри свойств и __str__), сколько запросов ушло уже из шаблона;
+  * planned() — выборка view с планом по шаблону (оптимистично: только
+    то, что видно в шаблоне) плюс пути, записанные командой ниже.
+
+Приложения регистрируют страницы объектами ``Target`` в <app>/prefetch.py;
+
+    python manage.py prefetch_plan [имя ...] [--seed 50] [--update] [--check]
+
+в откатываемой транзакции засевает данные, отрисовывает шаблон с
+выборкой по плану и с текущей выборкой view и печатает план, пути,
+которых статический разбор не увидел, колонки, которые текущая выборка
+грузит зря, и атрибуты шаблона, которых нет у модели или read-модели.
+``--update`` сохраняет увиденные при отрисовке пути (settings.PREFETCH_PLANS
+['LEARNED']) — planned() берёт их в план; ``--check`` — ошибка, если
+по плану шаблон всё ещё делает запросы (для CI).
+"""
+import functools
+import json
+import os
+import threading
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, models, transaction
+from django.db.models import Prefetch
+from django.template import loader
+from django.template.base import FilterExpression, TextNode, Variable, VariableNode
+from django.template.defaulttags import ForNode, IfNode, WithNode
+from django.template.loader_tags import BlockNode, ExtendsNode, IncludeNode
+from django.template.smartif import TokenBase
+
+from website import plans
+from website.cache import bypass
+from website.dictionaries import ModelDictionary
+
+TARGETS = {}
+
+ITEMS = '[]'
+# методы менеджера связи в шаблоне: article.scopes.all, student.teachers.count
+MANAGER_METHODS = {'all', 'count', 'exists', 'first', 'last'}
+
+_recorder = ContextVar('prefetch_recorder', default=None)
+_patch_lock = threading.Lock()
+_patched = 0
+
+
+def options():
+    return {
+        'LEARNED': os.path.join(settings.BASE_DIR, 'prefetch_plans.json'),
+        'SEED_SIZE': 50,
+        **getattr(settings, 'PREFETCH_PLANS', {}),
+    }
+
+
+# --- статический разбор шаблона ---------------------------------------------
+
+def template_paths(template_name, root):
+    """
+    Пути атрибутов от переменной root, которые использует шаблон:
+    {'title', 'scopes.all.is_main', 'scopes.all.tag.name', ...}.
+    ``root='object_list[]'`` — пути элементов коллекции.
+    """
+    items = root.endswith(ITEMS)
+    name = root[:-len(ITEMS)] if items else root
+    found = set()
+    _walk_template(_load(template_name), {name: ()}, found, {})
+    paths = set()
+    for path in found:
+        if items:
+            if not path or path[0] != ITEMS:
+                continue  # page_obj.number — атрибут страницы, а не строки
+            path = path[1:]
+        path = tuple(bit for bit in path if bit != ITEMS)
+        if path:
+            paths.add('.'.join(path))
+    return paths
+
+
+def _load(template_name):
+    return loader.get_template(template_name).template
+
+
+def _walk_template(template, scope, found, blocks):
+    nodelist = template.nodelist
+    extends = next((node for node in nodelist if isinstance(node, ExtendsNode)), None)
+    if extends is None:
+        _walk(nodelist, scope, found, blocks)
+        return
+    # у наследника значат только блоки; ближайшее переопределение — главнее
+    overrides = {**extends.blocks, **blocks}
+    parent = extends.parent_name.var
+    if isinstance(parent, str):
+        _walk_template(_load(parent), scope, found, overrides)
+    else:
+        for block in overrides.values():
+            _walk(block.nodelist, scope, found, overrides)
+
+
+def _walk(nodelist, scope, found, blocks):
+    for node in nodelist or ():
+        _walk_node(node, scope, found, blocks)
+
+
+def _walk_node(node, scope, found, blocks):
+    if isinstance(node, TextNode):
+        return
+    if isinstance(node, VariableNode):
+        _expression(node.filter_expression, scope, found)
+    elif isinstance(node, ForNode):
+        _expression(node.sequence, scope, found)
+        sequence = _resolve(node.sequence.var, scope)
+        inner = dict(scope)
+        for loopvar in node.loopvars:
+            # for group, students in ... — что внутри кортежа, неизвестно
+            inner[loopvar] = sequence + (ITEMS,) if sequence is not None and len(node.loopvars) == 1 else None
+        _walk(node.nodelist_loop, inner, found, blocks)
+        _walk(node.nodelist_empty, scope, found, blocks)
+    elif isinstance(node, IfNode):
+        for condition, nodelist in node.conditions_nodelists:
+            for expression in _expressions(condition):
+                _expression(expression, scope, found)
+            _walk(nodelist, scope, found, blocks)
+    elif isinstance(node, WithNode):
+        inner = dict(scope)
+        for name, expression in node.extra_context.items():
+            _expression(expression, scope, found)
+            inner[name] = _resolve(expression.var, scope)
+        _walk(node.nodelist, inner, found, blocks)
+    elif isinstance(node, IncludeNode):
+        inner = {} if node.isolated_context else dict(scope)
+        for name, expression in node.extra_context.items():
+            _expression(expression, scope, found)
+            inner[name] = _resolve(expression.var, scope)
+        if isinstance(node.template.var, str):
+            _walk_template(_load(node.template.var), inner, found, {})
+    elif isinstance(node, BlockNode):
+        _walk(blocks.get(node.name, node).nodelist, scope, found, blocks)
+    else:
+        # {% url %} и прочие теги: выражения — в атрибутах узла
+        for name, value in vars(node).items():
+            if name not in node.child_nodelists:
+                for expression in _expressions(value):
+                    _expression(expression, scope, found)
+        for name in node.child_nodelists:
+            _walk(getattr(node, name, None), scope, found, blocks)
+
+
+def _expressions(value, depth=0):
+    if depth > 4:
+        return
+    if isinstance(value, FilterExpression):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _expressions(item, depth + 1)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _expressions(item, depth + 1)
+    elif isinstance(value, TokenBase):
+        # дерево условия {% if a.b and not c %}
+        for name in ('value', 'first', 'second'):
+            yield from _expressions(getattr(value, name, None), depth + 1)
+
+
+def _expression(expression, scope, found):
+    variables = [expression.var]
+    for _func, arguments in expression.filters:
+        variables.extend(argument for is_variable, argument in arguments if is_variable)
+    for variable in variables:
+        path = _resolve(variable, scope)
+        if path is not None:
+            found.add(path)
+
+
+def _resolve(variable, scope):
+    if not isinstance(variable, Variable) or variable.lookups is None:
+        return None
+    prefix = scope.get(variable.lookups[0])
+    if prefix is None:
+        return None
+    return prefix + tuple(variable.lookups[1:])
+
+
+# --- поля и связи модели -------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def attributes(model):
+    """{имя атрибута: (вид, поле)}: вид — 'field', 'single' (FK, OneToOne) или 'many'."""
+    names = {}
+    for field in model._meta.get_fields():
+        if field.many_to_many or field.one_to_many:
+            accessor = field.name if field.concrete or not field.auto_created else field.get_accessor_name()
+            if accessor:
+                names[accessor] = ('many', field)
+        elif field.one_to_one and not field.concrete:
+            names[field.get_accessor_name()] = ('single', field)
+        elif field.concrete:
+            if field.is_relation:
+                names[field.name] = ('single', field)
+                names[field.attname] = ('field', field)
+            else:
+                names[field.name] = ('field', field)
+    names['pk'] = ('field', model._meta.pk)
+    return names
+
+
+class Plan:
+    """Колонки модели (only), select_related и Prefetch со своими планами."""
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = set()
+        self.select = {}
+        self.prefetch = {}
+        self.unresolved = set()
+
+    def add(self, path, prefix=''):
+        bits = [bit for bit in path.split('.') if bit] if isinstance(path, str) else list(path)
+        if not bits:
+            return
+        name, rest = bits[0], bits[1:]
+        kind, field = attributes(self.model).get(name, (None, None))
+        if kind is None:
+            self.unresolved.add(prefix + '.'.join(bits))
+        elif kind == 'field':
+            self.fields.add(field.name)
+        elif kind == 'single':
+            if field.concrete:
+                self.fields.add(field.name)
+            self.select.setdefault(name, Plan(field.related_model)).add(rest, f'{prefix}{name}.')
+        else:
+            while rest and rest[0] in MANAGER_METHODS:
+                rest = rest[1:]
+            plan = self.prefetch.setdefault(name, Plan(field.related_model))
+            if field.one_to_many:
+                # по этой колонке Django раскладывает строки Prefetch по родителям
+                plan.fields.add(field.field.name)
+            plan.add(rest, f'{prefix}{name}.')
+
+    def covers(self, path):
+        """Даёт ли план путь без догрузки."""
+        bits = path.split('.')
+        kind, field = attributes(self.model).get(bits[0], (None, None))
+        if kind is None:
+            return True
+        if kind == 'field':
+            return field is self.model._meta.pk or field.name in self.fields
+        plans = self.select if kind == 'single' else self.prefetch
+        rest = [bit for bit in bits[1:] if bit not in MANAGER_METHODS]
+        return bits[0] in plans and (not rest or plans[bits[0]].covers('.'.join(rest)))
+
+    def only(self):
+        names = set(self.fields) | {self.model._meta.pk.name}
+        for name, plan in self.select.items():
+            names.add(name)
+            # ключ связанной модели select_related берёт сам
+            names.update(f'{name}__{sub}' for sub in plan.only() if sub != plan.model._meta.pk.name)
+        return sorted(names)
+
+    def select_related(self):
+        names = []
+        for name, plan in sorted(self.select.items()):
+            names.append(name)
+            names.extend(f'{name}__{sub}' for sub in plan.select_related())
+        return names
+
+    def prefetches(self, ordering=None, prefix=''):
+        """[(путь, план, порядок)] — Prefetch этого плана и связей из select_related."""
+        ordering = ordering or {}
+        found = []
+        for name, plan in sorted(self.prefetch.items()):
+            found.append((prefix + name, plan, ordering.get(prefix + name, ())))
+        for name, plan in sorted(self.select.items()):
+            found.extend(plan.prefetches(ordering, f'{prefix}{name}__'))
+        return found
+
+    def apply(self, queryset, ordering=None):
+        """
+        queryset с планом; ordering — {путь Prefetch: порядок}, например
+        {'scopes': ('-is_main', 'tag__name')} — порядок из шаблона не виден.
+        """
+        queryset = queryset.only(*self.only())
+        if self.select:
+            queryset = queryset.select_related(*self.select_related())
+        lookups = []
+        for path, plan, order in self.prefetches(ordering):
+            related = plan.apply(plan.model._default_manager.all(), _nested(ordering, path))
+            lookups.append(Prefetch(path, queryset=related.order_by(*order) if order else related))
+        return queryset.prefetch_related(*lookups) if lookups else queryset
+
+    def as_code(self, ordering=None):
+        code = f"{self.model.__name__}.objects.only({', '.join(map(repr, self.only()))})"
+        if self.select:
+            code += f".select_related({', '.join(map(repr, self.select_related()))})"
+        lookups = []
+        for path, plan, order in self.prefetches(ordering):
+            related = plan.as_code(_nested(ordering, path))
+            if order:
+                related += f".order_by({', '.join(map(repr, order))})"
+            lookups.append(f'Prefetch({path!r}, queryset={related})')
+        if lookups:
+            code += f".prefetch_related({', '.join(lookups)})"
+        return code
+
+    def columns(self):
+        """{таблица: колонки}, которые грузит план."""
+        columns = defaultdict(set)
+        opts = self.model._meta
+        columns[opts.db_table].update(opts.get_field(name).column for name in self.fields | {opts.pk.name})
+        for plan in (*self.select.values(), *self.prefetch.values()):
+            for table, names in plan.columns().items():
+                columns[table] |= names
+        return columns
+
+
+def _nested(ordering, path):
+    prefix = path + '__'
+    return {key[len(prefix):]: value for key, value in (ordering or {}).items() if key.startswith(prefix)}
+
+
+def build_plan(model, paths):
+    plan = Plan(model)
+    for path in sorted(paths):
+        plan.add(path)
+    return plan
+
+
+# --- запись обращений при отрисовке ---------------------------------------------
+
+class Recorder:
+    """Загруженные колонки и обращения к полям и связям моделей."""
+
+    def __init__(self):
+        self.loaded = defaultdict(set)     # модель → attname загруженных колонок
+        self.accessed = defaultdict(set)   # модель → поля и связи, к которым обращался шаблон
+        self.linked = defaultdict(set)     # модель → attname, по которым Prefetch собирал строки
+        self.queries = 0
+        self.active = False
+
+    @contextmanager
+    def rendering(self):
+        def count(execute, sql, params, many, context):
+            self.queries += 1
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count))
+            self.active = True
+            try:
+                yield self
+            finally:
+                self.active = False
+
+    def touch(self, model, name):
+        kind, field = attributes(model).get(name, (None, None))
+        if kind is None:
+            return
+        # для ForeignKey — tag_id, а не tag: колонка без JOIN
+        self.accessed[model].add(field.attname if kind == 'field' else name)
+        if kind == 'many' and field.one_to_many:
+            self.linked[field.related_model].add(field.field.attname)
+
+    def paths(self, model, seen=()):
+        """Пути от model по записанным обращениям: 'title', 'scopes.tag.name', ..."""
+        found = []
+        for name in sorted(self.accessed.get(model, ())):
+            kind, field = attributes(model)[name]
+            found.append(name)
+            if kind != 'field' and field.related_model not in seen:
+                found.extend(f'{name}.{sub}' for sub in self.paths(field.related_model, (*seen, model)))
+        return found
+
+    def unused(self):
+        """{таблица: колонки}, которые загружены, но шаблону не понадобились."""
+        unused = {}
+        for model, loaded in self.loaded.items():
+            opts = model._meta
+            used = {opts.pk.attname} | self.linked[model]
+            for name in self.accessed.get(model, ()):
+                kind, field = attributes(model)[name]
+                if field.concrete:
+                    used.add(field.attname)
+            columns = sorted(opts.get_field(attname).column for attname in loaded - used if _is_column(opts, attname))
+            if columns:
+                unused[opts.db_table] = columns
+        return unused
+
+
+def _is_column(opts, attname):
+    return any(field.attname == attname for field in opts.concrete_fields)
+
+
+def _getattribute(self, name):
+    value = object.__getattribute__(self, name)
+    recorder = _recorder.get()
+    if recorder is not None and recorder.active and not name.startswith('_'):
+        recorder.touch(type(self), name)
+    return value
+
+
+_from_db = models.Model.__dict__['from_db']
+
+
+@classmethod
+def _recording_from_db(cls, db, field_names, values):
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.loaded[cls].update(field_names)
+    return _from_db.__func__(cls, db, field_names, values)
+
+
+@contextmanager
+def record():
+    """
+    Записывать загрузку и обращения к моделям (обращения — только внутри
+    recorder.rendering()). Подменяет Model.__getattribute__ и from_db на
+    время блока: для команды и тестов, а не для запросов сайта.
+    """
+    global _patched
+    recorder = Recorder()
+    with _patch_lock:
+        if not _patched:
+            models.Model.__getattribute__ = _getattribute
+            models.Model.from_db = _recording_from_db
+        _patched += 1
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+        with _patch_lock:
+            _patched -= 1
+            if not _patched:
+                del models.Model.__getattribute__
+                models.Model.from_db = _from_db
+
+
+# --- выборки view ---------------------------------------------------------------
+
+def load_learned(path=None):
+    path = path or options()['LEARNED']
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@functools.lru_cache(maxsize=None)
+def _learned():
+    return load_learned()
+
+
+@functools.lru_cache(maxsize=None)
+def plan_for(model, template_name, root):
+    """План model для шаблона: статический разбор + пути из --update."""
+    learned = _learned().get(f'{template_name}#{root}', {}).get(model._meta.label, ())
+    return build_plan(model, template_paths(template_name, root) | set(learned))
+
+
+def planned(queryset, template_name, root, ordering=None):
+    """queryset с колонками и связями, которые печатает шаблон (план — на процесс)."""
+    return plan_for(queryset.model, template_name, root).apply(queryset, ordering)
+
+
+def reset():
+    """Забыть разобранные шаблоны и пути из файла (после --update, в тестах)."""
+    plan_for.cache_clear()
+    _learned.cache_clear()
+
+
+class Target:
+    """
+    Страница для ``manage.py prefetch_plan``: шаблон и переменная с
+    выборкой (``root``), ``build()`` — выборка модели без плана,
+    ``current()`` — как её грузит view сейчас (по умолчанию planned()),
+    ``context(objects)`` — контекст шаблона, ``rows`` — read-модель,
+    которую view отдаёт вместо модели (у неё должны быть все атрибуты
+    из шаблона).
+    """
+
+    def __init__(self, name, template, root, build, seed=None, ordering=None, current=None, context=None, rows=None):
+        self.name = name
+        self.template = template
+        self.root = root
+        self.build = build
+        self.seed = seed
+        self.ordering = ordering or {}
+        self.current = current or (lambda: planned(self.build(), self.template, self.root, self.ordering))
+        self.context = context or self.default_context
+        self.rows = rows
+
+    @property
+    def many(self):
+        return self.root.endswith(ITEMS)
+
+    @property
+    def variable(self):
+        return self.root[:-len(ITEMS)] if self.many else self.root
+
+    def default_context(self, objects):
+        return {self.variable: objects if self.many else (objects[0] if objects else None)}
+
+    def observe(self, queryset):
+        with record() as recorder:
+            objects = list(queryset if self.many else queryset[:1])
+            with recorder.rendering():
+                loader.render_to_string(self.template, self.context(objects))
+        return recorder
+
+
+def register(target):
+    TARGETS[target.name] = target
+    return target
+
+
+def analyse(target, learned=()):
+    """Разбор одной страницы на текущих данных."""
+    model = target.build().model
+    static = template_paths(target.template, target.root)
+    plan = build_plan(model, static | set(learned))
+    observed = target.observe(plan.apply(target.build(), target.ordering))
+    runtime = observed.paths(model)
+    current = target.observe(target.current())
+    unresolved = sorted(plan.unresolved)
+    result = {
+        'static': sorted(static),
+        # увидены только при отрисовке: обращения изнутри свойств, методов, __str__
+        'runtime_only': [path for path in runtime if not plan.covers(path)],
+        'unresolved': unresolved,
+        'missing': [path for path in unresolved if not _has_attribute(model, path)],
+        'plan': plan.as_code(target.ordering),
+        'plan_queries': observed.queries,
+        'current_queries': current.queries,
+        'unused': current.unused(),
+        'learned': {model._meta.label: runtime},
+    }
+    if target.rows is not None:
+        result['rows_missing'] = sorted({path.split('.')[0] for path in static} - set(dir(target.rows)))
+    return result
+
+
+def _has_attribute(model, path):
+    return hasattr(model, path.split('.')[0])
+
+
+def run(names=None, size=None, update=False):
+    """Разобрать страницы на засеянных данных (всё откатывается); {имя: результат}."""
+    selected = [TARGETS[name] for name in (names or sorted(TARGETS))]
+    size = options()['SEED_SIZE'] if size is None else size
+    learned = load_learned()
+    results = {}
+    # кеш выборок отдал бы готовый результат без единого запроса
+    with bypass(), transaction.atomic():
+        if size:
+            plans.seed(selected, size)
+        for target in selected:
+            model = target.build().model
+            saved = learned.get(f'{target.template}#{target.root}', {}).get(model._meta.label, ())
+            results[target.name] = analyse(target, saved)
+        transaction.set_rollback(True)
+    for dictionary in ModelDictionary.instances:
+        dictionary.clear()
+    if update:
+        save_learned(selected, results)
+    return results
+
+
+def save_learned(targets, results, path=None):
+    path = path or options()['LEARNED']
+    document = load_learned(path)
+    for target in targets:
+        document[f'{target.template}#{target.root}'] = results[target.name]['learned']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write('\n')
+    reset()
+
+
+class PrefetchCommand(BaseCommand):
+    """Печатает план и расхождения по каждой странице; с --check — ошибка при догрузках."""
+    help = 'План only/select_related/Prefetch по шаблонам страниц и лишние колонки текущих выборок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help='страницы: ' + ', '.join(sorted(TARGETS)) + ' (по умолчанию все)')
+        parser.add_argument('--seed', type=int, default=None,
+                            help=f"строк синтетики (по умолчанию {options()['SEED_SIZE']}; 0 — текущие данные)")
+        parser.add_argument('--update', action='store_true',
+                            help='сохранить пути, увиденные при отрисовке, для planned()')
+        parser.add_argument('--check', action='store_true', help='ошибка, если по плану шаблон делает запросы')
+
+    def handle(self, *args, **flags):
+        unknown = sorted(set(flags['targets']) - set(TARGETS))
+        if unknown:
+            raise CommandError('неизвестные страницы: ' + ', '.join(unknown))
+        results = run(flags['targets'], flags['seed'], flags['update'])
+        failed = []
+        for name, result in results.items():
+            problems = result['plan_queries'] or result['missing'] or result.get('rows_missing')
+            if problems:
+                failed.append(name)
+            self.stdout.write(f"{name}: {self.style.ERROR('расхождения') if problems else self.style.SUCCESS('ok')}")
+            self.stdout.write(f"  план: {result['plan']}")
+            self.stdout.write(f"  пути шаблона: {', '.join(result['static']) or '-'}")
+            if result['runtime_only']:
+                self.stdout.write(f"  только при отрисовке: {', '.join(result['runtime_only'])} (--update)")
+            methods = sorted(set(result['unresolved']) - set(result['missing']))
+            if methods:
+                self.stdout.write(f"  свойства и методы (их обращения видны при отрисовке): {', '.join(methods)}")
+            if result['missing']:
+                self.stdout.write(self.style.ERROR(f"  нет у модели: {', '.join(result['missing'])}"))
+            if result.get('rows_missing'):
+                self.stdout.write(self.style.ERROR(f"  нет у read-модели: {', '.join(result['rows_missing'])}"))
+            self.stdout.write(
+                f"  запросов из шаблона: по плану {result['plan_queries']}, у текущей выборки {result['current_queries']}"
+            )
+            for table, columns in sorted(result['unused'].items()):
+                self.stdout.write(f"  текущая выборка грузит зря: {table}: {', '.join(columns)}")
+        if flags['update']:
+            self.stdout.write(self.style.SUCCESS(f"Пути сохранены в {options()['LEARNED']}"))
+        if flags['check'] and failed:
+            raise CommandError('Шаблон и выборка расходятся: ' + ', '.join(failed))
@@ -0,0 +1,201 @@
+"""
+Журнал SQL-запросов для подбора индексов (website/indexes.py).
+
+При ``QUERY_LOG['ENABLED']`` каждое новое подключение к БД получает
+execute_wrapper, который замеряет SELECT/UPDATE/DELETE и пишет строку
+JSON в логгер ``website.querylog`` (его обработчик — файл PATH):
+
+    {"fp": "<отпечаток>", "sql": "...", "params": [...], "ms": 1.25, "db": "default"}
+
+Отпечаток — SQL без чисел, строковых литералов и длины списков IN, так
+что один и тот же запрос с разными значениями попадает в одну группу.
+Параметры пишутся, чтобы потом снять план запроса как есть; даты
+и прочие не-JSON значения сохраняются с пометкой типа (encode_params).
+
+Писать можно не всё: SAMPLE_RATE — доля запросов, MIN_MS — только
+запросы не быстрее порога. Разово журнал включают ``recording(path)``
+(так делает ``manage.py loadtest --log-queries``).
+"""
+import datetime
+import decimal
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('website.querylog')
+# сколько открыто recording(): журнал пишется и при выключенном ENABLED
+_recordings = 0
+_installed = False
+
+STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+SPACES = re.compile(r'\s+')
+
+
+def options():
+    return {
+        'ENABLED': False,
+        'PATH': os.path.join(settings.BASE_DIR, '.cache', 'queries.ndjson'),
+        'SAMPLE_RATE': 1.0,
+        'MIN_MS': 0.0,
+        **getattr(settings, 'QUERY_LOG', {}),
+    }
+
+
+def normalize(sql):
+    """SQL без значений: IN (...), ? вместо литералов, один пробел."""
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode('utf-8')).hexdigest()[:12]
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'date': value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {'decimal': str(value)}
+    if isinstance(value, uuid.UUID):
+        return {'uuid': str(value)}
+    if isinstance(value, (bytes, memoryview)):
+        return {'bytes': bytes(value).hex()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, dict) and len(value) == 1:
+        (kind, raw), = value.items()
+        if kind == 'datetime':
+            return datetime.datetime.fromisoformat(raw)
+        if kind == 'date':
+            return datetime.date.fromisoformat(raw)
+        if kind == 'decimal':
+            return decimal.Decimal(raw)
+        if kind == 'uuid':
+            return uuid.UUID(raw)
+        if kind == 'bytes':
+            return bytes.fromhex(raw)
+    return value
+
+
+def encode_params(params):
+    return [_encode(value) for value in params or ()]
+
+
+def decode_params(params):
+    return tuple(_decode(value) for value in params)
+
+
+class QueryLogger:
+    """execute_wrapper: замер запроса и строка в логгер website.querylog."""
+
+    def __call__(self, execute, sql, params, many, context):
+        current = options()
+        if not (_recordings or current['ENABLED']) or many or not sql.lstrip().upper().startswith(STATEMENTS):
+            return execute(sql, params, many, context)
+        if current['SAMPLE_RATE'] < 1 and random.random() >= current['SAMPLE_RATE']:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            if elapsed >= current['MIN_MS']:
+                logger.info(json.dumps({
+                    'fp': fingerprint(sql),
+                    'sql': sql,
+                    'params': encode_params(params),
+                    'ms': round(elapsed, 3),
+                    'db': context['connection'].alias,
+                }, ensure_ascii=False))
+
+
+recorder = QueryLogger()
+
+
+def _attach(sender, connection, **kwargs):
+    if recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.append(recorder)
+
+
+def _file_handler(path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    return handler
+
+
+def install():
+    """Включить журнал для всех подключений (из AppConfig.ready)."""
+    global _installed
+    current = options()
+    if not current['ENABLED'] or _installed:
+        return
+    _installed = True
+    logger.addHandler(_file_handler(current['PATH']))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    connection_created.connect(_attach, dispatch_uid='website.querylog')
+    for connection in connections.all(initialized_only=True):
+        _attach(None, connection)
+
+
+@contextmanager
+def recording(path):
+    """Временно писать запросы всех подключений в файл path (NDJSON)."""
+    global _recordings
+    handler = _file_handler(path)
+    level, propagate = logger.level, logger.propagate
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    _recordings += 1
+    connection_created.connect(_attach, dispatch_uid='website.querylog.recording')
+    for connection in connections.all(initialized_only=True):
+        _attach(None, connection)
+    try:
+        yield path
+    finally:
+        _recordings -= 1
+        if not _recordings:
+            connection_created.disconnect(dispatch_uid='website.querylog.recording')
+        logger.removeHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = propagate
+        handler.close()
+
+
+def read(path):
+    """Записи журнала по одной; битые строки (оборванная запись) пропускаются."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and 'sql' in record:
+                yield record
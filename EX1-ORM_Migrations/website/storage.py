@@ -0,0 +1,76 @@
+"""
+Хранилище статики: отпечатки (hash в имени файла) + предсжатые копии.
+
+После ``collectstatic`` рядом с каждым текстовым файлом появляются
+``<имя>.gz`` и (если установлен пакет ``brotli``) ``<имя>.br``, которые
+отдаёт ``website.static_handler.PrecompressedStaticFiles``.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него будут только .gz
+    brotli = None
+
+# сжимать имеет смысл только текстовые форматы
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# слишком маленькие файлы после сжатия не выигрывают ничего
+MIN_COMPRESS_SIZE = 256
+
+
+def compress_file(path):
+    """
+    Кладёт рядом с файлом .gz/.br копии, если они меньше оригинала.
+    Возвращает список созданных путей.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+
+    created = []
+    for suffix, compressed in variants:
+        if len(compressed) >= len(data):
+            continue
+        with open(path + suffix, 'wb') as f:
+            f.write(compressed)
+        created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, который дополнительно сжимает результат
+    post-processing. Если манифеста ещё нет (тесты, collectstatic не
+    запускался) — отдаём исходное имя вместо ValueError.
+    """
+    manifest_strict = False
+    # bootstrap/jquery ссылаются на .map-файлы, которых в репозитории нет;
+    # переписывать sourceMappingURL не нужно, иначе collectstatic падает
+    patterns = tuple(
+        (extension, tuple(p for p in extension_patterns if 'sourceMappingURL' not in str(p)))
+        for extension, extension_patterns in ManifestStaticFilesStorage.patterns
+    )
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # сжимаем и исходные, и хешированные имена: исходные нужны,
+        # когда шаблон ссылается на файл в обход манифеста
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name))
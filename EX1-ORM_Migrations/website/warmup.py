@@ -0,0 +1,213 @@
+"""
+Прогрев процесса перед первым запросом.
+
+Первый запрос свежего воркера платит за разбор шаблонов, построение
+URL-резолвера, импорт модулей админки, подключение к БД и пустые кеши.
+Здесь всё это делается заранее, по фазам, с замером времени каждой:
+
+  * ``python manage.py warmup`` — прогнать и напечатать отчёт;
+  * website/wsgi.py и website/asgi.py вызывают ``warm_up_on_startup()``,
+    если settings.WARMUP_ON_STARTUP, и пишут отчёт в лог website.warmup;
+    подключения к БД после прогрева закрываются (close_connections()).
+
+Приложения добавляют свои фазы декоратором ``register`` (модуль
+<app>/warmup.py импортируется из AppConfig.ready()).
+"""
+import importlib
+import io
+import logging
+import os
+import time
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+from django.urls import get_resolver
+from django.utils.module_loading import module_has_submodule
+
+logger = logging.getLogger('website.warmup')
+
+Phase = namedtuple('Phase', 'name func uses_db')
+PhaseResult = namedtuple('PhaseResult', 'name seconds detail error')
+
+PHASES = []
+
+ADMIN_MODULES = (
+    'django.contrib.admin.helpers',
+    'django.contrib.admin.views.main',
+    'django.contrib.admin.views.autocomplete',
+    'django.contrib.admin.templatetags.admin_list',
+    'django.contrib.admin.templatetags.admin_modify',
+    'django.contrib.admin.templatetags.admin_urls',
+)
+
+
+def register(name, uses_db=False):
+    """Декоратор фазы прогрева; функция может вернуть строку-подробность."""
+    def decorator(func):
+        if all(phase.name != name for phase in PHASES):
+            PHASES.append(Phase(name, func, uses_db))
+        return func
+    return decorator
+
+
+def get_request(path='/'):
+    """GET-запрос для рендера страницы в фазе прогрева — без django.test."""
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    return WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': '',
+        'SERVER_NAME': hosts[0] if hosts else 'localhost',
+        'SERVER_PORT': '80',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http',
+    })
+
+
+@register('urls')
+def warm_urls():
+    resolver = get_resolver()
+    # обращение к reverse_dict строит таблицы reverse() для всего URLconf
+    names = len(resolver.reverse_dict)
+    for _prefix, sub_resolver in resolver.namespace_dict.values():
+        names += len(sub_resolver.reverse_dict)
+    return f'{names} имён'
+
+
+@register('admin')
+def warm_admin():
+    imported = 0
+    for module in ADMIN_MODULES:
+        importlib.import_module(module)
+        imported += 1
+    for app_config in apps.get_app_configs():
+        if module_has_submodule(app_config.module, 'admin'):
+            importlib.import_module(f'{app_config.name}.admin')
+            imported += 1
+    return f'{imported} модулей'
+
+
+def template_names(engine):
+    names = set()
+    for directory in engine.template_dirs:
+        for root, _dirs, files in os.walk(directory):
+            for filename in files:
+                if not filename.startswith('.'):
+                    path = os.path.join(root, filename)
+                    names.add(os.path.relpath(path, directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+@register('templates')
+def warm_templates():
+    compiled = skipped = 0
+    uncached = []
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        if not all(isinstance(loader, CachedLoader) for loader in engine.engine.template_loaders):
+            uncached.append(engine.name)
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+                compiled += 1
+            except (TemplateSyntaxError, TemplateDoesNotExist, UnicodeDecodeError):
+                skipped += 1
+    detail = f'{compiled} скомпилировано, {skipped} пропущено'
+    if uncached:
+        detail += f"; без cached.Loader: {', '.join(uncached)} — прогрев не сохранится"
+    return detail
+
+
+@register('models')
+def warm_models():
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+        # обратные связи считаются лениво при первом обращении
+        model._meta._relation_tree
+    return f'{len(models)} моделей'
+
+
+@register('database', uses_db=True)
+def warm_database():
+    from django.db import connections
+
+    for alias in connections:
+        connection = connections[alias]
+        connection.ensure_connection()
+        for model in apps.get_models():
+            model._default_manager.using(alias).all().query.get_compiler(using=alias).as_sql()
+    return ', '.join(connections)
+
+
+@register('dictionaries', uses_db=True)
+def warm_dictionaries():
+    from website.dictionaries import ModelDictionary
+
+    sizes = [f'{d.model._meta.label}: {len(d.records())}' for d in ModelDictionary.instances]
+    return ', '.join(sizes) or 'нет'
+
+
+@register('cache')
+def warm_cache():
+    from website.cache import enabled, get_cache
+
+    if not enabled():
+        return 'выключен'
+    tiered = get_cache()
+    tiered.shared.get('warmup:ping')
+    return settings.CACHES[tiered.options['SHARED_ALIAS']]['BACKEND'].rsplit('.', 1)[-1]
+
+
+def run(include_db=True, only=None):
+    """Прогнать фазы по порядку регистрации; ошибка фазы не останавливает остальные."""
+    results = []
+    for phase in PHASES:
+        if only and phase.name not in only:
+            continue
+        if phase.uses_db and not include_db:
+            continue
+        started = time.perf_counter()
+        try:
+            detail, error = phase.func(), None
+        except Exception as e:
+            detail, error = None, f'{type(e).__name__}: {e}'
+        results.append(PhaseResult(phase.name, time.perf_counter() - started, detail or '', error))
+    return results
+
+
+def warm_up_on_startup(setup_seconds=None):
+    """Хук для wsgi.py/asgi.py; ``setup_seconds`` — сколько занял django.setup()."""
+    if not getattr(settings, 'WARMUP_ON_STARTUP', False):
+        return []
+    results = run()
+    if setup_seconds is not None:
+        results.insert(0, PhaseResult('django.setup', setup_seconds, '', None))
+    for result in results:
+        if result.error:
+            logger.warning('прогрев %s: %.1f мс, ошибка %s', result.name, result.seconds * 1000, result.error)
+        else:
+            logger.info('прогрев %s: %.1f мс %s', result.name, result.seconds * 1000, result.detail)
+    logger.info('прогрев завершён за %.1f мс', sum(r.seconds for r in results) * 1000)
+    close_connections()
+    return results
+
+
+def close_connections():
+    """
+    Закрыть подключения к БД, открытые прогревом: с ``gunicorn --preload``
+    воркеры форкаются после импорта wsgi.py и унаследовали бы один сокет.
+    """
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        # внутри транзакции (atomic, тесты) закрывать нельзя
+        if not connection.in_atomic_block:
+            connection.close()
@@ -8,9 +8,21 @@ https://docs.djangoproject.com/en/2.1/howto/deployment/wsgi/
 """
 
 import os
+import time
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'website.settings')
 
+_started = time.perf_counter()
 application = get_wsgi_application()
+
+# статика из STATIC_ROOT (после collectstatic) отдаётся в обход Django
+from website.static_handler import PrecompressedStaticFiles  # noqa: E402
+
+application = PrecompressedStaticFiles(application)
+
+# шаблоны, URL, админка, БД и кеши — до первого запроса (settings.WARMUP_ON_STARTUP)
+from website.warmup import warm_up_on_startup  # noqa: E402
+
+warm_up_on_startup(time.perf_counter() - _started)
@@ -1,8 +1,15 @@
+import datetime
+
 from django.contrib import admin
+from django.db.models import Exists, OuterRef, Subquery
 from django.core.exceptions import ValidationError
 from django.forms import BaseInlineFormSet
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.formats import date_format
 
-from .models import Article, Tag, Scope
+from . import exports, month_counts
+from .models import Article, ArticleMonthCount, DuplicateCandidate, Tag, Scope
 
 
 class ScopeInlineFormSet(BaseInlineFormSet):
@@ -33,13 +40,98 @@ class ScopeInline(admin.TabularInline):
     fields = ("tag", "is_main")
 
 
+class PublishedYearFilter(admin.SimpleListFilter):
+    """
+    Год публикации. Вместо date_hierarchy, который на каждой странице
+    списка делает DISTINCT по датам всей таблицы, — годы и числа статей
+    из ArticleMonthCount (строка на месяц).
+    """
+    title = "год публикации"
+    parameter_name = "published_year"
+
+    def lookups(self, request, model_admin):
+        totals = {}
+        for row in ArticleMonthCount.objects.filter(articles__gt=0):
+            totals[row.month.year] = totals.get(row.month.year, 0) + row.articles
+        return [(str(year), f"{year} ({total})") for year, total in totals.items()]
+
+    def queryset(self, request, queryset):
+        if not (self.value() or "").isdigit():
+            return queryset
+        year = int(self.value())
+        start, _ = month_counts.month_bounds(year, 1)
+        end, _ = month_counts.month_bounds(year + 1, 1)
+        # диапазоном, а не __year: так работает индекс по published_at
+        return queryset.filter(published_at__gte=start, published_at__lt=end)
+
+
+class PublishedMonthFilter(admin.SimpleListFilter):
+    """Месяц публикации; после выбора года — только его месяцы."""
+    title = "месяц публикации"
+    parameter_name = "published_month"
+
+    def lookups(self, request, model_admin):
+        months = ArticleMonthCount.objects.filter(articles__gt=0)
+        year = request.GET.get(PublishedYearFilter.parameter_name, "")
+        if year.isdigit():
+            months = months.filter(month__year=int(year))
+        return [
+            (f"{row.month:%Y-%m}", f"{date_format(row.month, 'F Y')} ({row.articles})")
+            for row in months
+        ]
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            month = datetime.datetime.strptime(self.value(), "%Y-%m")
+        except ValueError:
+            return queryset
+        start, end = month_counts.month_bounds(month.year, month.month)
+        return queryset.filter(published_at__gte=start, published_at__lt=end)
+
+
+class DuplicateFilter(admin.SimpleListFilter):
+    """Возможные дубликаты — статьи с парой в DuplicateCandidate (articles/dedup.py)."""
+    title = "дубликаты"
+    parameter_name = "duplicate"
+
+    def lookups(self, request, model_admin):
+        return [("yes", "Возможные дубликаты"), ("no", "Без дубликатов")]
+
+    def queryset(self, request, queryset):
+        duplicates = Exists(DuplicateCandidate.objects.filter(article=OuterRef("pk")))
+        if self.value() == "yes":
+            return queryset.filter(duplicates)
+        if self.value() == "no":
+            return queryset.exclude(duplicates)
+        return queryset
+
+
 @admin.register(Article)
 class ArticleAdmin(admin.ModelAdmin):
-    list_display = ("title", "published_at")
+    list_display = ("title", "published_at", "duplicate_of")
+    list_filter = (DuplicateFilter, PublishedYearFilter, PublishedMonthFilter)
     search_fields = ("title", "text")
-    date_hierarchy = "published_at"
+    # потоковая выгрузка выбранных статей с тегами (website/export.py)
+    actions = exports.articles.admin_actions()
     inlines = [ScopeInline]
 
+    def get_queryset(self, request):
+        # самый похожий оригинал — подзапросом, без запроса на строку списка
+        best = DuplicateCandidate.objects.filter(article=OuterRef("pk")).order_by("-similarity")
+        return super().get_queryset(request).annotate(
+            duplicate_original=Subquery(best.values("original_id")[:1]),
+            duplicate_similarity=Subquery(best.values("similarity")[:1]),
+        )
+
+    @admin.display(description="Дубликат", ordering="duplicate_similarity")
+    def duplicate_of(self, obj):
+        if obj.duplicate_original is None:
+            return ""
+        url = reverse("admin:articles_article_change", args=[obj.duplicate_original])
+        return format_html('≈ <a href="{}">#{}</a> ({})', url, obj.duplicate_original, f"{obj.duplicate_similarity:.0%}")
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
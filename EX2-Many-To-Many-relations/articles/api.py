@@ -0,0 +1,69 @@
+"""
+JSON API статей только-для-чтения.
+
+    GET /api/articles/?limit=50&fields=id,title,tags&after=<курсор>
+
+Ответ строится из кортежей values_list(): экземпляры Article/Scope/Tag
+не создаются. Пагинация — keyset по (-published_at, -id).
+"""
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+
+from articles.models import Article
+from articles.read_models import load_scopes
+from website.api import (
+    ApiError, decode_cursor, error_response, json_response,
+    parse_fields, parse_limit, split_page,
+)
+
+ARTICLE_FIELDS = ('id', 'title', 'text', 'published_at', 'image', 'tags')
+
+
+def article_tags(article_ids):
+    """{article_id: [{'name': ..., 'is_main': ...}, ...]} — основной тег первым."""
+    return {
+        article_id: [{'name': scope.tag.name, 'is_main': scope.is_main} for scope in scopes]
+        for article_id, scopes in load_scopes(article_ids).items()
+    }
+
+
+@require_GET
+def articles_api(request):
+    try:
+        fields = parse_fields(request, ARTICLE_FIELDS)
+        limit = parse_limit(request)
+        cursor = decode_cursor(request, 2)
+        published_at = parse_datetime(cursor[0]) if cursor and isinstance(cursor[0], str) else None
+        if cursor and (published_at is None or not isinstance(cursor[1], int)):
+            raise ApiError('некорректный курсор after')
+    except (ApiError, ValueError) as e:
+        return error_response(e)
+
+    columns = [name for name in fields if name != 'tags']
+    # published_at нужен для курсора, даже если его не запрашивали
+    select = columns if 'published_at' in columns else columns + ['published_at']
+    published_idx = select.index('published_at')
+
+    queryset = Article.objects.order_by('-published_at', '-id')
+    if cursor:
+        queryset = queryset.filter(
+            Q(published_at__lt=published_at) | Q(published_at=published_at, id__lt=cursor[1])
+        )
+    rows = list(queryset.values_list(*select)[:limit + 1])
+    rows, next_cursor = split_page(rows, limit, lambda row: (row[published_idx], row[0]))
+
+    image_idx = select.index('image') if 'image' in select else None
+    tags = article_tags([row[0] for row in rows]) if 'tags' in fields else None
+
+    results = []
+    for row in rows:
+        item = dict(zip(columns, row))
+        if image_idx is not None:
+            item['image'] = settings.MEDIA_URL + row[image_idx] if row[image_idx] else None
+        if tags is not None:
+            item['tags'] = tags.get(row[0], [])
+        results.append(item)
+
+    return json_response({'results': results, 'next': next_cursor})
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ArticlesConfig(AppConfig):
     name = 'articles'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from website import querylog
+
+        from . import changes, exports, plans, prefetch, signals, tasks, warmup  # noqa: F401
+
+        # журнал SQL для advise_indexes (settings.QUERY_LOG)
+        querylog.install()
@@ -0,0 +1,19 @@
+"""
+Лента изменений статей (website/changes.py):
+
+    GET /api/articles/changes/?since=<токен>
+    python manage.py changes articles --since <токен>
+
+Запись — колонки карточки и теги (основной первым). Статьи, ушедшие
+в архив (article_partitions --archive-before), не удаляются и в журнал
+не попадают.
+"""
+from website.changes import Feed, register
+
+from .api import article_tags
+from .models import Article, Tombstone
+
+articles = register(Feed(
+    'articles', Article, ('title', 'excerpt', 'published_at', 'image'), Tombstone,
+    related=article_tags, related_name='tags',
+))
@@ -0,0 +1,251 @@
+"""
+Поиск почти одинаковых статей (перепечатки одной новости) — MinHash и LSH.
+
+Сравнивать каждую статью с каждой — O(n²). Вместо этого:
+
+  * текст (заголовок + текст, слова в нижнем регистре) режется на шинглы
+    по SHINGLE_SIZE слов подряд; похожесть статей — доля общих шинглов
+    (коэффициент Жаккара);
+  * подпись MinHash — минимумы NUM_HASHES хеш-функций по шинглам; доля
+    совпавших позиций двух подписей оценивает Жаккара. Подписи пачки
+    статей считаются матрицей numpy (шинглы × хеши) без циклов Python;
+  * подпись делится на BANDS полос по ROWS значений, хеш полосы —
+    корзина LSH (LshBucket, индекс (band, bucket)). Статьи с Жаккаром
+    около THRESHOLD и выше почти наверняка делят хотя бы одну корзину,
+    заметно менее похожие — почти никогда. Сравниваются только
+    соседи по корзинам, так что проход по архиву близок к линейному.
+
+Пары с оценкой не ниже THRESHOLD пишутся в DuplicateCandidate: более
+новая статья (больший id) — возможный дубликат более старой.
+
+  * при сохранении статьи с новым заголовком или текстом её подпись,
+    корзины и пары пересчитывает фоновая задача (articles/tasks.py);
+  * ``manage.py find_duplicates`` — подписи для статей без них (bulk_create,
+    loaddata, правки мимо модели) и все пары заново по корзинам;
+    ``--rebuild`` — и подписи всех статей.
+"""
+import re
+import zlib
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Article, ArticleSignature, DuplicateCandidate, LshBucket
+
+SHINGLE_SIZE = 3
+BANDS = 16
+ROWS = 8
+NUM_HASHES = BANDS * ROWS
+# при 16×8 пару с Жаккаром 0.8 находим с вероятностью ~95%, с 0.5 — ~6%
+THRESHOLD = 0.8
+# сколько шинглов хешировать за раз: матрица SLICE × NUM_HASHES по 8 байт
+SLICE = 16384
+# в корзине больше статей — сравниваем их только с самой старой, а не попарно
+MAX_BUCKET = 100
+BATCH = 1000
+
+WORD = re.compile(r'\w+')
+_random = np.random.default_rng(20180701)
+# хеши вида ((a·x + b) mod 2⁶⁴) >> 32 с нечётным a; семя фиксировано — подписи
+# из разных запусков сравнимы
+_A = _random.integers(1, 2 ** 63, size=NUM_HASHES, dtype=np.uint64) | np.uint64(1)
+_B = _random.integers(0, 2 ** 63, size=NUM_HASHES, dtype=np.uint64)
+
+
+def shingles(title, text):
+    """Хеши шинглов статьи (uint64); пустой массив, если слов нет."""
+    words = WORD.findall(f'{title} {text}'.casefold())
+    hashes = np.array([zlib.crc32(word.encode('utf-8')) for word in words], dtype=np.uint64)
+    if not len(hashes):
+        return hashes
+    if len(hashes) < SHINGLE_SIZE:
+        # короткий текст — один шингл из всех слов
+        hashes = np.pad(hashes, (0, SHINGLE_SIZE - len(hashes)))
+    count = len(hashes) - SHINGLE_SIZE + 1
+    combined = hashes[:count].copy()
+    with np.errstate(over='ignore'):
+        for offset in range(1, SHINGLE_SIZE):
+            combined = combined * np.uint64(1000003) + hashes[offset:offset + count]
+    return combined
+
+
+def signatures(documents):
+    """
+    MinHash пачки документов (списки хешей шинглов) — матрица
+    len(documents) × NUM_HASHES, uint32.
+    """
+    lengths = np.array([len(document) for document in documents], dtype=np.int64)
+    values = np.concatenate(documents) if documents else np.zeros(0, dtype=np.uint64)
+    owners = np.repeat(np.arange(len(documents)), lengths)
+    result = np.full((len(documents), NUM_HASHES), np.iinfo(np.uint32).max, dtype=np.uint32)
+    for start in range(0, len(values), SLICE):
+        chunk, chunk_owners = values[start:start + SLICE], owners[start:start + SLICE]
+        with np.errstate(over='ignore'):
+            hashed = ((chunk[:, None] * _A + _B) >> np.uint64(32)).astype(np.uint32)
+        # шинглы документа идут подряд: минимум по отрезкам, затем с прошлым срезом
+        starts = np.flatnonzero(np.r_[True, chunk_owners[1:] != chunk_owners[:-1]])
+        rows = chunk_owners[starts]
+        result[rows] = np.minimum(result[rows], np.minimum.reduceat(hashed, starts, axis=0))
+    return result
+
+
+def band_buckets(signature_rows):
+    """Корзины LSH: матрица len × BANDS со знаковыми 64-битными хешами полос."""
+    bands = signature_rows.reshape(len(signature_rows), BANDS, ROWS).astype(np.uint64)
+    buckets = np.full(bands.shape[:2], np.uint64(0xCBF29CE484222325))
+    with np.errstate(over='ignore'):
+        for row in range(ROWS):
+            buckets = (buckets ^ bands[:, :, row]) * np.uint64(0x100000001B3)
+    return buckets.view(np.int64)
+
+
+def similarity(left, right):
+    """Оценка Жаккара по подписям: доля совпавших позиций (построчно)."""
+    return (left == right).mean(axis=-1)
+
+
+def _pack(signature):
+    return signature.astype('<u4').tobytes()
+
+
+def _unpack(raw):
+    return np.frombuffer(bytes(raw), dtype='<u4')
+
+
+def _store(article_ids, signature_rows):
+    """Записать подписи и корзины статей (старые удаляются)."""
+    buckets = band_buckets(signature_rows)
+    ArticleSignature.objects.filter(article_id__in=article_ids).delete()
+    LshBucket.objects.filter(article_id__in=article_ids).delete()
+    ArticleSignature.objects.bulk_create(
+        ArticleSignature(article_id=article_id, minhash=_pack(signature))
+        for article_id, signature in zip(article_ids, signature_rows)
+    )
+    LshBucket.objects.bulk_create(
+        (
+            LshBucket(article_id=article_id, band=band, bucket=bucket)
+            for article_id, row in zip(article_ids, buckets.tolist())
+            for band, bucket in enumerate(row)
+        ),
+        batch_size=BATCH,
+    )
+
+
+def _forget(article_id):
+    ArticleSignature.objects.filter(article_id=article_id).delete()
+    LshBucket.objects.filter(article_id=article_id).delete()
+    DuplicateCandidate.objects.filter(Q(article_id=article_id) | Q(original_id=article_id)).delete()
+
+
+def index_article(article):
+    """
+    Пересчитать подпись одной статьи и её пары (из post_save). Соседи
+    ищутся одним запросом по BANDS корзинам.
+    """
+    document = shingles(article.title, article.text)
+    if not len(document):
+        _forget(article.pk)
+        return
+    signature = signatures([document])[0]
+    stored = ArticleSignature.objects.filter(article_id=article.pk).values_list('minhash', flat=True).first()
+    if stored is not None and np.array_equal(_unpack(stored), signature):
+        return
+
+    buckets = band_buckets(signature[None, :])[0].tolist()
+    with transaction.atomic():
+        _store([article.pk], signature[None, :])
+        neighbours = Q()
+        for band, bucket in enumerate(buckets):
+            neighbours |= Q(band=band, bucket=bucket)
+        candidate_ids = (
+            LshBucket.objects.filter(neighbours).exclude(article_id=article.pk)
+            .values_list('article_id', flat=True).distinct()
+        )
+        others = ArticleSignature.objects.filter(article_id__in=candidate_ids).values_list('article_id', 'minhash')
+        pairs = []
+        for other_id, raw in others:
+            score = float(similarity(signature, _unpack(raw)))
+            if score >= THRESHOLD:
+                pairs.append(_candidate(article.pk, other_id, score))
+        DuplicateCandidate.objects.filter(Q(article_id=article.pk) | Q(original_id=article.pk)).delete()
+        DuplicateCandidate.objects.bulk_create(pairs)
+
+
+def _candidate(first_id, second_id, score):
+    newer, older = max(first_id, second_id), min(first_id, second_id)
+    return DuplicateCandidate(article_id=newer, original_id=older, similarity=score)
+
+
+def index_missing(rebuild=False):
+    """Подписи статьям без них (всем при rebuild); вернуть число статей."""
+    queryset = Article.objects.order_by('id')
+    if not rebuild:
+        queryset = queryset.exclude(pk__in=ArticleSignature.objects.values('article_id'))
+    count = 0
+    batch = []
+    for row in queryset.values_list('id', 'title', 'text').iterator(chunk_size=BATCH):
+        batch.append(row)
+        if len(batch) == BATCH:
+            count += _index_batch(batch)
+            batch = []
+    return count + _index_batch(batch)
+
+
+def _index_batch(rows):
+    documents = [(article_id, shingles(title, text)) for article_id, title, text in rows]
+    documents = [(article_id, document) for article_id, document in documents if len(document)]
+    if documents:
+        with transaction.atomic():
+            _store([article_id for article_id, _ in documents], signatures([document for _, document in documents]))
+    return len(documents)
+
+
+def candidate_pairs():
+    """
+    Пары (старшая, младшая) статей с общей корзиной — по всем корзинам
+    сразу: сортировка numpy вместо сравнения каждой с каждой.
+    """
+    rows = np.array(
+        list(LshBucket.objects.values_list('band', 'bucket', 'article_id').iterator(chunk_size=10000)),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    order = np.lexsort((rows[:, 2], rows[:, 1], rows[:, 0]))
+    rows = rows[order]
+    same = (rows[1:, 0] == rows[:-1, 0]) & (rows[1:, 1] == rows[:-1, 1])
+    starts = np.flatnonzero(np.r_[True, ~same])
+    sizes = np.diff(np.r_[starts, len(rows)])
+
+    pairs = []
+    articles = rows[:, 2]
+    for start, size in zip(starts[sizes > 1].tolist(), sizes[sizes > 1].tolist()):
+        members = articles[start:start + size]
+        if size > MAX_BUCKET:
+            # много копий одного текста: каждая — дубликат самой старой
+            pairs.append(np.stack([members[1:], np.full(size - 1, members[0])], axis=1))
+        else:
+            newer, older = np.triu_indices(size, k=1)[::-1]
+            pairs.append(np.stack([members[newer], members[older]], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def scan():
+    """Все пары заново по корзинам; вернуть число найденных дубликатов."""
+    pairs = candidate_pairs()
+    found = []
+    for start in range(0, len(pairs), BATCH * 10):
+        chunk = pairs[start:start + BATCH * 10]
+        ids = np.unique(chunk)
+        raw = dict(ArticleSignature.objects.filter(article_id__in=ids.tolist()).values_list('article_id', 'minhash'))
+        matrix = np.stack([_unpack(raw[article_id]) for article_id in ids.tolist()])
+        scores = similarity(matrix[np.searchsorted(ids, chunk[:, 0])], matrix[np.searchsorted(ids, chunk[:, 1])])
+        keep = scores >= THRESHOLD
+        found.extend(zip(chunk[keep, 0].tolist(), chunk[keep, 1].tolist(), scores[keep].tolist()))
+    with transaction.atomic():
+        DuplicateCandidate.objects.all().delete()
+        DuplicateCandidate.objects.bulk_create(
+            (_candidate(newer, older, score) for newer, older, score in found), batch_size=BATCH,
+        )
+    return len(found)
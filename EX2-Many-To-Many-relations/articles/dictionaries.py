@@ -0,0 +1,12 @@
+"""
+Справочник тегов в памяти процесса (см. website/dictionaries.py).
+
+Список новостей и API берут из Scope только tag_id, а имя тега — отсюда,
+без JOIN с таблицей тегов. Сбрасывается сигналами в articles/signals.py.
+"""
+from website.dictionaries import ModelDictionary
+
+from .models import Tag
+from .read_models import TagRef
+
+tags = ModelDictionary(Tag, ('id', 'name'), record=TagRef)
@@ -0,0 +1,39 @@
+"""
+Выгрузка статей с тегами (website/export.py):
+
+    python manage.py export articles --format ndjson --gzip -o articles.ndjson.gz
+
+и действия «Выгрузить в CSV/NDJSON» в админке статей. Теги склеиваются
+в SQL (GroupConcat по Scope → Tag), основной тег — отдельной колонкой
+и первым в списке.
+"""
+from django.db.models import Max, Q
+
+from website.export import Export, GroupConcat, register, split_group
+
+from .models import Article
+
+COLUMNS = ('id', 'title', 'published_at', 'main_tag', 'tags', 'image', 'text')
+
+
+def article_rows(queryset):
+    return (
+        queryset
+        .order_by('id')
+        .annotate(
+            main_tag=Max('scopes__tag__name', filter=Q(scopes__is_main=True)),
+            tag_names=GroupConcat('scopes__tag__name'),
+        )
+        .values_list('id', 'title', 'published_at', 'main_tag', 'tag_names', 'image', 'text')
+    )
+
+
+def prepare(row):
+    article_id, title, published_at, main_tag, tag_names, image, text = row
+    tags = [name for name in split_group(tag_names) if name != main_tag]
+    if main_tag:
+        tags.insert(0, main_tag)
+    return article_id, title, published_at, main_tag, tags, image or None, text
+
+
+articles = register(Export('articles', Article, COLUMNS, article_rows, prepare))
@@ -0,0 +1,124 @@
+"""
+RSS/Atom ленты новостей: общая и по тегу.
+
+    /feeds/rss/, /feeds/atom/                  — последние статьи
+    /feeds/tags/<id>/rss/, /feeds/tags/<id>/atom/
+
+Читатели лент опрашивают их постоянно, поэтому документ не собирается
+на каждый запрос. Сначала считается «отпечаток» ленты двумя индексными
+запросами: последние published_at и updated_at её статей (правка тематик
+ставит статье updated_at, articles/signals.py), для тега ещё и число
+статей, плюс время последнего удаления из журнала Tombstone.
+
+  * отпечаток совпал с If-None-Match / If-Modified-Since — 304 без тела;
+  * иначе документ берётся из кеша (website/cache.py) по ключу
+    с отпечатком и пересобирается, только когда отпечаток сменился.
+
+Правка статьи другого тега не меняет отпечаток этой ленты: ленты тегов
+перестраиваются независимо.
+"""
+import hashlib
+
+from django.contrib.syndication.views import Feed
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import http_date, quote_etag
+
+from website.cache import cached
+
+from .dictionaries import tags
+from .models import Article, Scope, Tombstone
+
+FEED_TITLE = 'Будь в курсе событий'
+FEED_SIZE = 20
+# документ с отпечатком в ключе не устаревает — держим его, пока не вытеснят
+FEED_TTL = 24 * 3600
+
+
+class ArticlesFeed(Feed):
+    description = 'Последние новости'
+
+    def get_object(self, request, tag_id=None):
+        return tags.get(tag_id) if tag_id is not None else None
+
+    def title(self, obj):
+        return f'{FEED_TITLE}: {obj.name}' if obj else FEED_TITLE
+
+    def link(self, obj):
+        return reverse('articles')
+
+    def items(self, obj):
+        queryset = Article.objects.order_by('-published_at', '-id')
+        if obj is not None:
+            queryset = queryset.filter(scopes__tag_id=obj.id)
+        return list(queryset.as_cards()[:FEED_SIZE])
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_pubdate(self, item):
+        return item.published_at
+
+    def item_categories(self, item):
+        return [scope.tag.name for scope in item.scopes]
+
+
+class AtomArticlesFeed(ArticlesFeed):
+    feed_type = Atom1Feed
+    subtitle = ArticlesFeed.description
+
+
+def feed_stamp(tag_id=None):
+    """
+    (последняя публикация, последнее изменение, статей, последнее удаление)
+    для ленты; по индексам (published_at, id), (updated_at, id) и (tag, article).
+    """
+    if tag_id is None:
+        stamp = Article.objects.aggregate(published=Max('published_at'), updated=Max('updated_at'))
+        stamp['count'] = None
+    else:
+        stamp = Scope.objects.filter(tag_id=tag_id).aggregate(
+            published=Max('article__published_at'), updated=Max('article__updated_at'), count=Count('id'),
+        )
+    deleted = Tombstone.objects.filter(feed='articles').aggregate(deleted=Max('deleted_at'))['deleted']
+    return stamp['published'], stamp['updated'], stamp['count'], deleted
+
+
+@cached('feeds', key=lambda feed, request, tag_id, stamp: (
+    type(feed).__name__, request.scheme, request.get_host(), tag_id, stamp,
+), soft_ttl=FEED_TTL, hard_ttl=FEED_TTL)
+def render_feed(feed, request, tag_id, stamp):
+    response = feed(request, tag_id=tag_id) if tag_id is not None else feed(request)
+    return response['Content-Type'], response.content
+
+
+def serve_feed(feed):
+    def view(request, tag_id=None):
+        if tag_id is not None and tags.get(tag_id) is None:
+            raise Http404
+        stamp = feed_stamp(tag_id)
+        etag = quote_etag(hashlib.blake2b(repr(stamp).encode('utf-8'), digest_size=12).hexdigest())
+        last_modified = max((moment for moment in (stamp[0], stamp[1], stamp[3]) if moment), default=None)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            content_type, content = render_feed(feed, request, tag_id, stamp)
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # читатели могут не спрашивать минуту; дальше — условный запрос
+        patch_cache_control(response, public=True, max_age=60)
+        return response
+    return view
+
+
+rss_feed = serve_feed(ArticlesFeed())
+atom_feed = serve_feed(AtomArticlesFeed())
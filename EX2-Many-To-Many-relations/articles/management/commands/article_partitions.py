@@ -0,0 +1,58 @@
+"""
+Помесячные партиции статей (articles/partitions.py).
+
+    python manage.py article_partitions                  # создать партиции на 3 месяца вперёд и показать
+    python manage.py article_partitions --ahead 6
+    python manage.py article_partitions --archive-before 2024-01   # всё до января 2024 — в архив
+
+Запускать раз в месяц (cron): партиции создаются заранее, чтобы новые
+статьи не попадали в DEFAULT, а старые месяцы отсоединяются в архив.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from articles import partitions
+
+
+def human_size(size):
+    for unit in ('Б', 'КиБ', 'МиБ', 'ГиБ'):
+        if size < 1024 or unit == 'ГиБ':
+            return f'{size:.0f} {unit}'
+        size /= 1024
+
+
+class Command(BaseCommand):
+    help = 'Создать партиции статей по месяцам и перенести старые месяцы в архив'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=3, help='на сколько месяцев вперёд создать партиции')
+        parser.add_argument('--archive-before', metavar='ГГГГ-ММ',
+                            help='перенести в архив статьи, опубликованные раньше этого месяца')
+
+    def handle(self, *args, **options):
+        archive_before = None
+        if options['archive_before']:
+            try:
+                archive_before = partitions.parse_month(options['archive_before'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        if partitions.partitioning_supported():
+            created = partitions.ensure_partitions(options['ahead'])
+            for name in created:
+                self.stdout.write(f'создана {name}')
+        else:
+            self.stdout.write('Секционирование доступно только на PostgreSQL: таблицы обычные.')
+
+        if archive_before:
+            moved = partitions.archive_before(archive_before)
+            for name in moved['partitions']:
+                self.stdout.write(f'в архив: {name}')
+            self.stdout.write(self.style.SUCCESS(
+                f"В архив перенесено статей: {moved['rows']} (до {archive_before:%Y-%m})"
+            ))
+
+        if partitions.partitioning_supported():
+            for table in (partitions.HOT_TABLE, partitions.ARCHIVE_TABLE):
+                self.stdout.write(f'\n{table}:')
+                for name, bound, rows, size in partitions.list_partitions(table):
+                    self.stdout.write(f'  {name:<40} {rows:>9} строк {human_size(size):>10}  {bound}')
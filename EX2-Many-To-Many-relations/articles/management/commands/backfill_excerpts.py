@@ -0,0 +1,41 @@
+"""
+Заполнение Article.excerpt для строк, сохранённых в обход Article.save()
+(loaddata, bulk_create, старые данные до появления поля).
+
+    python manage.py backfill_excerpts [--all] [--batch-size 500]
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from articles.models import Article, make_excerpt
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать анонсы статей (Article.excerpt)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='пересчитать все, а не только пустые')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Article.objects.all() if options['all'] else Article.objects.filter(excerpt='')
+        # text читаем потоково и только вместе с id
+        rows = queryset.order_by('pk').values_list('pk', 'text').iterator(chunk_size=batch_size)
+
+        # excerpt входит в ленту изменений: bulk_update не трогает auto_now
+        now = timezone.now()
+        batch, updated = [], 0
+        for pk, text in rows:
+            batch.append(Article(pk=pk, excerpt=make_excerpt(text), updated_at=now))
+            if len(batch) >= batch_size:
+                updated += self.flush(batch, batch_size)
+        updated += self.flush(batch, batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Обновлено анонсов: {updated}'))
+
+    def flush(self, batch, batch_size):
+        count = len(batch)
+        if count:
+            Article.objects.bulk_update(batch, ['excerpt', 'updated_at'], batch_size=batch_size)
+            batch.clear()
+        return count
@@ -0,0 +1,84 @@
+"""
+Сравнение памяти: модели + Prefetch против ArticleCard.
+
+    python manage.py bench_read_models --articles 5000 --tags 3
+
+Данные создаются внутри транзакции и откатываются после замера.
+"""
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from articles.models import Article, Scope, Tag
+
+
+class Rollback(Exception):
+    pass
+
+
+def measure(build):
+    """(число строк, пиковое число байт, секунды) на построение списка."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = build()
+    elapsed = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), peak, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Замер памяти/времени построения списка статей: модели против read-моделей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=3, help='тегов на статью')
+        parser.add_argument('--text-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['articles'], options['tags'], options['text_size'])
+                self.report()
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, tags_per_article, text_size):
+        now = timezone.now()
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'bench-{i}') for i in range(max(tags_per_article, 10))
+        )
+        articles = Article.objects.bulk_create(
+            Article(title=f'Статья {i}', text='x' * text_size, published_at=now)
+            for i in range(count)
+        )
+        Scope.objects.bulk_create(
+            Scope(article=article, tag=tags[(article.pk + j) % len(tags)], is_main=(j == 0))
+            for article in articles
+            for j in range(tags_per_article)
+        )
+
+    def report(self):
+        def models():
+            prefetch = Prefetch(
+                'scopes',
+                queryset=Scope.objects.select_related('tag').order_by('-is_main', 'tag__name'),
+            )
+            return list(Article.objects.order_by('-published_at').prefetch_related(prefetch))
+
+        def cards():
+            return list(Article.objects.order_by('-published_at').as_cards())
+
+        results = {name: measure(build) for name, build in (('models', models), ('cards', cards))}
+        for name, (rows, peak, elapsed) in results.items():
+            self.stdout.write(
+                f'{name:>7}: {rows} строк, пик {peak / 1024:.0f} КиБ '
+                f'({peak / max(rows, 1):.0f} Б/строку), {elapsed * 1000:.0f} мс'
+            )
+        ratio = results['models'][1] / max(results['cards'][1], 1)
+        self.stdout.write(self.style.SUCCESS(f'read-модели экономят память в {ratio:.1f} раза'))
@@ -0,0 +1,12 @@
+"""
+Лента изменений статей в NDJSON (website/changes.py).
+
+    python manage.py changes articles                  # всё с начала + токен next
+    python manage.py changes articles --since <токен>  # только новое
+    python manage.py changes --prune                   # почистить журнал удалений
+"""
+from website.changes import ChangesCommand
+
+
+class Command(ChangesCommand):
+    pass
@@ -0,0 +1,11 @@
+"""
+Потоковая выгрузка статей (website/export.py).
+
+    python manage.py export articles > articles.csv
+    python manage.py export articles --format ndjson --gzip -o articles.ndjson.gz
+"""
+from website.export import ExportCommand
+
+
+class Command(ExportCommand):
+    pass
@@ -0,0 +1,30 @@
+"""
+Найти почти одинаковые статьи (articles/dedup.py).
+
+    python manage.py find_duplicates             # подписи новым статьям + все пары заново
+    python manage.py find_duplicates --rebuild   # подписи всех статей заново
+
+Пары пишутся в DuplicateCandidate; в админке статей — колонка «Дубликат»
+и фильтр «Возможные дубликаты».
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles import dedup
+
+
+class Command(BaseCommand):
+    help = 'Найти возможные дубликаты статей (MinHash + LSH)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='пересчитать подписи всех статей')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        indexed = dedup.index_missing(rebuild=options['rebuild'])
+        found = dedup.scan()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Подписей посчитано: {indexed}, возможных дубликатов: {found}, {elapsed:.2f} с'
+        ))
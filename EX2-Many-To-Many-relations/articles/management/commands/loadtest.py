@@ -0,0 +1,38 @@
+"""
+Нагрузочный прогон ленты новостей и админки (website/loadtest.py).
+
+    python manage.py loadtest --duration 20 --concurrency 20
+    python manage.py loadtest --rate 200 --server gunicorn --workers 4
+    python manage.py loadtest --compare latest
+"""
+from django.utils import timezone
+
+from articles.models import Article, Scope, Tag, make_excerpt
+from website.loadtest import LoadTestCommand
+
+
+class Command(LoadTestCommand):
+    default_paths = (
+        '/',
+        '/admin/',
+        '/admin/articles/article/',
+        '/admin/articles/tag/',
+    )
+    cache_namespaces = ('articles', 'dict:articles.tag')
+
+    def seed(self, count):
+        now = timezone.now()
+        text = 'Текст статьи. ' * 150
+        tags = Tag.objects.bulk_create(Tag(name=f'Тег {i}') for i in range(30))
+        articles = Article.objects.bulk_create(
+            Article(
+                title=f'Статья {i}', text=text, excerpt=make_excerpt(text),
+                published_at=now - timezone.timedelta(hours=i),
+            )
+            for i in range(count)
+        )
+        Scope.objects.bulk_create(
+            Scope(article=article, tag=tags[(i + j) % len(tags)], is_main=(j == 0))
+            for i, article in enumerate(articles)
+            for j in range(3)
+        )
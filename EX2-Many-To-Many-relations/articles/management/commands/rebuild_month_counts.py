@@ -0,0 +1,21 @@
+"""
+Пересчитать счётчики статей по месяцам (articles/month_counts.py).
+
+    python manage.py rebuild_month_counts
+
+Нужно после массовых правок мимо сигналов модели: QuerySet.update(),
+bulk_create(), загрузки дампа или правки в БД руками.
+"""
+from django.core.management.base import BaseCommand
+
+from articles import month_counts
+from website.cache import bump
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать число статей по месяцам для архива и фильтра админки'
+
+    def handle(self, *args, **options):
+        months = month_counts.rebuild()
+        bump('articles')
+        self.stdout.write(self.style.SUCCESS(f'Пересчитано месяцев: {months}'))
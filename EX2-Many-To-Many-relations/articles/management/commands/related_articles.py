@@ -0,0 +1,31 @@
+"""
+Пересчитать похожие статьи (articles/related.py).
+
+    python manage.py related_articles            # по ленте изменений с прошлого запуска
+    python manage.py related_articles --full     # всё заново
+    python manage.py related_articles --full --metric jaccard -k 8
+
+Первый запуск всегда полный. Метрику и K меняйте вместе с --full:
+инкрементальный пересчёт затрагивает только изменённые списки.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from articles import related
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать похожие статьи по общим тегам (top-K на статью)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='пересчитать все статьи')
+        parser.add_argument('--metric', choices=related.METRICS, default='cosine')
+        parser.add_argument('-k', type=int, default=related.TOP_K, help='похожих на статью')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        mode, count = related.update(options['k'], options['metric'], full=options['full'])
+        elapsed = time.perf_counter() - started
+        label = 'Полный пересчёт' if mode == 'full' else 'Инкрементальный пересчёт'
+        self.stdout.write(self.style.SUCCESS(f'{label}: статей {count}, {elapsed:.2f} с'))
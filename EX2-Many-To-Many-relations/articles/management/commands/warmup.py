@@ -0,0 +1,34 @@
+"""
+Прогрев процесса и отчёт по фазам (website/warmup.py).
+
+    python manage.py warmup
+    python manage.py warmup --no-db
+    python manage.py warmup --phase templates --phase urls
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from website import warmup
+
+
+class Command(BaseCommand):
+    help = 'Прогрев: шаблоны, URL, админка, ORM, кеши; время каждой фазы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-db', action='store_true', help='пропустить фазы, которым нужна БД')
+        parser.add_argument('--phase', action='append', dest='phases',
+                            help='только указанные фазы (можно несколько)')
+
+    def handle(self, *args, **options):
+        known = [phase.name for phase in warmup.PHASES]
+        unknown = set(options['phases'] or ()) - set(known)
+        if unknown:
+            raise CommandError(f"неизвестные фазы: {', '.join(sorted(unknown))}; есть: {', '.join(known)}")
+
+        results = warmup.run(include_db=not options['no_db'], only=options['phases'])
+        width = max(len(r.name) for r in results) if results else 0
+        for r in results:
+            line = f'{r.name:<{width}} {r.seconds * 1000:8.1f} мс  {r.error or r.detail}'
+            self.stdout.write(self.style.ERROR(line) if r.error else line)
+        self.stdout.write(f"{'итого':<{width}} {sum(r.seconds for r in results) * 1000:8.1f} мс")
+        if any(r.error for r in results):
+            raise CommandError('часть фаз прогрева завершилась ошибкой')
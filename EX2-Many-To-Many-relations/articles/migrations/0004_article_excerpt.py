@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_article_tags_scope_articles_sc_article_b53948_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=300, verbose_name='Анонс'),
+        ),
+    ]
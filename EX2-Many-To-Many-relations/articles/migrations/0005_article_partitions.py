@@ -0,0 +1,144 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:03
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# DDL и помощники заморожены здесь, а не импортируются из articles/partitions.py:
+# правки модуля не должны менять то, что делает уже написанная миграция
+HOT_TABLE = 'articles_article'
+ARCHIVE_TABLE = 'articles_archivedarticle'
+
+
+def month_start(value):
+    if isinstance(value, datetime.datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+    return timezone.make_aware(datetime.datetime(value.year, value.month, 1))
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return timezone.make_aware(datetime.datetime(index // 12, index % 12 + 1, 1))
+
+
+def month_range(first, last):
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def create_partition(cursor, table, month):
+    # таблица только что секционирована, DEFAULT пуста — переносить нечего
+    bound = cursor.db.ops.adapt_datetimefield_value
+    cursor.execute(
+        f'CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+        [bound(month), bound(add_months(month, 1))],
+    )
+
+
+def partition_table(cursor, table, months, sequence=False):
+    """
+    Обычная таблица → секционированная по published_at. PK становится
+    (id, published_at): PostgreSQL требует ключ секционирования в каждом
+    уникальном ограничении. ``sequence`` — заменить identity-колонку id
+    (её не переносит LIKE) обычной последовательностью.
+    """
+    plain = f'{table}_plain'
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {plain}')
+    cursor.execute(f'CREATE TABLE {table} (LIKE {plain} INCLUDING DEFAULTS) PARTITION BY RANGE (published_at)')
+    cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, published_at)')
+    cursor.execute(f'CREATE INDEX {table}_published_at_idx ON {table} (published_at)')
+    cursor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    for month in months:
+        create_partition(cursor, table, month)
+    cursor.execute(f'INSERT INTO {table} SELECT * FROM {plain}')
+    cursor.execute(f'DROP TABLE {plain}')
+    if sequence:
+        cursor.execute(f'CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+        cursor.execute(f"SELECT setval('{table}_id_seq', COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)")
+
+
+def unpartition_table(cursor, table):
+    """Обратно к обычной таблице с PK (id)."""
+    plain = f'{table}_plain'
+    cursor.execute(f'CREATE TABLE {plain} (LIKE {table} INCLUDING DEFAULTS)')
+    cursor.execute(f'INSERT INTO {plain} SELECT * FROM {table}')
+    # последовательность id (если есть) должна пережить удаление таблицы
+    cursor.execute(f"SELECT pg_get_serial_sequence('{table}', 'id')")
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {plain}.id')
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {plain} RENAME TO {table}')
+    cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+    cursor.execute(f'CREATE INDEX {table}_published_at_idx ON {table} (published_at)')
+
+
+def partition_tables(apps, schema_editor):
+    """Только PostgreSQL: горячая и архивная таблицы статей — по месяцам."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(published_at) FROM {HOT_TABLE}')
+        oldest = cursor.fetchone()[0] or timezone.now()
+        months = list(month_range(oldest, add_months(month_start(timezone.now()), 3)))
+        partition_table(cursor, HOT_TABLE, months, sequence=True)
+        partition_table(cursor, ARCHIVE_TABLE, [])
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        unpartition_table(cursor, ARCHIVE_TABLE)
+        unpartition_table(cursor, HOT_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_article_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedArticle',
+            fields=[
+                ('title', models.CharField(max_length=256, verbose_name='Название')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('excerpt', models.CharField(blank=True, editable=False, max_length=300, verbose_name='Анонс')),
+                ('published_at', models.DateTimeField(verbose_name='Дата публикации')),
+                ('image', models.ImageField(blank=True, null=True, upload_to='', verbose_name='Изображение')),
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'verbose_name': 'Архивная статья',
+                'verbose_name_plural': 'Архив статей',
+                'ordering': ['-published_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='scope',
+            name='article',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='scopes', to='articles.article', verbose_name='Статья'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedScope',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_main', models.BooleanField(default=False, verbose_name='Основной')),
+                ('article', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='scopes', to='articles.archivedarticle', verbose_name='Статья')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_scopes', to='articles.tag', verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Тематика архивной статьи',
+                'verbose_name_plural': 'Тематики архивных статей',
+                'indexes': [models.Index(fields=['article', 'is_main'], name='articles_ar_article_86dd18_idx')],
+            },
+        ),
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
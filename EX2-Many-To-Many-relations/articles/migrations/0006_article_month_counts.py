@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:08
+
+from django.db import migrations, models
+
+
+def count_months(apps, schema_editor):
+    from articles.month_counts import rebuild
+
+    rebuild(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0005_article_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleMonthCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True, verbose_name='Месяц')),
+                ('articles', models.PositiveIntegerField(default=0, verbose_name='Статей')),
+                ('archived', models.PositiveIntegerField(default=0, verbose_name='В архиве')),
+            ],
+            options={
+                'verbose_name': 'Статей за месяц',
+                'verbose_name_plural': 'Статей по месяцам',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedarticle',
+            index=models.Index(fields=['published_at', 'id'], name='articles_arch_published_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['published_at', 'id'], name='articles_published_id_idx'),
+        ),
+        migrations.RunPython(count_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0006_article_month_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(max_length=32, verbose_name='Лента')),
+                ('object_id', models.BigIntegerField(verbose_name='ID записи')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Удалена')),
+            ],
+            options={
+                'verbose_name': 'Удалённая запись',
+                'verbose_name_plural': 'Удалённые записи',
+            },
+        ),
+        migrations.AddField(
+            model_name='archivedarticle',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['updated_at', 'id'], name='articles_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['feed', 'deleted_at', 'id'], name='articles_tombstone_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0007_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCursor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Задача')),
+                ('token', models.CharField(blank=True, max_length=256, verbose_name='Токен')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлён')),
+            ],
+            options={
+                'verbose_name': 'Позиция в ленте изменений',
+                'verbose_name_plural': 'Позиции в ленте изменений',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedArticle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('related_id', models.IntegerField(verbose_name='Похожая статья')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('article', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='related_rows', to='articles.article', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Похожая статья',
+                'verbose_name_plural': 'Похожие статьи',
+                'ordering': ['article', '-score'],
+                'indexes': [models.Index(fields=['related_id'], name='articles_related_target_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'related_id'), name='unique_related_article')],
+            },
+        ),
+    ]
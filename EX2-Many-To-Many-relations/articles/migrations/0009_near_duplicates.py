@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0008_related_articles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSignature',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.BinaryField(verbose_name='MinHash')),
+                ('article', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='articles.article', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Подпись статьи',
+                'verbose_name_plural': 'Подписи статей',
+            },
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.IntegerField(verbose_name='Оригинал')),
+                ('similarity', models.FloatField(verbose_name='Сходство')),
+                ('article', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_rows', to='articles.article', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Возможный дубликат',
+                'verbose_name_plural': 'Возможные дубликаты',
+                'ordering': ['article', '-similarity'],
+                'indexes': [models.Index(fields=['original_id'], name='articles_duplicate_orig_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'original_id'), name='unique_duplicate_pair')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LshBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Полоса')),
+                ('bucket', models.BigIntegerField(verbose_name='Корзина')),
+                ('article', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='articles.article', verbose_name='Статья')),
+            ],
+            options={
+                'verbose_name': 'Корзина LSH',
+                'verbose_name_plural': 'Корзины LSH',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='articles_lsh_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('article', 'band'), name='unique_article_band')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0009_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='scope',
+            name='articles_sc_article_b53948_idx',
+        ),
+    ]
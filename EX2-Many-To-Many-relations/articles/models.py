@@ -1,4 +1,17 @@
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# длина анонса для списка новостей (полный текст — только в детальной)
+EXCERPT_LENGTH = 300
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Анонс: текст без разметки и лишних пробелов, обрезанный до length символов."""
+    plain = ' '.join(strip_tags(text or '').split())
+    return Truncator(plain).chars(length)
 
 # =================================================Для тегов и тем
 from django.db.models import Q
@@ -11,12 +24,41 @@ class Tag(models.Model):
     def __str__(self): return self.name
 # =================================================
 
-class Article(models.Model):
+class ArticleQuerySet(models.QuerySet):
+    def as_cards(self):
+        """
+        Отдавать лёгкие ArticleCard (см. articles/read_models.py) вместо
+        экземпляров модели; теги подтягиваются одним запросом.
+        """
+        from articles.read_models import ArticleCardIterable
+        clone = self.prefetch_related(None)
+        clone._iterable_class = ArticleCardIterable
+        return clone
+
 
+class ArticleFields(models.Model):
+    """
+    Колонки статьи. Горячая Article и архивная ArchivedArticle должны
+    совпадать колонка в колонку: на PostgreSQL месяц переходит в архив
+    переприсоединением партиции (articles/partitions.py).
+    """
     title = models.CharField(max_length=256, verbose_name='Название')
     text = models.TextField(verbose_name='Текст')
+    # поддерживается в save(); для старых строк — manage.py backfill_excerpts
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, editable=False, verbose_name='Анонс')
     published_at = models.DateTimeField(verbose_name='Дата публикации')
     image = models.ImageField(null=True, blank=True, verbose_name='Изображение',)
+    # лента изменений /api/articles/changes/ (website/changes.py); правки
+    # тематик и тегов ставят его статье сигналами (articles/signals.py)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменена')
+
+    class Meta:
+        abstract = True
+
+
+class Article(ArticleFields):
+    # на PostgreSQL таблица секционирована по месяцам published_at
+    # (миграция 0005, manage.py article_partitions)
 # ==================================================================================
     # Связь многие-ко-многим к Tag через промежуточную модель Scope
     tags = models.ManyToManyField(
@@ -27,13 +69,41 @@ class Article(models.Model):
         blank=True,
     )
 # ====================================================================================
+    objects = ArticleQuerySet.as_manager()
+
     class Meta:
         ordering = ['-published_at']
         verbose_name = 'Статья'
         verbose_name_plural = 'Статьи'
+        indexes = [
+            # страницы архива по месяцам: диапазон published_at + порядок (-published_at, -id)
+            models.Index(fields=['published_at', 'id'], name='articles_published_id_idx'),
+            # keyset-порядок ленты изменений
+            models.Index(fields=['updated_at', 'id'], name='articles_updated_id_idx'),
+        ]
 
     def __str__(self): return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # дата до изменения — чтобы перенести статью между месяцами в ArticleMonthCount
+        instance._loaded_published_at = instance.__dict__.get('published_at')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            update_fields = kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        if update_fields:
+            # auto_now пишется, только если поле есть в update_fields
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse('article', args=[self.pk])
+
 # ================================================= Для основания статьи
 
 class Scope(models.Model):
@@ -42,10 +112,13 @@ class Scope(models.Model):
         on_delete=models.CASCADE,
         related_name='scopes',
         verbose_name='Тег')
+    # без FK в БД: у секционированной articles_article уникален только
+    # (id, published_at); каскадное удаление выполняет Django
     article = models.ForeignKey(
         Article,
         on_delete=models.CASCADE,
         related_name='scopes',
+        db_constraint=False,
         verbose_name='Статья')
     is_main = models.BooleanField(default=False, verbose_name='Основной')
 
@@ -65,11 +138,195 @@ class Scope(models.Model):
                 name='unique_main_scope_per_article',
             ),
         ]
-        indexes = [
-            models.Index(fields=['article', 'is_main']),
-        ]
+        # индекс (article, is_main) убран по advise_indexes: запросы фильтруют
+        # тематики только по article (IN), is_main — лишь в сортировке вместе
+        # с tag__name, и её индекс не отдаёт; хватает индекса внешнего ключа
 
     def __str__(self) -> str:
         label = ' (основной)' if self.is_main else ''
         return f'{self.article} — {self.tag}{label}'
-# ========================================================
\ No newline at end of file
+# ========================================================
+
+
+class ArchivedArticle(ArticleFields):
+    """Статья из архивного уровня: месяцы, перенесённые article_partitions --archive-before."""
+    # id сохраняется из горячей таблицы
+    id = models.IntegerField(primary_key=True)
+
+    objects = ArticleQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-published_at']
+        verbose_name = 'Архивная статья'
+        verbose_name_plural = 'Архив статей'
+        indexes = [
+            models.Index(fields=['published_at', 'id'], name='articles_arch_published_id_idx'),
+        ]
+
+    def __str__(self): return self.title
+
+    def get_absolute_url(self):
+        return reverse('article', args=[self.pk])
+
+
+class ArchivedScope(models.Model):
+    article = models.ForeignKey(
+        ArchivedArticle,
+        on_delete=models.CASCADE,
+        related_name='scopes',
+        db_constraint=False,
+        verbose_name='Статья')
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='archived_scopes',
+        verbose_name='Тег')
+    is_main = models.BooleanField(default=False, verbose_name='Основной')
+
+    class Meta:
+        verbose_name = 'Тематика архивной статьи'
+        verbose_name_plural = 'Тематики архивных статей'
+        indexes = [
+            models.Index(fields=['article', 'is_main']),
+        ]
+
+
+class ArticleMonthCount(models.Model):
+    """
+    Сколько статей опубликовано в месяце: навигация по архиву и фильтр
+    админки читают эту таблицу (строка на месяц), а не сканируют статьи.
+    Поддерживается сигналами Article (articles/signals.py),
+    пересчитывается manage.py rebuild_month_counts.
+    """
+    month = models.DateField(unique=True, verbose_name='Месяц')  # первое число, в TIME_ZONE
+    articles = models.PositiveIntegerField(default=0, verbose_name='Статей')
+    archived = models.PositiveIntegerField(default=0, verbose_name='В архиве')
+
+    class Meta:
+        ordering = ['-month']
+        verbose_name = 'Статей за месяц'
+        verbose_name_plural = 'Статей по месяцам'
+
+    def __str__(self): return f'{self.month:%Y-%m}: {self.total}'
+
+    @property
+    def total(self):
+        return self.articles + self.archived
+
+
+class Tombstone(models.Model):
+    """Журнал удалений для лент изменений (website/changes.py)."""
+    feed = models.CharField(max_length=32, verbose_name='Лента')
+    object_id = models.BigIntegerField(verbose_name='ID записи')
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name='Удалена')
+
+    class Meta:
+        verbose_name = 'Удалённая запись'
+        verbose_name_plural = 'Удалённые записи'
+        indexes = [
+            models.Index(fields=['feed', 'deleted_at', 'id'], name='articles_tombstone_feed_idx'),
+        ]
+
+    def __str__(self): return f'{self.feed}#{self.object_id}'
+
+
+class FeedCursor(models.Model):
+    """Позиция фоновой задачи в ленте изменений (токен next, website/changes.py)."""
+    name = models.CharField(max_length=64, unique=True, verbose_name='Задача')
+    token = models.CharField(max_length=256, blank=True, verbose_name='Токен')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлён')
+
+    class Meta:
+        verbose_name = 'Позиция в ленте изменений'
+        verbose_name_plural = 'Позиции в ленте изменений'
+
+    def __str__(self): return self.name
+
+
+class RelatedArticle(models.Model):
+    """
+    Похожие статьи по общим тегам — top-K на статью, считаются пакетно
+    (articles/related.py, manage.py related_articles).
+    """
+    article = models.ForeignKey(
+        Article, on_delete=models.CASCADE, related_name='related_rows', db_constraint=False,
+        verbose_name='Статья',
+    )
+    # только id: похожая статья может уйти в архив, строки пересчитаются
+    related_id = models.IntegerField(verbose_name='Похожая статья')
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ['article', '-score']
+        verbose_name = 'Похожая статья'
+        verbose_name_plural = 'Похожие статьи'
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'related_id'], name='unique_related_article'),
+        ]
+        indexes = [
+            # «в чьих списках стоит статья» — для инкрементального пересчёта
+            models.Index(fields=['related_id'], name='articles_related_target_idx'),
+        ]
+
+    def __str__(self): return f'{self.article_id} → {self.related_id} ({self.score:.3f})'
+
+
+class ArticleSignature(models.Model):
+    """Подпись MinHash статьи: NUM_HASHES чисел uint32 (articles/dedup.py)."""
+    article = models.OneToOneField(
+        Article, on_delete=models.CASCADE, related_name='signature', db_constraint=False,
+        verbose_name='Статья',
+    )
+    minhash = models.BinaryField(verbose_name='MinHash')
+
+    class Meta:
+        verbose_name = 'Подпись статьи'
+        verbose_name_plural = 'Подписи статей'
+
+    def __str__(self): return str(self.article_id)
+
+
+class LshBucket(models.Model):
+    """Корзина LSH: хеш одной полосы подписи статьи."""
+    article = models.ForeignKey(
+        Article, on_delete=models.CASCADE, related_name='lsh_buckets', db_constraint=False,
+        verbose_name='Статья',
+    )
+    band = models.PositiveSmallIntegerField(verbose_name='Полоса')
+    bucket = models.BigIntegerField(verbose_name='Корзина')
+
+    class Meta:
+        verbose_name = 'Корзина LSH'
+        verbose_name_plural = 'Корзины LSH'
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'band'], name='unique_article_band'),
+        ]
+        indexes = [
+            # соседи статьи — по совпавшей корзине в той же полосе
+            models.Index(fields=['band', 'bucket'], name='articles_lsh_bucket_idx'),
+        ]
+
+    def __str__(self): return f'{self.article_id}: {self.band}/{self.bucket}'
+
+
+class DuplicateCandidate(models.Model):
+    """Возможный дубликат: более новая статья почти совпадает с более старой."""
+    article = models.ForeignKey(
+        Article, on_delete=models.CASCADE, related_name='duplicate_rows', db_constraint=False,
+        verbose_name='Статья',
+    )
+    original_id = models.IntegerField(verbose_name='Оригинал')
+    similarity = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ['article', '-similarity']
+        verbose_name = 'Возможный дубликат'
+        verbose_name_plural = 'Возможные дубликаты'
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'original_id'], name='unique_duplicate_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['original_id'], name='articles_duplicate_orig_idx'),
+        ]
+
+    def __str__(self): return f'{self.article_id} ≈ {self.original_id} ({self.similarity:.2f})'
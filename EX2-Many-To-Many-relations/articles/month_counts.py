@@ -0,0 +1,119 @@
+"""
+Счётчики статей по месяцам (ArticleMonthCount).
+
+Архив /archive/ и фильтр по дате в админке показывают месяцы с числом
+статей. Считать это GROUP BY по всей таблице на каждый запрос дорого,
+поэтому число хранится построчно — строка на месяц — и меняется точечно:
+
+  * создание статьи — +1 её месяцу, удаление — −1;
+  * смена published_at — −1 старому месяцу, +1 новому (старая дата
+    запоминается при загрузке, Article.from_db);
+  * archive_before (articles/partitions.py) переводит счёт месяцев
+    из ``articles`` в ``archived``.
+
+QuerySet.update(), bulk_create() и сырой SQL сигналов не шлют — после них
+счётчики пересчитываются ``python manage.py rebuild_month_counts``.
+Месяц — первое число в TIME_ZONE проекта, как и границы партиций.
+"""
+import datetime
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Q
+from django.db.models.functions import Greatest, TruncMonth
+from django.utils import timezone
+
+from articles.partitions import add_months, month_start
+
+NOT_EMPTY = Q(articles__gt=0) | Q(archived__gt=0)
+
+
+def month_of(value):
+    """Первое число месяца (date) для published_at."""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date().replace(day=1)
+
+
+def month_bounds(year, month):
+    """[начало, конец) месяца — aware datetime для фильтра по published_at."""
+    start = month_start(datetime.date(year, month, 1))
+    return start, add_months(start, 1)
+
+
+def adjust(month, delta, field='articles'):
+    """Прибавить delta к счётчику месяца; строка создаётся при первой статье."""
+    from articles.models import ArticleMonthCount
+
+    months = ArticleMonthCount.objects.filter(month=month)
+    if months.update(**{field: Greatest(F(field) + delta, 0)}) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            ArticleMonthCount.objects.create(month=month, **{field: delta})
+    except IntegrityError:
+        # строку успел создать параллельный запрос
+        months.update(**{field: F(field) + delta})
+
+
+def count_by_month(queryset):
+    """{первое число месяца: статей} одним GROUP BY."""
+    rows = (
+        queryset.order_by()
+        .annotate(month=TruncMonth('published_at', output_field=DateField()))
+        .values_list('month')
+        .annotate(total=Count('pk'))
+    )
+    return dict(rows)
+
+
+def rebuild(apps=global_apps):
+    """Пересчитать все месяцы заново; ``apps`` — реестр моделей (для миграции)."""
+    ArticleMonthCount = apps.get_model('articles', 'ArticleMonthCount')
+    hot = count_by_month(apps.get_model('articles', 'Article').objects.all())
+    archived = count_by_month(apps.get_model('articles', 'ArchivedArticle').objects.all())
+    with transaction.atomic():
+        ArticleMonthCount.objects.all().delete()
+        ArticleMonthCount.objects.bulk_create(
+            ArticleMonthCount(month=month, articles=hot.get(month, 0), archived=archived.get(month, 0))
+            for month in sorted(hot.keys() | archived.keys())
+        )
+    return len(hot.keys() | archived.keys())
+
+
+def move_to_archive(boundary):
+    """Счёт месяцев раньше boundary — в ``archived`` (статьи ушли в архив целиком)."""
+    from articles.models import ArticleMonthCount
+
+    return (
+        ArticleMonthCount.objects
+        .filter(month__lt=month_of(boundary), articles__gt=0)
+        .update(archived=F('archived') + F('articles'), articles=0)
+    )
+
+
+def years():
+    """
+    [(год, статей за год, [ArticleMonthCount, ...]), ...] от новых к старым —
+    навигация архива одним запросом по строкам месяцев.
+    """
+    from articles.models import ArticleMonthCount
+
+    result = []
+    for row in ArticleMonthCount.objects.filter(NOT_EMPTY):
+        if not result or result[-1][0] != row.month.year:
+            result.append((row.month.year, 0, []))
+        year, total, months = result[-1]
+        months.append(row)
+        result[-1] = (year, total + row.total, months)
+    return result
+
+
+def neighbours(month):
+    """(предыдущий, следующий) непустые месяцы — для ссылок «раньше/позже»."""
+    from articles.models import ArticleMonthCount
+
+    months = ArticleMonthCount.objects.filter(NOT_EMPTY)
+    previous = months.filter(month__lt=month).order_by('-month').first()
+    following = months.filter(month__gt=month).order_by('month').first()
+    return previous, following
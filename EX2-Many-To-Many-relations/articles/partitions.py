@@ -0,0 +1,226 @@
+"""
+Помесячные партиции статей и архивный уровень.
+
+На PostgreSQL таблица статей (articles_article) секционирована по
+published_at: по партиции на месяц плюс DEFAULT для дат вне созданных
+диапазонов. Архив (articles_archivedarticle) устроен так же. Старый месяц
+уходит в архив целиком: партицию отсоединяют от горячей таблицы
+(DETACH) и присоединяют к архивной (ATTACH), копирования нет. Тематики
+(Scope) узкие и не секционируются, строки архивных статей переносятся
+в ArchivedScope.
+
+В горячей таблице остаются только свежие месяцы. Запросы с условием
+по published_at (курсор /api/articles/, архив по месяцам) планировщик
+сводит к нужным партициям. ORDER BY published_at DESC LIMIT n читает
+партиции от новой к старой и останавливается на первой же.
+
+На других СУБД (SQLite в тестах) таблицы обычные, а архивирование
+переносит строки INSERT ... SELECT / DELETE.
+
+Управление — ``python manage.py article_partitions``.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+HOT_TABLE = 'articles_article'
+ARCHIVE_TABLE = 'articles_archivedarticle'
+SCOPE_TABLE = 'articles_scope'
+ARCHIVE_SCOPE_TABLE = 'articles_archivedscope'
+
+
+def partitioning_supported():
+    return connection.vendor == 'postgresql'
+
+
+# ---------------------------------------------------------------- месяцы
+def month_start(value):
+    """Начало месяца value в часовом поясе проекта (aware datetime)."""
+    if isinstance(value, datetime.datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+    return timezone.make_aware(datetime.datetime(value.year, value.month, 1))
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return timezone.make_aware(datetime.datetime(index // 12, index % 12 + 1, 1))
+
+
+def month_range(first, last):
+    """Начала месяцев от first до last включительно."""
+    month = month_start(first)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def parse_month(value):
+    """'2024-05' → начало мая 2024."""
+    try:
+        return month_start(datetime.datetime.strptime(value, '%Y-%m'))
+    except ValueError:
+        raise ValueError(f'ожидается месяц в виде ГГГГ-ММ, получено {value!r}')
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+# ---------------------------------------------------------------- SQL
+def article_columns():
+    from articles.models import Article
+
+    return [field.column for field in Article._meta.concrete_fields]
+
+
+def _bound(value):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def list_partitions(table):
+    """[(имя, граница 'FOR VALUES ...', строк ≈, байт)] — только PostgreSQL."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid),
+                   GREATEST(child.reltuples, 0)::bigint, pg_total_relation_size(child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [table],
+        )
+        return cursor.fetchall()
+
+
+def _month_partitions(table):
+    """{начало месяца: имя партиции} для партиций, созданных этим модулем."""
+    prefix = f'{table}_p'
+    result = {}
+    for name, _bound_sql, _rows, _size in list_partitions(table):
+        if name.startswith(prefix):
+            result[parse_month(name[len(prefix):].replace('_', '-'))] = name
+    return result
+
+
+def create_partition(cursor, table, month):
+    """
+    Партиция месяца. Если строки этого месяца уже лежат в DEFAULT,
+    PostgreSQL не даст создать партицию — сначала переносим их.
+    """
+    name = partition_name(table, month)
+    start, end = _bound(month), _bound(add_months(month, 1))
+    default = f'{table}_default'
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {default} WHERE published_at >= %s AND published_at < %s)',
+        [start, end],
+    )
+    if cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TEMPORARY TABLE _moved (LIKE {table}) ON COMMIT DROP')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {default} WHERE published_at >= %s AND published_at < %s '
+            f'RETURNING *) INSERT INTO _moved SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)', [start, end])
+        cursor.execute(f'INSERT INTO {table} SELECT * FROM _moved')
+        cursor.execute('DROP TABLE _moved')
+    else:
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return name
+
+
+def ensure_partitions(ahead=3, table=HOT_TABLE):
+    """
+    Партиции от самого старого месяца с данными до текущего + ahead.
+    Возвращает имена созданных.
+    """
+    existing = _month_partitions(table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(published_at) FROM {table}')
+        oldest = cursor.fetchone()[0] or timezone.now()
+    last = add_months(month_start(timezone.now()), ahead)
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for month in month_range(oldest, last):
+            if month not in existing:
+                created.append(create_partition(cursor, table, month))
+    return created
+
+
+# ---------------------------------------------------------------- архив
+def _move_scopes(cursor, source_sql, params):
+    """Тематики статей из source_sql (SELECT id ...) — в ArchivedScope."""
+    cursor.execute(
+        f'INSERT INTO {ARCHIVE_SCOPE_TABLE} (article_id, tag_id, is_main) '
+        f'SELECT article_id, tag_id, is_main FROM {SCOPE_TABLE} WHERE article_id IN ({source_sql})',
+        params,
+    )
+    cursor.execute(f'DELETE FROM {SCOPE_TABLE} WHERE article_id IN ({source_sql})', params)
+
+
+def _archive_rows(cursor, boundary):
+    """Переносом строк: для DEFAULT-партиции и для СУБД без секционирования."""
+    columns = ', '.join(article_columns())
+    params = [_bound(boundary)]
+    source = f'SELECT id FROM {HOT_TABLE} WHERE published_at < %s'
+    _move_scopes(cursor, source, params)
+    cursor.execute(
+        f'INSERT INTO {ARCHIVE_TABLE} ({columns}) '
+        f'SELECT {columns} FROM {HOT_TABLE} WHERE published_at < %s',
+        params,
+    )
+    cursor.execute(f'DELETE FROM {HOT_TABLE} WHERE published_at < %s', params)
+    return cursor.rowcount
+
+
+def _archive_partition(cursor, name, month):
+    """Месяц целиком: DETACH из горячей таблицы, ATTACH к архиву."""
+    _move_scopes(cursor, f'SELECT id FROM {name}', [])
+    cursor.execute(f'SELECT COUNT(*) FROM {name}')
+    rows = cursor.fetchone()[0]
+    archived = partition_name(ARCHIVE_TABLE, month)
+    start, end = _bound(month), _bound(add_months(month, 1))
+    cursor.execute(f'ALTER TABLE {HOT_TABLE} DETACH PARTITION {name}')
+    cursor.execute(f'ALTER TABLE {name} RENAME TO {archived}')
+    # строки этого месяца, раньше попавшие в архив переносом, не дадут
+    # присоединить партицию — забираем их из архивной DEFAULT
+    columns = ', '.join(article_columns())
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {ARCHIVE_TABLE}_default '
+        f'WHERE published_at >= %s AND published_at < %s RETURNING {columns}) '
+        f'INSERT INTO {archived} ({columns}) SELECT {columns} FROM moved',
+        [start, end],
+    )
+    cursor.execute(
+        f'ALTER TABLE {ARCHIVE_TABLE} ATTACH PARTITION {archived} FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+    return rows
+
+
+def archive_before(boundary):
+    """
+    Перенести в архив статьи, опубликованные раньше boundary (начало месяца).
+    Возвращает {'partitions': [...], 'rows': число статей}.
+    """
+    from articles.month_counts import move_to_archive
+    from website.cache import bump
+
+    boundary = month_start(boundary)
+    moved = {'partitions': [], 'rows': 0}
+    with transaction.atomic(), connection.cursor() as cursor:
+        if partitioning_supported():
+            for month, name in sorted(_month_partitions(HOT_TABLE).items()):
+                if add_months(month, 1) <= boundary:
+                    moved['rows'] += _archive_partition(cursor, name, month)
+                    moved['partitions'].append(name)
+        # что осталось (DEFAULT-партиция или обычная таблица) — переносом строк
+        moved['rows'] += _archive_rows(cursor, boundary)
+        move_to_archive(boundary)
+    # строки перенесены SQL-запросами, сигналы моделей не срабатывали
+    bump('articles')
+    return moved
@@ -0,0 +1,66 @@
+"""
+Ключевые выборки новостей для проверки планов (website/plans.py).
+
+    python manage.py check_plans
+"""
+import datetime
+
+from django.utils import timezone
+
+from website.plans import QueryPlan, register
+from website.prefetch import planned
+
+from . import month_counts
+from .feeds import FEED_SIZE
+from .models import Article, Scope, Tag
+
+TAGS = 50
+
+
+def seed(size):
+    """size статей за ~3 года, у каждой 3 тега из TAGS, первый — основной."""
+    tags = Tag.objects.bulk_create(Tag(name=f'Тег {n}') for n in range(TAGS))
+    start = timezone.now() - datetime.timedelta(days=3 * 365)
+    step = datetime.timedelta(days=3 * 365) / max(size, 1)
+    articles = Article.objects.bulk_create(
+        (Article(title=f'Статья {n}', text='-', published_at=start + step * n) for n in range(size)),
+        batch_size=1000,
+    )
+    Scope.objects.bulk_create(
+        (
+            Scope(article_id=article.pk, tag_id=tags[(n * 7 + k) % TAGS].pk, is_main=k == 0)
+            for n, article in enumerate(articles)
+            for k in range(3)
+        ),
+        batch_size=1000,
+    )
+    month_counts.rebuild()
+
+
+def _article_detail():
+    # как article_detail: план по шаблону, тематики одной статьи, основная первой
+    from .prefetch import SCOPE_ORDERING  # articles/prefetch.py сам берёт seed отсюда
+
+    latest = Article.objects.order_by('-published_at', '-id').values_list('id', flat=True).first()
+    return planned(Article.objects.filter(pk=latest), 'articles/article.html', 'article', SCOPE_ORDERING)
+
+
+def _archive_month():
+    latest = Article.objects.order_by('-published_at', '-id').values_list('published_at', flat=True).first()
+    month = month_counts.month_of(latest or timezone.now())
+    start, end = month_counts.month_bounds(month.year, month.month)
+    return Article.objects.filter(published_at__gte=start, published_at__lt=end).order_by('-published_at', '-id').as_cards()
+
+
+def _tag_feed():
+    tag_id = Scope.objects.order_by('tag_id').values_list('tag_id', flat=True).first()
+    return Article.objects.order_by('-published_at', '-id').filter(scopes__tag_id=tag_id).as_cards()[:FEED_SIZE]
+
+
+# главная без пагинации: статьи идут по индексу published_at, но тематики всех статей — проход Scope
+register(QueryPlan(
+    'articles_list', lambda: Article.objects.order_by('-published_at').as_cards(), seed=seed, allow=['seq_scan'],
+))
+register(QueryPlan('article_detail', _article_detail, seed=seed))
+register(QueryPlan('archive_month', _archive_month, seed=seed))
+register(QueryPlan('tag_feed', _tag_feed, seed=seed))
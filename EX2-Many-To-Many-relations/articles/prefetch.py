@@ -0,0 +1,35 @@
+"""
+Страницы новостей для плана загрузки по шаблону (website/prefetch.py).
+
+    python manage.py prefetch_plan
+"""
+from django.db.models import Prefetch
+
+from website.prefetch import Target, register
+
+from .models import Article, Scope
+from .plans import seed
+from .read_models import ArticleCard
+
+# основная тема первой — порядка в шаблоне не видно
+SCOPE_ORDERING = {'scopes': ('-is_main', 'tag__name')}
+
+
+def _latest():
+    return Article.objects.order_by('-published_at', '-id')
+
+
+# список отдаёт ArticleCard (read_models.py): у карточки должны быть все атрибуты
+# из cards.html, а выборка моделей — та, что была в view до read-моделей
+register(Target(
+    'articles_list', 'articles/news.html', 'object_list[]',
+    build=lambda: _latest()[:20], seed=seed, ordering=SCOPE_ORDERING, rows=ArticleCard,
+    current=lambda: _latest().prefetch_related(
+        Prefetch('scopes', queryset=Scope.objects.select_related('tag').order_by('-is_main', 'tag__name')),
+    )[:20],
+))
+register(Target(
+    'article_detail', 'articles/article.html', 'article',
+    build=lambda: _latest(), seed=seed, ordering=SCOPE_ORDERING,
+    context=lambda objects: {'article': objects[0] if objects else None, 'related': []},
+))
@@ -0,0 +1,115 @@
+"""
+Лёгкие read-модели для списка новостей.
+
+Вместо полноценных Article/Scope/Tag с prefetch-кешами список собирается
+из кортежей values_list() в компактные объекты со ``__slots__``.
+Атрибуты повторяют то, к чему обращается cards.html
+(``article.scopes.all`` → ``scope.is_main``, ``scope.tag.name``),
+поэтому шаблон менять не нужно.
+
+Используется через ``Article.objects.order_by(...).as_cards()``.
+"""
+from collections import defaultdict, namedtuple
+
+from django.db.models.query import BaseIterable
+from django.urls import reverse
+
+from website.cache import cached, queryset_key
+
+# Поля статьи, которые печатает cards.html: вместо тяжёлого text — excerpt
+CARD_FIELDS = ('id', 'title', 'excerpt', 'published_at', 'image')
+
+TagRef = namedtuple('TagRef', 'id name')
+ScopeRow = namedtuple('ScopeRow', 'tag is_main')
+
+
+class Related(tuple):
+    """Кортеж, который шаблон может обходить как ``{% for x in obj.rel.all %}``."""
+    __slots__ = ()
+
+    def all(self):
+        return self
+
+
+NO_RELATED = Related()
+
+
+class ArticleCard:
+    __slots__ = CARD_FIELDS + ('scopes',)
+
+    def __init__(self, id, title, excerpt, published_at, image, scopes=NO_RELATED):
+        self.id = id
+        self.title = title
+        self.excerpt = excerpt
+        self.published_at = published_at
+        # у модели пустой ImageField печатается как '', а не 'None'
+        self.image = image or ''
+        self.scopes = scopes
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_absolute_url(self):
+        return reverse('article', args=[self.id])
+
+    def __repr__(self):
+        return f'<ArticleCard {self.id}: {self.title}>'
+
+
+def scope_sort_key(scope):
+    """Основной тег первым, остальные по имени."""
+    return not scope.is_main, scope.tag.name.casefold(), scope.tag.name
+
+
+def load_scopes(article_ids, scope_model=None):
+    """
+    {article_id: Related(ScopeRow, ...)} — основной тег первым, дальше по имени.
+    Из Scope (для архивных статей — ArchivedScope) читаются только id;
+    имена тегов берутся из справочника в памяти (articles/dictionaries.py),
+    так что JOIN с тегами не нужен.
+    Одинаковые теги/связки переиспользуются между строками.
+    """
+    from articles.dictionaries import tags
+    from articles.models import Scope
+
+    rows = list(
+        (scope_model or Scope).objects
+        .filter(article_id__in=article_ids)
+        .values_list('article_id', 'tag_id', 'is_main')
+    )
+    tag_refs = tags.get_many({tag_id for _article_id, tag_id, _is_main in rows})
+
+    interned = {}
+    scopes = defaultdict(list)
+    for article_id, tag_id, is_main in rows:
+        key = (tag_id, is_main)
+        scope = interned.get(key)
+        if scope is None:
+            tag = tag_refs.get(tag_id)
+            if tag is None:  # тег удалили между запросами
+                continue
+            scope = interned[key] = ScopeRow(tag, is_main)
+        scopes[article_id].append(scope)
+    return {
+        article_id: Related(sorted(items, key=scope_sort_key))
+        for article_id, items in scopes.items()
+    }
+
+
+@cached('articles', key=queryset_key)
+def load_cards(queryset):
+    """Карточки для queryset; кешируются до изменения статей/тегов (articles/signals.py)."""
+    from articles.models import ArchivedArticle, ArchivedScope
+
+    rows = list(queryset.values_list(*CARD_FIELDS))
+    scope_model = ArchivedScope if queryset.model is ArchivedArticle else None
+    scopes = load_scopes([row[0] for row in rows], scope_model) if rows else {}
+    return [ArticleCard(*row, scopes=scopes.get(row[0], NO_RELATED)) for row in rows]
+
+
+class ArticleCardIterable(BaseIterable):
+    """Итерация QuerySet'а, отдающая ArticleCard вместо экземпляров Article."""
+
+    def __iter__(self):
+        return iter(load_cards(self.queryset))
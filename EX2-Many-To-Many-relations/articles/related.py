@@ -0,0 +1,248 @@
+"""
+Похожие статьи по общим тегам.
+
+Самосоединение Scope на каждый просмотр слишком дорого, поэтому top-K
+считается пакетно (``manage.py related_articles``) и хранится
+в RelatedArticle; страница статьи читает готовые строки.
+
+Статья — разреженный вектор по тегам: вес основного тега MAIN_WEIGHT,
+остальных 1. Матрица статья×тег держится массивами numpy в двух
+раскладках (по статьям и по тегам, как CSR/CSC). Сходство пачки статей
+со всеми остальными считается без циклов Python: теги пачки
+разворачиваются в списки статей этих тегов, вклады пар (a, b)
+суммируются ``np.bincount`` и нормируются — косинус или взвешенный
+Жаккар. Пары с общим тегом — единственные ненулевые, поэтому работа
+пропорциональна их числу, а не квадрату числа статей; пачки режутся так,
+чтобы пар в пачке было около MAX_PAIRS.
+
+Инкрементальный режим читает ленту изменений статей (website/changes.py)
+с позиции, сохранённой в FeedCursor, и пересчитывает только затронутые
+списки:
+
+  * изменённых и удалённых статей D;
+  * статей, в чьих списках стоит статья из D (сходство могло упасть);
+  * статей, для которых статья из D теперь не слабее их K-й похожей.
+
+numpy импортируют только этот модуль и articles/dedup.py.
+"""
+import datetime
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from website.api import encode_cursor, parse_cursor
+from website.changes import ResyncRequired, _parse_position, options
+
+from .changes import articles as feed
+from .models import FeedCursor, RelatedArticle, Scope
+
+MAIN_WEIGHT = 2.0
+TOP_K = 5
+MAX_PAIRS = 2_000_000
+METRICS = ('cosine', 'jaccard')
+CURSOR_NAME = 'related_articles'
+BATCH = 1000
+
+
+def _ranges(starts, lengths):
+    """Склеенные диапазоны [start, start + length) одним массивом индексов."""
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(int(lengths.sum()), dtype=np.int64)
+
+
+class TagMatrix:
+    """Матрица статья×тег: строки по статьям и по тегам, нормы и суммы весов."""
+
+    def __init__(self, article_ids, tag_ids, weights):
+        self.ids = np.unique(article_ids)
+        self.size = len(self.ids)
+        rows = np.searchsorted(self.ids, article_ids)
+        tags, cols = np.unique(tag_ids, return_inverse=True)
+        weights = np.asarray(weights, dtype=np.float64)
+
+        order = np.lexsort((cols, rows))
+        self.row_tags, self.row_weights = cols[order], weights[order]
+        self.row_ptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=self.size))))
+
+        order = np.lexsort((rows, cols))
+        self.tag_rows, self.tag_weights = rows[order], weights[order]
+        self.tag_ptr = np.concatenate(([0], np.cumsum(np.bincount(cols, minlength=len(tags)))))
+
+        self.norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=self.size))
+        self.totals = np.bincount(rows, weights=weights, minlength=self.size)
+
+    @classmethod
+    def load(cls):
+        """Все тематики одним проходом курсора: (статья, тег, основной)."""
+        rows = Scope.objects.values_list('article_id', 'tag_id', 'is_main').iterator(chunk_size=10000)
+        data = np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+        return cls(data[:, 0], data[:, 1], np.where(data[:, 2] == 1, MAIN_WEIGHT, 1.0))
+
+    def rows_of(self, article_ids):
+        """Номера строк матрицы для id статей (статьи без тегов пропускаются)."""
+        article_ids = np.unique(np.asarray(list(article_ids), dtype=np.int64))
+        positions = np.searchsorted(self.ids, article_ids)
+        found = positions < self.size
+        positions, article_ids = positions[found], article_ids[found]
+        return positions[self.ids[positions] == article_ids]
+
+    def _entries(self, rows):
+        starts = self.row_ptr[rows]
+        lengths = self.row_ptr[rows + 1] - starts
+        return _ranges(starts, lengths), lengths
+
+    def chunks(self, rows):
+        """Пачки строк примерно по MAX_PAIRS пар в развёртке."""
+        entries, lengths = self._entries(rows)
+        tags = self.row_tags[entries]
+        fanout = self.tag_ptr[tags + 1] - self.tag_ptr[tags]
+        per_row = np.bincount(np.repeat(np.arange(len(rows)), lengths), weights=fanout, minlength=len(rows))
+        cuts = np.flatnonzero(np.diff(np.cumsum(per_row) // MAX_PAIRS)) + 1
+        return [chunk for chunk in np.split(rows, cuts) if len(chunk)]
+
+    def similarities(self, rows, metric='cosine'):
+        """(строка из rows, другая строка, сходство) для всех пар с общим тегом."""
+        entries, lengths = self._entries(rows)
+        local = np.repeat(np.arange(len(rows)), lengths)
+        tags, weights = self.row_tags[entries], self.row_weights[entries]
+
+        post_starts = self.tag_ptr[tags]
+        post_lengths = self.tag_ptr[tags + 1] - post_starts
+        postings = _ranges(post_starts, post_lengths)
+        others, other_weights = self.tag_rows[postings], self.tag_weights[postings]
+        weights = np.repeat(weights, post_lengths)
+
+        if metric == 'cosine':
+            contributions = weights * other_weights
+        else:
+            contributions = np.minimum(weights, other_weights)
+        keys, inverse = np.unique(np.repeat(local, post_lengths) * self.size + others, return_inverse=True)
+        sums = np.bincount(inverse, weights=contributions)
+        sources, targets = rows[keys // self.size], keys % self.size
+
+        other = sources != targets
+        sources, targets, sums = sources[other], targets[other], sums[other]
+        if metric == 'cosine':
+            scores = sums / (self.norms[sources] * self.norms[targets])
+        else:
+            scores = sums / (self.totals[sources] + self.totals[targets] - sums)
+        return sources, targets, scores
+
+    def top_k(self, rows, k=TOP_K, metric='cosine'):
+        """k лучших для каждой строки; при равном сходстве — статья с большим id."""
+        sources, targets, scores = self.similarities(rows, metric)
+        order = np.lexsort((-self.ids[targets], -scores, sources))
+        sources, targets, scores = sources[order], targets[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+        rank = np.arange(len(sources)) - np.repeat(starts, np.diff(np.r_[starts, len(sources)]))
+        best = rank < k
+        return sources[best], targets[best], scores[best]
+
+
+def _replace(matrix, article_ids, sources, targets, scores):
+    """Заменить списки article_ids новыми строками (в текущей транзакции)."""
+    for start in range(0, len(article_ids), BATCH):
+        RelatedArticle.objects.filter(article_id__in=article_ids[start:start + BATCH]).delete()
+    RelatedArticle.objects.bulk_create(
+        (
+            RelatedArticle(article_id=article_id, related_id=related_id, score=score)
+            for article_id, related_id, score in zip(
+                matrix.ids[sources].tolist(), matrix.ids[targets].tolist(), scores.tolist(),
+            )
+        ),
+        batch_size=BATCH,
+    )
+
+
+def rebuild(k=TOP_K, metric='cosine'):
+    """Пересчитать все списки; вернуть число статей с тегами."""
+    matrix = TagMatrix.load()
+    with transaction.atomic():
+        RelatedArticle.objects.all().delete()
+        for rows in matrix.chunks(np.arange(matrix.size)):
+            _replace(matrix, [], *matrix.top_k(rows, k, metric))
+    return matrix.size
+
+
+def affected(matrix, dirty_ids, k=TOP_K, metric='cosine'):
+    """id статей, чьи списки надо пересчитать после изменения dirty_ids."""
+    dirty_ids = sorted(dirty_ids)
+    result = set(dirty_ids)
+    for start in range(0, len(dirty_ids), BATCH):
+        result.update(
+            RelatedArticle.objects
+            .filter(related_id__in=dirty_ids[start:start + BATCH])
+            .values_list('article_id', flat=True)
+        )
+
+    rows = matrix.rows_of(dirty_ids)
+    if not len(rows):
+        return result
+    # лучшее новое сходство каждой статьи с кем-то из D
+    pairs = [matrix.similarities(chunk, metric) for chunk in matrix.chunks(rows)]
+    targets = np.concatenate([pair[1] for pair in pairs])
+    scores = np.concatenate([pair[2] for pair in pairs])
+    if not len(targets):
+        return result
+    order = np.argsort(targets, kind='stable')
+    targets, scores = targets[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, targets[1:] != targets[:-1]])
+    best = dict(zip(matrix.ids[targets[starts]].tolist(), np.maximum.reduceat(scores, starts).tolist()))
+
+    candidates = sorted(set(best) - result)
+    stored = {}
+    for start in range(0, len(candidates), BATCH):
+        for article_id, score in (
+            RelatedArticle.objects
+            .filter(article_id__in=candidates[start:start + BATCH])
+            .values_list('article_id', 'score')
+        ):
+            stored.setdefault(article_id, []).append(score)
+    for article_id in candidates:
+        scores = stored.get(article_id, [])
+        if len(scores) < k or best[article_id] >= min(scores):
+            result.add(article_id)
+    return result
+
+
+def recompute(article_ids, k=TOP_K, metric='cosine', matrix=None):
+    """Пересчитать списки article_ids; у статей без тегов список станет пустым."""
+    matrix = matrix if matrix is not None else TagMatrix.load()
+    article_ids = sorted(article_ids)
+    with transaction.atomic():
+        _replace(matrix, article_ids, *matrix.top_k(matrix.rows_of(article_ids), k, metric))
+    return len(article_ids)
+
+
+def update(k=TOP_K, metric='cosine', full=False):
+    """
+    Пересчёт по ленте изменений с сохранённой позиции; без позиции (первый
+    запуск, ``full``) или с устаревшей — полный. Вернуть (режим, статей).
+    """
+    cursor, _ = FeedCursor.objects.get_or_create(name=CURSOR_NAME)
+    dirty = set()
+    try:
+        if full or not cursor.token:
+            raise ResyncRequired
+        position = _parse_position(parse_cursor(cursor.token, 4, param='since'))
+        while True:
+            page = feed.changes(position, limit=BATCH)
+            dirty.update(item['id'] for item in page['changes'])
+            dirty.update(page['deleted'])
+            position = _parse_position(parse_cursor(page['next'], 4))
+            if not page['more']:
+                break
+        token = page['next']
+    except ResyncRequired:
+        # всё, что изменится после этой отметки, прочитает следующий запуск
+        moment = timezone.now() - datetime.timedelta(seconds=options()['SETTLE_SECONDS'])
+        token = encode_cursor(moment, 0, moment, 0)
+        mode, count = 'full', rebuild(k, metric)
+    else:
+        mode, count = 'incremental', 0
+        if dirty:
+            matrix = TagMatrix.load()
+            count = recompute(affected(matrix, dirty, k, metric), k, metric, matrix)
+    FeedCursor.objects.filter(pk=cursor.pk).update(token=token, updated_at=timezone.now())
+    return mode, count
@@ -0,0 +1,123 @@
+"""
+Сброс кеша новостей (website/cache.py, пространство имён 'articles')
+при любом изменении статей, тегов и их связей; счётчики статей
+по месяцам (articles/month_counts.py); updated_at и журнал удалений
+для ленты изменений (articles/changes.py); фоновые задачи на подписи
+MinHash и пары возможных дубликатов (articles/dedup.py) и уменьшение
+картинок (articles/tasks.py).
+"""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from website.cache import bump
+from website.changes import touch
+
+from . import changes, month_counts, tasks
+from .dictionaries import tags
+from .models import Article, DuplicateCandidate, Scope, Tag
+
+
+@receiver(post_save, sender=Article, dispatch_uid='articles_cache_article_saved')
+@receiver(post_delete, sender=Article, dispatch_uid='articles_cache_article_deleted')
+@receiver(post_save, sender=Scope, dispatch_uid='articles_cache_scope_saved')
+@receiver(post_delete, sender=Scope, dispatch_uid='articles_cache_scope_deleted')
+@receiver(post_save, sender=Tag, dispatch_uid='articles_cache_tag_saved')
+@receiver(post_delete, sender=Tag, dispatch_uid='articles_cache_tag_deleted')
+def invalidate_articles_cache(sender, using, **kwargs):
+    # после коммита: иначе кеш успеют заполнить старыми строками под новой версией
+    transaction.on_commit(lambda: bump('articles'), using=using)
+
+
+@receiver(m2m_changed, sender=Article.tags.through, dispatch_uid='articles_cache_tags_changed')
+def invalidate_articles_cache_m2m(sender, action, using, **kwargs):
+    # article.tags.add()/remove() создают Scope через bulk_create — без post_save
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(lambda: bump('articles'), using=using)
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='articles_tag_dictionary_saved')
+@receiver(post_delete, sender=Tag, dispatch_uid='articles_tag_dictionary_deleted')
+def invalidate_tag_dictionary(sender, using, **kwargs):
+    # справочник перечитывается только при новой версии — её ставим после коммита
+    transaction.on_commit(tags.invalidate, using=using)
+
+
+@receiver(pre_save, sender=Article, dispatch_uid='articles_month_count_before')
+def remember_article_month(sender, instance, **kwargs):
+    if '_loaded_published_at' in instance.__dict__ or instance.pk is None:
+        before = getattr(instance, '_loaded_published_at', None)
+    else:
+        # экземпляр собран вручную, с готовым pk: дата в БД неизвестна
+        before = sender._base_manager.filter(pk=instance.pk).values_list('published_at', flat=True).first()
+    instance._month_before = month_counts.month_of(before) if before else None
+
+
+@receiver(post_save, sender=Article, dispatch_uid='articles_month_count_saved')
+def count_saved_article(sender, instance, created, **kwargs):
+    before = None if created else instance._month_before
+    after = month_counts.month_of(instance.published_at)
+    if before != after:
+        if before:
+            month_counts.adjust(before, -1)
+        month_counts.adjust(after, 1)
+    instance._loaded_published_at = instance.published_at
+
+
+@receiver(post_delete, sender=Article, dispatch_uid='articles_month_count_deleted')
+def count_deleted_article(sender, instance, **kwargs):
+    month_counts.adjust(month_counts.month_of(instance.published_at), -1)
+
+
+@receiver(post_delete, sender=Article, dispatch_uid='articles_changes_article_deleted')
+def log_deleted_article(sender, instance, using, **kwargs):
+    changes.articles.forget([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Scope, dispatch_uid='articles_changes_scope_saved')
+@receiver(post_delete, sender=Scope, dispatch_uid='articles_changes_scope_deleted')
+def touch_scope_article(sender, instance, using, **kwargs):
+    touch(Article.objects.using(using).filter(pk=instance.article_id))
+
+
+@receiver(m2m_changed, sender=Article.tags.through, dispatch_uid='articles_changes_tags_changed')
+def touch_tagged_articles(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch(Article.objects.using(using).filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        # после clear() статьи тега уже не найти
+        touch(Article.objects.using(using).filter(scopes__tag=instance))
+    else:
+        touch(Article.objects.using(using).filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='articles_changes_tag_saved')
+def touch_renamed_tag_articles(sender, instance, created, using, **kwargs):
+    # имя тега входит в запись ленты
+    if not created:
+        touch(Article.objects.using(using).filter(scopes__tag=instance))
+
+
+
+@receiver(post_save, sender=Article, dispatch_uid='articles_dedup_article_saved')
+def index_saved_article(sender, instance, raw, update_fields, **kwargs):
+    # фикстуры (raw) и правки без заголовка и текста подпись не меняют;
+    # статьи из loaddata/bulk_create подхватит manage.py find_duplicates
+    if raw or (update_fields is not None and not {'title', 'text'} & set(update_fields)):
+        return
+    tasks.index_duplicates.enqueue({'article_id': instance.pk}, key=f'dedup:{instance.pk}')
+
+
+@receiver(post_save, sender=Article, dispatch_uid='articles_image_article_saved')
+def process_saved_image(sender, instance, raw, update_fields, **kwargs):
+    if raw or not instance.image or (update_fields is not None and 'image' not in update_fields):
+        return
+    tasks.process_image.enqueue({'article_id': instance.pk}, key=f'image:{instance.pk}')
+
+
+@receiver(post_delete, sender=Article, dispatch_uid='articles_dedup_article_deleted')
+def forget_deleted_original(sender, instance, **kwargs):
+    # строки, где статья — дубликат, удаляет CASCADE; где оригинал — здесь
+    DuplicateCandidate.objects.filter(original_id=instance.pk).delete()
@@ -0,0 +1,114 @@
+"""
+Карта сайта: индекс и куски по месяцам.
+
+    /sitemap.xml                   — индекс: страницы + по куску на месяц
+    /sitemap-pages.xml             — главная и архив
+    /sitemap-articles-2018-07.xml  — статьи месяца (горячие и архивные)
+
+Индекс строится из ArticleMonthCount (строка на месяц, articles/month_counts.py)
+одним запросом, без COUNT по статьям. Кусок читает один месяц по индексу
+(published_at, id); если в месяце больше Sitemap.limit статей, он
+делится на страницы ``?p=N``. Собранные куски кешируются до изменения
+статей (website/cache.py, пространство 'articles'), ответы отдаются
+с ETag и поддерживают условный GET.
+"""
+import datetime
+import math
+
+from django.contrib.sitemaps import Sitemap
+from django.contrib.sitemaps.views import SitemapIndexItem, sitemap, x_robots_tag
+from django.contrib.sites.requests import RequestSite
+from django.http import Http404, HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.views.decorators.http import conditional_page
+
+from website.cache import cached
+
+from . import month_counts
+from .models import ArchivedArticle, Article, ArticleMonthCount
+
+SECTION_PREFIX = 'articles-'
+
+
+class PagesSitemap(Sitemap):
+    changefreq = 'hourly'
+
+    def items(self):
+        return ['articles', 'archive']
+
+    def location(self, name):
+        return reverse(name)
+
+
+class MonthSitemap(Sitemap):
+    """Статьи одного месяца из обеих таблиц: (id, updated_at) без моделей."""
+    changefreq = 'monthly'
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    def items(self):
+        month = self.counts.month
+        start, end = month_counts.month_bounds(month.year, month.month)
+        rows = []
+        for model, count in ((Article, self.counts.articles), (ArchivedArticle, self.counts.archived)):
+            if count:
+                rows.extend(
+                    model.objects
+                    .filter(published_at__gte=start, published_at__lt=end)
+                    .order_by('published_at', 'id')
+                    .values_list('id', 'updated_at')
+                )
+        return rows
+
+    def location(self, item):
+        return reverse('article', args=[item[0]])
+
+    def lastmod(self, item):
+        return item[1]
+
+
+def section_name(month):
+    return f'{SECTION_PREFIX}{month:%Y-%m}'
+
+
+@x_robots_tag
+@conditional_page
+def sitemap_index(request):
+    base = f'{request.scheme}://{RequestSite(request).domain}'
+    items = [SitemapIndexItem(base + reverse('sitemap_section', args=['pages']), None)]
+    for counts in ArticleMonthCount.objects.filter(month_counts.NOT_EMPTY):
+        url = base + reverse('sitemap_section', args=[section_name(counts.month)])
+        pages = max(1, math.ceil(counts.total / Sitemap.limit))
+        items.append(SitemapIndexItem(url, None))
+        items.extend(SitemapIndexItem(f'{url}?p={page}', None) for page in range(2, pages + 1))
+    return TemplateResponse(request, 'sitemap_index.xml', {'sitemaps': items}, content_type='application/xml')
+
+
+@cached('articles', key=lambda request, section: (
+    request.scheme, request.get_host(), section, request.GET.get('p', '1'),
+))
+def render_section(request, section):
+    if section == 'pages':
+        site = PagesSitemap()
+    elif section.startswith(SECTION_PREFIX):
+        try:
+            month = datetime.datetime.strptime(section[len(SECTION_PREFIX):], '%Y-%m').date()
+            counts = ArticleMonthCount.objects.filter(month=month).first()
+        except ValueError:
+            counts = None
+        if counts is None or not counts.total:
+            raise Http404
+        site = MonthSitemap(counts)
+    else:
+        raise Http404
+    response = sitemap(request, {section: site}, section=section)
+    response.render()
+    return response.content
+
+
+@x_robots_tag
+@conditional_page
+def sitemap_section(request, section):
+    return HttpResponse(render_section(request, section), content_type='application/xml')
@@ -0,0 +1,61 @@
+"""
+Фоновые задачи статей (jobs/queue.py): тяжёлая работа после сохранения
+статьи уходит из запроса в воркер ``manage.py jobs_worker``.
+
+  * подпись MinHash и пары возможных дубликатов (articles/dedup.py);
+  * уменьшение загруженной картинки до ARTICLE_IMAGE_MAX_SIDE по большей
+    стороне.
+
+Ставит их articles/signals.py; ключ — по статье, так что несколько
+сохранений подряд дают одну задачу.
+"""
+import io
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from jobs.queue import task
+
+from .models import Article
+
+
+@task('articles.index_duplicates', timeout=60)
+def index_duplicates(article_id):
+    article = Article.objects.filter(pk=article_id).only('title', 'text').first()
+    if article is None:
+        return
+    # numpy — в воркере при первой задаче, а не при старте: его пул потоков
+    # не переживает fork (воркеры gunicorn --preload, параллельные тесты)
+    from . import dedup
+
+    dedup.index_article(article)
+
+
+@task('articles.process_image', priority=-1, timeout=120)
+def process_image(article_id):
+    from PIL import Image
+
+    article = Article.objects.filter(pk=article_id).only('image').first()
+    if article is None or not article.image:
+        return
+    max_side = getattr(settings, 'ARTICLE_IMAGE_MAX_SIDE', 1600)
+    storage, name = article.image.storage, article.image.name
+    with storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image.load()
+    if max(image.size) <= max_side:
+        return
+    image_format = image.format
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    # уменьшенная копия — под новым именем (storage добавит суффикс), старый
+    # файл удаляем, только когда статья уже указывает на копию: читатели
+    # не получают 404, а неудачная запись не теряет картинку
+    saved = storage.save(name, ContentFile(buffer.getvalue()))
+    # update, а не save(): сохранение снова поставило бы задачу;
+    # условие — картинку за это время не заменили и статью не удалили
+    if Article.objects.filter(pk=article_id, image=name).update(image=saved):
+        storage.delete(name)
+    else:
+        storage.delete(saved)
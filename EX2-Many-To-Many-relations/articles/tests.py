@@ -1,5 +1,7 @@
 # articles/tests.py
-from django.test import TestCase, Client
+import io
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.db import IntegrityError, transaction
 from django.utils import timezone
@@ -154,3 +156,1377 @@ class AdminInlineValidationTests(TestCase):
             {"tag": self.t2.id, "is_main": False},
         ])
         self.assertTrue(fs.is_valid(), f"Формсет должен быть валиден, но есть ошибки: {fs.errors} {fs.non_form_errors()}")
+
+
+class StaticPipelineTests(TestCase):
+    """
+    collectstatic: отпечатки + .gz копии; WSGI-обработчик статики
+    и встроенный критический CSS.
+    """
+    def setUp(self):
+        import tempfile
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(__import__("shutil").rmtree, self.static_root, True)
+
+    def _collect(self):
+        from django.core.management import call_command
+        from django.test import override_settings
+        with override_settings(STATIC_ROOT=self.static_root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            from django.contrib.staticfiles.storage import staticfiles_storage
+            return staticfiles_storage.stored_name("css/bootstrap.min.css")
+
+    def _call(self, app, path, **environ):
+        from wsgiref.util import setup_testing_defaults
+        env = {"PATH_INFO": path, **environ}
+        setup_testing_defaults(env)
+        status = {}
+
+        def start_response(st, headers):
+            status["status"] = st
+            status["headers"] = dict(headers)
+
+        body = b"".join(app(env, start_response))
+        return status["status"], status["headers"], body
+
+    def test_collectstatic_fingerprints_and_compresses(self):
+        import os
+        hashed = self._collect()
+        self.assertNotEqual(hashed, "css/bootstrap.min.css")
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, hashed + ".gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, "staticfiles.json")))
+
+    def test_handler_negotiates_encoding_and_caches_forever(self):
+        from website.static_handler import PrecompressedStaticFiles
+        hashed = self._collect()
+        fallback = lambda env, start: start("404 Not Found", []) or [b"app"]  # noqa: E731
+        app = PrecompressedStaticFiles(fallback, root=self.static_root, prefix="/static/")
+
+        status, headers, body = self._call(app, "/static/" + hashed, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", headers["Cache-Control"])
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(int(headers["Content-Length"]), len(body))
+
+        status, _, _ = self._call(app, "/static/" + hashed, HTTP_ACCEPT_ENCODING="gzip",
+                                  HTTP_IF_NONE_MATCH=headers["ETag"])
+        self.assertEqual(status, "304 Not Modified")
+
+        # без Accept-Encoding — оригинал; вне префикса и ../ — в приложение
+        _, headers, _ = self._call(app, "/static/" + hashed)
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(self._call(app, "/static/../settings.py")[2], b"app")
+        self.assertEqual(self._call(app, "/")[2], b"app")
+
+    def test_handler_compares_whole_etags_and_skips_misses(self):
+        from website.static_handler import PrecompressedStaticFiles
+        hashed = self._collect()
+        fallback = lambda env, start: start("404 Not Found", []) or [b"app"]  # noqa: E731
+        app = PrecompressedStaticFiles(fallback, root=self.static_root, prefix="/static/")
+
+        etag = self._call(app, "/static/" + hashed)[1]["ETag"]
+        self.assertEqual(self._call(app, "/static/" + hashed, HTTP_IF_NONE_MATCH='"x", W/' + etag)[0],
+                         "304 Not Modified")
+        # ETag несжатого варианта — подстрока ETag'а gzip-варианта
+        self.assertEqual(self._call(app, "/static/" + hashed, HTTP_IF_NONE_MATCH=etag[:-1] + '-gzip"')[0],
+                         "200 OK")
+
+        # промахи не оседают в кэше обработчика
+        for i in range(20):
+            self.assertEqual(self._call(app, f"/static/missing-{i}.css")[2], b"app")
+        self.assertEqual(list(app._files), [hashed])
+
+    def test_critical_css_is_inlined(self):
+        resp = Client().get(reverse("articles"))
+        html = resp.content.decode("utf-8")
+        self.assertIn("<style>body{padding-top:84px", html)
+        self.assertNotIn("3-col-portfolio.css", html)
+
+
+class ArticlesApiTests(TestCase):
+    """JSON API: теги по порядку, выбор полей, keyset-пагинация, без моделей."""
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import timedelta
+        now = timezone.now()
+        cls.tags = [Tag.objects.create(name=n) for n in ("Analytics", "Backend", "Cloud")]
+        cls.articles = []
+        for i in range(5):
+            article = Article.objects.create(
+                title=f"Статья {i}", text="Текст", published_at=now - timedelta(days=i),
+            )
+            cls.articles.append(article)
+        a = cls.articles[0]
+        Scope.objects.create(article=a, tag=cls.tags[2], is_main=True)
+        Scope.objects.create(article=a, tag=cls.tags[0], is_main=False)
+        Scope.objects.create(article=a, tag=cls.tags[1], is_main=False)
+
+    def test_tags_are_ordered_main_first(self):
+        resp = self.client.get(reverse("articles_api"))
+        self.assertEqual(resp.status_code, 200)
+        first = resp.json()["results"][0]
+        self.assertEqual(first["id"], self.articles[0].id)
+        self.assertEqual(
+            first["tags"],
+            [{"name": "Cloud", "is_main": True},
+             {"name": "Analytics", "is_main": False},
+             {"name": "Backend", "is_main": False}],
+        )
+
+    def test_field_selection_and_keyset_paging(self):
+        url = reverse("articles_api")
+        seen = []
+        params = {"limit": 2, "fields": "title"}
+        while True:
+            data = self.client.get(url, params).json()
+            for item in data["results"]:
+                self.assertEqual(set(item), {"id", "title"})
+                seen.append(item["id"])
+            if not data["next"]:
+                break
+            params["after"] = data["next"]
+        self.assertEqual(seen, [a.id for a in self.articles])
+
+    def test_bad_parameters(self):
+        url = reverse("articles_api")
+        self.assertEqual(self.client.get(url, {"fields": "nope"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"limit": "0"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"after": "!!!"}).status_code, 400)
+
+    def test_no_model_instances_are_created(self):
+        from django.db.models.signals import post_init
+        created = []
+
+        def on_init(sender, **kwargs):
+            created.append(sender)
+
+        post_init.connect(on_init)
+        try:
+            self.client.get(reverse("articles_api"))
+        finally:
+            post_init.disconnect(on_init)
+        self.assertFalse({Article, Scope, Tag} & set(created))
+
+
+class ReadModelTests(TestCase):
+    """Список строится из ArticleCard, а не из экземпляров моделей."""
+    def setUp(self):
+        self.tag_main = Tag.objects.create(name="Zeta")
+        self.tag_other = Tag.objects.create(name="Alpha")
+        self.article = Article.objects.create(
+            title="Карточка", text="Текст карточки", published_at=timezone.now(),
+        )
+        Scope.objects.create(article=self.article, tag=self.tag_main, is_main=True)
+        Scope.objects.create(article=self.article, tag=self.tag_other, is_main=False)
+        Article.objects.create(title="Без тегов", text="-", published_at=timezone.now())
+
+    def test_cards_match_prefetch_shape(self):
+        from .read_models import ArticleCard
+        cards = {card.id: card for card in Article.objects.as_cards()}
+        card = cards[self.article.id]
+        self.assertIsInstance(card, ArticleCard)
+        self.assertEqual(card.image, "")
+        self.assertEqual(
+            [(s.tag.name, s.is_main) for s in card.scopes.all()],
+            [("Zeta", True), ("Alpha", False)],
+        )
+        self.assertFalse(hasattr(card, "__dict__"))
+
+    def test_list_view_uses_two_queries(self):
+        # справочник тегов уже в памяти: статьи + id тегов из Scope, без JOIN
+        from .dictionaries import tags
+        tags.records()
+        with self.assertNumQueries(2):
+            resp = self.client.get(reverse("articles"))
+        self.assertContains(resp, "Текст карточки")
+        self.assertContains(resp, "badge-primary\">Zeta")
+
+
+class ExcerptTests(TestCase):
+    """Анонс считается в save(), список не тянет полный текст."""
+    def setUp(self):
+        self.long_text = "<p>Начало новости.</p> " + "слово " * 400 + "КОНЕЦ_ТЕКСТА"
+        self.article = Article.objects.create(
+            title="Длинная", text=self.long_text, published_at=timezone.now(),
+        )
+
+    def test_excerpt_is_computed_on_save(self):
+        from .models import EXCERPT_LENGTH
+        self.assertTrue(self.article.excerpt.startswith("Начало новости. слово"))
+        self.assertLessEqual(len(self.article.excerpt), EXCERPT_LENGTH)
+        self.article.text = "Новый текст"
+        self.article.save(update_fields=["text"])
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.excerpt, "Новый текст")
+
+    def test_list_renders_excerpt_and_detail_renders_text(self):
+        resp = self.client.get(reverse("articles"))
+        self.assertNotContains(resp, "КОНЕЦ_ТЕКСТА")
+        self.assertContains(resp, self.article.get_absolute_url())
+
+        resp = self.client.get(self.article.get_absolute_url())
+        self.assertContains(resp, "КОНЕЦ_ТЕКСТА")
+        self.assertEqual(self.client.get(reverse("article", args=[0])).status_code, 404)
+
+    def test_backfill_command(self):
+        from django.core.management import call_command
+        from io import StringIO
+        Article.objects.filter(pk=self.article.pk).update(excerpt="")
+        call_command("backfill_excerpts", stdout=StringIO())
+        self.article.refresh_from_db()
+        self.assertTrue(self.article.excerpt.startswith("Начало новости."))
+
+
+TIERED_CACHE_ON = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "TIERED_CACHE": {"ENABLED": True, "LOCAL_MAX_BYTES": 1024 * 1024},
+}
+
+
+class TieredCacheTests(TestCase):
+    """LRU по размеру, single-flight, soft TTL и инвалидация по версии."""
+    def setUp(self):
+        from django.test import override_settings
+        override = override_settings(**TIERED_CACHE_ON)
+        override.enable()
+        self.addCleanup(override.disable)
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_lru_evicts_by_size(self):
+        from website.cache import LRUCache
+        lru = LRUCache(max_bytes=100)
+        lru.set("a", 1, 40)
+        lru.set("b", 2, 40)
+        lru.get("a")            # a — свежий, вытеснять надо b
+        lru.set("c", 3, 40)
+        self.assertEqual(lru.get("a"), 1)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual(lru.total_bytes, 80)
+        lru.set("huge", 4, 1000)  # больше лимита — не кладём вовсе
+        self.assertIsNone(lru.get("huge"))
+
+    def test_single_flight(self):
+        import threading
+        import time
+        from website.cache import get_cache
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_cache().get_or_compute("k", compute)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 8)
+
+    def test_soft_ttl_serves_stale_and_refreshes_in_background(self):
+        import threading
+        from website.cache import get_cache
+        tiered = get_cache()
+        tiered.get_or_compute("k", lambda: "old", soft_ttl=0)
+        refreshed = threading.Event()
+
+        def compute():
+            refreshed.set()
+            return "new"
+
+        self.assertEqual(tiered.get_or_compute("k", compute, soft_ttl=0), "old")
+        self.assertTrue(refreshed.wait(2))
+        for t in threading.enumerate():
+            if t.name.startswith("cache-refresh:"):
+                t.join()
+        self.assertEqual(tiered.get_or_compute("k", compute), "new")
+
+    def test_list_is_cached_until_data_changes(self):
+        tag = Tag.objects.create(name="Кеш")
+        article = Article.objects.create(title="Закешированная", text="-", published_at=timezone.now())
+        self.client.get(reverse("articles"))
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse("articles"))
+        self.assertContains(resp, "Закешированная")
+        self.assertNotContains(resp, "Кеш<")
+
+        # кеш сбрасывается после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            Scope.objects.create(article=article, tag=tag, is_main=True)
+        self.assertContains(self.client.get(reverse("articles")), "Кеш<")
+
+
+class TagDictionaryTests(TestCase):
+    """Справочник тегов в памяти: загрузка один раз, сброс по версии."""
+    def setUp(self):
+        from .dictionaries import tags
+        # id в SQLite переиспользуются после отката — начинаем с пустого справочника
+        tags.clear()
+
+    def test_loaded_once_and_refreshed_on_change(self):
+        from .dictionaries import tags
+        tag = Tag.objects.create(name="Python")
+        self.assertEqual(tags[tag.id].name, "Python")
+        with self.assertNumQueries(0):
+            self.assertEqual(tags.get(tag.id).name, "Python")
+
+        tag.name = "Django"
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+            # до коммита — прежняя версия и прежние данные
+            self.assertEqual(tags[tag.id].name, "Python")
+        self.assertEqual(tags[tag.id].name, "Django")
+
+    def test_unknown_id_triggers_reload(self):
+        from .dictionaries import tags
+        tags.records()
+        # bulk_create не шлёт post_save — справочник узнаёт о теге по промаху
+        new_tag, = Tag.objects.bulk_create([Tag(name="Новый")])
+        new_tag = Tag.objects.get(name="Новый")
+        self.assertEqual(tags.get_many([new_tag.id])[new_tag.id].name, "Новый")
+        self.assertIsNone(tags.get(-1))
+
+
+class ProgressTestRunnerTests(TestCase):
+    """Порядок по истории прогонов и счётчик запросов раннера."""
+    def test_slow_classes_go_first_within_group(self):
+        from .tests_runner import ProgressTestRunner
+
+        class Fast(TestCase):
+            def test_a(self): pass
+            def test_b(self): pass
+
+        class Slow(TestCase):
+            def test_c(self): pass
+
+        class Simple(SimpleTestCase):
+            def test_d(self): pass
+
+        tests = [Fast("test_a"), Fast("test_b"), Slow("test_c"), Simple("test_d")]
+        runner = ProgressTestRunner(parallel=1, slowest=0, verbosity=0)
+        runner.state = {"durations": {tests[0].id(): 0.1, tests[1].id(): 0.1, tests[2].id(): 2.0}}
+        ordered = runner.order_by_history(tests)
+        # SimpleTestCase остаётся после TestCase, тесты класса — рядом и по порядку
+        self.assertEqual([t._testMethodName for t in ordered], ["test_c", "test_a", "test_b", "test_d"])
+
+    def test_query_counter(self):
+        from django.db import connection
+        from .tests_runner import QueryCounter
+
+        counter = QueryCounter()
+        counter.start()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.execute("SELECT 2")
+        self.assertEqual(counter.stop(), 2)
+        self.assertNotIn(counter, connection.execute_wrappers)
+
+
+class LoadHarnessTests(SimpleTestCase):
+    """website/loadtest.py: клиент, открытая/закрытая модель и перцентили."""
+    @staticmethod
+    def app(environ, start_response):
+        status = "404 Not Found" if environ["PATH_INFO"] == "/missing/" else "200 OK"
+        body = b"ok" * 100
+        start_response(status, [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))])
+        return [body]
+
+    def test_percentile_nearest_rank(self):
+        from website.loadtest import percentile
+        values = [i / 1000 for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 0.05)
+        self.assertEqual(percentile(values, 99), 0.099)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_drive_closed_and_open_loop(self):
+        import asyncio
+        from website.loadtest import drive, inprocess_server, summarize
+
+        with inprocess_server(self.app) as base_url:
+            samples, elapsed = asyncio.run(
+                drive(base_url, ["/", "/missing/"], duration=0.3, concurrency=4)
+            )
+            report = summarize(samples, elapsed)
+            self.assertGreater(report["total"]["requests"], 0)
+            self.assertEqual(report["paths"]["/"]["errors"], 0)
+            self.assertEqual(report["paths"]["/missing/"]["errors"], report["paths"]["/missing/"]["requests"])
+
+            samples, elapsed = asyncio.run(
+                drive(base_url, ["/"], duration=0.3, rate=50, warmup=0.1, seed=1)
+            )
+            self.assertTrue(all(status == 200 for _path, _latency, status in samples))
+            total = summarize(samples, elapsed)["total"]
+            self.assertLessEqual(total["p50_ms"], total["p95_ms"])
+            self.assertLessEqual(total["p95_ms"], total["p99_ms"])
+
+
+class WarmupTests(TestCase):
+    """website/warmup.py: все фазы проходят, справочники после прогрева в памяти."""
+    def test_all_phases_succeed(self):
+        from website import warmup
+        from .dictionaries import tags
+
+        tags.clear()
+        results = warmup.run()
+        self.assertEqual([r.error for r in results if r.error], [])
+        names = [r.name for r in results]
+        self.assertEqual(names[:3], ["urls", "admin", "templates"])
+        self.assertIn("articles: лента", names)
+        with self.assertNumQueries(0):
+            tags.records()
+
+    def test_no_db_skips_database_phases(self):
+        from website import warmup
+
+        with self.assertNumQueries(0):
+            results = warmup.run(include_db=False)
+        self.assertNotIn("database", [r.name for r in results])
+
+
+class WarmupConnectionTests(TransactionTestCase):
+    """Прогрев при старте не оставляет открытых подключений для форкнутых воркеров."""
+    def test_startup_closes_connections(self):
+        from unittest import mock
+
+        from django.db import connection
+        from website import warmup
+
+        with override_settings(WARMUP_ON_STARTUP=True), mock.patch.object(connection, "close") as close:
+            warmup.warm_up_on_startup()
+        close.assert_called_once_with()
+
+
+class PartitionTests(TestCase):
+    """articles/partitions.py: месяцы и архивный уровень (на SQLite — переносом строк)."""
+    def test_month_arithmetic(self):
+        from .partitions import add_months, month_range, parse_month, partition_name
+
+        december = parse_month("2023-12")
+        self.assertEqual(add_months(december, 1), parse_month("2024-01"))
+        self.assertEqual(add_months(december, -12), parse_month("2022-12"))
+        self.assertEqual(len(list(month_range(december, parse_month("2024-03")))), 4)
+        self.assertEqual(partition_name("articles_article", december), "articles_article_p2023_12")
+
+    def test_archive_before_moves_articles_and_scopes(self):
+        from django.core.management import call_command
+        from .models import ArchivedArticle, ArchivedScope
+        from .partitions import parse_month
+
+        tag = Tag.objects.create(name="История")
+        old = Article.objects.create(
+            title="Старая", text="-", published_at=parse_month("2018-07") + timezone.timedelta(days=3),
+        )
+        Scope.objects.create(article=old, tag=tag, is_main=True)
+        fresh = Article.objects.create(title="Свежая", text="-", published_at=timezone.now())
+        Scope.objects.create(article=fresh, tag=tag, is_main=True)
+
+        call_command("article_partitions", archive_before="2019-01", stdout=io.StringIO())
+
+        self.assertEqual(list(Article.objects.values_list("title", flat=True)), ["Свежая"])
+        archived = ArchivedArticle.objects.get()
+        self.assertEqual((archived.id, archived.title), (old.id, "Старая"))
+        self.assertEqual(list(ArchivedScope.objects.values_list("article_id", "tag_id", "is_main")),
+                         [(old.id, tag.id, True)])
+        self.assertEqual(Scope.objects.get().article_id, fresh.id)
+        self.assertNotContains(self.client.get(reverse("articles")), "Старая")
+
+
+class MonthArchiveTests(TestCase):
+    """Архив по месяцам: счётчики ArticleMonthCount, страницы /archive/ и фильтр админки."""
+    def setUp(self):
+        from .dictionaries import tags
+        from .partitions import parse_month
+
+        tags.clear()
+        self.july = parse_month("2018-07")
+        self.tag = Tag.objects.create(name="История")
+        self.first = Article.objects.create(title="Первая", text="-", published_at=self.july + timezone.timedelta(days=2))
+        self.second = Article.objects.create(title="Вторая", text="-", published_at=self.july + timezone.timedelta(days=9))
+        Scope.objects.create(article=self.first, tag=self.tag, is_main=True)
+
+    def counts(self):
+        from .models import ArticleMonthCount
+
+        return {
+            f"{row.month:%Y-%m}": (row.articles, row.archived)
+            for row in ArticleMonthCount.objects.all()
+        }
+
+    def test_counts_follow_save_and_delete(self):
+        self.assertEqual(self.counts(), {"2018-07": (2, 0)})
+
+        article = Article.objects.get(pk=self.second.pk)
+        article.published_at += timezone.timedelta(days=30)
+        article.save()
+        article.title = "Вторая, правка"
+        article.save()
+        self.assertEqual(self.counts(), {"2018-07": (1, 0), "2018-08": (1, 0)})
+
+        # экземпляр не из БД: старая дата читается перед сохранением
+        Article(pk=self.first.pk, title="Первая", text="-", published_at=article.published_at).save()
+        self.assertEqual(self.counts(), {"2018-07": (0, 0), "2018-08": (2, 0)})
+
+        Article.objects.filter(pk=article.pk).delete()
+        self.assertEqual(self.counts(), {"2018-07": (0, 0), "2018-08": (1, 0)})
+
+    def test_month_uses_project_time_zone(self):
+        from .month_counts import month_of
+
+        # 31.07 23:30 по Москве — это ещё июль, хотя в UTC уже 20:30 того же дня
+        late = timezone.make_aware(timezone.datetime(2018, 7, 31, 23, 30))
+        self.assertEqual(month_of(late), timezone.datetime(2018, 7, 1).date())
+
+    def test_rebuild_and_archive_shift(self):
+        from django.core.management import call_command
+        from .models import ArticleMonthCount
+
+        Article.objects.filter(pk=self.second.pk).update(published_at=self.july - timezone.timedelta(days=5))
+        call_command("rebuild_month_counts", stdout=io.StringIO())
+        self.assertEqual(self.counts(), {"2018-06": (1, 0), "2018-07": (1, 0)})
+
+        call_command("article_partitions", archive_before="2018-07", stdout=io.StringIO())
+        self.assertEqual(self.counts(), {"2018-06": (0, 1), "2018-07": (1, 0)})
+        ArticleMonthCount.objects.all().delete()
+        call_command("rebuild_month_counts", stdout=io.StringIO())
+        self.assertEqual(self.counts(), {"2018-06": (0, 1), "2018-07": (1, 0)})
+
+    def test_archive_pages(self):
+        from django.core.management import call_command
+
+        call_command("article_partitions", archive_before="2018-08", stdout=io.StringIO())
+        Article.objects.create(title="Июльская", text="-", published_at=self.july + timezone.timedelta(days=20))
+        self.assertEqual(self.counts(), {"2018-07": (1, 2)})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("archive"))
+        self.assertContains(response, reverse("archive_month", args=[2018, 7]))
+        self.assertContains(response, ">3<")
+
+        response = self.client.get(reverse("archive_month", args=[2018, 7]))
+        titles = [card.title for card in response.context["object_list"]]
+        self.assertEqual(titles, ["Июльская", "Вторая", "Первая"])
+        self.assertContains(response, "История")
+
+        self.assertEqual(self.client.get(reverse("archive_month", args=[2018, 6])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("archive_month", args=[2018, 13])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("archive_year", args=[2017])).status_code, 404)
+
+    def test_archived_article_detail(self):
+        from django.core.management import call_command
+
+        call_command("article_partitions", archive_before="2019-01", stdout=io.StringIO())
+        response = self.client.get(reverse("article", args=[self.first.pk]))
+        self.assertContains(response, "Первая")
+        self.assertContains(response, "История")
+
+    def test_admin_filters_use_month_counts(self):
+        from django.contrib.auth.models import User
+
+        Article.objects.create(title="Свежая", text="-", published_at=self.july.replace(year=2019))
+        admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        self.client.force_login(admin)
+        url = reverse("admin:articles_article_changelist")
+
+        response = self.client.get(url)
+        self.assertContains(response, "2018 (2)")
+        self.assertContains(response, "2019 (1)")
+
+        response = self.client.get(url, {"published_year": "2018"})
+        self.assertEqual(response.context["cl"].result_count, 2)
+        self.assertContains(response, "Июль 2018 (2)")
+        self.assertNotContains(response, "Июль 2019")
+
+        response = self.client.get(url, {"published_month": "2019-07"})
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+
+@override_settings(CHANGE_FEED={"SETTLE_SECONDS": 0, "RETENTION_DAYS": 30})
+class ChangeFeedTests(TestCase):
+    """/api/articles/changes/: updated_at, касание статьи при правке тегов, журнал удалений."""
+    def setUp(self):
+        from .dictionaries import tags
+
+        tags.clear()
+        self.tag = Tag.objects.create(name="Наука")
+        self.first = Article.objects.create(title="Первая", text="-", published_at=timezone.now())
+        self.second = Article.objects.create(title="Вторая", text="-", published_at=timezone.now())
+        Scope.objects.create(article=self.first, tag=self.tag, is_main=True)
+
+    def feed(self, since=None, **params):
+        if since:
+            params["since"] = since
+        response = self.client.get(reverse("articles_changes"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_sync_then_deltas(self):
+        page = self.feed(limit=1)
+        self.assertEqual([item["id"] for item in page["changes"]], [self.second.pk])
+        self.assertTrue(page["more"])
+        page = self.feed(page["next"], limit=1)
+        self.assertEqual(page["changes"][0]["tags"], [{"name": "Наука", "is_main": True}])
+        page = self.feed(page["next"])
+        self.assertEqual((page["changes"], page["deleted"], page["more"]), ([], [], False))
+
+        token = page["next"]
+        self.tag.name = "Физика"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.save()
+        deleted = self.second.pk
+        self.second.delete()
+        # записи, журнал, тематики и справочник тегов (перечитывается после переименования)
+        with self.assertNumQueries(4):
+            page = self.feed(token)
+        self.assertEqual([item["id"] for item in page["changes"]], [self.first.pk])
+        self.assertEqual(page["changes"][0]["tags"], [{"name": "Физика", "is_main": True}])
+        self.assertEqual(page["deleted"], [deleted])
+        self.assertEqual(self.feed(page["next"])["changes"], [])
+
+    def test_relation_changes_touch_article(self):
+        token = self.feed()["next"]
+        self.second.tags.add(self.tag, through_defaults={"is_main": True})
+        self.assertEqual([item["id"] for item in self.feed(token)["changes"]], [self.second.pk])
+
+        token = self.feed(token)["next"]
+        self.tag.articles.clear()
+        ids = {item["id"] for item in self.feed(token)["changes"]}
+        self.assertEqual(ids, {self.first.pk, self.second.pk})
+
+    def test_settle_window_and_bad_tokens(self):
+        with self.settings(CHANGE_FEED={"SETTLE_SECONDS": 60, "RETENTION_DAYS": 30}):
+            self.assertEqual(self.feed()["changes"], [])
+        response = self.client.get(reverse("articles_changes"), {"since": "мусор"})
+        self.assertEqual(response.status_code, 400)
+
+        from website.api import encode_cursor
+        stale = encode_cursor(timezone.now(), 0, timezone.now() - timezone.timedelta(days=31), 0)
+        self.assertEqual(self.client.get(reverse("articles_changes"), {"since": stale}).status_code, 410)
+
+    def test_command_and_prune(self):
+        import json
+        from django.core.management import call_command
+        from .models import Tombstone
+
+        out = io.StringIO()
+        call_command("changes", "articles", "--all", "--limit", "1", stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line.get("id") for line in lines[:-1]], [self.second.pk, self.first.pk])
+        self.assertEqual(lines[-1]["more"], False)
+
+        self.second.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timezone.timedelta(days=40))
+        call_command("changes", "--prune", stdout=io.StringIO())
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class ExportTests(TestCase):
+    """website/export.py: статьи с тегами одним запросом, CSV/NDJSON, gzip."""
+    def setUp(self):
+        self.main = Tag.objects.create(name="Физика")
+        self.other = Tag.objects.create(name="Астрономия")
+        self.article = Article.objects.create(title="С тегами", text="Текст", published_at=timezone.now())
+        Scope.objects.create(article=self.article, tag=self.main, is_main=True)
+        Scope.objects.create(article=self.article, tag=self.other, is_main=False)
+        self.bare = Article.objects.create(title="Без тегов", text="-", published_at=timezone.now())
+
+    def test_ndjson_main_tag_first(self):
+        import json
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        with self.assertNumQueries(1):
+            call_command("export", "articles", "--format", "ndjson", stdout=out)
+        rows = {row["id"]: row for row in map(json.loads, out.getvalue().splitlines())}
+        self.assertEqual(rows[self.article.pk]["tags"], ["Физика", "Астрономия"])
+        self.assertEqual(rows[self.article.pk]["main_tag"], "Физика")
+        self.assertEqual((rows[self.bare.pk]["tags"], rows[self.bare.pk]["main_tag"]), ([], None))
+
+    def test_gzip_stream_is_chunked(self):
+        import csv
+        import gzip
+        from unittest import mock
+        from .exports import articles
+
+        with mock.patch("website.export.CHUNK_SIZE", 10):
+            chunks = list(articles.stream("csv"))
+        # кусок на каждую строку: заголовок уходит с первой
+        self.assertEqual(len(chunks), 2)
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b"".join(articles.stream("csv", compress=True))).decode())))
+        self.assertEqual(rows[0][:4], ["id", "title", "published_at", "main_tag"])
+        self.assertEqual(len(rows), 3)
+
+    def test_admin_action(self):
+        import gzip
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pass"))
+        response = self.client.post(reverse("admin:articles_article_changelist"), {
+            "action": "export_articles_ndjson",
+            "_selected_action": [self.article.pk],
+        })
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        body = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8")
+        self.assertIn("С тегами", body)
+        self.assertNotIn("Без тегов", body)
+
+
+@override_settings(**TIERED_CACHE_ON)
+class FeedAndSitemapTests(TestCase):
+    """RSS/Atom с отпечатком и условным GET, карта сайта по месяцам."""
+    def setUp(self):
+        from website.cache import get_cache
+        from .dictionaries import tags
+        from .partitions import parse_month
+
+        get_cache().clear()
+        tags.clear()
+        self.physics = Tag.objects.create(name="Физика")
+        self.music = Tag.objects.create(name="Музыка")
+        self.july = parse_month("2018-07")
+        self.article = Article.objects.create(
+            title="Про физику", text="Текст", published_at=self.july + timezone.timedelta(days=1),
+        )
+        Scope.objects.create(article=self.article, tag=self.physics, is_main=True)
+
+    def test_feed_conditional_get_and_cache(self):
+        url = reverse("tag_rss", args=[self.physics.pk])
+        response = self.client.get(url)
+        self.assertContains(response, "Про физику")
+        self.assertContains(response, "Будь в курсе событий: Физика")
+        etag = response["ETag"]
+
+        # отпечаток тот же — 304, только запросы отпечатка
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # без заголовка — документ из кеша
+        with self.assertNumQueries(2):
+            self.assertContains(self.client.get(url), "Про физику")
+
+        # статья другого тега не трогает ленту «Физики»
+        other = Article.objects.create(title="Про музыку", text="-", published_at=timezone.now())
+        Scope.objects.create(article=other, tag=self.music, is_main=True)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # новая тематика статьи «Физики» — новый отпечаток
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.tags.add(self.music)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<category>Музыка</category>")
+
+    def test_global_atom_and_unknown_tag(self):
+        response = self.client.get(reverse("articles_atom"))
+        self.assertEqual(response["Content-Type"], "application/atom+xml; charset=utf-8")
+        self.assertContains(response, "Про физику")
+        self.assertEqual(self.client.get(reverse("tag_rss", args=[999])).status_code, 404)
+
+    def test_sitemap_index_and_month_chunk(self):
+        from django.core.management import call_command
+
+        Article.objects.create(title="Старая", text="-", published_at=self.july - timezone.timedelta(days=40))
+        call_command("article_partitions", archive_before="2018-07", stdout=io.StringIO())
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("sitemap"))
+        self.assertContains(response, "/sitemap-pages.xml")
+        self.assertContains(response, "/sitemap-articles-2018-07.xml")
+        self.assertContains(response, "/sitemap-articles-2018-05.xml")
+
+        response = self.client.get(reverse("sitemap_section", args=["articles-2018-07"]))
+        self.assertContains(response, reverse("article", args=[self.article.pk]))
+        self.assertContains(response, "<lastmod>")
+        archived = self.client.get(reverse("sitemap_section", args=["articles-2018-05"]))
+        self.assertContains(archived, "/articles/")
+        self.assertEqual(self.client.get(reverse("sitemap_section", args=["articles-2017-01"])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("sitemap_section", args=["nope"])).status_code, 404)
+
+
+@override_settings(CHANGE_FEED={"SETTLE_SECONDS": 0, "RETENTION_DAYS": 30})
+class RelatedArticlesTests(TestCase):
+    """Похожие статьи: веса тегов, top-K, пачки numpy, пересчёт по ленте изменений."""
+    def setUp(self):
+        from .dictionaries import tags
+
+        tags.clear()
+        self.a, self.b, self.c = (Tag.objects.create(name=name) for name in ("Наука", "Космос", "Спорт"))
+        now = timezone.now()
+        self.articles = {}
+        for name, scopes in (
+            ("first", [(self.a, True), (self.b, False)]),
+            ("twin", [(self.a, True), (self.b, False)]),
+            ("only_a", [(self.a, False)]),
+            ("swapped", [(self.b, True), (self.a, False)]),
+            ("sport", [(self.c, True)]),
+        ):
+            article = Article.objects.create(title=name, text="-", published_at=now)
+            for tag, is_main in scopes:
+                Scope.objects.create(article=article, tag=tag, is_main=is_main)
+            self.articles[name] = article
+
+    def related(self, name):
+        from .models import RelatedArticle
+
+        ids = {article.pk: key for key, article in self.articles.items()}
+        rows = RelatedArticle.objects.filter(article=self.articles[name]).values_list("related_id", "score")
+        return [(ids[related_id], round(score, 3)) for related_id, score in rows]
+
+    def test_main_tag_weight_and_top_k(self):
+        from . import related
+
+        self.assertEqual(related.update(), ("full", 5))
+        # основной тег весит вдвое: «Наука» без основного ближе, чем «Космос» основным
+        self.assertEqual(self.related("first"), [("twin", 1.0), ("only_a", 0.894), ("swapped", 0.8)])
+        self.assertEqual(self.related("sport"), [])
+
+        related.update(k=2, metric="jaccard", full=True)
+        self.assertEqual(self.related("first"), [("twin", 1.0), ("swapped", 0.5)])
+
+    def test_vectorized_matches_dense(self):
+        import numpy as np
+        from unittest import mock
+
+        from . import related
+
+        rng = np.random.default_rng(7)
+        articles = np.repeat(np.arange(1, 41), 3)
+        tags = rng.integers(1, 12, size=len(articles))
+        articles = np.unique(np.stack([articles, tags]), axis=1)  # пары (статья, тег) без повторов
+        weights = np.where(rng.random(articles.shape[1]) < 0.3, related.MAIN_WEIGHT, 1.0)
+        matrix = related.TagMatrix(articles[0], articles[1], weights)
+
+        dense = np.zeros((matrix.size, 12))
+        dense[np.searchsorted(matrix.ids, articles[0]), articles[1]] = weights
+        expected = dense @ dense.T / np.outer(matrix.norms, matrix.norms)
+        np.fill_diagonal(expected, 0)
+
+        # мелкие пачки — проверка склейки диапазонов между ними
+        with mock.patch.object(related, "MAX_PAIRS", 25):
+            chunks = matrix.chunks(np.arange(matrix.size))
+            self.assertGreater(len(chunks), 3)
+            got = np.zeros_like(expected)
+            for chunk in chunks:
+                sources, targets, scores = matrix.similarities(chunk)
+                got[sources, targets] = scores
+        np.testing.assert_allclose(got, expected)
+
+    def test_incremental_update_follows_change_feed(self):
+        from . import related
+
+        related.update()
+        sport, twin = self.articles["sport"], self.articles["twin"]
+        Scope.objects.filter(article=sport).delete()
+        Scope.objects.create(article=sport, tag=self.a, is_main=True)
+        Scope.objects.create(article=sport, tag=self.b, is_main=False)
+        twin.delete()
+
+        mode, count = related.update()
+        self.assertEqual(mode, "incremental")
+        # sport, удалённая twin и все, у кого они в списках или кого sport теперь догнала
+        self.assertEqual(count, 5)
+        # при равном сходстве выше более новая статья
+        self.assertEqual(self.related("first"), [("sport", 1.0), ("only_a", 0.894), ("swapped", 0.8)])
+        self.assertEqual(self.related("sport")[0], ("first", 1.0))
+        self.assertNotIn("twin", [name for name, _score in self.related("only_a")])
+        self.assertEqual(related.update(), ("incremental", 0))
+
+    def test_detail_page_lists_related(self):
+        from . import related
+
+        related.update(k=2)
+        response = self.client.get(reverse("article", args=[self.articles["first"].pk]))
+        self.assertContains(response, "Похожие статьи")
+        related_titles = [item["title"] for item in response.context["related"]]
+        self.assertEqual(related_titles, ["twin", "only_a"])
+        response = self.client.get(reverse("article", args=[self.articles["sport"].pk]))
+        self.assertNotContains(response, "Похожие статьи")
+
+
+class NearDuplicateTests(TestCase):
+    """MinHash/LSH: пары фоновой задачей после сохранения, полный проход команды, отметка в админке."""
+    STORY = (
+        "Учёные из Новосибирска представили новый метод очистки воды от микропластика. "
+        "По словам авторов, установка работает без сменных фильтров и потребляет меньше энергии, "
+        "чем существующие аналоги. Первые испытания прошли на очистных сооружениях города, "
+        "промышленный образец обещают к концу следующего года."
+    )
+
+    def create(self, title, text):
+        return Article.objects.create(title=title, text=text, published_at=timezone.now())
+
+    def pairs(self):
+        from .models import DuplicateCandidate
+
+        return list(DuplicateCandidate.objects.order_by("article_id").values_list("article_id", "original_id"))
+
+    def run_jobs(self):
+        from jobs import queue
+
+        return queue.run_pending()
+
+    def test_signature_estimates_jaccard(self):
+        import numpy as np
+
+        from . import dedup
+
+        base = dedup.shingles("", self.STORY)
+        edited = dedup.shingles("", self.STORY.replace("концу следующего", "началу будущего"))
+        exact = len(np.intersect1d(base, edited)) / len(np.union1d(base, edited))
+        left, right = dedup.signatures([base, edited])
+        self.assertAlmostEqual(float(dedup.similarity(left, right)), exact, delta=0.12)
+        self.assertEqual(dedup.band_buckets(np.stack([left, left])).shape, (2, dedup.BANDS))
+
+    def test_flags_reprint_on_save(self):
+        original = self.create("Новый метод очистки воды", self.STORY)
+        self.create("Курс рубля", "Биржевые торги завершились ростом индексов.")
+        reprint = self.create("Новый метод очистки воды — подробности", self.STORY + " Источник: ТАСС.")
+        # подпись считает воркер, а не сохранение
+        self.assertEqual(self.pairs(), [])
+        self.assertEqual(self.run_jobs(), 3)
+        self.assertEqual(self.pairs(), [(reprint.pk, original.pk)])
+
+        # правка, после которой тексты разошлись, снимает отметку;
+        # две правки подряд — одна задача
+        reprint.text = "Совсем другая история о погоде на выходных и пробках на дорогах города."
+        reprint.save()
+        reprint.save()
+        self.assertEqual(self.run_jobs(), 1)
+        self.assertEqual(self.pairs(), [])
+
+        # правка даты в том же месяце — один UPDATE, без пересчёта подписи
+        with self.assertNumQueries(1):
+            original.published_at = timezone.now()
+            original.save(update_fields=["published_at"])
+
+    def test_bulk_scan_finds_articles_saved_past_signals(self):
+        from unittest import mock
+
+        from django.core.management import call_command
+
+        from . import dedup
+
+        Article.objects.bulk_create(
+            [Article(title="Перепечатка", text=self.STORY, published_at=timezone.now()) for _ in range(3)]
+            + [Article(title="Погода", text="Завтра без осадков, ветер слабый.", published_at=timezone.now())]
+        )
+        first, second, third, _weather = Article.objects.order_by("id").values_list("id", flat=True)
+        out = io.StringIO()
+        with mock.patch.object(dedup, "MAX_BUCKET", 2):
+            call_command("find_duplicates", stdout=out)
+        self.assertIn("Подписей посчитано: 4, возможных дубликатов: 2", out.getvalue())
+        # корзина больше MAX_BUCKET — копии сравниваются только с самой старой
+        self.assertEqual(self.pairs(), [(second, first), (third, first)])
+
+        call_command("find_duplicates", stdout=out)
+        self.assertIn("Подписей посчитано: 0", out.getvalue())
+
+    def test_admin_marks_duplicates(self):
+        from django.contrib.auth import get_user_model
+
+        original = self.create("Новый метод очистки воды", self.STORY)
+        reprint = self.create("Очистка воды", self.STORY)
+        self.run_jobs()
+        admin_user = get_user_model().objects.create_superuser("admin", "a@example.com", "pass")
+        self.client.force_login(admin_user)
+        url = reverse("admin:articles_article_changelist")
+        response = self.client.get(url, {"duplicate": "yes"})
+        self.assertEqual(list(response.context["cl"].result_list), [reprint])
+        self.assertContains(response, reverse("admin:articles_article_change", args=[original.pk]))
+
+
+class JobQueueTests(TestCase):
+    """Фоновые задачи статей: подписи дубликатов и уменьшение картинок (articles/tasks.py)."""
+
+    def setUp(self):
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(MEDIA_ROOT=directory.name, ARTICLE_IMAGE_MAX_SIDE=100)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def image(self, size):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "red").save(buffer, format="PNG")
+        return SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+
+    def test_save_queues_one_job_per_kind(self):
+        from jobs.models import Job
+
+        article = Article.objects.create(
+            title="Фото", text="Текст", published_at=timezone.now(), image=self.image((300, 150)),
+        )
+        article.save()
+        article.save(update_fields=["published_at"])
+        self.assertEqual(
+            sorted(Job.objects.values_list("name", "key")),
+            [("articles.index_duplicates", f"dedup:{article.pk}"), ("articles.process_image", f"image:{article.pk}")],
+        )
+
+    def test_large_image_is_downscaled(self):
+        import os
+
+        from PIL import Image
+
+        from jobs import queue
+        from jobs.models import Job
+
+        large = Article.objects.create(title="Большое", text="Текст", published_at=timezone.now(), image=self.image((300, 150)))
+        small = Article.objects.create(title="Малое", text="Текст", published_at=timezone.now(), image=self.image((80, 40)))
+        small_bytes = small.image.read()
+        small.image.close()
+        self.assertEqual(queue.run_pending(), 4)
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 4)
+
+        original = large.image.path
+        large.refresh_from_db()
+        small.refresh_from_db()
+        with Image.open(large.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+        # копия записана под новым именем, исходный файл удалён после переключения
+        self.assertNotEqual(large.image.path, original)
+        self.assertFalse(os.path.exists(original))
+        with open(small.image.path, "rb") as f:
+            self.assertEqual(f.read(), small_bytes)
+        self.assertEqual(queue.stats()["articles.process_image"]["counts"], {"done": 2})
+
+    def test_failed_write_keeps_original_image(self):
+        import os
+        from unittest import mock
+
+        from django.core.files.storage import FileSystemStorage
+
+        from articles.tasks import process_image
+
+        article = Article.objects.create(title="Фото", text="Текст", published_at=timezone.now(), image=self.image((300, 150)))
+        name = article.image.name
+        with mock.patch.object(FileSystemStorage, "save", side_effect=OSError("диск заполнен")):
+            with self.assertRaises(OSError):
+                process_image(article_id=article.pk)
+        article.refresh_from_db()
+        self.assertEqual(article.image.name, name)
+        self.assertTrue(os.path.exists(article.image.path))
+
+
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, "plans.json")
+        override = override_settings(QUERY_PLANS={"BASELINE": self.baseline, "SEQ_SCAN_MIN_ROWS": 50})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_key_queries_use_indexes(self):
+        from django.core.management import CommandError, call_command
+
+        # без эталона сравнивать не с чем — ошибка с подсказкой
+        with self.assertRaisesMessage(CommandError, "check_plans --update-baseline"):
+            call_command("check_plans", "--seed", "0", stdout=io.StringIO())
+        out = io.StringIO()
+        call_command("check_plans", "--seed", "300", "--update-baseline", stdout=out)
+        for name in ("archive_month", "article_detail", "articles_list", "tag_feed"):
+            self.assertIn(f"{name}: ok", out.getvalue())
+        self.assertIn("articles_published_id_idx", out.getvalue())
+        # синтетика откатилась, эталон сохранён — повторный прогон без изменений
+        self.assertFalse(Article.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+        call_command("check_plans", "--seed", "300", stdout=io.StringIO())
+
+    def test_single_plan_matches_full_run_baseline(self):
+        from django.core.management import call_command
+
+        call_command("check_plans", "--seed", "300", "--update-baseline", stdout=io.StringIO())
+        # справочник тегов не должен зависеть от того, какие выборки шли раньше
+        for name in ("articles_list", "tag_feed"):
+            out = io.StringIO()
+            call_command("check_plans", name, "--seed", "300", stdout=out)
+            self.assertIn(f"{name}: ok", out.getvalue())
+
+    def test_unindexed_filter_is_flagged(self):
+        from website import plans
+
+        Article.objects.bulk_create(
+            Article(title=f"Статья {n}", text=f"Текст {n}", published_at=timezone.now()) for n in range(60)
+        )
+        plan = plans.QueryPlan("by_text", lambda: Article.objects.filter(text="Текст 1").order_by())
+        result = plans.check(plan)
+        self.assertEqual(result["flags"], ["seq_scan"])
+
+
+class IndexAdvisorTests(TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, "queries.ndjson")
+
+    def test_fingerprint_ignores_values(self):
+        from website import querylog
+
+        first = querylog.fingerprint('SELECT "a"."id" FROM "a" WHERE "a"."id" IN (%s, %s) AND "a"."n" > 10')
+        second = querylog.fingerprint('SELECT "a"."id" FROM "a" WHERE "a"."id" IN (%s) AND "a"."n" > 250')
+        self.assertEqual(first, second)
+
+    def test_parse_positional_order_by(self):
+        from website.indexes import parse
+
+        # карточки ленты (as_cards() → values()) сортируются номерами колонок SELECT
+        usages = parse(
+            'SELECT "articles_article"."id" AS "id", "articles_article"."title" AS "title", '
+            '"articles_article"."published_at" AS "published_at" FROM "articles_article" '
+            'ORDER BY 3 DESC, 1 DESC LIMIT 20'
+        )
+        self.assertEqual(usages["articles_article"].order, [("published_at", True), ("id", True)])
+
+    def test_parse_skips_from_of_select_subquery(self):
+        from website.indexes import parse
+
+        # список админки: первый FROM — у подзапроса дубликатов в списке SELECT
+        usages = parse(
+            'SELECT "articles_article"."id", (SELECT U0."original_id" AS "original_id" '
+            'FROM "articles_duplicatecandidate" U0 WHERE U0."article_id" = ("articles_article"."id") '
+            'ORDER BY U0."similarity" DESC LIMIT 1) AS "duplicate_original" FROM "articles_article" '
+            'ORDER BY "articles_article"."published_at" DESC, "articles_article"."id" DESC LIMIT 100'
+        )
+        self.assertEqual(usages["articles_article"].order, [("published_at", True), ("id", True)])
+
+    def test_recording_writes_selects_with_params(self):
+        from website import querylog
+
+        with querylog.recording(self.log):
+            list(Article.objects.filter(pk__in=[1, 2]))
+            Tag.objects.create(name="Не попадёт")
+        records = list(querylog.read(self.log))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(querylog.decode_params(records[0]["params"]), (1, 2))
+        moment = timezone.now()
+        self.assertEqual(querylog.decode_params(querylog.encode_params([moment, b"\x01"])), (moment, b"\x01"))
+        # после recording журнал не пишется
+        list(Tag.objects.all())
+        self.assertEqual(len(list(querylog.read(self.log))), 1)
+
+    def test_advice_from_captured_queries(self):
+        import json
+
+        from django.core.management import call_command
+
+        from website import querylog
+
+        tag = Tag.objects.create(name="Наука")
+        article = Article.objects.create(title="Заголовок", text="Текст", published_at=timezone.now())
+        Scope.objects.create(article=article, tag=tag, is_main=True)
+        with querylog.recording(self.log):
+            for _ in range(3):
+                list(Article.objects.filter(title="Заголовок", image__isnull=True).order_by())
+            self.client.get(reverse("article", args=[article.pk]))
+        out = io.StringIO()
+        call_command("advise_indexes", "--log", self.log, "--json", stdout=out)
+        result = json.loads(out.getvalue())
+
+        self.assertEqual(len(result["proposals"]), 1)
+        proposal = result["proposals"][0]
+        self.assertEqual(proposal["model"], "articles.Article")
+        self.assertIn("fields=['title']", proposal["index"])
+        self.assertIn("condition=Q(image__isnull=True)", proposal["index"])
+        self.assertEqual(proposal["calls"], 3)
+        self.assertTrue(proposal["estimate"]["samples"][0]["used"])
+        # тематики статьи читаются по article_id — хватает индекса внешнего ключа
+        self.assertNotIn("articles_scope", [note["table"] for note in result["existing"]])
+
+    def test_missing_log(self):
+        from django.core.management import CommandError, call_command
+
+        with self.assertRaisesMessage(CommandError, "Нет журнала запросов"):
+            call_command("advise_indexes", "--log", self.log, stdout=io.StringIO())
+
+
+class PrefetchPlannerTests(TestCase):
+    def setUp(self):
+        from website import prefetch
+
+        self.addCleanup(prefetch.reset)
+
+    def test_template_paths_through_extends_and_include(self):
+        from website.prefetch import template_paths
+
+        # news.html → блок content → include cards.html → {% for scope in article.scopes.all %}
+        self.assertEqual(
+            template_paths("articles/news.html", "object_list[]"),
+            {
+                "excerpt", "get_absolute_url", "image", "title",
+                "scopes.all", "scopes.all.is_main", "scopes.all.tag.name",
+            },
+        )
+        self.assertIn("text", template_paths("articles/article.html", "article"))
+        # item.title у похожих статей — не пути article
+        self.assertNotIn("id", template_paths("articles/article.html", "article"))
+
+    def test_plan_from_paths(self):
+        from website.prefetch import build_plan
+
+        plan = build_plan(Article, {"title", "get_absolute_url", "scopes.all.is_main", "scopes.all.tag.name"})
+        self.assertEqual(plan.only(), ["id", "title"])
+        self.assertEqual(plan.unresolved, {"get_absolute_url"})
+        self.assertEqual(
+            plan.as_code({"scopes": ("-is_main",)}),
+            "Article.objects.only('id', 'title').prefetch_related(Prefetch('scopes', queryset="
+            "Scope.objects.only('article', 'id', 'is_main', 'tag', 'tag__name').select_related('tag')"
+            ".order_by('-is_main')))",
+        )
+        self.assertTrue(plan.covers("scopes.tag.name"))
+        self.assertFalse(plan.covers("published_at"))
+
+    def test_article_detail_loads_printed_columns(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        article = Article.objects.create(title="Заголовок", text="Полный текст", published_at=timezone.now())
+        Scope.objects.create(article=article, tag=Tag.objects.create(name="Наука"), is_main=True)
+        Scope.objects.create(article=article, tag=Tag.objects.create(name="Арт"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("article", args=[article.pk]))
+        self.assertContains(response, "Полный текст")
+        self.assertRegex(response.content.decode(), r"Наука</span>\s+<span[^>]*>Арт")
+        statement = queries.captured_queries[0]["sql"]
+        self.assertIn('"text"', statement)
+        self.assertNotIn('"excerpt"', statement)
+        self.assertNotIn('"updated_at"', statement)
+
+    def test_command_reports_unused_columns(self):
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command("prefetch_plan", "--seed", "20", "--check", stdout=out)
+        self.assertIn("article_detail: ok", out.getvalue())
+        self.assertIn("articles_list: ok", out.getvalue())
+        self.assertIn("текущая выборка грузит зря: articles_article: published_at, text, updated_at", out.getvalue())
+        self.assertFalse(Article.objects.exists())
+
+
+class MemoryProfileTests(TestCase):
+    def setUp(self):
+        import tempfile
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        now = timezone.now()
+        tag = Tag.objects.create(name="Наука")
+        for number in range(30):
+            article = Article.objects.create(title=f"Статья {number}", text="Текст " * 50, published_at=now)
+            Scope.objects.create(article=article, tag=tag, is_main=True)
+
+    def profiling(self, **options):
+        return override_settings(MEMORY_PROFILE={
+            "ENABLED": True, "STRICT": True, "FRAMES": 5, "INTERVAL": 0, "PATH": self.path, **options,
+        })
+
+    def test_sizes_and_categories(self):
+        import tracemalloc
+
+        from website.memprofile import category, parse_size
+
+        self.assertEqual(parse_size("64MB"), 64 * 1024 * 1024)
+        self.assertEqual(parse_size("1.5 kb"), 1536)
+        self.assertEqual(parse_size(2048), 2048)
+        with self.assertRaises(ValueError):
+            parse_size("много")
+        frames = [("/venv/django/core/handlers/base.py", 1), ("/venv/django/db/models/query.py", 2), ("/venv/django/db/models/base.py", 3)]
+        self.assertEqual(category(tracemalloc.Traceback(tuple(reversed(frames)))), "models")
+        self.assertEqual(category(tracemalloc.Traceback(tuple(reversed(frames[:2])))), "querysets")
+        self.assertEqual(category(tracemalloc.Traceback(tuple(reversed(frames[:1])))), "other")
+
+    def test_page_profile_and_flamegraph(self):
+        import json
+        import os
+        import re
+
+        with self.profiling(BUDGETS={"articles": "64MB"}):
+            response = self.client.get(reverse("articles"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response["X-Memory-Peak"]), 0)
+        with open(os.path.join(self.path, "profiles.ndjson"), encoding="utf-8") as f:
+            record = json.loads(f.readline())
+        self.assertEqual(record["name"], "articles")
+        self.assertEqual(record["budget"], 64 * 1024 * 1024)
+        self.assertTrue({"templates", "querysets"} & set(record["categories"]))
+        with open(os.path.join(self.path, "articles.folded"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(re.match(r"^articles(;[^;]+:\d+)+ \d+$", line) for line in lines))
+
+    def test_page_over_budget_fails(self):
+        from website.memprofile import MemoryBudgetExceeded
+
+        with self.profiling(BUDGETS={"articles": "1KB"}):
+            with self.assertRaisesMessage(MemoryBudgetExceeded, "articles: пик памяти"):
+                self.client.get(reverse("articles"))
+        # без STRICT — только предупреждение в журнал
+        with self.profiling(BUDGETS={"articles": "1KB"}, STRICT=False), self.assertLogs("website.memprofile", "WARNING"):
+            self.assertEqual(self.client.get(reverse("articles")).status_code, 200)
+
+    def test_command_wrapper_attributes_fixture_load(self):
+        import os
+
+        from django.core.management import CommandError, call_command
+
+        fixture = os.path.join(self.path, "articles.json")
+        call_command("dumpdata", "articles.article", "articles.tag", "articles.scope", output=fixture)
+        Article.objects.all().delete()
+        folded = os.path.join(self.path, "load.folded")
+        out = io.StringIO()
+        with self.profiling(ENABLED=False):
+            call_command("memprofile", "loaddata", fixture, folded=folded, stdout=out)
+        self.assertEqual(Article.objects.count(), 30)
+        self.assertRegex(out.getvalue(), r"loaddata: пик \d")
+        self.assertRegex(out.getvalue(), r"serialization +\d")
+        self.assertTrue(os.path.getsize(folded))
+
+        with self.profiling(BUDGETS={"loaddata": "1KB"}, STRICT=False):
+            with self.assertRaisesMessage(CommandError, "больше бюджета"):
+                call_command("memprofile", "loaddata", fixture, check=True, stdout=io.StringIO())
+
+    def test_shipped_fixture_load_within_budget(self):
+        import os
+
+        from django.conf import settings
+        from django.core.management import call_command
+
+        Article.objects.all().delete()
+        out = io.StringIO()
+        with self.profiling(BUDGETS={"loaddata": "256MB"}):
+            call_command(
+                "memprofile", "loaddata", os.path.join(settings.BASE_DIR, "articles.json"),
+                folded=os.path.join(self.path, "articles.folded"), stdout=out,
+            )
+        self.assertIn("Installed 3 object(s)", out.getvalue())
+        self.assertRegex(out.getvalue(), r"loaddata: пик \d.* \(бюджет 256\.0 MB\)")
+
+
+class ShippedFixtureTests(TestCase):
+    def test_articles_json_loads(self):
+        import os
+
+        from django.conf import settings
+        from django.core.management import call_command
+
+        call_command("loaddata", os.path.join(settings.BASE_DIR, "articles.json"), stdout=io.StringIO())
+        self.assertEqual(Article.objects.count(), 3)
+        self.assertFalse(Article.objects.filter(updated_at__isnull=True).exists())
@@ -1,8 +1,24 @@
 from django.urls import path
 
-from articles.views import articles_list
+from articles.api import articles_api
+from articles.changes import articles as article_changes
+from articles.feeds import atom_feed, rss_feed
+from articles.sitemaps import sitemap_index, sitemap_section
+from articles.views import archive_index, archive_month, article_detail, articles_list
 
 urlpatterns = [
     path('', articles_list, name='articles'),
+    path('articles/<int:pk>/', article_detail, name='article'),
+    path('archive/', archive_index, name='archive'),
+    path('archive/<int:year>/', archive_index, name='archive_year'),
+    path('archive/<int:year>/<int:month>/', archive_month, name='archive_month'),
+    path('api/articles/', articles_api, name='articles_api'),
+    path('api/articles/changes/', article_changes.as_view(), name='articles_changes'),
+    path('feeds/rss/', rss_feed, name='articles_rss'),
+    path('feeds/atom/', atom_feed, name='articles_atom'),
+    path('feeds/tags/<int:tag_id>/rss/', rss_feed, name='tag_rss'),
+    path('feeds/tags/<int:tag_id>/atom/', atom_feed, name='tag_atom'),
+    path('sitemap.xml', sitemap_index, name='sitemap'),
+    path('sitemap-<slug:section>.xml', sitemap_section, name='sitemap_section'),
 
 ]
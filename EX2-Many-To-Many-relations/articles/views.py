@@ -1,8 +1,15 @@
-from django.shortcuts import render
+import datetime
+
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
 
 # ==========================
-from django.db.models import Prefetch
-from articles.models import Article, Scope
+from articles import month_counts
+from articles.models import ArchivedArticle, Article, ArticleMonthCount, RelatedArticle
+from articles.prefetch import SCOPE_ORDERING
+from website.prefetch import planned
+
+ARTICLE_TEMPLATE = 'articles/article.html'
 
 def articles_list(request):
     template = 'articles/news.html'
@@ -10,16 +17,83 @@ def articles_list(request):
     # https://docs.djangoproject.com/en/3.1/ref/models/querysets/#django.db.models.query.QuerySet.order_by
     ordering = '-published_at'
 
-    scopes_prefetch = Prefetch(
-        'scopes',
-        queryset=Scope.objects.select_related('tag').order_by('-is_main', 'tag__name')
-    )
+    # вместо моделей с Prefetch('scopes', ...select_related('tag')) —
+    # компактные ArticleCard, теги (основной первым) собираются одним запросом
     articles = (
         Article.objects
         .order_by(ordering)
-        .prefetch_related(scopes_prefetch)
+        .as_cards()
     )
 
     context = {'object_list': articles}
 
     return render(request, template, context)
+
+
+def article_detail(request, pk):
+    # полный text грузится только здесь, в списке — только excerpt; колонки
+    # и Prefetch тематик — по тому, что печатает шаблон (website/prefetch.py)
+    article = planned(Article.objects.filter(pk=pk), ARTICLE_TEMPLATE, 'article', SCOPE_ORDERING).first()
+    if article is None:
+        # месяц мог уйти в архив (article_partitions --archive-before) — ссылка та же
+        article = get_object_or_404(planned(ArchivedArticle.objects.all(), ARTICLE_TEMPLATE, 'article', SCOPE_ORDERING), pk=pk)
+    return render(request, ARTICLE_TEMPLATE, {'article': article, 'related': related_articles(pk)})
+
+
+def related_articles(pk):
+    # готовый top-K из RelatedArticle (manage.py related_articles) + заголовки;
+    # похожая статья могла уйти в архив — ищем её там
+    scores = dict(RelatedArticle.objects.filter(article_id=pk).values_list('related_id', 'score'))
+    found = {}
+    for model in (Article, ArchivedArticle):
+        missing = [related_id for related_id in scores if related_id not in found]
+        if not missing:
+            break
+        rows = model.objects.filter(pk__in=missing).values('id', 'title', 'published_at')
+        found.update((item['id'], item) for item in rows)
+    return sorted(found.values(), key=lambda item: (-scores[item['id']], -item['id']))
+
+
+def archive_index(request, year=None):
+    # годы и месяцы с числом статей — из ArticleMonthCount, по строке на месяц
+    years = month_counts.years()
+    if year is not None:
+        years = [item for item in years if item[0] == year]
+        if not years:
+            raise Http404
+    return render(request, 'articles/archive.html', {'years': years, 'year': year})
+
+
+def archive_month(request, year, month):
+    try:
+        first_day = datetime.date(year, month, 1)
+    except ValueError:
+        raise Http404
+    counts = ArticleMonthCount.objects.filter(month=first_day).first()
+    if counts is None or not counts.total:
+        raise Http404
+
+    start, end = month_counts.month_bounds(year, month)
+    ordering = ('-published_at', '-id')
+    articles = []
+    # уровень, где статей этого месяца нет, не запрашиваем вовсе
+    for model, count in ((Article, counts.articles), (ArchivedArticle, counts.archived)):
+        if count:
+            articles.extend(
+                model.objects
+                .filter(published_at__gte=start, published_at__lt=end)
+                .order_by(*ordering)
+                .as_cards()
+            )
+    if counts.articles and counts.archived:
+        articles.sort(key=lambda card: (card.published_at, card.id), reverse=True)
+
+    previous, following = month_counts.neighbours(first_day)
+    context = {
+        'object_list': articles,
+        'month': first_day,
+        'counts': counts,
+        'previous': previous,
+        'following': following,
+    }
+    return render(request, 'articles/archive_month.html', context)
@@ -0,0 +1,13 @@
+"""
+Фазы прогрева ленты новостей (website/warmup.py): первый рендер
+news.html заполняет справочник тегов и кеш карточек.
+"""
+from website.warmup import get_request, register
+
+
+@register('articles: лента', uses_db=True)
+def warm_news():
+    from .views import articles_list
+
+    response = articles_list(get_request('/'))
+    return f'{len(response.content) // 1024} КиБ'
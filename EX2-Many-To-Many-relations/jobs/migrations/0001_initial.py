@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLock',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('owner', models.CharField(max_length=100)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Блокировка очереди',
+                'verbose_name_plural': 'Блокировки очереди',
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Задача')),
+                ('args', models.JSONField(blank=True, default=dict, verbose_name='Аргументы')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, verbose_name='Ключ')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Приоритет')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка')], default='queued', max_length=10, verbose_name='Состояние')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Попыток всего')),
+                ('timeout', models.PositiveIntegerField(default=300, verbose_name='Таймаут, с')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Запуск не раньше')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Поставлена')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Воркер')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Занята до')),
+                ('wait_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Ожидание, мс')),
+                ('run_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Выполнение, мс')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['-priority', 'run_at', 'id'], name='jobs_job_ready_idx'), models.Index(fields=['status', 'locked_until'], name='jobs_job_lease_idx'), models.Index(fields=['status', 'finished_at'], name='jobs_job_finished_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('key',), name='jobs_job_queued_key_uniq')],
+            },
+        ),
+    ]
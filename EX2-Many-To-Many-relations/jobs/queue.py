@@ -0,0 +1,309 @@
+"""
+Очередь фоновых задач в основной БД.
+
+Задача — функция, зарегистрированная декоратором ``task`` (модули
+<app>/tasks.py импортируются в AppConfig.ready), аргументы — JSON:
+
+    @task('articles.index_duplicates', timeout=60)
+    def index_duplicates(article_id): ...
+
+    enqueue('articles.index_duplicates', {'article_id': 5}, key='dedup:5')
+
+  * постановка — обычный INSERT в текущей транзакции: задача видна
+    воркерам только после коммита изменений, которые она обрабатывает;
+  * ``key`` — ключ одинаковой работы: пока задача с ним ждёт, повторная
+    постановка вернёт её (приоритет — больший, срок — более ранний),
+    так правки подряд дают один запуск; ``delay`` откладывает запуск;
+    с ``debounce=True`` повторная постановка, наоборот, сдвигает срок
+    на delay от последней — задача ждёт, пока правки не утихнут;
+  * выбор: ждущие задачи со сроком не позже сейчас, по убыванию
+    приоритета, затем по сроку. На PostgreSQL — ``SELECT ... FOR UPDATE
+    SKIP LOCKED`` (воркеры не ждут друг друга), где его нет (SQLite) —
+    взаимоисключение строкой JobLock и условный UPDATE;
+  * взятая задача занята воркером до ``locked_until`` (таймаут + запас);
+    задачи упавших воркеров возвращает в очередь ``recover()``;
+  * ошибка — повтор через BACKOFF_SECONDS · 2^(попытка−1), пока
+    не кончатся ``max_attempts``, затем состояние failed с трассировкой;
+  * у каждой задачи сохраняются ожидание в очереди и время выполнения
+    (``stats()``, ``manage.py jobs``).
+
+Воркер — ``manage.py jobs_worker`` (jobs/worker.py).
+Настройки — settings.JOBS (см. options()).
+"""
+import datetime
+import logging
+import math
+import os
+import random
+import socket
+import time
+import traceback
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job, JobLock
+
+logger = logging.getLogger('jobs')
+
+TASKS = {}
+CLAIM_LOCK = 'jobs.claim'
+
+
+def options():
+    return {
+        'PROCESSES': 2,
+        'POLL_SECONDS': 1.0,
+        'DEFAULT_TIMEOUT': 300,
+        'BACKOFF_SECONDS': 10,
+        # запас сверх таймаута, после которого занятая задача считается брошенной
+        'LEASE_GRACE_SECONDS': 30,
+        'LOCK_SECONDS': 30,
+        'KEEP_DAYS': 7,
+        **getattr(settings, 'JOBS', {}),
+    }
+
+
+class Task:
+    def __init__(self, name, func, priority=0, max_attempts=3, timeout=None):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, args=None, **kwargs):
+        return enqueue(self.name, args, **kwargs)
+
+
+def task(name, priority=0, max_attempts=3, timeout=None):
+    """Зарегистрировать функцию как задачу; вызов напрямую выполняет её сразу."""
+    def register(func):
+        TASKS[name] = Task(name, func, priority, max_attempts, timeout)
+        return TASKS[name]
+    return register
+
+
+def enqueue(name, args=None, key=None, priority=None, delay=0, debounce=False):
+    """Поставить задачу (или вернуть ждущую с тем же key)."""
+    spec = TASKS[name]
+    priority = spec.priority if priority is None else priority
+    run_at = timezone.now() + datetime.timedelta(seconds=delay)
+    while True:
+        if key is not None:
+            waiting = Job.objects.filter(status=Job.QUEUED, key=key).first()
+            if waiting is not None:
+                return _merge(waiting, priority, run_at, debounce)
+        job = Job(
+            name=name, args=args or {}, key=key, priority=priority, run_at=run_at,
+            max_attempts=spec.max_attempts, timeout=spec.timeout or options()['DEFAULT_TIMEOUT'],
+        )
+        try:
+            with transaction.atomic():
+                job.save()
+        except IntegrityError:
+            if key is None:
+                raise
+            # ту же работу только что поставил другой процесс; если воркер
+            # уже успел её взять, ждущей не найдётся — ставим заново
+            continue
+        return job
+
+
+def _merge(job, priority, run_at, debounce=False):
+    priority = max(priority, job.priority)
+    run_at = max(run_at, job.run_at) if debounce else min(run_at, job.run_at)
+    if (priority, run_at) != (job.priority, job.run_at):
+        job.priority, job.run_at = priority, run_at
+        Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(priority=priority, run_at=run_at)
+    return job
+
+
+def worker_name(slot=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{slot}'
+
+
+def ready():
+    return Job.objects.filter(status=Job.QUEUED, run_at__lte=timezone.now()).order_by('-priority', 'run_at', 'id')
+
+
+@contextmanager
+def table_lock(name, owner, seconds=None):
+    """
+    Взаимоисключение строкой JobLock: INSERT удаётся одному. Просроченную
+    строку (владелец упал) удаляют и пробуют снова.
+    """
+    seconds = options()['LOCK_SECONDS'] if seconds is None else seconds
+    while True:
+        now = timezone.now()
+        JobLock.objects.filter(name=name, expires_at__lt=now).delete()
+        try:
+            with transaction.atomic():
+                JobLock.objects.create(name=name, owner=owner, expires_at=now + datetime.timedelta(seconds=seconds))
+            break
+        except IntegrityError:
+            time.sleep(random.uniform(0.01, 0.05))
+    try:
+        yield
+    finally:
+        JobLock.objects.filter(name=name, owner=owner).delete()
+
+
+def _start(job, worker, now):
+    """Условный UPDATE queued → running; True, если задача наша."""
+    locked_until = now + datetime.timedelta(seconds=job.timeout + options()['LEASE_GRACE_SECONDS'])
+    taken = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+        status=Job.RUNNING, worker=worker, started_at=now, locked_until=locked_until,
+        attempts=F('attempts') + 1, wait_ms=_ms(now - job.run_at),
+    )
+    if taken:
+        job.status, job.worker, job.started_at, job.locked_until = Job.RUNNING, worker, now, locked_until
+        job.attempts += 1
+    return bool(taken)
+
+
+def claim(worker, limit=1):
+    """Взять до limit готовых задач для воркера."""
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(ready().select_for_update(skip_locked=True)[:limit])
+            now = timezone.now()
+            return [job for job in jobs if _start(job, worker, now)]
+    with table_lock(CLAIM_LOCK, worker):
+        jobs = list(ready()[:limit])
+        now = timezone.now()
+        return [job for job in jobs if _start(job, worker, now)]
+
+
+def _ms(delta):
+    return max(0, round(delta.total_seconds() * 1000))
+
+
+def execute(job):
+    """Выполнить взятую задачу и записать итог; вернуть True при успехе."""
+    spec = TASKS.get(job.name)
+    started = time.perf_counter()
+    try:
+        if spec is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        spec.func(**job.args)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s упала (попытка %s из %s)', job, job.attempts, job.max_attempts)
+    else:
+        error = None
+    finish(job, error, (time.perf_counter() - started) * 1000)
+    return error is None
+
+
+def finish(job, error=None, run_ms=None):
+    """Итог задачи: done; при ошибке — повтор с паузой или failed."""
+    now = timezone.now()
+    owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker)
+    fields = {'finished_at': now, 'locked_until': None, 'run_ms': None if run_ms is None else round(run_ms)}
+    if error is None:
+        owned.update(status=Job.DONE, error='', **fields)
+        job.status = Job.DONE
+        return
+    if job.attempts < job.max_attempts:
+        delay = options()['BACKOFF_SECONDS'] * 2 ** (job.attempts - 1)
+        try:
+            with transaction.atomic():
+                owned.update(
+                    status=Job.QUEUED, error=error, run_at=now + datetime.timedelta(seconds=delay), **fields,
+                )
+            job.status = Job.QUEUED
+            return
+        except IntegrityError:
+            # пока задача выполнялась, ту же работу поставили снова — повторит она
+            pass
+    owned.update(status=Job.FAILED, error=error, **fields)
+    job.status = Job.FAILED
+
+
+def recover():
+    """Вернуть задачи, чей воркер пропал (срок locked_until вышел); вернуть их число."""
+    count = 0
+    for job in Job.objects.filter(status=Job.RUNNING, locked_until__lt=timezone.now()):
+        finish(job, 'Воркер не завершил задачу к сроку (упал или завис)')
+        count += 1
+    return count
+
+
+def run_pending(worker=None, limit=None):
+    """Выполнить готовые задачи в этом процессе; вернуть их число (для тестов и --processes 0)."""
+    worker = worker or worker_name()
+    count = 0
+    while limit is None or count < limit:
+        jobs = claim(worker)
+        if not jobs:
+            break
+        execute(jobs[0])
+        count += 1
+    return count
+
+
+def retry_failed(name=None, ids=None):
+    """Вернуть упавшие задачи (все, с именем name или из ids) в очередь с новым запасом попыток."""
+    failed = Job.objects.filter(status=Job.FAILED)
+    if name:
+        failed = failed.filter(name=name)
+    if ids is not None:
+        failed = failed.filter(pk__in=ids)
+    count = 0
+    for job in failed:
+        try:
+            with transaction.atomic():
+                count += Job.objects.filter(pk=job.pk).update(
+                    status=Job.QUEUED, attempts=0, run_at=timezone.now(), error='',
+                )
+        except IntegrityError:
+            # такая же задача уже ждёт
+            continue
+    return count
+
+
+def prune(days=None):
+    """Удалить выполненные задачи старше KEEP_DAYS; вернуть их число."""
+    days = options()['KEEP_DAYS'] if days is None else days
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def _summary(values):
+    values.sort()
+    return {'p50': _percentile(values, 0.5), 'p95': _percentile(values, 0.95), 'max': values[-1] if values else None}
+
+
+def stats():
+    """По задачам: число в каждом состоянии и p50/p95/max ожидания и выполнения (выполненные)."""
+    result = {}
+    for name, status, count in (
+        Job.objects.order_by().values_list('name', 'status').annotate(count=Count('id'))
+    ):
+        result.setdefault(name, {'counts': {}})['counts'][status] = count
+    timings = {}
+    for name, wait_ms, run_ms in (
+        Job.objects.filter(status=Job.DONE).values_list('name', 'wait_ms', 'run_ms').iterator(chunk_size=5000)
+    ):
+        entry = timings.setdefault(name, ([], []))
+        if wait_ms is not None:
+            entry[0].append(wait_ms)
+        if run_ms is not None:
+            entry[1].append(run_ms)
+    for name, (waits, runs) in timings.items():
+        result[name].update({'wait_ms': _summary(waits), 'run_ms': _summary(runs)})
+    return dict(sorted(result.items()))
@@ -0,0 +1,135 @@
+"""
+Многопроцессный воркер очереди: ``manage.py jobs_worker --processes 4``.
+
+Родитель запускает дочерние процессы (spawn: чистый интерпретатор, без
+унаследованных подключений к БД и пулов потоков) и следит за ними:
+
+  * каждый ребёнок (jobs/child.py) в цикле берёт задачу, выполняет
+    и пишет итог; номер задачи и момент старта он кладёт в общий массив,
+    чтобы родитель видел, чем он занят;
+  * задачу дольше её таймаута родитель прерывает: завершает процесс,
+    записывает ошибку (повтор или failed) и запускает замену;
+  * неожиданно умерший ребёнок тоже заменяется, его задачу вернёт
+    в очередь recover() по истечении locked_until;
+  * SIGTERM/SIGINT — дети дорабатывают текущие задачи и выходят;
+  * ``--burst`` — дети выходят, когда готовых задач не осталось
+    (запуск из cron, CI).
+
+``--processes 0`` выполняет задачи в самом процессе команды, без детей
+и без контроля таймаута — для отладки.
+"""
+import multiprocessing
+import signal
+import time
+
+from django.db import connections
+
+from . import child, queue
+from .child import IDLE
+
+# как часто родитель проверяет детей и брошенные задачи
+SUPERVISE_SECONDS = 0.5
+RECOVER_SECONDS = 30
+# столько падений подряд без задачи (ошибка запуска, БД недоступна) — выход
+MAX_CRASHES = 5
+
+
+class Supervisor:
+    def __init__(self, processes, burst=False, log=print):
+        self.processes = processes
+        self.burst = burst
+        self.log = log
+        self.context = multiprocessing.get_context('spawn')
+        self.stop = self.context.Event()
+        self.children = {}
+        self.crashes = 0
+
+    def spawn(self, slot):
+        state = self.context.Array('d', [IDLE, IDLE, IDLE], lock=False)
+        process = self.context.Process(
+            target=child.main, args=(slot, state, self.stop, self.burst), name=f'jobs-worker-{slot}', daemon=True,
+        )
+        process.start()
+        self.children[slot] = (process, state)
+
+    def request_stop(self, *args):
+        if not self.stop.is_set():
+            self.log('Остановка: воркеры дорабатывают текущие задачи')
+        self.stop.set()
+
+    def check(self, slot):
+        """Прервать задачу сверх таймаута; заменить умерший процесс. Вернуть, жив ли слот."""
+        process, state = self.children[slot]
+        job_id, started, timeout = state[:]
+        if job_id:
+            self.crashes = 0
+        if process.is_alive():
+            if job_id and time.time() - started > timeout:
+                process.kill()
+                process.join()
+                self.fail(int(job_id), f'Превышен таймаут {timeout:g} с')
+                self.log(f'Задача #{int(job_id)} прервана по таймауту')
+            else:
+                return True
+        elif job_id:
+            self.fail(int(job_id), f'Процесс воркера завершился с кодом {process.exitcode}')
+        elif process.exitcode != 0:
+            self.crashes += 1
+            if self.crashes >= MAX_CRASHES:
+                self.log(f'Воркер падает при запуске ({process.exitcode}), остановка')
+                self.stop.set()
+        if self.stop.is_set() or (self.burst and process.exitcode == 0 and not job_id):
+            del self.children[slot]
+            return False
+        self.spawn(slot)
+        return True
+
+    def fail(self, job_id, error):
+        job = queue.Job.objects.filter(pk=job_id, status=queue.Job.RUNNING).first()
+        if job is not None:
+            queue.finish(job, error)
+
+    def run(self):
+        # дети открывают свои подключения; родительские не должны им достаться
+        connections.close_all()
+        previous = {sig: signal.signal(sig, self.request_stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            queue.recover()
+            for slot in range(self.processes):
+                self.spawn(slot)
+            recovered_at = time.monotonic()
+            while self.children:
+                time.sleep(SUPERVISE_SECONDS)
+                for slot in list(self.children):
+                    self.check(slot)
+                if time.monotonic() - recovered_at > RECOVER_SECONDS:
+                    recovered = queue.recover()
+                    if recovered:
+                        self.log(f'Возвращено брошенных задач: {recovered}')
+                    recovered_at = time.monotonic()
+        finally:
+            self.stop.set()
+            for process, _state in self.children.values():
+                process.join()
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            connections.close_all()
+
+
+def run_inline(burst=False, log=print):
+    """Задачи в текущем процессе, без детей; вернуть число выполненных."""
+    worker = queue.worker_name()
+    poll = queue.options()['POLL_SECONDS']
+    count = 0
+    queue.recover()
+    try:
+        while True:
+            done = queue.run_pending(worker)
+            count += done
+            if burst and not done:
+                return count
+            if not done:
+                time.sleep(poll)
+    except KeyboardInterrupt:
+        log('Остановка')
+        return count
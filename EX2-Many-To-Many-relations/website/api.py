@@ -0,0 +1,109 @@
+"""
+Общие помощники для JSON API только-для-чтения.
+
+Эндпоинты собирают ответ из кортежей ``values_list()`` и сериализуют его
+одним вызовом ``dumps`` — без создания экземпляров моделей и без
+пополевой обработки в стиле DRF.
+"""
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # orjson быстрее, но не обязателен
+    orjson = None
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class ApiError(Exception):
+    """Ошибка в параметрах запроса — превращается в ответ 400."""
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        payload, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'),
+    ).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return HttpResponse(dumps(payload), status=status, content_type='application/json')
+
+
+def error_response(error):
+    return json_response({'error': str(error)}, status=400)
+
+
+def parse_limit(request):
+    raw = request.GET.get('limit')
+    if raw is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ApiError('limit должен быть целым числом')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'limit должен быть от 1 до {MAX_LIMIT}')
+    return limit
+
+
+def parse_fields(request, allowed, default=None):
+    """
+    ``?fields=id,title`` → кортеж полей в порядке ``allowed``.
+    ``id`` добавляется всегда: он нужен для курсора и связей.
+    """
+    raw = request.GET.get('fields')
+    if not raw:
+        return tuple(default or allowed)
+    requested = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ApiError('неизвестные поля: ' + ', '.join(sorted(unknown)))
+    requested.add('id')
+    return tuple(name for name in allowed if name in requested)
+
+
+def encode_cursor(*values):
+    """Курсор keyset-пагинации — значения ключа сортировки последней строки."""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime.datetime) else v for v in values],
+        ensure_ascii=False, separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def parse_cursor(raw, size, param='after'):
+    """Строка курсора → список из size значений (None для пустой строки)."""
+    if not raw:
+        return None
+    try:
+        padded = raw + '=' * (-len(raw) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except ValueError:
+        raise ApiError(f'некорректный курсор {param}')
+    if not isinstance(values, list) or len(values) != size:
+        raise ApiError(f'некорректный курсор {param}')
+    return values
+
+
+def decode_cursor(request, size, param='after'):
+    return parse_cursor(request.GET.get(param), size, param)
+
+
+def split_page(rows, limit, cursor_values):
+    """
+    ``rows`` выбраны с запасом ``limit + 1``: лишняя строка означает,
+    что есть следующая страница. Возвращает (строки страницы, курсор next).
+    """
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and page:
+        next_cursor = encode_cursor(*cursor_values(page[-1]))
+    return page, next_cursor
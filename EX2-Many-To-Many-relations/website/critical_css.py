@@ -0,0 +1,62 @@
+"""
+Библиотека шаблонов для встраивания критического CSS прямо в <head>.
+
+Подключена в settings.TEMPLATES как ``critical_css``:
+
+    {% load critical_css %}
+    <style>{% critical_css "css/3-col-portfolio.css" %}</style>
+
+Файл ищется через staticfiles finders (или в STATIC_ROOT), из него
+выбрасываются комментарии и лишние пробелы. Результат кешируется в процессе
+(при DEBUG=True файл перечитывается на каждый рендер).
+"""
+import functools
+import os
+import re
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+SPACE_RE = re.compile(r'\s+')
+PUNCT_RE = re.compile(r'\s*([{};:,>])\s*')
+
+
+def minify_css(css):
+    css = COMMENT_RE.sub('', css)
+    css = SPACE_RE.sub(' ', css)
+    css = PUNCT_RE.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def _find(path):
+    found = finders.find(path)
+    if found:
+        return found
+    if settings.STATIC_ROOT:
+        candidate = os.path.join(settings.STATIC_ROOT, path)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _load(path):
+    found = _find(path)
+    if found is None:
+        raise template.TemplateSyntaxError(f'critical_css: файл {path!r} не найден')
+    with open(found, encoding='utf-8') as f:
+        # '</' внутри <style> закрыл бы тег раньше времени
+        return minify_css(f.read()).replace('</', '<\\/')
+
+
+_load_cached = functools.lru_cache(maxsize=32)(_load)
+
+
+@register.simple_tag
+def critical_css(path):
+    css = _load(path) if settings.DEBUG else _load_cached(path)
+    return mark_safe(css)
@@ -0,0 +1,584 @@
+"""
+Подбор индексов по журналу запросов (website/querylog.py).
+
+    python manage.py advise_indexes [--log .cache/queries.ndjson] [--top 10]
+
+  * записи журнала группируются по отпечатку; у группы — число вызовов,
+    суммарное время и самый медленный образец (SQL с параметрами);
+  * из SQL группы по каждой таблице проекта берутся колонки условий
+    WHERE (равенство, IN, диапазон, IS NULL, булевы), ORDER BY ведущей
+    таблицы и колонки соединений;
+  * кандидат — колонки равенства, затем колонки сортировки (если индекс
+    может отдать порядок) или первая колонка диапазона. Булева колонка,
+    которая во всей группе сравнивается с одним значением, и IS NULL
+    уходят в условие частичного индекса;
+  * кандидаты, которые уже покрыты началом существующего индекса
+    (или уникального ограничения), отбрасываются; остальные сливаются
+    и ранжируются по суммарному времени своих групп;
+  * для лучших предложений план образца снимается до и после индекса:
+    на PostgreSQL с расширением hypopg индекс гипотетический, на SQLite
+    настоящий в транзакции, которая откатывается; без hypopg оценки нет;
+  * существующие индексы таблиц из журнала проверяются на то, какие их
+    колонки запросы вообще используют: «не используется» — ни одна,
+    «избыточен» — используются только первые, и такой индекс уже есть.
+
+Предложения печатаются строками ``models.Index(...)`` для Meta.indexes
+модели; для автоматической таблицы связи M2M — DDL (RunSQL в миграции).
+"""
+import json
+import re
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import Q
+
+from website import plans, querylog
+
+SAMPLES_PER_PROPOSAL = 3
+
+COLUMN = r'(?:"(?P<{0}table>\w+)"|(?P<{0}alias>[A-Z]\d+))\."(?P<{0}column>\w+)"'
+PREDICATE = re.compile(
+    COLUMN.format('') + r'\s*(?P<op>IS NOT NULL|IS NULL|<>|!=|<=|>=|=|<|>|IN\b|LIKE\b|BETWEEN\b)\s*'
+    r'(?:(?P<param>%s)|' + COLUMN.format('other_') + r'|(?P<literal>true|false|-?\d+))?',
+    re.IGNORECASE,
+)
+# WHERE "articles_scope"."is_main" / NOT "articles_scope"."is_main"
+BARE = re.compile(
+    r'(?:WHERE|AND|OR|\()\s*(?P<not>NOT\s+)?' + COLUMN.format('')
+    + r'\s*(?=\)|AND\b|OR\b|ORDER\b|GROUP\b|LIMIT\b|$)',
+)
+ORDER_ITEM = re.compile(
+    r'(?:' + COLUMN.format('') + r'|(?P<position>\d+))(?:\s+(?P<direction>ASC|DESC))?(?:\s+NULLS\s+(?:FIRST|LAST))?',
+    re.IGNORECASE,
+)
+SELECT_ITEM = re.compile(COLUMN.format('') + r'(?:\s+AS\s+"\w+")?', re.IGNORECASE)
+BASE_TABLE = re.compile(r'\bFROM\s+"(\w+)"')
+RANGE = {'<', '>', '<=', '>=', 'LIKE', 'BETWEEN'}
+
+
+class Usage:
+    """Как запрос использует колонки одной таблицы."""
+
+    def __init__(self):
+        self.equal = []       # [(колонка, индекс параметра или None)]
+        self.many = False     # есть IN (...) — порядок индекс не отдаст
+        self.ranges = []
+        self.order = []       # [(колонка, по убыванию)]
+        self.joins = []
+        self.constants = {}   # колонка → значение (булевы литералы, IS NULL)
+
+    def columns(self):
+        return (
+            {column for column, _ in self.equal} | set(self.ranges) | {column for column, _ in self.order}
+            | set(self.joins) | set(self.constants)
+        )
+
+
+def _depths(sql):
+    """Глубина скобок у каждого символа sql (открывающая скобка — ещё снаружи)."""
+    depth, depths = 0, []
+    for char in sql:
+        if char == ')':
+            depth -= 1
+        depths.append(depth)
+        if char == '(':
+            depth += 1
+    return depths
+
+
+def _split(text):
+    """Части text через запятые вне скобок."""
+    depths, parts, start = _depths(text), [], 0
+    for index, char in enumerate(text):
+        if char == ',' and depths[index] == 0:
+            parts.append(text[start:index].strip())
+            start = index + 1
+    return parts + [text[start:].strip()]
+
+
+def _outer(sql):
+    """(ведущая таблица, колонки SELECT) внешнего запроса: FROM и SELECT подзапросов в скобках не считаются."""
+    depths = _depths(sql)
+    base = next((match for match in BASE_TABLE.finditer(sql) if depths[match.start()] == 0), None)
+    if base is None:
+        return None, []
+    select = re.match(r'\s*SELECT\s+(?:DISTINCT\s+)?', sql, re.IGNORECASE)
+    return base.group(1), _split(sql[select.end():base.start()]) if select else []
+
+
+def parse(sql):
+    """{таблица: Usage} для SQL (Django-стиль: "таблица"."колонка", псевдонимы U0/T3)."""
+    aliases = {alias: table for table, alias in plans.ALIAS.findall(sql)}
+    start = sql.upper().find(' FROM ')
+    body = sql[start:] if start >= 0 else sql
+    offset = len(sql) - len(body)
+    usages = {}
+
+    def usage(match, prefix=''):
+        table = match.group(f'{prefix}table') or aliases.get(match.group(f'{prefix}alias'))
+        return usages.setdefault(table, Usage()) if table else None
+
+    for match in PREDICATE.finditer(body):
+        target = usage(match)
+        if target is None:
+            continue
+        column, op = match.group('column'), ' '.join(match.group('op').upper().split())
+        if match.group('other_column'):
+            if op == '=':
+                target.joins.append(column)
+                other = usage(match, 'other_')
+                if other is not None:
+                    other.joins.append(match.group('other_column'))
+        elif op == '=':
+            param = sql.count('%s', 0, offset + match.start('param')) if match.group('param') else None
+            literal = (match.group('literal') or '').lower()
+            if literal in ('true', 'false'):
+                target.constants[column] = literal == 'true'
+            else:
+                target.equal.append((column, param))
+        elif op == 'IN':
+            target.equal.append((column, None))
+            target.many = True
+        elif op == 'IS NULL':
+            target.constants[column] = None
+        elif op in RANGE:
+            target.ranges.append(column)
+    for match in BARE.finditer(body):
+        target = usage(match)
+        if target is not None:
+            target.constants[match.group('column')] = not match.group('not')
+
+    position = body.upper().rfind(' ORDER BY ')
+    order = re.split(r'\s+(?:LIMIT|OFFSET)\s', body[position + 10:])[0] if position >= 0 else ''
+    base, select = _outer(sql)
+    # только простые колонки ORDER BY внешнего запроса (у подзапроса дальше идёт ")")
+    if order and '(' not in order and ')' not in order and base:
+        items = []
+        for item in _split(order):
+            match = column = ORDER_ITEM.fullmatch(item)
+            if match is not None and match.group('position'):
+                # ORDER BY 4 DESC — номер колонки SELECT (так сортируют values())
+                number = int(match.group('position'))
+                column = SELECT_ITEM.fullmatch(select[number - 1]) if 0 < number <= len(select) else None
+            if column is None:
+                break
+            items.append((column, usage(column), (match.group('direction') or '').upper() == 'DESC'))
+        else:
+            leading = usages.get(base)
+            if items and all(target is not None and target is leading for _, target, _ in items):
+                leading.order = [(column.group('column'), descending) for column, _, descending in items]
+    return usages
+
+
+class Cluster:
+    """Группа записей журнала с одним отпечатком."""
+
+    def __init__(self, fingerprint, record, tables):
+        self.fingerprint = fingerprint
+        self.sql = querylog.normalize(record['sql'])
+        self.usages = parse(record['sql'])
+        self.calls = 0
+        self.total_ms = 0.0
+        self.sample = record
+        # параметры сравнений булевых колонок → встреченные значения
+        self.values = {}
+        for table, usage in self.usages.items():
+            model = tables.get(table)
+            for column, param in usage.equal:
+                if model is not None and param is not None and isinstance(_field(model, column), models.BooleanField):
+                    self.values[param] = set()
+
+    def add(self, record):
+        self.calls += 1
+        self.total_ms += record.get('ms', 0.0)
+        if record.get('ms', 0.0) > self.sample.get('ms', 0.0):
+            self.sample = record
+        params = record.get('params') or []
+        for index, values in self.values.items():
+            if index < len(params):
+                values.add(json.dumps(params[index]))
+
+
+def project_tables():
+    """{таблица: модель} для моделей приложений проекта (вместе с таблицами связей M2M)."""
+    base = str(settings.BASE_DIR)
+    tables = {}
+    for app_config in apps.get_app_configs():
+        if not app_config.path.startswith(base):
+            continue
+        for model in app_config.get_models(include_auto_created=True):
+            if not model._meta.proxy and model._meta.managed:
+                tables[model._meta.db_table] = model
+    return tables
+
+
+def load(path, min_calls=1):
+    """Группы журнала (только с таблицами проекта), тяжёлые первыми."""
+    tables = project_tables()
+    clusters = {}
+    for record in querylog.read(path):
+        fingerprint = record.get('fp') or querylog.fingerprint(record['sql'])
+        cluster = clusters.get(fingerprint)
+        if cluster is None:
+            cluster = clusters[fingerprint] = Cluster(fingerprint, record, tables)
+        cluster.add(record)
+    result = [
+        cluster for cluster in clusters.values()
+        if cluster.calls >= min_calls and set(cluster.usages) & set(tables)
+    ]
+    return sorted(result, key=lambda cluster: (-cluster.total_ms, -cluster.calls))
+
+
+def _field(model, column):
+    for field in model._meta.concrete_fields:
+        if field.column == column:
+            return field
+    return None
+
+
+class Proposal:
+    def __init__(self, model, columns, condition):
+        self.model = model
+        self.table = model._meta.db_table
+        self.columns = columns          # [(колонка, по убыванию)]
+        self.condition = condition      # [(колонка, значение)]
+        self.clusters = []
+
+    @property
+    def key(self):
+        return self.table, tuple(self.columns), tuple(self.condition)
+
+    @property
+    def calls(self):
+        return sum(cluster.calls for cluster in self.clusters)
+
+    @property
+    def total_ms(self):
+        return sum(cluster.total_ms for cluster in self.clusters)
+
+    def index(self):
+        mixed = len({descending for _, descending in self.columns}) > 1
+        fields = [
+            ('-' if mixed and descending else '') + _field(self.model, column).name
+            for column, descending in self.columns
+        ]
+        condition = None
+        if self.condition:
+            condition = Q(**{
+                (f'{_field(self.model, column).name}__isnull' if value is None else _field(self.model, column).name):
+                    True if value is None else value
+                for column, value in self.condition
+            })
+        index = models.Index(fields=fields, condition=condition, name='advised')
+        index.set_name_with_model(self.model)
+        return index
+
+    def code(self):
+        index = self.index()
+        parts = [f'fields={index.fields!r}', f'name={index.name!r}']
+        if self.condition:
+            condition = ', '.join(f'{key}={value!r}' for key, value in index.condition.children)
+            parts.append(f'condition=Q({condition})')
+        return f"models.Index({', '.join(parts)})"
+
+    def ddl(self, name=None):
+        quote = connection.ops.quote_name
+        mixed = len({descending for _, descending in self.columns}) > 1
+        columns = ', '.join(
+            quote(column) + (' DESC' if mixed and descending else '') for column, descending in self.columns
+        )
+        sql = f'CREATE INDEX {quote(name or self.index().name)} ON {quote(self.table)} ({columns})'
+        if self.condition:
+            sql += ' WHERE ' + ' AND '.join(
+                f'{quote(column)} IS NULL' if value is None else f"{quote(column)} = {'true' if value else 'false'}"
+                for column, value in self.condition
+            )
+        return sql
+
+
+class ExistingIndexes(dict):
+    """{таблица: [(имя, колонки, уникальный)]} без частичных (по Meta модели) и первичных ключей."""
+
+    def __init__(self, tables):
+        super().__init__()
+        self.tables = tables
+
+    def __missing__(self, table):
+        model = self.tables[table]
+        partial = {
+            item.name for item in [*model._meta.indexes, *model._meta.constraints]
+            if getattr(item, 'condition', None) is not None
+        }
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        result = self[table] = [
+            (name, info['columns'], bool(info['unique'] or info['primary_key']))
+            for name, info in constraints.items()
+            if (info['index'] or info['unique'] or info['primary_key']) and name not in partial and info['columns']
+        ]
+        return result
+
+
+def _covered(columns, equal_count, existing):
+    """Начало существующего индекса покрывает кандидата: равенства в любом порядке, дальше — по порядку."""
+    names = [column for column, _ in columns]
+    for _name, index_columns, _unique in existing:
+        if len(index_columns) < len(names):
+            continue
+        if set(index_columns[:equal_count]) == set(names[:equal_count]) and \
+                index_columns[equal_count:len(names)] == names[equal_count:]:
+            return True
+    return False
+
+
+def candidates(cluster, tables, existing):
+    """Предложения для одной группы: по кандидату на таблицу и по колонке соединения."""
+    pk_columns = {table: model._meta.pk.column for table, model in tables.items()}
+    result = []
+    for table, usage in cluster.usages.items():
+        model = tables.get(table)
+        if model is None:
+            continue
+        constants = dict(usage.constants)
+        equal = []
+        for column, param in usage.equal:
+            values = cluster.values.get(param)
+            if values is not None and len(values) == 1 and column not in constants:
+                constants[column] = json.loads(next(iter(values)))
+            elif column not in [name for name, _ in equal]:
+                equal.append((column, False))
+        if any(column == pk_columns[table] for column, _ in equal):
+            # поиск по первичному ключу уже индексирован
+            continue
+        columns = list(equal)
+        # без своих условий порядок таблицы полезен, только если другие таблицы не фильтруются
+        filtered_elsewhere = any(
+            other.equal or other.ranges or other.constants for other in cluster.usages.values() if other is not usage
+        )
+        if usage.order and not usage.many and (equal or not filtered_elsewhere):
+            columns += [item for item in usage.order if item[0] not in [name for name, _ in columns]]
+        elif usage.ranges:
+            columns.append((usage.ranges[0], False))
+        condition = sorted(constants.items())
+        if columns and not _covered(columns, len(equal), existing[table]):
+            result.append(Proposal(model, columns, condition))
+        for column in dict.fromkeys(usage.joins):
+            if column != pk_columns[table] and not _covered([(column, False)], 1, existing[table]):
+                result.append(Proposal(model, [(column, False)], []))
+    return result
+
+
+def propose(clusters):
+    """Предложения по всем группам, слитые и отсортированные по суммарному времени."""
+    tables = project_tables()
+    existing = ExistingIndexes(tables)
+    merged = {}
+    for cluster in clusters:
+        for proposal in candidates(cluster, tables, existing):
+            proposal = merged.setdefault(proposal.key, proposal)
+            if cluster not in proposal.clusters:
+                proposal.clusters.append(cluster)
+    return sorted(merged.values(), key=lambda proposal: (-proposal.total_ms, -proposal.calls))
+
+
+def review(clusters):
+    """Замечания к существующим неуникальным индексам таблиц, попавших в журнал."""
+    tables = project_tables()
+    existing = ExistingIndexes(tables)
+    used = {}
+    for cluster in clusters:
+        for table, usage in cluster.usages.items():
+            if table in tables:
+                used.setdefault(table, set()).update(usage.columns())
+    notes = []
+    for table in sorted(used):
+        for name, columns, unique in existing[table]:
+            if unique:
+                continue
+            prefix = 0
+            while prefix < len(columns) and columns[prefix] in used[table]:
+                prefix += 1
+            if not prefix:
+                notes.append({'table': table, 'index': name, 'columns': columns, 'status': 'unused'})
+                continue
+            if prefix == len(columns):
+                continue
+            enough = [
+                other for other, other_columns, _ in existing[table]
+                if other != name and other_columns[:prefix] == columns[:prefix] and len(other_columns) <= prefix
+            ]
+            if enough:
+                notes.append({
+                    'table': table, 'index': name, 'columns': columns, 'status': 'redundant',
+                    'unused_columns': columns[prefix:], 'instead': enough[0],
+                })
+    return notes
+
+
+def _hypopg():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'hypopg'")
+        return cursor.fetchone() is not None
+
+
+@contextmanager
+def hypothetical(proposal):
+    """Индекс на время оценки; имя, под которым он виден в плане, или None."""
+    if connection.vendor == 'postgresql':
+        if not _hypopg():
+            yield None
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexname FROM hypopg_create_index(%s)', [proposal.ddl()])
+            name = cursor.fetchone()[0]
+        try:
+            yield name
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT hypopg_reset()')
+        return
+    name = proposal.index().name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(proposal.ddl(name))
+        try:
+            yield name
+        finally:
+            transaction.set_rollback(True)
+
+
+def explain(sql, params):
+    """(стоимость или None, текст плана, пометки) без выполнения запроса."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            document = cursor.fetchone()[0]
+        if isinstance(document, str):
+            document = json.loads(document)
+        root = document[0]['Plan']
+        nodes = [node for _depth, node in plans._walk(root)]
+        text = '\n'.join(f"{node['Node Type']} {node.get('Index Name', '')}" for node in nodes)
+        flags = {'seq_scan' for node in nodes if node['Node Type'] == 'Seq Scan'}
+        return root['Total Cost'], text, sorted(flags)
+    shape, _cost, flags = plans.explain_sqlite(sql, params, plans.TableRows())
+    return None, '\n'.join(shape), sorted(flags)
+
+
+def estimate(proposal):
+    """Планы образцов групп предложения до и после индекса."""
+    samples = []
+    for cluster in sorted(proposal.clusters, key=lambda cluster: -cluster.total_ms)[:SAMPLES_PER_PROPOSAL]:
+        sql, params = cluster.sample['sql'], querylog.decode_params(cluster.sample.get('params') or [])
+        try:
+            with transaction.atomic():
+                before = explain(sql, params)
+                with hypothetical(proposal) as name:
+                    if name is None:
+                        return {'available': False}
+                    after = explain(sql, params)
+        except DatabaseError as error:
+            samples.append({'fingerprint': cluster.fingerprint, 'error': str(error).strip()})
+            continue
+        sample = {
+            'fingerprint': cluster.fingerprint,
+            'used': name in after[1],
+            'cost_before': before[0],
+            'cost_after': after[0],
+            'flags_before': before[2],
+            'flags_after': after[2],
+        }
+        if before[0] and after[0] is not None and sample['used']:
+            sample['saving_ms'] = round(cluster.total_ms * max(0.0, 1 - after[0] / before[0]), 1)
+        samples.append(sample)
+    return {'available': True, 'samples': samples}
+
+
+def advise(path, top=10, min_calls=1, explain_plans=True):
+    clusters = load(path, min_calls)
+    proposals = propose(clusters)[:top]
+    return {
+        'queries': sum(cluster.calls for cluster in clusters),
+        'fingerprints': len(clusters),
+        'proposals': [
+            {
+                'model': proposal.model._meta.label,
+                'table': proposal.table,
+                'index': proposal.code(),
+                'ddl': proposal.ddl(),
+                'auto_created': bool(proposal.model._meta.auto_created),
+                'calls': proposal.calls,
+                'total_ms': round(proposal.total_ms, 1),
+                'fingerprints': [cluster.fingerprint for cluster in proposal.clusters],
+                'estimate': estimate(proposal) if explain_plans else None,
+            }
+            for proposal in proposals
+        ],
+        'existing': review(clusters),
+    }
+
+
+class AdviseCommand(BaseCommand):
+    help = 'Предложения индексов по журналу SQL-запросов (QUERY_LOG)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='журнал запросов (по умолчанию QUERY_LOG["PATH"])')
+        parser.add_argument('--top', type=int, default=10, help='сколько предложений показать')
+        parser.add_argument('--min-calls', type=int, default=1, help='пропускать более редкие запросы')
+        parser.add_argument('--no-explain', action='store_true', help='не оценивать планы')
+        parser.add_argument('--json', action='store_true', help='вывести результат JSON')
+
+    def handle(self, *args, **options):
+        path = options['log'] or querylog.options()['PATH']
+        try:
+            result = advise(path, options['top'], options['min_calls'], not options['no_explain'])
+        except FileNotFoundError:
+            raise CommandError(f'Нет журнала запросов {path}: включите QUERY_LOG или loadtest --log-queries')
+        if options['json']:
+            self.stdout.write(json.dumps(result, ensure_ascii=False, indent=1))
+            return
+        self.stdout.write(f"Запросов в журнале: {result['queries']}, отпечатков: {result['fingerprints']}")
+        if not result['proposals']:
+            self.stdout.write(self.style.SUCCESS('Новых индексов не нужно'))
+        for number, proposal in enumerate(result['proposals'], 1):
+            self.stdout.write(
+                f"{number}. {proposal['model']}: {proposal['index']}"
+                f"  # {proposal['calls']} вызовов, {proposal['total_ms']} мс"
+            )
+            if proposal['auto_created']:
+                self.stdout.write(f"   таблица связи M2M — RunSQL в миграции: {proposal['ddl']}")
+            self.write_estimate(proposal['estimate'])
+        for note in result['existing']:
+            columns = ', '.join(note['columns'])
+            if note['status'] == 'unused':
+                self.stdout.write(self.style.WARNING(
+                    f"{note['table']}: {note['index']} ({columns}) — запросы журнала его колонки не используют"
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"{note['table']}: {note['index']} ({columns}) — избыточен: "
+                    f"{', '.join(note['unused_columns'])} не используются, хватает {note['instead']}"
+                ))
+
+    def write_estimate(self, estimate):
+        if estimate is None:
+            return
+        if not estimate['available']:
+            self.stdout.write('   оценка недоступна: нет расширения hypopg')
+            return
+        for sample in estimate['samples']:
+            if 'error' in sample:
+                self.stdout.write(f"   {sample['fingerprint']}: ошибка плана: {sample['error']}")
+                continue
+            line = f"   {sample['fingerprint']}: " + ('индекс используется' if sample['used'] else 'индекс не используется')
+            if sample['cost_before'] is not None:
+                line += f", стоимость {sample['cost_before']} → {sample['cost_after']}"
+            if sample['flags_before'] != sample['flags_after']:
+                line += f", пометки {sample['flags_before'] or '—'} → {sample['flags_after'] or '—'}"
+            if 'saving_ms' in sample:
+                line += f", ~{sample['saving_ms']} мс"
+            self.stdout.write(line)
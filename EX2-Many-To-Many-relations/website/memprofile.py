@@ -0,0 +1,429 @@
+"""
+Профиль памяти страниц и команд на tracemalloc.
+
+При ``MEMORY_PROFILE['ENABLED']`` MemoryProfileMiddleware снимает профиль
+каждого запроса; ``manage.py memprofile <команда> [аргументы]`` — профиль
+любой команды (loaddata, dumpdata, export, seed...). В профиле:
+
+  * peak — пик памяти сверх занятой до начала, в байтах (без памяти
+    самих снимков tracemalloc);
+  * categories — на что ушли байты у пика: models (экземпляры моделей
+    и их поля), querysets (строки из БД, кеш результатов, SQL),
+    templates (отрисовка), serialization (сериализаторы и json), other.
+    Выделение относится к ближайшему к нему кадру, путь которого есть
+    в CATEGORIES;
+  * stacks — стеки выделений; write_folded() пишет их в folded-формате
+    («кадр;кадр;... байты») для flamegraph.pl, speedscope, inferno.
+
+Категории считаются по самому большому снимку за время работы. Новый
+снимок берётся, когда занятая память выросла больше чем на 5 % (и на
+GROWTH_STEP): в конце отрисовки шаблона, выборки queryset, сохранения
+объекта при loaddata и сериализации (CHECKPOINTS), в фоне раз в INTERVAL
+секунд и по checkpoint() из своего кода.
+
+Бюджеты — BUDGETS: {'articles': '32MB', 'loaddata': '256MB'} по имени URL
+или команды. Превышение пишется в журнал, а при STRICT (в тестах) бросает
+MemoryBudgetExceeded. Одновременно идёт один профиль: запросы других
+потоков в это время проходят без профиля, поэтому профилируют сервер
+с одним рабочим потоком. tracemalloc замедляет код в разы, и тем сильнее,
+чем больше FRAMES (глубина стеков во флеймграфе).
+"""
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+CATEGORIES = (
+    ('serialization', ('django/core/serializers/', '/json/', 'website/export.py')),
+    ('templates', ('django/template/', 'django/templatetags/')),
+    ('models', ('django/db/models/base.py', 'django/db/models/fields/', 'django/db/models/query_utils.py')),
+    ('querysets', ('django/db/models/query.py', 'django/db/models/sql/', 'django/db/backends/', 'django/db/utils.py')),
+)
+
+# (класс, метод): после вызова — проверка, не пора ли снять снимок
+CHECKPOINTS = (
+    ('django.template.base.Template', '_render'),
+    ('django.db.models.query.QuerySet', '_fetch_all'),
+    ('django.core.serializers.base.DeserializedObject', 'save'),
+    ('django.core.serializers.base.Serializer', 'serialize'),
+)
+
+GROWTH = 1.05
+GROWTH_STEP = 16 * 1024
+SIZE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*$', re.IGNORECASE)
+UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+logger = logging.getLogger('website.memprofile')
+_lock = threading.Lock()
+# сэмплер текущего профиля: его проверяют CHECKPOINTS и checkpoint()
+_active = None
+
+
+def options():
+    return {
+        'ENABLED': False,
+        'PATH': os.path.join(settings.BASE_DIR, '.cache', 'memory'),
+        'FRAMES': 10,
+        'INTERVAL': 0.05,
+        'BUDGETS': {},
+        'STRICT': False,
+        'CATEGORIES': CATEGORIES,
+        **getattr(settings, 'MEMORY_PROFILE', {}),
+    }
+
+
+class MemoryBudgetExceeded(AssertionError):
+    """Пик памяти страницы или команды больше её бюджета (MEMORY_PROFILE['BUDGETS'])."""
+
+
+def parse_size(value):
+    """512KB, 64MB, 1GB или число байт."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = SIZE.match(str(value))
+    if match is None:
+        raise ValueError(f'непонятный размер {value!r}: нужно 512KB, 64MB, 1GB или число байт')
+    return int(float(match[1]) * UNITS[match[2].upper()])
+
+
+def human(size):
+    if abs(size) < 1024:
+        return f'{size} B'
+    for unit in ('KB', 'MB', 'GB'):
+        size /= 1024
+        if abs(size) < 1024 or unit == 'GB':
+            return f'{size:.1f} {unit}'
+
+
+def category(traceback, categories=CATEGORIES):
+    """Категория выделения: по ближайшему к месту выделения кадру из categories."""
+    for frame in reversed(traceback):
+        filename = frame.filename.replace(os.sep, '/')
+        for name, fragments in categories:
+            if any(fragment in filename for fragment in fragments):
+                return name
+    return 'other'
+
+
+@functools.lru_cache(maxsize=1)
+def _roots():
+    roots = {os.path.abspath(path) for path in sys.path if path} | {os.path.abspath(settings.BASE_DIR)}
+    return sorted(roots, key=len, reverse=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def _short(filename):
+    for root in _roots():
+        if filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1:]
+            break
+    return filename.replace(os.sep, '/').replace(';', ':')
+
+
+def label(frame):
+    """Кадр для флеймграфа: путь от sys.path или BASE_DIR и строка."""
+    return f'{_short(frame.filename)}:{frame.lineno}'
+
+
+class Profile:
+    """Итог профиля: пик, байты у пика по категориям и стеки выделений."""
+
+    def __init__(self, name):
+        self.name = name
+        self.peak = 0
+        self.retained = 0
+        self.seconds = 0.0
+        self.categories = {}
+        self.stacks = []
+
+    @property
+    def budget(self):
+        value = options()['BUDGETS'].get(self.name)
+        return None if value is None else parse_size(value)
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.peak > self.budget
+
+    def attribute(self, snapshot, start, categories=CATEGORIES):
+        self.categories, self.stacks = {}, []
+        for stat in snapshot.compare_to(start, 'traceback'):
+            if stat.size_diff <= 0:
+                continue
+            kind = category(stat.traceback, categories)
+            self.categories[kind] = self.categories.get(kind, 0) + stat.size_diff
+            self.stacks.append((stat.traceback, stat.size_diff))
+
+    def top(self, limit=10):
+        """Строки, выделившие больше всего (по месту выделения)."""
+        lines = {}
+        for traceback, size in self.stacks:
+            where = label(traceback[-1])
+            lines[where] = lines.get(where, 0) + size
+        return sorted(lines.items(), key=lambda item: -item[1])[:limit]
+
+    def folded(self):
+        """Строки folded-формата: корень — имя профиля, дальше кадры от внешнего к месту выделения."""
+        root = self.name.replace(';', ':').replace(' ', '_')
+        for traceback, size in self.stacks:
+            yield ';'.join([root, *(label(frame) for frame in traceback)]) + f' {size}'
+
+    def write_folded(self, path, append=False):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a' if append else 'w', encoding='utf-8') as f:
+            for line in self.folded():
+                f.write(line + '\n')
+        return path
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'peak': self.peak,
+            'retained': self.retained,
+            'budget': self.budget,
+            'seconds': round(self.seconds, 3),
+            'categories': dict(sorted(self.categories.items(), key=lambda item: -item[1])),
+        }
+
+    def describe(self):
+        budget = f' (бюджет {human(self.budget)})' if self.budget is not None else ''
+        return f'{self.name}: пик {human(self.peak)}{budget}, к концу занято {human(self.retained)}, {self.seconds:.2f} с'
+
+
+def budget_message(result):
+    parts = ', '.join(f'{kind} {human(size)}' for kind, size in result.as_dict()['categories'].items())
+    return f'{result.name}: пик памяти {human(result.peak)} больше бюджета {human(result.budget)} ({parts})'
+
+
+def check_budget(result):
+    """Пик сверх бюджета: MemoryBudgetExceeded при STRICT, иначе предупреждение в журнал."""
+    if not result.over_budget:
+        return
+    if options()['STRICT']:
+        raise MemoryBudgetExceeded(budget_message(result))
+    logger.warning(budget_message(result))
+
+
+class _Sampler:
+    """
+    Самый большой снимок за время профиля и точный пик. Снимки tracemalloc
+    сами занимают отслеживаемую память: она вычитается из пика (overhead),
+    а после каждого снимка пик сбрасывается (reset_peak).
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.guard = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.snapshot = None
+        self.snapshot_overhead = 0
+        self.overhead = 0
+        self.size = 0
+        self.peak = 0
+
+    def start(self):
+        before = tracemalloc.get_traced_memory()[0]
+        self.first = tracemalloc.take_snapshot()
+        self.base = before
+        self.overhead = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.reset_peak()
+        if self.interval > 0:
+            self.thread = threading.Thread(target=self._run, name='memprofile', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def _used(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak - self.overhead - self.base)
+        return current - self.overhead - self.base
+
+    def check(self, final=False):
+        with self.guard:
+            used = self._used()
+            if final:
+                if self.snapshot is not None and used <= self.size:
+                    return used
+            elif used <= self.size * GROWTH + GROWTH_STEP:
+                return used
+            self.snapshot = None
+            self.overhead -= self.snapshot_overhead
+            before = tracemalloc.get_traced_memory()[0]
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_overhead = tracemalloc.get_traced_memory()[0] - before
+            self.overhead += self.snapshot_overhead
+            self.size = used
+            tracemalloc.reset_peak()
+            return used
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        return self.check(final=True)
+
+
+def checkpoint():
+    """Проверить, не пора ли снять снимок (вызывать у предполагаемого пика своего кода)."""
+    sampler = _active
+    if sampler is not None:
+        sampler.check()
+
+
+def _checkpointed(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        finally:
+            checkpoint()
+    return wrapper
+
+
+@contextmanager
+def _patched():
+    originals = []
+    for path, name in CHECKPOINTS:
+        owner = import_string(path)
+        originals.append((owner, name, vars(owner)[name]))
+        setattr(owner, name, _checkpointed(vars(owner)[name]))
+    try:
+        yield
+    finally:
+        for owner, name, original in originals:
+            setattr(owner, name, original)
+
+
+def _filters():
+    # память самого tracemalloc и профилировщика — не предмет профиля
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ]
+
+
+@contextmanager
+def profile(name):
+    """
+    Профиль блока: отдаёт Profile, который заполняется на выходе, или None,
+    если в процессе уже идёт другой профиль.
+    """
+    global _active
+    if not _lock.acquire(blocking=False):
+        yield None
+        return
+    current = options()
+    ours = not tracemalloc.is_tracing()
+    if ours:
+        tracemalloc.start(current['FRAMES'])
+    result = Profile(name)
+    sampler = _Sampler(current['INTERVAL'])
+    started = time.perf_counter()
+    try:
+        with _patched():
+            sampler.start()
+            _active = sampler
+            try:
+                yield result
+            finally:
+                _active = None
+                result.retained = sampler.stop()
+        result.seconds = time.perf_counter() - started
+        result.peak = max(sampler.peak, result.retained)
+        if ours:
+            tracemalloc.stop()
+        filters = _filters()
+        result.attribute(
+            sampler.snapshot.filter_traces(filters), sampler.first.filter_traces(filters), current['CATEGORIES'],
+        )
+    finally:
+        if ours and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        _lock.release()
+
+
+def record(result):
+    """Итог в PATH/profiles.ndjson и стеки в PATH/<имя>.folded (дописываются)."""
+    path = options()['PATH']
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'profiles.ndjson'), 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'at': datetime.now().isoformat(timespec='seconds'), **result.as_dict()}) + '\n')
+    filename = re.sub(r'[^\w.-]+', '_', result.name).strip('_') or 'root'
+    return result.write_folded(os.path.join(path, f'{filename}.folded'), append=True)
+
+
+class MemoryProfileMiddleware:
+    """
+    Профиль памяти запроса при MEMORY_PROFILE['ENABLED']; имя профиля — имя
+    URL (resolver_match.view_name). Потоковый ответ отдаётся уже после
+    профиля, и его память не учитывается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not options()['ENABLED']:
+            return self.get_response(request)
+        with profile(request.path) as result:
+            response = self.get_response(request)
+        if result is None:
+            return response
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.view_name:
+            result.name = match.view_name
+        response['X-Memory-Peak'] = str(result.peak)
+        record(result)
+        check_budget(result)
+        return response
+
+
+class MemoryProfileCommand(BaseCommand):
+    help = 'Профиль памяти команды: пик, байты по категориям, флеймграф (website/memprofile.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', metavar='COMMAND', help='команда manage.py')
+        parser.add_argument('arguments', nargs='...', metavar='ARG', help='её аргументы')
+        parser.add_argument('--folded', metavar='FILE', help='куда записать стеки (по умолчанию PATH/<команда>-<время>.folded)')
+        parser.add_argument('--top', type=int, default=10, help='сколько мест выделения показать')
+        parser.add_argument('--check', action='store_true', help='ошибка, если пик больше бюджета команды')
+
+    def handle(self, *args, **flags):
+        name = flags['name']
+        with profile(name) as result:
+            if result is None:
+                raise CommandError('в процессе уже идёт профиль памяти')
+            call_command(name, *flags['arguments'], stdout=self.stdout, stderr=self.stderr)
+        self.stdout.write(result.describe())
+        total = sum(result.categories.values()) or 1
+        for kind, size in result.as_dict()['categories'].items():
+            self.stdout.write(f'  {kind:<14} {human(size):>10}  {size * 100 // total:>3}%')
+        if flags['top']:
+            self.stdout.write('Больше всего выделили:')
+            for where, size in result.top(flags['top']):
+                self.stdout.write(f'  {human(size):>10}  {where}')
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        path = flags['folded'] or os.path.join(options()['PATH'], f'{name}-{stamp}.folded')
+        self.stdout.write(f'Флеймграф (folded): {result.write_folded(path)}')
+        if result.over_budget:
+            if flags['check'] or options()['STRICT']:
+                raise CommandError(budget_message(result))
+            self.stdout.write(self.style.WARNING(budget_message(result)))
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -37,10 +38,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'articles.apps.ArticlesConfig',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    # профиль памяти запроса при MEMORY_PROFILE['ENABLED'] (website/memprofile.py)
+    'website.memprofile.MemoryProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +71,9 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'libraries': {
+                'critical_css': 'website.critical_css',
+            },
         },
     },
 ]
@@ -84,6 +92,11 @@ DATABASES = {
     }
 }
 
+# manage.py loadtest --server gunicorn/uvicorn: сервер-подпроцесс работает
+# с тестовой БД, которую засеяла команда
+if os.environ.get('LOADTEST_DB_NAME'):
+    DATABASES['default']['NAME'] = os.environ['LOADTEST_DB_NAME']
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -126,10 +139,133 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# collectstatic складывает сюда файлы с отпечатками и их .gz/.br копии,
+# а website.static_handler отдаёт их с долгим Cache-Control
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+STATIC_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'website.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# картинки статей больше этого (px по большей стороне) уменьшает фоновая
+# задача articles.process_image (articles/tasks.py)
+ARTICLE_IMAGE_MAX_SIDE = 1600
+
+# Общий (для всех воркеров) уровень кеша: файлы на локальном диске
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache'),
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+TESTING = sys.argv[1:2] == ['test']
+
+if TESTING:
+    # версии кеша/справочников не должны переживать прогон тестов
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# website/cache.py: LRU в процессе поверх CACHES['default'];
+# в тестах выключен, чтобы данные разных тестов не пересекались
+TIERED_CACHE = {
+    'ENABLED': not TESTING,
+    'SHARED_ALIAS': 'default',
+    'LOCAL_MAX_BYTES': 16 * 1024 * 1024,
+    'SOFT_TTL': 30,
+    'HARD_TTL': 600,
+}
+
+# website/warmup.py: wsgi.py/asgi.py прогревают процесс до первого запроса;
+# при DEBUG не нужно — runserver перезапускается на каждое изменение
+WARMUP_ON_STARTUP = not DEBUG
+
+# website/changes.py: лента изменений не отдаёт записи моложе SETTLE_SECONDS
+# (ещё не закоммиченные транзакции), журнал удалений хранится RETENTION_DAYS
+CHANGE_FEED = {
+    'SETTLE_SECONDS': 2,
+    'RETENTION_DAYS': 30,
+}
+
+# website/plans.py: manage.py check_plans — эталон планов, размер синтетики,
+# от скольких строк полный проход и сортировка таблицы считаются проблемой
+QUERY_PLANS = {
+    'BASELINE': os.path.join(BASE_DIR, 'query_plans.json'),
+    'SEED_SIZE': 5000,
+    'SEQ_SCAN_MIN_ROWS': 1000,
+    'COST_TOLERANCE': 2.0,
+}
+
+# website/prefetch.py: manage.py prefetch_plan — куда --update пишет пути,
+# увиденные при отрисовке (их берёт planned()), и размер синтетики
+PREFETCH_PLANS = {
+    'LEARNED': os.path.join(BASE_DIR, 'prefetch_plans.json'),
+    'SEED_SIZE': 50,
+}
+
+# website/querylog.py: журнал SQL-запросов для manage.py advise_indexes
+# (website/indexes.py); SAMPLE_RATE — доля записываемых запросов, MIN_MS —
+# писать только запросы не быстрее порога
+QUERY_LOG = {
+    'ENABLED': False,
+    'PATH': os.path.join(BASE_DIR, '.cache', 'queries.ndjson'),
+    'SAMPLE_RATE': 1.0,
+    'MIN_MS': 0.0,
+}
+
+# website/memprofile.py: профиль памяти tracemalloc — MemoryProfileMiddleware
+# (при ENABLED) и manage.py memprofile <команда>; BUDGETS — пик по имени URL
+# или команды, STRICT — превышение бюджета бросает MemoryBudgetExceeded;
+# FRAMES — глубина стеков: чем больше, тем медленнее под профилем
+MEMORY_PROFILE = {
+    'ENABLED': False,
+    'PATH': os.path.join(BASE_DIR, '.cache', 'memory'),
+    'FRAMES': 10,
+    'INTERVAL': 0.05,
+    'BUDGETS': {
+        'articles': '32MB',
+        'article': '16MB',
+        'loaddata': '256MB',
+        'dumpdata': '256MB',
+    },
+    'STRICT': False,
+}
+
+# jobs/queue.py: очередь фоновых задач в БД, воркер — manage.py jobs_worker;
+# BACKOFF_SECONDS — пауза перед первым повтором (дальше вдвое больше),
+# KEEP_DAYS — сколько хранить выполненные задачи (manage.py jobs --prune)
+JOBS = {
+    'PROCESSES': 2,
+    'POLL_SECONDS': 1.0,
+    'DEFAULT_TIMEOUT': 300,
+    'BACKOFF_SECONDS': 10,
+    'LEASE_GRACE_SECONDS': 30,
+    'LOCK_SECONDS': 30,
+    'KEEP_DAYS': 7,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'website.warmup': {'handlers': ['console'], 'level': 'INFO'},
+        'jobs': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 TEST_RUNNER = 'articles.tests_runner.ProgressTestRunner'
\ No newline at end of file
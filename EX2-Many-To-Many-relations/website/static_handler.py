@@ -0,0 +1,147 @@
+"""
+Небольшой WSGI-обработчик статики из STATIC_ROOT.
+
+Умеет:
+  * выбирать .br/.gz копию по заголовку Accept-Encoding;
+  * ставить far-future Cache-Control для файлов с отпечатком в имени;
+  * отвечать 304 по If-None-Match.
+Всё остальное передаётся обёрнутому приложению Django.
+"""
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from wsgiref.headers import Headers
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+# css/bootstrap.min.3c2f1e9a6b7d.css — так именует файлы ManifestStaticFilesStorage
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# порядок важен: сначала лучшее сжатие
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header):
+    """Разбирает Accept-Encoding в множество кодировок с q > 0."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def etag_matches(header, etag):
+    """Есть ли ``etag`` в списке If-None-Match (слабое сравнение, ``*`` — любой)."""
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+
+class StaticFile:
+    """Сведения о файле и его сжатых вариантах (снимаются один раз)."""
+
+    def __init__(self, path, name):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = '%x-%x' % (int(stat.st_mtime), stat.st_size)
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.immutable = bool(HASHED_NAME_RE.search(name))
+        self.variants = {None: (path, stat.st_size)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.isfile(path + suffix):
+                self.variants[encoding] = (path + suffix, os.path.getsize(path + suffix))
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _suffix in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return None
+
+
+class PrecompressedStaticFiles:
+    """
+    WSGI-обёртка: ``application = PrecompressedStaticFiles(get_wsgi_application())``.
+    """
+
+    def __init__(self, application, root=None, prefix=None, max_age=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        if not self.prefix.startswith('/'):
+            self.prefix = '/' + self.prefix
+        self.max_age = max_age if max_age is not None else getattr(
+            settings, 'STATIC_CACHE_MAX_AGE', 60 * 60 * 24 * 365)
+        # файлы после collectstatic не меняются — stat() делаем один раз;
+        # промахи не запоминаем, иначе словарь растёт от любых случайных URL
+        self._files = {}
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if self.root and path.startswith(self.prefix) and environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            static_file = self.find(path[len(self.prefix):])
+            if static_file is not None:
+                return self.serve(static_file, environ, start_response)
+        return self.application(environ, start_response)
+
+    def find(self, name):
+        if name in self._files:
+            return self._files[name]
+        try:
+            path = safe_join(self.root, name)
+        except (SuspiciousFileOperation, ValueError):  # попытка выйти за пределы STATIC_ROOT
+            return None
+        if not os.path.isfile(path):
+            return None
+        static_file = self._files[name] = StaticFile(path, name)
+        return static_file
+
+    def serve(self, static_file, environ, start_response):
+        encoding = static_file.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        path, size = static_file.variants[encoding]
+        # у каждого варианта сжатия должен быть свой ETag
+        etag = '"%s%s"' % (static_file.etag, '-' + encoding if encoding else '')
+
+        headers = Headers([])
+        headers['Vary'] = 'Accept-Encoding'
+        headers['ETag'] = etag
+        headers['Last-Modified'] = static_file.last_modified
+        if static_file.immutable:
+            headers['Cache-Control'] = 'public, max-age=%d, immutable' % self.max_age
+        else:
+            # без отпечатка браузер должен перепроверять файл
+            headers['Cache-Control'] = 'public, max-age=0, must-revalidate'
+
+        if etag_matches(environ.get('HTTP_IF_NONE_MATCH', ''), etag):
+            start_response('304 Not Modified', headers.items())
+            return []
+
+        headers['Content-Type'] = static_file.content_type
+        headers['Content-Length'] = str(size)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        start_response('200 OK', headers.items())
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), 8192)